@@ -0,0 +1,473 @@
+#!/usr/bin/env python
+# Copyright 2015-2018 Yelp Inc.
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Offline benchmarks for the functions on the marathon deploy path.
+
+Builds a synthetic soa-configs tree and fake Marathon app and task payloads for a given number of instances, times a
+sweep of each benchmarked function over all of them, and measures the peak memory traced during a sweep. Results are
+compared against a stored baseline (benchmarks/baseline.json) and the script exits 1 if any benchmark got slower or
+allocates more than --tolerance allows.
+
+Timings are compared relative to a reference workload of plain python timed on the same machine, so a baseline
+recorded on one machine can be compared against on another. Absolute timings are reported too.
+
+Usage:
+    python benchmarks/run_benchmarks.py --scale 1000 --scale 10000
+    python benchmarks/run_benchmarks.py --update-baseline
+"""
+import argparse
+import contextlib
+import json
+import os
+import shutil
+import sys
+import tempfile
+import time
+import tracemalloc
+from typing import Any
+from typing import Callable
+from typing import Dict
+from typing import Iterator
+from typing import List
+from typing import Tuple
+
+import mock
+import service_configuration_lib
+import yaml
+from marathon.models import MarathonApp
+
+from paasta_tools import drain_lib
+from paasta_tools import marathon_tools
+from paasta_tools import setup_marathon_job
+from paasta_tools import soa_config_cache
+from paasta_tools.long_running_service_tools import load_service_namespace_config
+from paasta_tools.utils import deep_merge_dictionaries
+from paasta_tools.utils import get_config_hash
+from paasta_tools.utils import SystemPaastaConfig
+
+
+CLUSTER = 'bench-cluster'
+INSTANCES_PER_SERVICE = 10
+TASKS_PER_APP = 5
+OLD_APPS_PER_SERVICE = 2
+DEFAULT_BASELINE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'baseline.json')
+DEFAULT_SCALES = [1000]
+DEFAULT_TOLERANCE = 0.25
+DEFAULT_REPEAT = 3
+
+# The metrics compared against the baseline
+METRICS = ('relative_time', 'peak_kib')
+
+
+def parse_args(argv: List[str]) -> argparse.Namespace:
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        '--scale', type=int, action='append', dest='scales',
+        help=f'Number of instances to benchmark with; may be given more than once (default: {DEFAULT_SCALES})',
+    )
+    parser.add_argument(
+        '--baseline', default=DEFAULT_BASELINE,
+        help='JSON file of results to compare against (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--update-baseline', action='store_true',
+        help='Write these results to the baseline file instead of comparing against it',
+    )
+    parser.add_argument(
+        '--tolerance', type=float, default=DEFAULT_TOLERANCE,
+        help='Fraction a metric may exceed its baseline by before it counts as a regression (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--repeat', type=int, default=DEFAULT_REPEAT,
+        help='Number of timed sweeps per benchmark; the fastest is reported (default: %(default)s)',
+    )
+    parser.add_argument(
+        '--only', action='append', default=[],
+        help='Only run benchmarks whose name contains this; may be given more than once',
+    )
+    return parser.parse_args(argv)
+
+
+def get_system_paasta_config() -> SystemPaastaConfig:
+    return SystemPaastaConfig(
+        {
+            'cluster': CLUSTER,
+            'docker_registry': 'docker-registry.bench',
+            'volumes': [
+                {'hostPath': f'/nail/volume{i}', 'containerPath': f'/nail/volume{i}', 'mode': 'RO'}
+                for i in range(10)
+            ],
+            'deploy_blacklist': [['region', 'bench-region-9']],
+            'dockercfg_location': 'file:///root/.dockercfg',
+        },
+        '/fake/etc/paasta',
+    )
+
+
+def get_service_names(scale: int) -> List[str]:
+    return [f'service{i}' for i in range(max(1, scale // INSTANCES_PER_SERVICE))]
+
+
+def get_instance_names() -> List[str]:
+    return [f'instance{i}' for i in range(INSTANCES_PER_SERVICE)]
+
+
+def get_instance_config(service_number: int, instance_number: int) -> Dict[str, Any]:
+    config: Dict[str, Any] = {
+        'cpus': 0.1 * (instance_number + 1),
+        'mem': 512 + instance_number,
+        'instances': 3,
+        'deploy_group': 'prod.everything',
+        'env': {f'VAR{i}': f'value{i}' for i in range(10)},
+        'extra_volumes': [
+            {'hostPath': f'/nail/srv/{service_number}', 'containerPath': f'/srv/{service_number}', 'mode': 'RO'},
+        ],
+        'monitoring': {'team': 'bench', 'page': False},
+        'healthcheck_grace_period_seconds': 60,
+    }
+    # a mix of instances with hand written constraints, discovery based ones and pool based ones
+    if instance_number % 3 == 0:
+        config['constraints'] = [['region', 'GROUP_BY', '3']]
+    elif instance_number % 3 == 1:
+        config['deploy_blacklist'] = [['habitat', f'habitat{instance_number}']]
+    else:
+        config['pool'] = 'batch'
+    return config
+
+
+def write_soa_configs(soa_dir: str, scale: int) -> List[Tuple[str, str]]:
+    """Write a service.yaml, smartstack.yaml, deployments.json and marathon-<cluster>.yaml for enough services to
+    have scale instances and return their (service, instance)s."""
+    service_instances = []
+    for service_number, service in enumerate(get_service_names(scale)):
+        service_dir = os.path.join(soa_dir, service)
+        os.makedirs(service_dir)
+        with open(os.path.join(service_dir, 'service.yaml'), 'w') as f:
+            yaml.safe_dump({'description': service, 'docker_registry': 'docker-registry.bench'}, f)
+        with open(os.path.join(service_dir, 'smartstack.yaml'), 'w') as f:
+            yaml.safe_dump(
+                {
+                    instance: {
+                        'proxy_port': 20000 + service_number,
+                        'healthcheck_uri': '/status',
+                        'discover': 'region',
+                        'advertise': ['region'],
+                    }
+                    for instance in get_instance_names()
+                },
+                f,
+            )
+        with open(os.path.join(service_dir, f'marathon-{CLUSTER}.yaml'), 'w') as f:
+            yaml.safe_dump(
+                {
+                    instance: get_instance_config(service_number, instance_number)
+                    for instance_number, instance in enumerate(get_instance_names())
+                },
+                f,
+            )
+        with open(os.path.join(service_dir, 'deployments.json'), 'w') as f:
+            json.dump(
+                {
+                    'v1': {},
+                    'v2': {
+                        'deployments': {
+                            'prod.everything': {
+                                'docker_image': f'services-{service}:paasta-{"a" * 40}',
+                                'git_sha': 'a' * 40,
+                            },
+                        },
+                        'controls': {
+                            f'{service}:{CLUSTER}.{instance}': {'desired_state': 'start', 'force_bounce': None}
+                            for instance in get_instance_names()
+                        },
+                    },
+                },
+                f,
+            )
+        service_instances.extend((service, instance) for instance in get_instance_names())
+    return service_instances[:scale]
+
+
+def get_marathon_app_payload(app_id: str, app_number: int) -> Dict[str, Any]:
+    return {
+        'id': app_id,
+        'instances': TASKS_PER_APP,
+        'healthChecks': [{'protocol': 'HTTP', 'path': '/status', 'portIndex': 0}],
+        'tasks': [
+            {
+                'id': f'{app_id.lstrip("/")}.task{task_number}',
+                'appId': app_id,
+                'host': f'host{(app_number * TASKS_PER_APP + task_number) % 500}.bench',
+                'ports': [31000 + task_number],
+                'stagedAt': '2018-06-01T00:00:00.000Z',
+                'startedAt': '2018-06-01T00:00:10.000Z',
+                'healthCheckResults': [{'alive': task_number != 0, 'taskId': f'task{task_number}'}],
+            }
+            for task_number in range(TASKS_PER_APP)
+        ],
+    }
+
+
+def get_old_marathon_apps(service_instances: List[Tuple[str, str]]) -> List[List[MarathonApp]]:
+    """Fake MarathonApps, OLD_APPS_PER_SERVICE for each instance, with TASKS_PER_APP tasks each."""
+    apps = []
+    for instance_number, (service, instance) in enumerate(service_instances):
+        apps.append([
+            MarathonApp.from_json(get_marathon_app_payload(
+                f'/{service}.{instance}.gitold{i}.config{i}',
+                instance_number * OLD_APPS_PER_SERVICE + i,
+            ))
+            for i in range(OLD_APPS_PER_SERVICE)
+        ])
+    return apps
+
+
+class Fixture:
+    """The synthetic soa-configs tree and payloads for one scale, and the inputs each benchmark sweeps over."""
+
+    def __init__(self, scale: int) -> None:
+        self.scale = scale
+        # Like paasta-deployd and paasta-api, so that the cold benchmarks parse every yaml file
+        service_configuration_lib.disable_yaml_cache()
+        self.soa_dir = tempfile.mkdtemp(prefix='paasta-benchmarks-')
+        self.system_paasta_config = get_system_paasta_config()
+        self.service_instances = write_soa_configs(self.soa_dir, scale)
+        with self.patched():
+            self.instance_configs = [
+                marathon_tools.load_marathon_service_config_no_cache(
+                    service, instance, CLUSTER, soa_dir=self.soa_dir,
+                )
+                for service, instance in self.service_instances
+            ]
+            self.service_namespace_configs = [
+                load_service_namespace_config(service, instance, soa_dir=self.soa_dir)
+                for service, instance in self.service_instances
+            ]
+            self.app_dicts = [config.format_marathon_app_dict() for config in self.instance_configs]
+        self.merge_inputs = [
+            (config.config_dict, {'env': {'DEFAULT': 'yes'}, 'monitoring': {'team': 'default', 'runbook': 'y/r'}})
+            for config in self.instance_configs
+        ]
+        self.old_apps = get_old_marathon_apps(self.service_instances)
+        self.draining_hosts = {f'host{i}.bench' for i in range(0, 500, 50)}
+
+    @contextlib.contextmanager
+    def patched(self) -> Iterator[None]:
+        """Point everything that would read /etc/paasta or the real soa-configs at the synthetic ones."""
+        with mock.patch(
+            'paasta_tools.marathon_tools.load_system_paasta_config', autospec=True,
+            return_value=self.system_paasta_config,
+        ), mock.patch(
+            'paasta_tools.marathon_tools.load_service_namespace_config', autospec=True,
+            side_effect=lambda service, namespace: load_service_namespace_config(
+                service, namespace, soa_dir=self.soa_dir,
+            ),
+        ):
+            yield
+
+    def cleanup(self) -> None:
+        shutil.rmtree(self.soa_dir, ignore_errors=True)
+        service_configuration_lib.enable_yaml_cache()
+
+
+def bench_load_marathon_service_config_no_cache(fixture: Fixture) -> int:
+    for service, instance in fixture.service_instances:
+        marathon_tools.load_marathon_service_config_no_cache(service, instance, CLUSTER, soa_dir=fixture.soa_dir)
+    return len(fixture.service_instances)
+
+
+def bench_load_marathon_service_config_no_cache_cold(fixture: Fixture) -> int:
+    soa_config_cache.invalidate()
+    return bench_load_marathon_service_config_no_cache(fixture)
+
+
+def bench_format_marathon_app_dict(fixture: Fixture) -> int:
+    for config in fixture.instance_configs:
+        config.format_marathon_app_dict()
+    return len(fixture.instance_configs)
+
+
+def bench_get_config_hash(fixture: Fixture) -> int:
+    for app_dict in fixture.app_dicts:
+        get_config_hash(app_dict)
+    return len(fixture.app_dicts)
+
+
+def bench_deep_merge_dictionaries(fixture: Fixture) -> int:
+    for overrides, defaults in fixture.merge_inputs:
+        deep_merge_dictionaries(overrides=overrides, defaults=defaults)
+    return len(fixture.merge_inputs)
+
+
+def bench_get_calculated_constraints(fixture: Fixture) -> int:
+    for config, service_namespace_config in zip(fixture.instance_configs, fixture.service_namespace_configs):
+        config.get_calculated_constraints(
+            system_paasta_config=fixture.system_paasta_config,
+            service_namespace_config=service_namespace_config,
+        )
+    return len(fixture.instance_configs)
+
+
+def bench_get_tasks_by_state(fixture: Fixture) -> int:
+    drain_method = drain_lib.NoopDrainMethod(service='bench', instance='bench', registrations=[])
+    client = mock.Mock()
+    for (service, instance), apps in zip(fixture.service_instances, fixture.old_apps):
+        setup_marathon_job.get_tasks_by_state(
+            other_apps_with_clients=[(app, client) for app in apps],
+            drain_method=drain_method,
+            service=service,
+            nerve_ns=instance,
+            bounce_health_params={},
+            system_paasta_config=fixture.system_paasta_config,
+            log_deploy_error=lambda msg: None,
+            draining_hosts=fixture.draining_hosts,
+        )
+    return len(fixture.service_instances)
+
+
+BENCHMARKS: Dict[str, Callable[[Fixture], int]] = {
+    'load_marathon_service_config_no_cache': bench_load_marathon_service_config_no_cache,
+    'load_marathon_service_config_no_cache.cold': bench_load_marathon_service_config_no_cache_cold,
+    'format_marathon_app_dict': bench_format_marathon_app_dict,
+    'get_config_hash': bench_get_config_hash,
+    'deep_merge_dictionaries': bench_deep_merge_dictionaries,
+    'get_calculated_constraints': bench_get_calculated_constraints,
+    'get_tasks_by_state': bench_get_tasks_by_state,
+}
+
+
+def reference_workload() -> None:
+    """Plain python dict, list and string work that doesn't depend on paasta_tools, to tell how fast this machine is"""
+    doc = {f'key{i}': {'name': f'name{i}', 'values': list(range(20)), 'enabled': i % 2 == 0} for i in range(200)}
+    for _ in range(20):
+        copied = json.loads(json.dumps(doc, sort_keys=True))
+        merged = {key: dict(value, extra=key.upper()) for key, value in sorted(copied.items())}
+        sum(len(value['values']) for value in merged.values() if value['enabled'])
+
+
+def time_reference_workload(repeat: int) -> float:
+    """Returns the fastest of repeat runs of reference_workload, in microseconds"""
+    reference_workload()
+    timings = []
+    for _ in range(max(repeat, 5)):
+        start = time.perf_counter()
+        reference_workload()
+        timings.append(time.perf_counter() - start)
+    return min(timings) * 1e6
+
+
+def run_benchmark(
+    benchmark: Callable[[Fixture], int],
+    fixture: Fixture,
+    repeat: int,
+    reference_usec: float,
+) -> Dict[str, float]:
+    """Returns the fastest of repeat sweeps as microseconds per call and relative to the reference workload, and the
+    peak memory traced during a separate sweep (tracing slows everything down, so it isn't timed)."""
+    timings = []
+    with fixture.patched():
+        # warm up any caches, as a long running sweep would have them
+        calls = benchmark(fixture)
+        for _ in range(repeat):
+            start = time.perf_counter()
+            benchmark(fixture)
+            timings.append(time.perf_counter() - start)
+
+        tracemalloc.start()
+        try:
+            benchmark(fixture)
+            _, peak = tracemalloc.get_traced_memory()
+        finally:
+            tracemalloc.stop()
+
+    usec_per_call = min(timings) / calls * 1e6
+    return {
+        'calls': calls,
+        'usec_per_call': round(usec_per_call, 2),
+        'relative_time': round(usec_per_call / reference_usec, 5),
+        'peak_kib': round(peak / 1024, 1),
+    }
+
+
+def compare_to_baseline(
+    results: Dict[str, Dict[str, float]],
+    baseline: Dict[str, Dict[str, float]],
+    tolerance: float,
+) -> List[str]:
+    """Returns a description of each metric that exceeds its baseline by more than tolerance."""
+    regressions = []
+    for key, result in sorted(results.items()):
+        for metric in METRICS:
+            expected = baseline.get(key, {}).get(metric)
+            if expected and result[metric] > expected * (1 + tolerance):
+                regressions.append(
+                    f'{key} {metric}: {result[metric]} vs {expected} in the baseline '
+                    f'(+{(result[metric] / expected - 1) * 100:.0f}%)',
+                )
+    return regressions
+
+
+def format_result_line(key: str, result: Dict[str, float], baseline: Dict[str, Dict[str, float]]) -> str:
+    line = f'{key:<55} {result["usec_per_call"]:>12.2f} us/call {result["peak_kib"]:>12.1f} KiB peak'
+    if baseline.get(key, {}).get('relative_time'):
+        change = result['relative_time'] / baseline[key]['relative_time'] - 1
+        line += f'  ({change * 100:+.0f}% relative time)'
+    return line
+
+
+def main(argv: List[str]=None) -> int:
+    args = parse_args(sys.argv[1:] if argv is None else argv)
+    scales = args.scales or DEFAULT_SCALES
+
+    baseline: Dict[str, Dict[str, float]] = {}
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+    reference_usec = time_reference_workload(args.repeat)
+    print(f'Reference workload: {reference_usec:.0f} us')
+
+    results: Dict[str, Dict[str, float]] = {}
+    for scale in scales:
+        print(f'Building a synthetic soa-configs tree for {scale} instances...')
+        fixture = Fixture(scale)
+        try:
+            for name, benchmark in BENCHMARKS.items():
+                if args.only and not any(only in name for only in args.only):
+                    continue
+                key = f'{name}@{scale}'
+                results[key] = run_benchmark(benchmark, fixture, args.repeat, reference_usec)
+                print(format_result_line(key, results[key], baseline))
+        finally:
+            fixture.cleanup()
+
+    if args.update_baseline:
+        baseline.update(results)
+        with open(args.baseline, 'w') as f:
+            json.dump(baseline, f, indent=2, sort_keys=True)
+            f.write('\n')
+        print(f'Wrote {len(results)} results to {args.baseline}')
+        return 0
+
+    regressions = compare_to_baseline(results, baseline, args.tolerance)
+    if regressions:
+        print(f'\n{len(regressions)} regression(s) beyond {args.tolerance * 100:.0f}% of the baseline:')
+        for regression in regressions:
+            print(f'  {regression}')
+        return 1
+    return 0
+
+
+if __name__ == '__main__':
+    sys.exit(main())
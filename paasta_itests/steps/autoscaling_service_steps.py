@@ -24,4 +24,4 @@ def save_fake_historical_load_data(context):
 def load_fake_historical_load_data(context):
     actual = autoscaling_service_lib.fetch_historical_load('/itest/fake_historical_load_data')
     expected = context.fake_historical_load_data
-    assert actual == expected
+    assert list(actual) == expected
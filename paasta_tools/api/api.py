@@ -28,7 +28,9 @@ from wsgicors import CORS
 import paasta_tools.api
 from paasta_tools import kubernetes_tools
 from paasta_tools import marathon_tools
+from paasta_tools import shared_cache
 from paasta_tools.api import settings
+from paasta_tools.metrics import metrics_lib
 from paasta_tools.utils import load_system_paasta_config
 
 
@@ -52,6 +54,15 @@ def parse_paasta_api_args():
         dest="soa_dir",
         help="define a different soa config directory",
     )
+    parser.add_argument(
+        '--shared-cache-dir',
+        dest="shared_cache_dir",
+        nargs='?', const=shared_cache.DEFAULT_SHARED_CACHE_DIR, default=None,
+        help=(
+            "share marathon app lists, mesos state and metastatus between the api workers through this directory "
+            "(default when given without a value: %(const)s)"
+        ),
+    )
     args = parser.parse_args()
     return args
 
@@ -74,6 +85,7 @@ def make_app(global_config=None):
     config.add_route('service.instance.tasks', '/v1/services/{service}/{instance}/tasks')
     config.add_route('service.instance.tasks.task', '/v1/services/{service}/{instance}/tasks/{task_id}')
     config.add_route('service.list', '/v1/services/{service}')
+    config.add_route('instances.status', '/v1/instances/status')
     config.add_route('services', '/v1/services')
     config.add_route('service.autoscaler.get', '/v1/services/{service}/{instance}/autoscaler', request_method="GET")
     config.add_route('service.autoscaler.post', '/v1/services/{service}/{instance}/autoscaler', request_method="POST")
@@ -122,6 +134,7 @@ def setup_paasta_api():
 
     try:
         settings.kubernetes_client = kubernetes_tools.KubeClient()
+        settings.kubernetes_client.start_informer()
     except Exception:
         log.exception('Error while initializing KubeClient')
         settings.kubernetes_client = None
@@ -131,6 +144,13 @@ def setup_paasta_api():
     # concern here. Thus remove_expired_responses is not needed.
     requests_cache.install_cache("paasta-api", backend="memory", expire_after=5)
 
+    shared_cache_dir = os.environ.get("PAASTA_API_SHARED_CACHE_DIR")
+    if shared_cache_dir:
+        shared_cache.configure(
+            shared_cache_dir,
+            metrics=metrics_lib.get_metrics_interface('paasta.api.shared_cache'),
+        )
+
 
 def main(argv=None):
     args = parse_paasta_api_args()
@@ -141,6 +161,9 @@ def main(argv=None):
     if args.soa_dir:
         os.environ["PAASTA_API_SOA_DIR"] = args.soa_dir
 
+    if args.shared_cache_dir:
+        os.environ["PAASTA_API_SHARED_CACHE_DIR"] = args.shared_cache_dir
+
     os.execlp(
         os.path.join(sys.exec_prefix, "bin", "gunicorn"),
         "gunicorn",
@@ -14,14 +14,25 @@
 # limitations under the License.
 """
 Client interface for the Paasta rest api.
+
+Clients are cached per api server for the life of the process: building one from the swagger spec is far more
+expensive than the requests it makes, and sharing them also shares their pools of keep-alive connections.
 """
+import copy
 import json
 import logging
 import os
+import threading
+from functools import lru_cache
 from typing import Any
+from typing import Dict
+from typing import Optional
+from typing import Tuple
 from urllib.parse import urlparse
 
 from bravado.client import SwaggerClient
+from bravado.requests_client import RequestsClient
+from requests.adapters import HTTPAdapter
 
 import paasta_tools.api
 from paasta_tools.utils import load_system_paasta_config
@@ -30,6 +41,44 @@ from paasta_tools.utils import SystemPaastaConfig
 
 log = logging.getLogger(__name__)
 
+# Enough for `paasta status` to have a request in flight for every thread of its pool
+CONNECTION_POOL_SIZE = 20
+
+_clients: Dict[Tuple[str, bool], Any] = {}
+_clients_lock = threading.Lock()
+
+
+@lru_cache(maxsize=1)
+def load_swagger_spec(swagger_file: str) -> Dict[str, Any]:
+    with open(swagger_file) as f:
+        return json.load(f)
+
+
+def get_swagger_file() -> Optional[str]:
+    # Get swagger spec from file system instead of the api server
+    paasta_api_path = os.path.dirname(paasta_tools.api.__file__)
+    swagger_file = os.path.join(paasta_api_path, 'api_docs/swagger.json')
+    if not os.path.isfile(swagger_file):
+        log.error('paasta-api swagger spec %s does not exist', swagger_file)
+        return None
+    return swagger_file
+
+
+def build_paasta_api_client(swagger_file: str, api_server: str, http_res: bool = False) -> Any:
+    # Copied since the memoized spec is shared by the clients for every api server
+    spec_dict = copy.deepcopy(load_swagger_spec(swagger_file))
+    # replace localhost in swagger.json with actual api server
+    spec_dict['host'] = api_server
+
+    http_client = RequestsClient()
+    adapter = HTTPAdapter(pool_maxsize=CONNECTION_POOL_SIZE)
+    http_client.session.mount('http://', adapter)
+    http_client.session.mount('https://', adapter)
+
+    # sometimes we want the status code
+    config = {'also_return_response': True} if http_res else None
+    return SwaggerClient.from_spec(spec_dict=spec_dict, http_client=http_client, config=config)
+
 
 def get_paasta_api_client(
     cluster: str = None,
@@ -54,21 +103,12 @@ def get_paasta_api_client(
         return None
     api_server = parsed.netloc
 
-    # Get swagger spec from file system instead of the api server
-    paasta_api_path = os.path.dirname(paasta_tools.api.__file__)
-    swagger_file = os.path.join(paasta_api_path, 'api_docs/swagger.json')
-    if not os.path.isfile(swagger_file):
-        log.error('paasta-api swagger spec %s does not exist', swagger_file)
+    swagger_file = get_swagger_file()
+    if swagger_file is None:
         return None
 
-    with open(swagger_file) as f:
-        spec_dict = json.load(f)
-    # replace localhost in swagger.json with actual api server
-    spec_dict['host'] = api_server
-
-    # sometimes we want the status code
-    if http_res:
-        config = {'also_return_response': True}
-        return SwaggerClient.from_spec(spec_dict=spec_dict, config=config)
-    else:
-        return SwaggerClient.from_spec(spec_dict=spec_dict)
+    key = (api_server, http_res)
+    with _clients_lock:
+        if key not in _clients:
+            _clients[key] = build_paasta_api_client(swagger_file, api_server, http_res=http_res)
+        return _clients[key]
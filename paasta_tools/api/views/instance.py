@@ -15,17 +15,24 @@
 """
 PaaSTA service instance status/start/stop etc.
 """
+import asyncio
 import logging
 import traceback
 from typing import Any
+from typing import Collection
 from typing import Dict
+from typing import List
 from typing import Mapping
 from typing import MutableMapping
+from typing import Optional
 from typing import Sequence
+from typing import Tuple
 
 import a_sync
-import marathon
 from kubernetes.client import V1Pod
+from marathon import MarathonClient
+from marathon.models.app import MarathonApp
+from marathon.models.queue import MarathonQueueItem
 from pyramid.response import Response
 from pyramid.view import view_config
 
@@ -42,11 +49,53 @@ from paasta_tools.mesos_tools import get_tasks_from_app_id
 from paasta_tools.mesos_tools import select_tasks_by_id
 from paasta_tools.mesos_tools import TaskNotFound
 from paasta_tools.paasta_serviceinit import get_deployment_version
+from paasta_tools.utils import decompose_job_id
+from paasta_tools.utils import get_service_instance_list
+from paasta_tools.utils import InvalidJobNameError
 from paasta_tools.utils import NoDockerImageError
 from paasta_tools.utils import validate_service_instance
 log = logging.getLogger(__name__)
 
 
+class StatusSnapshot:
+    """Marathon apps, launch queues and deployments fetched at most once, and shared by every instance whose status
+    is looked up with the same snapshot.
+
+    A bulk status request uses one snapshot for all of its instances, so it makes the same few round trips to
+    marathon whether it covers one instance or fifty.
+    """
+
+    def __init__(self, services: Collection[str]) -> None:
+        # Only list the apps of the service when there is just one, otherwise list every app once
+        self.service = next(iter(services)) if len(set(services)) == 1 else None
+        self.apps_by_client: Dict[int, Dict[str, MarathonApp]] = {}
+        self.queue_by_client: Dict[int, Dict[str, MarathonQueueItem]] = {}
+        self.deployments_by_service: Dict[str, Mapping[str, str]] = {}
+
+    def marathon_apps(self, client: MarathonClient) -> Dict[str, MarathonApp]:
+        """The apps running on client, by app id without the leading slash"""
+        if id(client) not in self.apps_by_client:
+            apps = marathon_tools.get_all_marathon_apps(client, service_name=self.service)
+            self.apps_by_client[id(client)] = {app.id.lstrip('/'): app for app in apps}
+        return self.apps_by_client[id(client)]
+
+    def app_queue_item(self, client: MarathonClient, app_id: str) -> Optional[MarathonQueueItem]:
+        if id(client) not in self.queue_by_client:
+            self.queue_by_client[id(client)] = {item.app.id.lstrip('/'): item for item in client.list_queue()}
+        return self.queue_by_client[id(client)].get(app_id.lstrip('/'))
+
+    def actual_deployments(self, service: str) -> Mapping[str, str]:
+        if service not in self.deployments_by_service:
+            self.deployments_by_service[service] = get_actual_deployments(service, settings.soa_dir)
+        return self.deployments_by_service[service]
+
+
+async def get_slave_hostnames(tasks: Sequence[Any]) -> List[str]:
+    """The distinct hostnames of the agents running tasks, looking the agents up concurrently"""
+    slaves = await asyncio.gather(*[task.slave() for task in tasks])
+    return list({slave['hostname'] for slave in slaves})
+
+
 def chronos_instance_status(
     instance_status: Mapping[str, Any],
     service: str,
@@ -174,7 +223,10 @@ def marathon_job_status(
     client,
     job_config,
     verbose: bool,
+    snapshot: Optional[StatusSnapshot]=None,
 ) -> None:
+    if snapshot is None:
+        snapshot = StatusSnapshot([job_config.get_service()])
     try:
         app_id = job_config.format_marathon_app_dict()['id']
     except NoDockerImageError:
@@ -184,27 +236,26 @@ def marathon_job_status(
 
     mstatus['app_id'] = app_id
     if verbose is True:
-        mstatus['slaves'] = list(
-            {a_sync.block(task.slave)['hostname'] for task in a_sync.block(get_running_tasks_from_frameworks, app_id)},
-        )
+        tasks = a_sync.block(get_running_tasks_from_frameworks, app_id)
+        mstatus['slaves'] = a_sync.block(get_slave_hostnames, tasks)
     mstatus['expected_instance_count'] = job_config.get_instances()
 
-    try:
-        app = client.get_app(app_id)
-    except marathon.exceptions.NotFoundError:
+    app = snapshot.marathon_apps(client).get(app_id)
+    if app is None:
         mstatus['deploy_status'] = marathon_tools.MarathonDeployStatus.tostring(
             marathon_tools.MarathonDeployStatus.NotRunning,
         )
         mstatus['running_instance_count'] = 0
     else:
-        deploy_status = marathon_tools.get_marathon_app_deploy_status(client, app)
+        app_queue_item = snapshot.app_queue_item(client, app_id)
+        deploy_status = marathon_tools.get_marathon_app_deploy_status_from_queue(app, app_queue_item)
         mstatus['deploy_status'] = marathon_tools.MarathonDeployStatus.tostring(deploy_status)
         # by comparing running count with expected count, callers can figure
         # out if the instance is in Healthy, Warning or Critical state.
         mstatus['running_instance_count'] = app.tasks_running
 
         if deploy_status == marathon_tools.MarathonDeployStatus.Delayed:
-            _, backoff_seconds = marathon_tools.get_app_queue_status(client, app_id)
+            _, backoff_seconds = marathon_tools.get_app_queue_status_from_queue(app_queue_item)
             mstatus['backoff_seconds'] = backoff_seconds
 
 
@@ -213,34 +264,40 @@ def marathon_instance_status(
     service: str,
     instance: str,
     verbose: bool,
+    snapshot: Optional[StatusSnapshot]=None,
 ) -> Mapping[str, Any]:
+    if snapshot is None:
+        snapshot = StatusSnapshot([service])
     mstatus: Dict[str, Any] = {}
     job_config = marathon_tools.load_marathon_service_config(
         service, instance, settings.cluster, soa_dir=settings.soa_dir,
     )
     client = settings.marathon_clients.get_current_client_for_service(job_config)
-    apps = marathon_tools.get_matching_appids(service, instance, client)
+    apps = marathon_tools.get_matching_apps(service, instance, snapshot.marathon_apps(client).values())
 
     # bouncing status can be inferred from app_count, ref get_bouncing_status
     mstatus['app_count'] = len(apps)
     mstatus['desired_state'] = job_config.get_desired_state()
     mstatus['bounce_method'] = job_config.get_bounce_method()
-    marathon_job_status(mstatus, client, job_config, verbose)
+    marathon_job_status(mstatus, client, job_config, verbose, snapshot)
     return mstatus
 
 
-@view_config(route_name='service.instance.status', request_method='GET', renderer='json')
-def instance_status(request):
-    service = request.swagger_data.get('service')
-    instance = request.swagger_data.get('instance')
-    verbose = request.swagger_data.get('verbose', False)
-
+def get_instance_status(
+    service: str,
+    instance: str,
+    verbose: bool,
+    snapshot: Optional[StatusSnapshot]=None,
+) -> Dict[str, Any]:
+    """Raises ApiFailure with the http status to respond with if the status can't be determined"""
+    if snapshot is None:
+        snapshot = StatusSnapshot([service])
     instance_status: Dict[str, Any] = {}
     instance_status['service'] = service
     instance_status['instance'] = instance
 
     try:
-        actual_deployments = get_actual_deployments(service, settings.soa_dir)
+        actual_deployments = snapshot.actual_deployments(service)
     except Exception:
         error_message = traceback.format_exc()
         raise ApiFailure(error_message, 500)
@@ -256,7 +313,9 @@ def instance_status(request):
     try:
         instance_type = validate_service_instance(service, instance, settings.cluster, settings.soa_dir)
         if instance_type == 'marathon':
-            instance_status['marathon'] = marathon_instance_status(instance_status, service, instance, verbose)
+            instance_status['marathon'] = marathon_instance_status(
+                instance_status, service, instance, verbose, snapshot,
+            )
         elif instance_type == 'chronos':
             instance_status['chronos'] = chronos_instance_status(instance_status, service, instance, verbose)
         elif instance_type == 'adhoc':
@@ -273,6 +332,45 @@ def instance_status(request):
     return instance_status
 
 
+@view_config(route_name='service.instance.status', request_method='GET', renderer='json')
+def instance_status(request):
+    service = request.swagger_data.get('service')
+    instance = request.swagger_data.get('instance')
+    verbose = request.swagger_data.get('verbose', False)
+    return get_instance_status(service, instance, verbose)
+
+
+@view_config(route_name='instances.status', request_method='GET', renderer='json')
+def instances_status(request):
+    """Status of every instance of a service and/or of a list of service.instance names, computed from one shared
+    StatusSnapshot. Instances whose status can't be determined get an error_code and error_message instead."""
+    service = request.swagger_data.get('service')
+    instances = request.swagger_data.get('instances') or []
+    verbose = request.swagger_data.get('verbose', False)
+
+    service_instances: List[Tuple[str, str]] = []
+    if service:
+        service_instances.extend(get_service_instance_list(service, cluster=settings.cluster, soa_dir=settings.soa_dir))
+    for service_instance in instances:
+        try:
+            srv, inst, _, _ = decompose_job_id(service_instance)
+        except InvalidJobNameError:
+            raise ApiFailure(f'{service_instance} is not of the form service.instance', 400)
+        service_instances.append((srv, inst))
+    if not service_instances:
+        raise ApiFailure('a service or a list of service.instance names is required', 400)
+    service_instances = list(dict.fromkeys(service_instances))
+
+    snapshot = StatusSnapshot([srv for srv, _ in service_instances])
+    statuses = []
+    for srv, inst in service_instances:
+        try:
+            statuses.append(get_instance_status(srv, inst, verbose, snapshot))
+        except ApiFailure as e:
+            statuses.append({'service': srv, 'instance': inst, 'error_code': e.err, 'error_message': e.msg})
+    return statuses
+
+
 @view_config(route_name='service.instance.tasks.task', request_method='GET', renderer='json')
 def instance_task(request):
     status = instance_status(request)
@@ -17,13 +17,29 @@ PaaSTA metastatus.
 """
 from pyramid.view import view_config
 
+from paasta_tools import shared_cache
 from paasta_tools.paasta_metastatus import get_output
 
+# How long metastatus output stays in the shared cache, when one is configured
+SHARED_CACHE_TTL = 15
+# Only output for combinations of these flags is shared, so clients can't create an unbounded number of entries
+SHARED_CACHE_FLAGS = frozenset({'-v', '-vv', '-vvv', '--verbose', '-a', '--autoscaling-info', '--use-mesos-cache'})
+
 
 @view_config(route_name='metastatus', request_method='GET', renderer='json')
 def metastatus(request):
     cmd_args = request.swagger_data.get('cmd_args', None)
-    output, exit_code = get_output(cmd_args)
+    cache = shared_cache.get_shared_cache()
+    cacheable = len(set(cmd_args or ())) == len(cmd_args or ()) and SHARED_CACHE_FLAGS.issuperset(cmd_args or ())
+    if cache is None or not cacheable:
+        output, exit_code = get_output(cmd_args)
+    else:
+        output, exit_code = cache.get(
+            'metastatus',
+            key=tuple(sorted(cmd_args or ())),
+            fetch=lambda: get_output(cmd_args),
+            ttl=SHARED_CACHE_TTL,
+        )
     return {
         "output": output,
         "exit_code": exit_code,
@@ -28,9 +28,11 @@ import requests
 from gevent import monkey
 from gevent import pool
 from kazoo.client import KazooClient
+from kazoo.exceptions import BadVersionError
 from kazoo.exceptions import NoNodeError
 
 from paasta_tools.autoscaling.forecasting import get_forecast_policy
+from paasta_tools.autoscaling.forecasting import HistoricalLoad
 from paasta_tools.autoscaling.utils import get_autoscaling_component
 from paasta_tools.autoscaling.utils import register_autoscaling_component
 from paasta_tools.bounce_lib import LockHeldException
@@ -162,8 +164,9 @@ def proportional_decision_policy(
     current_load = (utilization - offset) * num_healthy_instances
 
     historical_load = fetch_historical_load(zk_path_prefix=zookeeper_path)
-    historical_load.append((time.time(), current_load))
-    save_historical_load(historical_load, zk_path_prefix=zookeeper_path)
+    current_record = (time.time(), current_load)
+    historical_load.append(current_record)
+    append_historical_load(current_record, zk_path_prefix=zookeeper_path)
 
     predicted_load = forecast_policy_func(historical_load, **kwargs)
 
@@ -185,47 +188,120 @@ def proportional_decision_policy(
 
 HISTORICAL_LOAD_SERIALIZATION_FORMAT = 'dd'
 SIZE_PER_HISTORICAL_LOAD_RECORD = struct.calcsize(HISTORICAL_LOAD_SERIALIZATION_FORMAT)
+MAX_HISTORICAL_LOAD_RECORDS = 1000000 // SIZE_PER_HISTORICAL_LOAD_RECORD
+# Historical load is stored as a ring of znodes of up to this many records each, so that saving a new datapoint only
+# rewrites the newest (small) chunk rather than the whole history.
+HISTORICAL_LOAD_RECORDS_PER_CHUNK = 4096
+MAX_HISTORICAL_LOAD_CHUNKS = ceil(MAX_HISTORICAL_LOAD_RECORDS / HISTORICAL_LOAD_RECORDS_PER_CHUNK)
 
 
 def zk_historical_load_path(zk_path_prefix):
     return "%s/historical_load" % zk_path_prefix
 
 
+def zk_historical_load_chunks_path(zk_path_prefix):
+    return "%s/historical_load_chunks" % zk_path_prefix
+
+
+def get_historical_load_chunk_names(zk, zk_path_prefix):
+    try:
+        return sorted(zk.get_children(zk_historical_load_chunks_path(zk_path_prefix)))
+    except NoNodeError:
+        return []
+
+
+def write_historical_load_chunks(zk, historical_load_bytes, zk_path_prefix):
+    chunk_size = HISTORICAL_LOAD_RECORDS_PER_CHUNK * SIZE_PER_HISTORICAL_LOAD_RECORD
+    for pos in range(0, len(historical_load_bytes), chunk_size):
+        zk.create(
+            "%s/chunk" % zk_historical_load_chunks_path(zk_path_prefix),
+            historical_load_bytes[pos:pos + chunk_size],
+            sequence=True,
+            makepath=True,
+        )
+
+
+def trim_historical_load_chunks(zk, chunk_names, zk_path_prefix):
+    for chunk_name in chunk_names[:-MAX_HISTORICAL_LOAD_CHUNKS]:
+        zk.delete("{}/{}".format(zk_historical_load_chunks_path(zk_path_prefix), chunk_name))
+
+
+def migrate_legacy_historical_load(zk, zk_path_prefix):
+    """Move historical load saved as a single znode by older versions of paasta into chunks."""
+    try:
+        historical_load_bytes, _ = zk.get(zk_historical_load_path(zk_path_prefix))
+    except NoNodeError:
+        return
+    write_historical_load_chunks(zk, historical_load_bytes, zk_path_prefix)
+    zk.delete(zk_historical_load_path(zk_path_prefix))
+
+
 def save_historical_load(historical_load, zk_path_prefix):
+    """Replace all stored historical load with historical_load. To add a single datapoint use append_historical_load,
+    which is much cheaper."""
     with ZookeeperPool() as zk:
-        historical_load_bytes = serialize_historical_load(historical_load)
-        zk.ensure_path(zk_historical_load_path(zk_path_prefix))
-        zk.set(zk_historical_load_path(zk_path_prefix), historical_load_bytes)
+        old_chunk_names = get_historical_load_chunk_names(zk, zk_path_prefix)
+        write_historical_load_chunks(zk, serialize_historical_load(historical_load), zk_path_prefix)
+        for chunk_name in old_chunk_names:
+            zk.delete("{}/{}".format(zk_historical_load_chunks_path(zk_path_prefix), chunk_name))
+
+
+def append_historical_load(record, zk_path_prefix):
+    """Add one (timestamp, load) record to the stored historical load, writing only the newest chunk."""
+    record_bytes = serialize_historical_load([record])
+    chunk_size = HISTORICAL_LOAD_RECORDS_PER_CHUNK * SIZE_PER_HISTORICAL_LOAD_RECORD
+    with ZookeeperPool() as zk:
+        chunk_names = get_historical_load_chunk_names(zk, zk_path_prefix)
+        if not chunk_names:
+            migrate_legacy_historical_load(zk, zk_path_prefix)
+            chunk_names = get_historical_load_chunk_names(zk, zk_path_prefix)
+        while chunk_names:
+            newest_chunk_path = "{}/{}".format(zk_historical_load_chunks_path(zk_path_prefix), chunk_names[-1])
+            try:
+                newest_chunk_bytes, stat = zk.get(newest_chunk_path)
+                if len(newest_chunk_bytes) >= chunk_size:
+                    break
+                zk.set(newest_chunk_path, newest_chunk_bytes + record_bytes, version=stat.version)
+                return
+            except (BadVersionError, NoNodeError):
+                # Another autoscaler wrote or trimmed the chunk since we read it, so read it again.
+                chunk_names = get_historical_load_chunk_names(zk, zk_path_prefix)
+        write_historical_load_chunks(zk, record_bytes, zk_path_prefix)
+        trim_historical_load_chunks(zk, get_historical_load_chunk_names(zk, zk_path_prefix), zk_path_prefix)
 
 
 def serialize_historical_load(historical_load):
-    max_records = 1000000 // SIZE_PER_HISTORICAL_LOAD_RECORD
-    historical_load = historical_load[-max_records:]
-    return b''.join([struct.pack(HISTORICAL_LOAD_SERIALIZATION_FORMAT, *x) for x in historical_load])
+    historical_load = HistoricalLoad.from_records(historical_load)[-MAX_HISTORICAL_LOAD_RECORDS:]
+    return historical_load.to_interleaved_bytes()
 
 
 def fetch_historical_load(zk_path_prefix):
     with ZookeeperPool() as zk:
-        try:
-            historical_load_bytes, _ = zk.get(zk_historical_load_path(zk_path_prefix))
+        chunk_names = get_historical_load_chunk_names(zk, zk_path_prefix)
+        if not chunk_names:
+            try:
+                historical_load_bytes, _ = zk.get(zk_historical_load_path(zk_path_prefix))
+            except NoNodeError:
+                return HistoricalLoad()
             return deserialize_historical_load(historical_load_bytes)
-        except NoNodeError:
-            return []
+        # Issue all the reads before waiting on any of them, so we only pay for one round trip.
+        chunk_results = [
+            zk.get_async("{}/{}".format(zk_historical_load_chunks_path(zk_path_prefix), chunk_name))
+            for chunk_name in chunk_names
+        ]
+        chunks = []
+        for chunk_result in chunk_results:
+            try:
+                chunks.append(chunk_result.get()[0])
+            except NoNodeError:
+                # trimmed by someone else between listing and reading
+                continue
+        return deserialize_historical_load(b''.join(chunks))
 
 
 def deserialize_historical_load(historical_load_bytes):
-    historical_load = []
-
-    for pos in range(0, len(historical_load_bytes), SIZE_PER_HISTORICAL_LOAD_RECORD):
-        historical_load.append(
-            struct.unpack(
-                # unfortunately struct.unpack doesn't like kwargs.
-                HISTORICAL_LOAD_SERIALIZATION_FORMAT,
-                historical_load_bytes[pos:pos + SIZE_PER_HISTORICAL_LOAD_RECORD],
-            ),
-        )
-
-    return historical_load
+    usable_length = len(historical_load_bytes) - len(historical_load_bytes) % SIZE_PER_HISTORICAL_LOAD_RECORD
+    return HistoricalLoad.from_interleaved_bytes(historical_load_bytes[:usable_length])
 
 
 def get_json_body_from_service(host, port, endpoint, timeout=2):
@@ -1,3 +1,11 @@
+import operator
+from array import array
+from bisect import bisect_left
+from bisect import bisect_right
+from itertools import compress
+from itertools import islice
+from itertools import repeat
+
 from paasta_tools.autoscaling.utils import get_autoscaling_component
 from paasta_tools.autoscaling.utils import register_autoscaling_component
 
@@ -5,6 +13,71 @@ from paasta_tools.autoscaling.utils import register_autoscaling_component
 FORECAST_POLICY_KEY = 'forecast_policy'
 
 
+class HistoricalLoad:
+    """A series of (timestamp, load) datapoints stored as two contiguous arrays of doubles.
+
+    Behaves enough like a list of (timestamp, load) tuples (len, indexing, iteration, append) that forecast policies
+    can be handed either, but lets them work on whole columns at once rather than one tuple at a time.
+    """
+
+    def __init__(self, times=(), loads=()):
+        self.times = array('d', times)
+        self.loads = array('d', loads)
+
+    @classmethod
+    def from_records(cls, historical_load):
+        if isinstance(historical_load, cls):
+            return historical_load
+        if not historical_load:
+            return cls()
+        times, loads = zip(*historical_load)
+        return cls(times, loads)
+
+    @classmethod
+    def from_interleaved_bytes(cls, historical_load_bytes):
+        """Decode native-endian doubles laid out as timestamp, load, timestamp, load, ..."""
+        interleaved = array('d')
+        interleaved.frombytes(historical_load_bytes)
+        return cls(interleaved[0::2], interleaved[1::2])
+
+    def to_interleaved_bytes(self):
+        interleaved = array('d', repeat(0.0, 2 * len(self)))
+        interleaved[0::2] = self.times
+        interleaved[1::2] = self.loads
+        return interleaved.tobytes()
+
+    def append(self, record):
+        timestamp, load = record
+        self.times.append(timestamp)
+        self.loads.append(load)
+
+    def is_sorted(self):
+        return all(map(operator.le, self.times, islice(self.times, 1, None)))
+
+    def window(self, window_begin, window_end):
+        """Return the datapoints lying between times window_begin and window_end, inclusive."""
+        if self.is_sorted():
+            lo = bisect_left(self.times, window_begin)
+            hi = bisect_right(self.times, window_end)
+            return HistoricalLoad(self.times[lo:hi], self.loads[lo:hi])
+        mask = [window_begin <= timestamp <= window_end for timestamp in self.times]
+        return HistoricalLoad(compress(self.times, mask), compress(self.loads, mask))
+
+    def __len__(self):
+        return len(self.times)
+
+    def __getitem__(self, index):
+        if isinstance(index, slice):
+            return HistoricalLoad(self.times[index], self.loads[index])
+        return self.times[index], self.loads[index]
+
+    def __iter__(self):
+        return zip(self.times, self.loads)
+
+    def __repr__(self):
+        return f'HistoricalLoad({list(self)!r})'
+
+
 def get_forecast_policy(name):
     """
     Returns a forecast policy matching the given name. Only used by decision policies that try to forecast load, like
@@ -24,11 +97,7 @@ def current_value_forecast_policy(historical_load, **kwargs):
 
 def window_historical_load(historical_load, window_begin, window_end):
     """Filter historical_load down to just the datapoints lying between times window_begin and window_end, inclusive."""
-    filtered = []
-    for timestamp, value in historical_load:
-        if timestamp >= window_begin and timestamp <= window_end:
-            filtered.append((timestamp, value))
-    return filtered
+    return HistoricalLoad.from_records(historical_load).window(window_begin, window_end)
 
 
 def trailing_window_historical_load(historical_load, window_size):
@@ -43,8 +112,7 @@ def moving_average_forecast_policy(historical_load, moving_average_window_second
     points within the window equally."""
 
     windowed_data = trailing_window_historical_load(historical_load, moving_average_window_seconds)
-    windowed_values = [value for timestamp, value in windowed_data]
-    return sum(windowed_values) / len(windowed_values)
+    return sum(windowed_data.loads) / len(windowed_data)
 
 
 @register_autoscaling_component('linreg', FORECAST_POLICY_KEY)
@@ -67,19 +135,25 @@ def linreg_forecast_policy(
     """
 
     window = trailing_window_historical_load(historical_load, linreg_window_seconds)
+    n = len(window)
 
-    loads = [load for timestamp, load in window]
-    times = [timestamp for timestamp, load in window]
+    # Timestamps are shifted to start at zero so that the sums of squares below don't lose all their precision to the
+    # size of a unix timestamp.
+    origin = window.times[0]
+    times = array('d', map(operator.sub, window.times, repeat(origin)))
+    loads = window.loads
 
-    mean_time = sum(times) / len(times)
-    mean_load = sum(loads) / len(loads)
+    mean_time = sum(times) / n
+    mean_load = sum(loads) / n
 
-    if len(window) > 1:
-        slope = sum((t - mean_time) * (l - mean_load) for t, l in window) / sum((t - mean_time) ** 2 for t in times)
+    if n > 1:
+        covariance = sum(map(operator.mul, times, loads)) - n * mean_time * mean_load
+        variance = sum(map(operator.mul, times, times)) - n * mean_time * mean_time
+        slope = covariance / variance
     else:
         slope = linreg_default_slope
 
-    intercept = mean_load - slope * mean_time
+    intercept = mean_load - slope * (mean_time + origin)
 
     def predict(timestamp):
         return slope * timestamp + intercept
@@ -47,7 +47,7 @@ from requests.exceptions import RequestException
 
 from paasta_tools import marathon_tools
 from paasta_tools.long_running_service_tools import BounceMethodConfigDict
-from paasta_tools.smartstack_tools import get_registered_marathon_tasks
+from paasta_tools.smartstack_tools import get_smartstack_registration_service
 from paasta_tools.utils import compose_job_id
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import SystemPaastaConfig
@@ -229,18 +229,19 @@ def filter_tasks_in_smartstack(
 
     selected_hosts = all_hosts[:max_hosts_to_query]
     registered_task_count: typing.Counter[MarathonTask] = Counter()
+    # Shared by every bounce in this process, so a synapse host is only queried once per haproxy stats ttl
+    registration_service = get_smartstack_registration_service()
+    nerve_service = compose_job_id(service, nerve_ns)
 
     async def get_registered_tasks_on_host(host):
         try:
-            registered_task_count.update(
-                set(await a_sync.to_async(get_registered_marathon_tasks)(
-                    synapse_host=host,
-                    synapse_port=system_paasta_config.get_synapse_port(),
-                    synapse_haproxy_url_format=system_paasta_config.get_synapse_haproxy_url_format(),
-                    service=compose_job_id(service, nerve_ns),
-                    marathon_tasks=tasks,
-                )),
+            registered_tasks = await a_sync.to_async(registration_service.get_registered_tasks)(
+                synapse_host=host,
+                synapse_port=system_paasta_config.get_synapse_port(),
+                synapse_haproxy_url_format=system_paasta_config.get_synapse_haproxy_url_format(),
+                tasks_by_service={nerve_service: tasks},
             )
+            registered_task_count.update(set(registered_tasks[nerve_service]))
         except (ConnectionError, RequestException) as e:
             log.warning(f"Failed to connect to smartstack on {host}; this may cause us to consider tasks unhealthy.")
 
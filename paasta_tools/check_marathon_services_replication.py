@@ -31,8 +31,15 @@ CRITICAL. If replication_threshold is defined in the yelpsoa config for a servic
 instance then it will be used instead.
 """
 import argparse
+import contextlib
 import logging
 import os
+import threading
+import time
+from collections import defaultdict
+from concurrent.futures import as_completed
+from concurrent.futures import ThreadPoolExecutor
+from concurrent.futures import wait
 from datetime import datetime
 from datetime import timedelta
 
@@ -43,6 +50,7 @@ from paasta_tools import marathon_tools
 from paasta_tools import monitoring_tools
 from paasta_tools.marathon_tools import format_job_id
 from paasta_tools.mesos_tools import get_slaves
+from paasta_tools.metrics.metrics_lib import get_metrics_interface
 from paasta_tools.paasta_service_config_loader import PaastaServiceConfigLoader
 from paasta_tools.smartstack_tools import SmartstackReplicationChecker
 from paasta_tools.utils import _log
@@ -107,6 +115,15 @@ def parse_args():
         '-v', '--verbose', action='store_true',
         dest="verbose", default=False,
     )
+    parser.add_argument(
+        '--pipelined', action='store_true',
+        dest="pipelined", default=False,
+        help="load configs, query haproxy and send events concurrently rather than one instance at a time",
+    )
+    parser.add_argument(
+        '--max-workers', dest="max_workers", type=int, default=8,
+        help="the number of threads to use for each stage in --pipelined mode",
+    )
     options = parser.parse_args()
 
     return options
@@ -301,17 +318,7 @@ def check_service_replication(
     """
     expected_count = instance_config.get_instances()
     log.info("Expecting %d total tasks for %s" % (expected_count, instance_config.job_id))
-    proxy_port = marathon_tools.get_proxy_port_for_instance(
-        name=instance_config.service,
-        instance=instance_config.instance,
-        cluster=instance_config.cluster,
-        soa_dir=instance_config.soa_dir,
-    )
-
-    registrations = instance_config.get_registrations()
-    # if the primary registration does not match the service_instance name then
-    # the best we can do is check marathon for replication (for now).
-    if proxy_port is not None and registrations[0] == instance_config.job_id:
+    if is_checked_in_smartstack(instance_config):
         check_smartstack_replication_for_instance(
             instance_config=instance_config,
             expected_count=expected_count,
@@ -325,11 +332,156 @@ def check_service_replication(
         )
 
 
+def is_checked_in_smartstack(instance_config):
+    proxy_port = marathon_tools.get_proxy_port_for_instance(
+        name=instance_config.service,
+        instance=instance_config.instance,
+        cluster=instance_config.cluster,
+        soa_dir=instance_config.soa_dir,
+    )
+    registrations = instance_config.get_registrations()
+    # if the primary registration does not match the service_instance name then
+    # the best we can do is check marathon for replication (for now).
+    return proxy_port is not None and registrations[0] == instance_config.job_id
+
+
 def list_services(soa_dir):
     rootdir = os.path.abspath(soa_dir)
     return os.listdir(rootdir)
 
 
+def get_deployed_instance_configs(service, soa_dir, cluster):
+    service_config = PaastaServiceConfigLoader(service=service, soa_dir=soa_dir)
+    instance_configs = []
+    for instance_config in service_config.instance_configs(
+        cluster=cluster,
+        instance_type_class=marathon_tools.MarathonServiceConfig,
+    ):
+        if instance_config.get_docker_image():
+            instance_configs.append(instance_config)
+        else:
+            log.debug(
+                '%s is not deployed. Skipping replication monitoring.' %
+                instance_config.job_id,
+            )
+    return instance_configs
+
+
+class StageTimings:
+    """Collects how long each stage of a pipelined run was busy for, and the wall clock time from when it
+    started its first piece of work to when it finished its last."""
+
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.started = {}
+        self.finished = {}
+        self.busy = defaultdict(float)
+
+    @contextlib.contextmanager
+    def time(self, stage):
+        started = time.time()
+        try:
+            yield
+        finally:
+            finished = time.time()
+            with self.lock:
+                self.started[stage] = min(self.started.get(stage, started), started)
+                self.finished[stage] = max(self.finished.get(stage, finished), finished)
+                self.busy[stage] += finished - started
+
+    def report(self, metrics, cluster):
+        for stage in sorted(self.started):
+            wall = self.finished[stage] - self.started[stage]
+            log.info(f"Stage {stage} took {wall:.2f}s ({self.busy[stage]:.2f}s busy)")
+            metrics.create_gauge(f'{stage}.wall_seconds', paasta_cluster=cluster).set(wall)
+            metrics.create_gauge(f'{stage}.busy_seconds', paasta_cluster=cluster).set(self.busy[stage])
+
+
+def prepare_service_checks(service, soa_dir, cluster, smartstack_replication_checker, timings):
+    """Returns a (instance_config, {location: synapse host}) pair for each deployed instance of service. The
+    locations are empty for instances we check in marathon rather than smartstack."""
+    with timings.time('load_configs'):
+        checks = []
+        for instance_config in get_deployed_instance_configs(service, soa_dir, cluster):
+            if is_checked_in_smartstack(instance_config):
+                hosts = smartstack_replication_checker.get_synapse_hosts_for_instance(instance_config)
+            else:
+                hosts = {}
+            checks.append((instance_config, hosts))
+        return checks
+
+
+def fetch_replication_for_location(location, hostname, smartstack_replication_checker, timings):
+    with timings.time('fetch_haproxy'):
+        smartstack_replication_checker.prefetch_replication_for_location(location, hostname)
+
+
+def check_service_replication_when_fetched(
+    instance_config,
+    fetches,
+    all_tasks,
+    smartstack_replication_checker,
+    timings,
+):
+    wait(fetches)
+    with timings.time('check_and_send_events'):
+        try:
+            check_service_replication(
+                instance_config=instance_config,
+                all_tasks=all_tasks,
+                smartstack_replication_checker=smartstack_replication_checker,
+            )
+        except Exception:
+            log.exception(f"Failed to check replication of {instance_config.job_id}")
+
+
+def check_all_services_replication_pipelined(
+    soa_dir,
+    cluster,
+    all_tasks,
+    smartstack_replication_checker,
+    max_workers,
+    timings,
+):
+    """Check the replication of every deployed marathon instance in the cluster, overlapping the three stages:
+    loading each service's configs, fetching the haproxy CSV of each location's synapse host (once for all
+    services) and checking each instance and sending its sensu event. Each stage has its own pool of
+    max_workers threads."""
+    fetches_by_location = {}
+    checks = []
+    with ThreadPoolExecutor(max_workers) as config_pool, \
+            ThreadPoolExecutor(max_workers) as haproxy_pool, \
+            ThreadPoolExecutor(max_workers) as event_pool:
+        service_futures = {
+            config_pool.submit(
+                prepare_service_checks, service, soa_dir, cluster, smartstack_replication_checker, timings,
+            ): service
+            for service in list_services(soa_dir=soa_dir)
+        }
+        for service_future in as_completed(service_futures):
+            try:
+                service_checks = service_future.result()
+            except Exception:
+                log.exception(f"Failed to load the marathon configs of {service_futures[service_future]}")
+                continue
+            for instance_config, hosts in service_checks:
+                for location, hostname in hosts.items():
+                    if location not in fetches_by_location:
+                        fetches_by_location[location] = haproxy_pool.submit(
+                            fetch_replication_for_location,
+                            location, hostname, smartstack_replication_checker, timings,
+                        )
+                checks.append(event_pool.submit(
+                    check_service_replication_when_fetched,
+                    instance_config,
+                    [fetches_by_location[location] for location in hosts],
+                    all_tasks,
+                    smartstack_replication_checker,
+                    timings,
+                ))
+        wait(checks)
+
+
 def main():
     args = parse_args()
 
@@ -349,23 +501,26 @@ def main():
     mesos_slaves = a_sync.block(get_slaves)
     smartstack_replication_checker = SmartstackReplicationChecker(mesos_slaves, system_paasta_config)
 
-    for service in list_services(soa_dir=args.soa_dir):
-        service_config = PaastaServiceConfigLoader(service=service, soa_dir=args.soa_dir)
-        for instance_config in service_config.instance_configs(
+    if args.pipelined:
+        timings = StageTimings()
+        check_all_services_replication_pipelined(
+            soa_dir=args.soa_dir,
             cluster=cluster,
-            instance_type_class=marathon_tools.MarathonServiceConfig,
-        ):
-            if instance_config.get_docker_image():
-                check_service_replication(
-                    instance_config=instance_config,
-                    all_tasks=all_tasks,
-                    smartstack_replication_checker=smartstack_replication_checker,
-                )
-            else:
-                log.debug(
-                    '%s is not deployed. Skipping replication monitoring.' %
-                    instance_config.job_id,
-                )
+            all_tasks=all_tasks,
+            smartstack_replication_checker=smartstack_replication_checker,
+            max_workers=args.max_workers,
+            timings=timings,
+        )
+        timings.report(get_metrics_interface('paasta.check_marathon_services_replication'), cluster)
+        return
+
+    for service in list_services(soa_dir=args.soa_dir):
+        for instance_config in get_deployed_instance_configs(service, args.soa_dir, cluster):
+            check_service_replication(
+                instance_config=instance_config,
+                all_tasks=all_tasks,
+                smartstack_replication_checker=smartstack_replication_checker,
+            )
 
 
 if __name__ == "__main__":
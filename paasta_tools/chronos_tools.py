@@ -15,9 +15,13 @@ import argparse
 import csv
 import datetime
 import logging
+import os
 import re
-from collections import defaultdict
+import threading
+import time
 from time import sleep
+from typing import Dict
+from typing import Tuple
 from urllib.parse import urlsplit
 
 import chronos
@@ -29,6 +33,9 @@ from croniter import croniter
 from crontab import CronSlices
 
 from paasta_tools import monitoring_tools
+from paasta_tools import soa_config_cache
+from paasta_tools.dependency_graph import topological_sort
+from paasta_tools.dependency_graph import UnionFind
 from paasta_tools.mesos_tools import get_mesos_network_for_net
 from paasta_tools.mesos_tools import mesos_services_running_here
 from paasta_tools.secret_tools import get_secret_hashes
@@ -77,10 +84,6 @@ log = logging.getLogger(__name__)
 logging.getLogger("crontab").setLevel(logging.CRITICAL)
 
 
-# Variable used by DFS algorithm
-_ENTERED, _ENTERED_AND_EXITED = range(0, 2)
-
-
 class LastRunState:
     """Cheap enum to represent the state of the last run"""
     Success, Fail, NotRun = range(0, 3)
@@ -1042,135 +1045,130 @@ def chronos_services_running_here():
     )
 
 
-ENTERED, ENTERED_AND_EXITED = range(0, 2)
+# How long a ChronosJobGraph trusts its last refresh before it stats the soa-configs again
+CHRONOS_JOB_GRAPH_REFRESH_INTERVAL = 5
 
 
-def dfs(node, neighbours_mapping, ignore_cycles=False, node_status=None):
-    """
-    Execute Deep-First search on a graph starting from a specific `node`.
-
-    `neighbours_mapping` contains the graph links as adjacency list
-        neighbours_mapping[x] = [y, z] means that the node `x` as two outgoing edges/links directed to `y` and `z`
-
-    :param node: starting node for DFS execution
-    :param neighbours_mapping: graph adjacency list
-    :type neighbours_mapping: dict
-    :param ignore_cycles: raise an exception if a cycle is identified in the graph
-    :type ignore_cycles: bool
-    :param node_status: dictionary that keep tracks of the already visited nodes.
-        NOTE: this is meant for internal usage only, please do NOT set it during method call
-    :type node_status: dict
-
-    :return: list of visited nodes sorted by exit order
-    :type: list
+class ChronosJobGraph:
+    """The dependencies between the chronos jobs of a cluster.
+
+    Job configs are kept per service and on refresh are only reloaded for services whose soa-configs changed, after
+    which the connected components of the (undirected) dependency graph are rebuilt in O(jobs + dependencies).
+    Checking for changes stats a dozen files per service, so it is done at most once every refresh_interval seconds.
     """
-    visited_nodes = []
 
-    if node_status is None:
-        node_status = {}
+    def __init__(self, cluster, soa_dir=DEFAULT_SOA_DIR, refresh_interval=CHRONOS_JOB_GRAPH_REFRESH_INTERVAL):
+        self.cluster = cluster
+        self.soa_dir = soa_dir
+        self.refresh_interval = refresh_interval
+        self.last_refresh = None
+        self.lock = threading.Lock()
+        self.stats_by_service = {}
+        self.configs_by_service = {}
+        self.configs = {}
+        self.components = {}
+
+    def _service_stats(self, service):
+        service_dir = os.path.join(os.path.abspath(self.soa_dir), service)
+        chronos_stat = soa_config_cache.stat_key(os.path.join(service_dir, 'chronos-%s.yaml' % self.cluster))
+        if chronos_stat is None:
+            return None
+        other_names = ('deployments.json',) + soa_config_cache.SERVICE_CONFIGURATION_FILES
+        return (chronos_stat,) + tuple(soa_config_cache.stat_key(os.path.join(service_dir, n)) for n in other_names)
 
-    if node_status.get(node) == _ENTERED_AND_EXITED:
-        return []
+    def _load_service(self, service):
+        configs = {}
+        # ttl=-1 so that load_chronos_job_config sees this fresh copy rather than one up to 30s old
+        for instance in read_chronos_jobs_for_service(service, self.cluster, soa_dir=self.soa_dir, ttl=-1):
+            try:
+                configs[(service, instance)] = load_chronos_job_config(
+                    service=service,
+                    instance=instance,
+                    cluster=self.cluster,
+                    soa_dir=self.soa_dir,
+                )
+            except NoDeploymentsAvailable:
+                pass
+        return configs
+
+    def refresh(self, force=False):
+        """Reload the services whose files changed since the last refresh, or all of them if force is set. Without
+        force, nothing is checked if the last refresh was less than refresh_interval seconds ago."""
+        with self.lock:
+            now = time.monotonic()
+            if not force and self.last_refresh is not None and now - self.last_refresh < self.refresh_interval:
+                return
+            services = set(os.listdir(os.path.abspath(self.soa_dir)))
+            changed = force
+            for service in set(self.configs_by_service) - services:
+                del self.configs_by_service[service]
+                del self.stats_by_service[service]
+                changed = True
+            for service in services:
+                stats = self._service_stats(service)
+                if not force and service in self.stats_by_service and self.stats_by_service[service] == stats:
+                    continue
+                self.configs_by_service[service] = self._load_service(service)
+                self.stats_by_service[service] = stats
+                changed = True
+            if changed:
+                self._rebuild()
+            self.last_refresh = now
+
+    def _rebuild(self):
+        configs = {}
+        for service_configs in self.configs_by_service.values():
+            configs.update(service_configs)
+        union_find = UnionFind()
+        for job, config in configs.items():
+            union_find.add(job)
+            for parent in self.get_parents(config):
+                union_find.union(parent, job)
+        self.configs = configs
+        self.components = union_find.components()
+
+    @staticmethod
+    def get_parents(config):
+        return [decompose_job_id(paasta_to_chronos_job_name(parent)) for parent in config.get_parents() or []]
+
+    def related_jobs(self, service, instance):
+        """The jobs that service.instance (transitively) depends on or is depended on by, including itself"""
+        return self.components[(service, instance)]
+
+    def topological_sort(self, service, instance):
+        related_jobs = self.related_jobs(service, instance)
+        jobs = [job for job in self.configs if job in related_jobs]
+        return topological_sort(
+            nodes=jobs,
+            parents={job: self.get_parents(self.configs[job]) for job in jobs},
+        )
 
-    node_status[node] = _ENTERED
-    for current_node in neighbours_mapping[node]:
-        current_node_state = node_status.get(current_node, None)
-        if current_node_state == _ENTERED:
-            if ignore_cycles:
-                continue
-            else:
-                raise ValueError("cycle")
-        if current_node_state == _ENTERED_AND_EXITED:
-            continue
 
-        visited_nodes.extend(
-            dfs(
-                node=current_node,
-                neighbours_mapping=neighbours_mapping,
-                node_status=node_status,
-                ignore_cycles=ignore_cycles,
-            ),
-        )
+_chronos_job_graphs: Dict[Tuple[str, str], ChronosJobGraph] = {}
+_chronos_job_graphs_lock = threading.Lock()
 
-    visited_nodes.append(node)
-    node_status[node] = _ENTERED_AND_EXITED
-    return visited_nodes
 
+def get_chronos_job_graph(cluster, soa_dir=DEFAULT_SOA_DIR, use_cache=True):
+    """Return the refreshed ChronosJobGraph for cluster. With use_cache=False every job config is reloaded."""
+    key = (cluster, os.path.abspath(soa_dir))
+    with _chronos_job_graphs_lock:
+        if key not in _chronos_job_graphs:
+            _chronos_job_graphs[key] = ChronosJobGraph(cluster, soa_dir=soa_dir)
+        graph = _chronos_job_graphs[key]
+    graph.refresh(force=not use_cache)
+    return graph
 
-@time_cache(ttl=30)
-def _get_related_jobs_and_configs(cluster, soa_dir=DEFAULT_SOA_DIR):
+
+def _get_related_jobs_and_configs(cluster, soa_dir=DEFAULT_SOA_DIR, use_cache=True):
     """
-    For all the Chronos jobs defined in cluster, extract the list of topologically sorted related Chronos.
+    For all the Chronos jobs defined in cluster, extract the connected components of the dependency graph.
     Two individual jobs are considered related each other if exists a dependency relationship between them.
 
     :param cluster: cluster from which extracting the jobs
     :return: tuple(related jobs mapping, jobs configuration)
     """
-    chronos_configs = {}
-    for service in service_configuration_lib.read_services_configuration(soa_dir=soa_dir):
-        for instance in read_chronos_jobs_for_service(service=service, cluster=cluster, soa_dir=soa_dir):
-            try:
-                chronos_configs[(service, instance)] = load_chronos_job_config(
-                    service=service,
-                    instance=instance,
-                    cluster=cluster,
-                    soa_dir=soa_dir,
-                )
-            except NoDeploymentsAvailable:
-                pass
-
-    adjacency_list = defaultdict(set)  # List of adjacency used by dfs algorithm
-    for instance, config in chronos_configs.items():
-        for parent in config.get_parents():
-            parent = decompose_job_id(paasta_to_chronos_job_name(parent))
-            # Map the graph a undirected graph to simplify identification of connected components
-            adjacency_list[parent].add(instance)
-            adjacency_list[instance].add(parent)
-
-    def cached_dfs(known_dfs_results, node, neighbours_mapping, ignore_cycles=False):
-        """
-        Cached version of DFS algorithm (tuned for extraction of connected components).
-
-        :param known_dfs_results: previous results of DFS
-        :type known_dfs_results: list
-        :param node: starting node for DFS execution
-        :param neighbours_mapping: graph adjacency list
-        :type neighbours_mapping: dict
-        :param ignore_cycles: raise an exception if a cycle is identified in the graph
-        :type ignore_cycles: bool
-
-        :return: set of nodes part of the same connected component of `node`
-        :type: set
-        """
-        for known_dfs_result in known_dfs_results:
-            if node in known_dfs_result:
-                return known_dfs_result
-
-        visited_nodes = set(dfs(
-            node=node,
-            neighbours_mapping=neighbours_mapping,
-            ignore_cycles=ignore_cycles,
-        ))
-        known_dfs_results.append(visited_nodes)
-
-        return visited_nodes
-
-    # Build connected components
-    known_connected_components = []
-    for instance in chronos_configs:
-        cached_dfs(  # Using cached version of DFS to avoid all algorithm execution if the result it already know
-            known_dfs_results=known_connected_components,
-            node=instance,
-            ignore_cycles=True,  # Operating on an undirected graph to simplify identification of connected components
-            neighbours_mapping=adjacency_list,
-        )
-
-    connected_components = {}
-    for connected_component in known_connected_components:
-        for node in connected_component:
-            connected_components[node] = connected_component
-
-    return connected_components, chronos_configs
+    graph = get_chronos_job_graph(cluster, soa_dir=soa_dir, use_cache=use_cache)
+    return graph.components, graph.configs
 
 
 def get_related_jobs_configs(cluster, service, instance, soa_dir=DEFAULT_SOA_DIR, use_cache=True):
@@ -1179,17 +1177,8 @@ def get_related_jobs_configs(cluster, service, instance, soa_dir=DEFAULT_SOA_DIR
 
     :return: job-config mapping. Job identifier is a tuple (service, instance)
     """
-    kwargs = {}
-    if not use_cache:
-        kwargs['ttl'] = -1  # Disable usage of time_cached value
-
-    connected_components, chronos_configs = _get_related_jobs_and_configs(cluster, soa_dir=soa_dir, **kwargs)
-    related_jobs = connected_components[(service, instance)]
-    return {
-        job: config
-        for job, config in chronos_configs.items()
-        if job in related_jobs
-    }
+    graph = get_chronos_job_graph(cluster, soa_dir=soa_dir, use_cache=use_cache)
+    return {job: graph.configs[job] for job in graph.related_jobs(service, instance) if job in graph.configs}
 
 
 def topological_sort_related_jobs(cluster, service, instance, soa_dir=DEFAULT_SOA_DIR):
@@ -1199,32 +1188,4 @@ def topological_sort_related_jobs(cluster, service, instance, soa_dir=DEFAULT_SO
             The list is ordered such that job with index `i` could be executed in respect of its dependencies
             if all jobs with index smaller than `i` have terminated.
     """
-    def _sort(nodes):
-        adjacency_list = {
-            node: [
-                decompose_job_id(paasta_to_chronos_job_name(parent_job))
-                for parent_job in chronos_configs[node].get_parents()
-            ]
-            for node in related_jobs
-        }
-
-        order, enter, node_status = list(), {n for n in nodes}, {}
-
-        while enter:
-            order.extend(
-                dfs(
-                    node=enter.pop(),
-                    neighbours_mapping=adjacency_list,
-                    node_status=node_status,
-                    ignore_cycles=False,
-                ),
-            )
-
-        return order
-
-    connected_components, chronos_configs = _get_related_jobs_and_configs(cluster, soa_dir=soa_dir)
-    related_jobs = connected_components[(service, instance)]
-
-    return _sort(
-        nodes=related_jobs,
-    )
+    return get_chronos_job_graph(cluster, soa_dir=soa_dir).topological_sort(service, instance)
@@ -13,18 +13,25 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 # PYTHON_ARGCOMPLETE_OK
-"""A command line tool for viewing information from the PaaSTA stack."""
+"""A command line tool for viewing information from the PaaSTA stack.
+
+Importing every subcommand module to build the argument parser pulls in most of paasta_tools and its dependencies,
+so only the module of the subcommand being run (or completed) is imported. The others get a stub parser built from
+paasta_tools.cli.command_manifest, which records the name and help of each subcommand.
+"""
 import argparse
+import importlib
 import logging
+import os
+import shlex
 import sys
+import textwrap
 
 import argcomplete
-import pkg_resources
 
-from paasta_tools.cli import cmds
-from paasta_tools.cli.utils import load_method
-from paasta_tools.cli.utils import modules_in_pkg as paasta_commands_dir
-from paasta_tools.utils import paasta_print
+from paasta_tools.cli.command_manifest import COMMANDS
+
+COMMAND_MANIFEST_PATH = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'command_manifest.py')
 
 
 class PrintsHelpOnErrorArgumentParser(argparse.ArgumentParser):
@@ -33,11 +40,25 @@ class PrintsHelpOnErrorArgumentParser(argparse.ArgumentParser):
     is way too terse"""
 
     def error(self, message):
+        from paasta_tools.utils import paasta_print
         paasta_print("Argument parse error: %s" % message)
         self.print_help()
         sys.exit(1)
 
 
+class VersionAction(argparse.Action):
+    """Like action='version', but only looks the version up (which is slow) when it is asked for"""
+
+    def __init__(self, option_strings, dest=argparse.SUPPRESS, default=argparse.SUPPRESS, help=None):
+        super().__init__(option_strings=option_strings, dest=dest, default=default, nargs=0, help=help)
+
+    def __call__(self, parser, namespace, values, option_string=None):
+        import pkg_resources
+        version = pkg_resources.get_distribution('paasta-tools').version
+        parser._print_message('paasta-tools {}\n'.format(version), sys.stdout)
+        parser.exit()
+
+
 def add_subparser(command, subparsers):
     """Given a command name, paasta_cmd, execute the add_subparser method
     implemented in paasta_cmd.py.
@@ -49,12 +70,40 @@ def add_subparser(command, subparsers):
 
     :param command: a simple string - e.g. 'list'
     :param subparsers: an ArgumentParser object"""
-    module_name = 'paasta_tools.cli.cmds.%s' % command
-    add_subparser_fn = load_method(module_name, 'add_subparser')
-    add_subparser_fn(subparsers)
-
-
-def get_argparser():
+    module = importlib.import_module('paasta_tools.cli.cmds.%s' % command)
+    module.add_subparser(subparsers)
+
+
+def add_stub_subparser(name, help, subparsers):
+    """Add a parser for a subcommand that only knows its name and help, standing in for one we didn't load"""
+    if help is None:
+        subparsers.add_parser(name, add_help=False)
+    else:
+        subparsers.add_parser(name, help=help, add_help=False)
+
+
+def get_requested_command(argv):
+    """Return the subcommand name given on the command line (or the one being completed), if there is one"""
+    if '_ARGCOMPLETE' in os.environ:
+        comp_line = os.environ.get('COMP_LINE', '')[:int(os.environ.get('COMP_POINT', 0)) or None]
+        try:
+            argv = shlex.split(comp_line)[1:]
+        except ValueError:  # an unterminated quote while completing
+            argv = comp_line.split()[1:]
+    elif argv is None:
+        argv = sys.argv[1:]
+    for arg in argv:
+        if not arg.startswith('-'):
+            return arg
+    return None
+
+
+def get_argparser(commands=None):
+    """Build the paasta argument parser.
+
+    :param commands: names of the subcommands that should get their full parsers, which means importing their
+        modules. The rest only get stubs from the command manifest. Defaults to every subcommand.
+    """
     parser = PrintsHelpOnErrorArgumentParser(
         description=(
             "The PaaSTA command line tool. The 'paasta' command is the entry point "
@@ -74,10 +123,8 @@ def get_argparser():
     # http://stackoverflow.com/a/8521644/812183
     parser.add_argument(
         '-V', '--version',
-        action='version',
-        version='paasta-tools {}'.format(
-            pkg_resources.get_distribution('paasta-tools').version,
-        ),
+        action=VersionAction,
+        help="show program's version number and exit",
     )
 
     subparsers = parser.add_subparsers(help="[-h, --help] for subcommand help", dest='command')
@@ -87,19 +134,76 @@ def get_argparser():
     help_parser = subparsers.add_parser('help', add_help=False)
     help_parser.set_defaults(command=None)
 
-    for command in sorted(paasta_commands_dir(cmds)):
-        add_subparser(command, subparsers)
+    modules = []
+    for module, _, _ in COMMANDS:
+        if module not in modules:
+            modules.append(module)
+    if commands is None:
+        modules_to_load = set(modules)
+    else:
+        modules_to_load = {module for module, name, _ in COMMANDS if name in commands}
+
+    for module in modules:
+        if module in modules_to_load:
+            add_subparser(module, subparsers)
+        else:
+            for command_module, name, help in COMMANDS:
+                if command_module == module:
+                    add_stub_subparser(name, help, subparsers)
 
     return parser
 
 
+def build_command_manifest():
+    """Import every subcommand module and return the (module, command name, help) of each command it adds."""
+    from paasta_tools.cli import cmds
+    from paasta_tools.cli.utils import modules_in_pkg
+
+    manifest = []
+    for module in sorted(modules_in_pkg(cmds)):
+        subparsers = argparse.ArgumentParser().add_subparsers()
+        add_subparser(module, subparsers)
+        helps = {action.dest: action.help for action in subparsers._choices_actions}
+        for name in subparsers.choices:
+            manifest.append((module, name, helps.get(name)))
+    return manifest
+
+
+def format_command_manifest(manifest):
+    lines = [
+        '# This file is generated by `make command-manifest` from the add_subparser functions in',
+        '# paasta_tools.cli.cmds. Do not edit it by hand.',
+        '# (module, command name, help)',
+        'COMMANDS = [',
+    ]
+    for module, name, help in manifest:
+        lines.extend(['    (', f'        {module!r},', f'        {name!r},'])
+        if help is None:
+            lines.append('        None,')
+        else:
+            chunks = textwrap.wrap(
+                help, width=80, expand_tabs=False, replace_whitespace=False, drop_whitespace=False,
+                break_on_hyphens=False,
+            ) or ['']
+            lines.extend(f'        {chunk!r}' for chunk in chunks[:-1])
+            lines.append(f'        {chunks[-1]!r},')
+        lines.append('    ),')
+    lines.append(']')
+    return '\n'.join(lines) + '\n'
+
+
+def write_command_manifest(path=COMMAND_MANIFEST_PATH):
+    with open(path, 'w') as f:
+        f.write(format_command_manifest(build_command_manifest()))
+
+
 def parse_args(argv):
     """Initialize autocompletion and configure the argument parser.
 
     :return: an argparse.Namespace object mapping parameter names to the inputs
              from sys.argv
     """
-    parser = get_argparser()
+    parser = get_argparser(commands=[get_requested_command(argv)])
     argcomplete.autocomplete(parser)
 
     return parser.parse_args(argv), parser
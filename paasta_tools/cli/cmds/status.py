@@ -16,10 +16,13 @@ import concurrent.futures
 import difflib
 import os
 import sys
+import threading
 from collections import defaultdict
 from distutils.util import strtobool
+from typing import Any
 from typing import Callable
 from typing import DefaultDict
+from typing import Dict
 from typing import Iterable
 from typing import List
 from typing import Mapping
@@ -32,6 +35,7 @@ from bravado.exception import HTTPError
 from service_configuration_lib import read_deploy
 
 from paasta_tools import kubernetes_tools
+from paasta_tools.api.client import CONNECTION_POOL_SIZE
 from paasta_tools.api.client import get_paasta_api_client
 from paasta_tools.cli.utils import execute_paasta_serviceinit_on_remote_master
 from paasta_tools.cli.utils import figure_out_service_name
@@ -59,6 +63,11 @@ from paasta_tools.utils import paasta_print
 from paasta_tools.utils import PaastaColors
 from paasta_tools.utils import SystemPaastaConfig
 
+# paasta status asks about several services at once, so the per-instance requests to one paasta-api share a single
+# pool of threads, one per connection that its client keeps open
+_api_status_executors: Dict[int, concurrent.futures.ThreadPoolExecutor] = {}
+_api_status_executors_lock = threading.Lock()
+
 
 def add_subparser(
     subparsers,
@@ -196,23 +205,66 @@ def get_actual_deployments(
     return actual_deployments
 
 
-def paasta_status_on_api_endpoint(
+def get_instance_statuses_from_api(
     cluster: str,
     service: str,
-    instance: str,
+    instances: Sequence[str],
     system_paasta_config: SystemPaastaConfig,
-    verbose: int,
-) -> int:
+) -> Mapping[str, Any]:
+    """Request the status of every instance from the cluster's paasta-api in one bulk request. Against a paasta-api
+    without the bulk endpoint, or if the bulk request fails, fall back to one round of concurrent requests, one per
+    instance.
+
+    :returns: instance -> its status, or the HTTPError its request failed with
+    """
     client = get_paasta_api_client(cluster, system_paasta_config)
     if not client:
         paasta_print('Cannot get a paasta-api client')
         exit(1)
 
-    try:
-        status = client.service.status_instance(service=service, instance=instance).result()
-    except HTTPError as exc:
-        paasta_print(exc.response.text)
-        return exc.status_code
+    if len(instances) > 1:
+        try:
+            statuses = client.service.status_instances(
+                instances=[compose_job_id(service, instance) for instance in instances],
+            ).result()
+        except HTTPError:
+            pass
+        else:
+            return {status.instance: status for status in statuses}
+
+    def get_status(instance: str) -> Any:
+        try:
+            return client.service.status_instance(service=service, instance=instance).result()
+        except HTTPError as exc:
+            return exc
+
+    executor = get_api_status_executor(client)
+    return dict(zip(instances, executor.map(get_status, instances)))
+
+
+def get_api_status_executor(client: Any) -> concurrent.futures.ThreadPoolExecutor:
+    """The thread pool for per-instance status requests to the paasta-api of client. It has as many threads as the
+    client's connection pool has connections, however many threads share the client."""
+    with _api_status_executors_lock:
+        if id(client) not in _api_status_executors:
+            _api_status_executors[id(client)] = concurrent.futures.ThreadPoolExecutor(
+                max_workers=CONNECTION_POOL_SIZE,
+            )
+        return _api_status_executors[id(client)]
+
+
+def print_status_from_api(
+    service: str,
+    instance: str,
+    status: Any,
+) -> int:
+    if isinstance(status, HTTPError):
+        paasta_print(status.response.text)
+        return status.status_code
+    if getattr(status, 'error_code', None) is not None:
+        # an instance whose status the bulk endpoint couldn't determine
+        paasta_print(status.error_message)
+        return status.error_code
 
     paasta_print('instance: %s' % PaastaColors.blue(instance))
     paasta_print('Git sha:    %s (desired)' % status.git_sha)
@@ -226,6 +278,17 @@ def paasta_status_on_api_endpoint(
         return 0
 
 
+def paasta_status_on_api_endpoint(
+    cluster: str,
+    service: str,
+    instance: str,
+    system_paasta_config: SystemPaastaConfig,
+    verbose: int,
+) -> int:
+    statuses = get_instance_statuses_from_api(cluster, service, [instance], system_paasta_config)
+    return print_status_from_api(service, instance, statuses[instance])
+
+
 def print_marathon_status(
     service: str,
     instance: str,
@@ -387,14 +450,9 @@ def report_status_for_cluster(
     return_code = 0
     if len(deployed_instances) > 0:
         if use_api_endpoint:
+            statuses = get_instance_statuses_from_api(cluster, service, deployed_instances, system_paasta_config)
             return_codes = [
-                paasta_status_on_api_endpoint(
-                    cluster,
-                    service,
-                    deployed_instance,
-                    system_paasta_config,
-                    verbose=verbose,
-                )
+                print_status_from_api(service, deployed_instance, statuses[deployed_instance])
                 for deployed_instance in deployed_instances
             ]
             if any(return_code != 200 for return_code in return_codes):
@@ -0,0 +1,196 @@
+# This file is generated by `make command-manifest` from the add_subparser functions in
+# paasta_tools.cli.cmds. Do not edit it by hand.
+# (module, command name, help)
+COMMANDS = [
+    (
+        'autoscale',
+        'autoscale',
+        'Manually scale a service up and down manually, bypassing the normal autoscaler',
+    ),
+    (
+        'boost',
+        'boost',
+        'Set, print the status, or clear a capacity boost for a given region in a PaaSTA '
+        'cluster',
+    ),
+    (
+        'check',
+        'check',
+        "Determine whether service in pwd is 'paasta ready', checking for common mistakes"
+        ' in the soa-configs directory and the local service directory. This command is '
+        "designed to be run from the 'root' of a service directory.",
+    ),
+    (
+        'cook_image',
+        'cook-image',
+        "'paasta cook-image' calls 'make cook-image' as part of the PaaSTA contract.\n\nThe"
+        " PaaSTA contract specifies that a service MUST respond to 'cook-image' and "
+        'produce a docker image as a result. This command is often run as part of the '
+        "normal build pipeline ('paasta itest'), or via a 'paasta local-run --build'.",
+    ),
+    (
+        'docker_exec',
+        'docker_exec',
+        'Docker exec against a container running your service',
+    ),
+    (
+        'docker_inspect',
+        'docker_inspect',
+        'Docker inspect against a container running your service',
+    ),
+    (
+        'docker_stop',
+        'docker_stop',
+        'Docker stop a container running your service',
+    ),
+    (
+        'emergency_restart',
+        'emergency-restart',
+        'Restarts a PaaSTA service instance in an emergency',
+    ),
+    (
+        'emergency_start',
+        'emergency-start',
+        'Kicks off a chronos job run. Not implemented for Marathon instances.',
+    ),
+    (
+        'emergency_stop',
+        'emergency-stop',
+        'Stop a PaaSTA service instance in an emergency',
+    ),
+    (
+        'fsm',
+        'fsm',
+        'Generate boilerplate configs for a new PaaSTA Service',
+    ),
+    (
+        'generate_pipeline',
+        'generate-pipeline',
+        "Configures a Yelp-specific Jenkins build pipeline to match the 'deploy.yaml'",
+    ),
+    (
+        'get_latest_deployment',
+        'get-latest-deployment',
+        'Gets the Git SHA for the latest deployment of a service',
+    ),
+    (
+        'info',
+        'info',
+        'Prints the general information about a service.',
+    ),
+    (
+        'itest',
+        'itest',
+        "Runs 'make itest' as part of the PaaSTA contract.",
+    ),
+    (
+        'list',
+        'list',
+        'Display a list of PaaSTA services',
+    ),
+    (
+        'list_clusters',
+        'list-clusters',
+        'Display a list of all PaaSTA clusters',
+    ),
+    (
+        'local_run',
+        'local-run',
+        "Run service's Docker image locally",
+    ),
+    (
+        'logs',
+        'logs',
+        'Streams logs relevant to a service across the PaaSTA components',
+    ),
+    (
+        'mark_for_deployment',
+        'mark-for-deployment',
+        'Mark a docker image for deployment in git',
+    ),
+    (
+        'metastatus',
+        'metastatus',
+        'Display the status for an entire PaaSTA cluster',
+    ),
+    (
+        'pause_service_autoscaler',
+        'pause_service_autoscaler',
+        'Pause the service autoscaler for an entire cluster',
+    ),
+    (
+        'performance_check',
+        'performance-check',
+        'Performs a performance check',
+    ),
+    (
+        'push_to_registry',
+        'push-to-registry',
+        'Uploads a docker image to a registry',
+    ),
+    (
+        'remote_run',
+        'remote-run',
+        'Schedule Mesos to run adhoc command in context of a service',
+    ),
+    (
+        'rerun',
+        'rerun',
+        'Re-run a scheduled PaaSTA job',
+    ),
+    (
+        'rollback',
+        'rollback',
+        'Rollback a docker image to a previous deploy',
+    ),
+    (
+        'secret',
+        'secret',
+        'Add/update PaaSTA service secrets',
+    ),
+    (
+        'security_check',
+        'security-check',
+        'Performs a security check',
+    ),
+    (
+        'spark_run',
+        'spark-run',
+        'Run Spark on the PaaSTA cluster',
+    ),
+    (
+        'start_stop_restart',
+        'start',
+        'Start or restarts a PaaSTA service in a graceful way.',
+    ),
+    (
+        'start_stop_restart',
+        'restart',
+        'Start or restarts a PaaSTA service in a graceful way.',
+    ),
+    (
+        'start_stop_restart',
+        'stop',
+        'Stops a PaaSTA service in a graceful way.',
+    ),
+    (
+        'status',
+        'status',
+        'Display the status of a PaaSTA service.',
+    ),
+    (
+        'sysdig',
+        'sysdig',
+        'Run sysdig on a remote host and filter to a service and instance',
+    ),
+    (
+        'validate',
+        'validate',
+        'Validate that all paasta config files in pwd are correct',
+    ),
+    (
+        'wait_for_deployment',
+        'wait-for-deployment',
+        'Wait a service to be deployed to deploy_group',
+    ),
+]
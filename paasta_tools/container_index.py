@@ -0,0 +1,163 @@
+"""An in-process index of the PaaSTA containers running on this host, by ip, mac address and container id.
+
+The index is built from one container listing and then kept current by a daemon thread following the docker events
+stream. Every resync_interval seconds the thread relists all containers, in case an event was missed. Looking up a
+container is a dict lookup instead of a docker API call, so the load on the docker daemon doesn't grow with how
+often containers are looked up.
+"""
+import logging
+import os
+import threading
+import time
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import NamedTuple
+from typing import Optional
+
+from paasta_tools.utils import get_docker_client
+from paasta_tools.utils import get_running_mesos_docker_containers
+
+log = logging.getLogger(__name__)
+
+DEFAULT_RESYNC_INTERVAL = 300
+# seconds to wait before resyncing after the docker events stream failed
+RETRY_INTERVAL = 5
+
+
+ServiceContainer = NamedTuple(
+    'ServiceContainer', [
+        ('service', str),
+        ('instance', str),
+        ('mac', str),
+        ('ip', str),
+    ],
+)
+
+
+def service_container(container: Dict[str, Any]) -> Optional[ServiceContainer]:
+    """Return the service, instance, mac and ip of a container from a docker container listing, or None if it isn't
+    a PaaSTA container on the bridge network."""
+    if container['HostConfig']['NetworkMode'] != 'bridge':
+        return None
+
+    service = container['Labels'].get('paasta_service')
+    instance = container['Labels'].get('paasta_instance')
+    if service is None or instance is None:
+        return None
+
+    network_info = container['NetworkSettings']['Networks']['bridge']
+    return ServiceContainer(service, instance, network_info['MacAddress'], network_info['IPAddress'])
+
+
+class ContainerIndex:
+
+    def __init__(self, resync_interval: float=DEFAULT_RESYNC_INTERVAL) -> None:
+        self.resync_interval = resync_interval
+        self.pid = os.getpid()
+        self._by_id: Dict[str, ServiceContainer] = {}
+        self._by_ip: Dict[str, ServiceContainer] = {}
+        self._by_mac: Dict[str, ServiceContainer] = {}
+        self._watcher: Optional[threading.Thread] = None
+
+    def by_id(self, container_id: str) -> Optional[ServiceContainer]:
+        return self._by_id.get(container_id)
+
+    def by_ip(self, ip: str) -> Optional[ServiceContainer]:
+        return self._by_ip.get(ip)
+
+    def by_mac(self, mac: str) -> Optional[ServiceContainer]:
+        return self._by_mac.get(mac.lower())
+
+    def containers(self) -> List[ServiceContainer]:
+        return list(self._by_id.values())
+
+    def start(self) -> None:
+        """Sync the index, then keep it current from a daemon thread"""
+        since = self.resync()
+        self._watcher = threading.Thread(target=self._watch, args=(since,), name='container-index', daemon=True)
+        self._watcher.start()
+
+    def resync(self) -> int:
+        """Rebuild the index from a full container listing. Returns the docker timestamp from which events have to
+        be followed to keep it current."""
+        since = int(time.time())
+        by_id = {}
+        for container in get_running_mesos_docker_containers():
+            found = service_container(container)
+            if found is not None:
+                by_id[container['Id']] = found
+        # Readers only ever see a complete index, since each dict is swapped in with a single assignment
+        self._by_id = by_id
+        self._by_ip = {found.ip: found for found in by_id.values()}
+        self._by_mac = {found.mac.lower(): found for found in by_id.values()}
+        return since
+
+    def _watch(self, since: int) -> None:
+        while True:
+            try:
+                self.follow_events(since)
+                since = self.resync()
+            except Exception:
+                log.exception('Lost the docker events stream, resyncing the container index')
+                time.sleep(RETRY_INTERVAL)
+                try:
+                    since = self.resync()
+                except Exception:
+                    log.exception('Unable to resync the container index')
+
+    def follow_events(self, since: int) -> None:
+        """Apply docker events from since until resync_interval seconds later, when the stream ends"""
+        client = get_docker_client()
+        events = client.events(
+            since=since,
+            until=since + int(self.resync_interval),
+            filters={'event': ['start', 'die']},
+            decode=True,
+        )
+        for event in events:
+            self.handle_event(event)
+
+    def handle_event(self, event: Dict[str, Any]) -> None:
+        container_id = event.get('id')
+        if container_id is None:
+            return
+        if event.get('status') == 'start':
+            for container in get_running_mesos_docker_containers(filters={'id': container_id}):
+                found = service_container(container)
+                if found is not None:
+                    self._add(container['Id'], found)
+        elif event.get('status') == 'die':
+            self._remove(container_id)
+
+    def _add(self, container_id: str, found: ServiceContainer) -> None:
+        self._remove(container_id)
+        self._by_id[container_id] = found
+        self._by_ip[found.ip] = found
+        self._by_mac[found.mac.lower()] = found
+
+    def _remove(self, container_id: str) -> None:
+        found = self._by_id.pop(container_id, None)
+        if found is None:
+            return
+        # A new container may already have been given the same address
+        if self._by_ip.get(found.ip) is found:
+            del self._by_ip[found.ip]
+        if self._by_mac.get(found.mac.lower()) is found:
+            del self._by_mac[found.mac.lower()]
+
+
+_container_index: Optional[ContainerIndex] = None
+
+
+def get_container_index() -> ContainerIndex:
+    """Return this process' ContainerIndex, starting it on first use.
+
+    Threads don't survive a fork, so a forked child starts its own index rather than using its parent's.
+    """
+    global _container_index
+    if _container_index is None or _container_index.pid != os.getpid():
+        index = ContainerIndex()
+        index.start()
+        _container_index = index
+    return _container_index
@@ -0,0 +1,83 @@
+"""Linear time building blocks for analysing job dependency graphs.
+
+Both helpers are iterative, so arbitrarily deep dependency chains can't hit the recursion limit.
+"""
+from collections import deque
+from typing import Dict
+from typing import Hashable
+from typing import Iterable
+from typing import List
+from typing import Mapping
+from typing import Set
+from typing import TypeVar
+
+NodeT = TypeVar('NodeT', bound=Hashable)
+
+
+class UnionFind:
+    """Disjoint sets with union by size and path halving: nearly O(1) amortised per operation."""
+
+    def __init__(self) -> None:
+        self.parents: Dict = {}
+        self.sizes: Dict = {}
+
+    def add(self, node: Hashable) -> None:
+        if node not in self.parents:
+            self.parents[node] = node
+            self.sizes[node] = 1
+
+    def find(self, node: Hashable) -> Hashable:
+        self.add(node)
+        parents = self.parents
+        while parents[node] != node:
+            parents[node] = parents[parents[node]]
+            node = parents[node]
+        return node
+
+    def union(self, a: Hashable, b: Hashable) -> None:
+        root_a, root_b = self.find(a), self.find(b)
+        if root_a == root_b:
+            return
+        if self.sizes[root_a] < self.sizes[root_b]:
+            root_a, root_b = root_b, root_a
+        self.parents[root_b] = root_a
+        self.sizes[root_a] += self.sizes.pop(root_b)
+
+    def components(self) -> Dict[Hashable, Set]:
+        """Map every node to the set of nodes in its component. Nodes of a component share the same set object."""
+        by_root: Dict[Hashable, Set] = {}
+        for node in self.parents:
+            by_root.setdefault(self.find(node), set()).add(node)
+        return {node: by_root[self.find(node)] for node in self.parents}
+
+
+def topological_sort(nodes: Iterable[NodeT], parents: Mapping[NodeT, Iterable[NodeT]]) -> List[NodeT]:
+    """Order nodes so that each comes after all of its parents, using Kahn's algorithm.
+
+    Parents that aren't in nodes are ignored. Nodes that are ready at the same time keep the order they were given in.
+
+    :raises ValueError: if the nodes contain a cycle
+    """
+    nodes = list(dict.fromkeys(nodes))
+    node_set = set(nodes)
+    in_degree: Dict[NodeT, int] = {node: 0 for node in nodes}
+    children: Dict[NodeT, List[NodeT]] = {node: [] for node in nodes}
+    for node in nodes:
+        for parent in set(parents.get(node, ())):
+            if parent in node_set:
+                in_degree[node] += 1
+                children[parent].append(node)
+
+    ready = deque(node for node in nodes if in_degree[node] == 0)
+    order: List[NodeT] = []
+    while ready:
+        node = ready.popleft()
+        order.append(node)
+        for child in children[node]:
+            in_degree[child] -= 1
+            if in_degree[child] == 0:
+                ready.append(child)
+
+    if len(order) != len(node_set):
+        raise ValueError("cycle")
+    return order
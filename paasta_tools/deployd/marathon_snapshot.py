@@ -0,0 +1,239 @@
+"""An in-memory snapshot of all marathon apps (with embedded tasks) shared by
+the deployd workers.
+
+Without this every worker fetches the full app list from every marathon shard
+on every bounce. The snapshot is fully resynced periodically in the background
+and kept fresh between resyncs by marking the apps named in marathon's event
+stream as dirty. Reads for a service instance only hit marathon (with a
+targeted, per-instance query) if that instance is dirty or older than the
+staleness bound.
+"""
+import json
+import threading
+import time
+from typing import Any
+from typing import Collection
+from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Tuple
+
+from marathon import MarathonClient
+from marathon.models.app import MarathonApp
+
+from paasta_tools.deployd.common import PaastaThread
+from paasta_tools.marathon_tools import does_app_id_match
+from paasta_tools.marathon_tools import format_job_id
+from paasta_tools.marathon_tools import MarathonClients
+from paasta_tools.marathon_tools import MESOS_TASK_SPACER
+
+# Marathon events which mean that the apps or tasks we have cached for an app id
+# may no longer be accurate.
+INVALIDATING_EVENT_TYPES = [
+    'api_post_event',
+    'app_terminated_event',
+    'deployment_step_success',
+    'deployment_step_failure',
+    'health_status_changed_event',
+    'instance_changed_event',
+    'status_update_event',
+    'unhealthy_task_kill_event',
+]
+
+
+def get_job_key_from_app_id(app_id: str) -> str:
+    """Turn a marathon app id like /service.instance.gitsha.config into the
+    service.instance prefix which all apps of that instance share"""
+    return MESOS_TASK_SPACER.join(app_id.lstrip('/').split(MESOS_TASK_SPACER)[:2])
+
+
+def get_app_ids_from_event(event: Dict[str, Any]) -> List[str]:
+    if 'appId' in event:
+        return [event['appId']]
+    if 'runSpecId' in event:
+        return [event['runSpecId']]
+    if 'appDefinition' in event:
+        return [event['appDefinition'].get('id', '')]
+    if 'plan' in event:
+        return [app['id'] for app in event['plan'].get('target', {}).get('apps', [])]
+    return []
+
+
+def get_client_key(client: MarathonClient) -> Tuple[str, ...]:
+    return tuple(sorted(client.servers))
+
+
+class MarathonShardSnapshot:
+    """The cached apps for a single marathon shard. All public methods are thread safe."""
+
+    def __init__(self, client: MarathonClient) -> None:
+        self.client = client
+        self.lock = threading.Lock()
+        # service.instance -> app id -> app
+        self.apps: Dict[str, Dict[str, MarathonApp]] = {}
+        # service.instance -> when that instance was last refreshed on its own
+        self.refreshed_at: Dict[str, float] = {}
+        # service.instance -> when an event told us it had changed
+        self.dirty: Dict[str, float] = {}
+        self.last_full_sync = 0.0
+
+    def full_sync(self) -> None:
+        started = time.time()
+        apps = self.client.list_apps(embed_tasks=True)
+        by_job_key: Dict[str, Dict[str, MarathonApp]] = {}
+        for app in apps:
+            by_job_key.setdefault(get_job_key_from_app_id(app.id), {})[app.id] = app
+        with self.lock:
+            self.apps = by_job_key
+            self.refreshed_at = {}
+            # anything that changed while we were listing has to be fetched again
+            self.dirty = {key: marked for key, marked in self.dirty.items() if marked > started}
+            self.last_full_sync = started
+
+    def refresh_job(self, job_key: str) -> None:
+        started = time.time()
+        apps = [
+            app for app in self.client.list_apps(embed_tasks=True, app_id=f'/{job_key}')
+            if get_job_key_from_app_id(app.id) == job_key
+        ]
+        with self.lock:
+            self.apps[job_key] = {app.id: app for app in apps}
+            self.refreshed_at[job_key] = started
+            if job_key in self.dirty and self.dirty[job_key] <= started:
+                del self.dirty[job_key]
+
+    def mark_dirty(self, job_key: str) -> None:
+        with self.lock:
+            self.dirty[job_key] = time.time()
+
+    def is_fresh(self, job_key: str, max_age: float) -> bool:
+        with self.lock:
+            if job_key in self.dirty:
+                return False
+            refreshed_at = max(self.refreshed_at.get(job_key, 0.0), self.last_full_sync)
+        return time.time() - refreshed_at <= max_age
+
+    def get_apps(self, job_key: str, max_age: float) -> List[MarathonApp]:
+        if not self.is_fresh(job_key, max_age):
+            self.refresh_job(job_key)
+        with self.lock:
+            return list(self.apps.get(job_key, {}).values())
+
+
+class MarathonEventListener(PaastaThread):
+    """Marks apps as dirty in a shard snapshot as marathon tells us about changes to them"""
+
+    def __init__(self, shard: MarathonShardSnapshot, reconnect_delay: float=10) -> None:
+        super().__init__()
+        self.daemon = True
+        self.shard = shard
+        self.reconnect_delay = reconnect_delay
+
+    def process_event(self, raw_event: str) -> None:
+        try:
+            event = json.loads(raw_event)
+        except ValueError:
+            self.log.warning(f"Ignoring unparseable marathon event: {raw_event}")
+            return
+        for app_id in get_app_ids_from_event(event):
+            if app_id:
+                self.shard.mark_dirty(get_job_key_from_app_id(app_id))
+
+    def run(self) -> None:
+        while True:
+            try:
+                for raw_event in self.shard.client.event_stream(raw=True, event_types=INVALIDATING_EVENT_TYPES):
+                    self.process_event(raw_event)
+            except Exception as e:
+                self.log.error(f"Marathon event stream failed, reconnecting: {e}")
+            # Events may have been missed while we were disconnected, so don't trust
+            # anything until the next full sync.
+            with self.shard.lock:
+                self.shard.last_full_sync = 0.0
+                self.shard.refreshed_at = {}
+            time.sleep(self.reconnect_delay)
+
+
+class MarathonSnapshotResync(PaastaThread):
+    """Periodically replaces every shard snapshot with a full listing from marathon"""
+
+    def __init__(self, snapshot: 'MarathonAppsSnapshot', interval: float) -> None:
+        super().__init__()
+        self.daemon = True
+        self.snapshot = snapshot
+        self.interval = interval
+
+    def run(self) -> None:
+        while True:
+            for shard in self.snapshot.shards.values():
+                try:
+                    shard.full_sync()
+                except Exception as e:
+                    self.log.error(f"Failed to resync marathon apps from {shard.client.servers}: {e}")
+            time.sleep(self.interval)
+
+
+class MarathonAppsSnapshot:
+    """A snapshot of the apps on every shard of a MarathonClients, shared between threads. Implements
+    marathon_tools.MarathonAppsSnapshotProtocol.
+
+    :param clients: the marathon clients to keep a snapshot of. The snapshot uses
+                    these clients exclusively; callers keep their own.
+    :param max_age: how many seconds the apps of a service instance may be cached
+                    for before a read fetches them again
+    :param resync_interval: how often to do a full listing of every shard
+    """
+
+    def __init__(self, clients: MarathonClients, max_age: float, resync_interval: float) -> None:
+        self.max_age = max_age
+        self.resync_interval = resync_interval
+        self.shards: Dict[Tuple[str, ...], MarathonShardSnapshot] = {
+            get_client_key(client): MarathonShardSnapshot(client) for client in clients.get_all_clients()
+        }
+        self.threads: List[PaastaThread] = []
+
+    def start(self) -> None:
+        self.threads = [MarathonEventListener(shard) for shard in self.shards.values()]
+        self.threads.append(MarathonSnapshotResync(self, self.resync_interval))
+        for thread in self.threads:
+            thread.start()
+
+    def get_apps_with_clients(
+        self,
+        service: str,
+        instance: str,
+        clients: Collection[MarathonClient],
+        max_age: Optional[float]=None,
+    ) -> List[Tuple[MarathonApp, MarathonClient]]:
+        """Return the apps of service.instance on the given clients, in the same form as
+        marathon_tools.get_marathon_apps_with_clients. The returned pairs reference the
+        caller's clients, not the snapshot's own.
+
+        :param max_age: override the snapshot's staleness bound, 0 forces a refresh
+        """
+        if max_age is None:
+            max_age = self.max_age
+        job_key = format_job_id(service, instance)
+        apps_with_clients: List[Tuple[MarathonApp, MarathonClient]] = []
+        for client in clients:
+            shard = self.shards.get(get_client_key(client))
+            if shard is None:
+                apps = shard_apps_without_snapshot(client, service, instance)
+            else:
+                apps = shard.get_apps(job_key, max_age)
+            apps_with_clients.extend((app, client) for app in apps)
+        return apps_with_clients
+
+    def invalidate(self, service: str, instance: str) -> None:
+        """Make the next read of service.instance go to marathon, e.g. after we changed its apps"""
+        job_key = format_job_id(service, instance)
+        for shard in self.shards.values():
+            shard.mark_dirty(job_key)
+
+
+def shard_apps_without_snapshot(client: MarathonClient, service: str, instance: str) -> List[MarathonApp]:
+    job_id = format_job_id(service, instance)
+    return [
+        app for app in client.list_apps(embed_tasks=True, app_id=f'/{job_id}')
+        if does_app_id_match(service, instance, app.id)
+    ]
@@ -1,4 +1,5 @@
 #!/usr/bin/env python
+import heapq
 import inspect
 import logging
 import logging.handlers
@@ -17,7 +18,9 @@ from paasta_tools.deployd.common import PaastaThread
 from paasta_tools.deployd.common import rate_limit_instances
 from paasta_tools.deployd.common import ServiceInstance
 from paasta_tools.deployd.leader import PaastaLeaderElection
+from paasta_tools.deployd.marathon_snapshot import MarathonAppsSnapshot
 from paasta_tools.deployd.metrics import QueueMetrics
+from paasta_tools.deployd.metrics import SmartstackRegistrationMetrics
 from paasta_tools.deployd.workers import PaastaDeployWorker
 from paasta_tools.list_marathon_service_instances import get_service_instances_that_need_bouncing
 from paasta_tools.marathon_tools import DEFAULT_SOA_DIR
@@ -26,6 +29,9 @@ from paasta_tools.utils import get_services_for_cluster
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import ZookeeperPool
 
+# How often the main loop checks that all watchers and workers are still alive
+HEALTH_CHECK_INTERVAL = 1
+
 
 class DedupedPriorityQueue(PaastaPriorityQueue):
     """This class extends the python Queue class so that the Queue is
@@ -66,32 +72,53 @@ class Inbox(PaastaThread):
         self.inbox_q = inbox_q
         self.bounce_q = bounce_q
         self.to_bounce = {}
+        # A heap of (bounce_by, counter, key, service_instance) for everything in to_bounce. When a service
+        # instance is replaced in to_bounce its old entry is left here and skipped once it reaches the top.
+        self.bounce_schedule = []
+        self.counter = 0
 
     def run(self):
         while True:
             self.process_inbox()
 
     def process_inbox(self):
+        """Wait for new service instances until the next one in to_bounce is due, take everything currently
+        waiting in the inbox queue and then move whatever is due to the bounce queue."""
         try:
-            service_instance = self.inbox_q.get(block=False)
+            service_instance = self.inbox_q.get(timeout=self.seconds_until_next_bounce())
         except Empty:
             service_instance = None
         if service_instance:
-            self.log.debug("Processing {}.{} to see if we need to add it "
-                           "to bounce queue".format(
-                               service_instance.service,
-                               service_instance.instance,
-                           ))
             self.process_service_instance(service_instance)
-        if self.inbox_q.empty() and self.to_bounce:
-            self.process_to_bounce()
-        time.sleep(0.1)
+            for _ in range(self.inbox_q.qsize()):
+                try:
+                    self.process_service_instance(self.inbox_q.get(block=False))
+                except Empty:
+                    break
+        self.process_to_bounce()
+
+    def seconds_until_next_bounce(self):
+        """How long we can block on the inbox queue before something in to_bounce is due. None if nothing is
+        scheduled."""
+        if not self.bounce_schedule:
+            return None
+        return max(self.bounce_schedule[0][0] - time.time(), 0)
 
     def process_service_instance(self, service_instance):
+        self.log.debug("Processing {}.{} to see if we need to add it "
+                       "to bounce queue".format(
+                           service_instance.service,
+                           service_instance.instance,
+                       ))
         service_instance_key = f"{service_instance.service}.{service_instance.instance}"
         if self.should_add_to_bounce(service_instance, service_instance_key):
             self.log.info(f"Enqueuing {service_instance} to be bounced in the future")
             self.to_bounce[service_instance_key] = service_instance
+            self.counter += 1
+            heapq.heappush(
+                self.bounce_schedule,
+                (service_instance.bounce_by, self.counter, service_instance_key, service_instance),
+            )
 
     def should_add_to_bounce(self, service_instance, service_instance_key):
         if service_instance_key in self.to_bounce:
@@ -101,15 +128,14 @@ class Inbox(PaastaThread):
         return True
 
     def process_to_bounce(self):
-        bounced = []
-        self.log.debug("Processing %d bounce queue entries..." % len(self.to_bounce.keys()))
-        for service_instance_key in self.to_bounce.keys():
-            if self.to_bounce[service_instance_key].bounce_by < int(time.time()):
-                service_instance = self.to_bounce[service_instance_key]
-                bounced.append(service_instance_key)
-                self.bounce_q.put(service_instance.priority, service_instance)
-        for service_instance_key in bounced:
-            self.to_bounce.pop(service_instance_key)
+        now = time.time()
+        while self.bounce_schedule and self.bounce_schedule[0][0] <= now:
+            _, _, service_instance_key, service_instance = heapq.heappop(self.bounce_schedule)
+            if self.to_bounce.get(service_instance_key) is not service_instance:
+                # superseded by an earlier bounce_by for the same service instance
+                continue
+            del self.to_bounce[service_instance_key]
+            self.bounce_q.put(service_instance.priority, service_instance)
         # TODO: if the bounceq is empty we could probably start adding SIs from
         # self.to_bounce to make sure the workers always have something to do.
 
@@ -136,6 +162,7 @@ class DeployDaemon(PaastaThread):
         self.control = PaastaQueue("ControlQueue")
         self.inbox = Inbox(self.inbox_q, self.bounce_q)
         self.marathon_clients = get_marathon_clients_from_config()
+        self.marathon_apps_snapshot = None
 
     def setup_logging(self):
         root_logger = logging.getLogger()
@@ -180,6 +207,7 @@ class DeployDaemon(PaastaThread):
         leader_counter = self.metrics.create_counter("leader_elections", paasta_cluster=self.config.get_cluster())
         leader_counter.count()
         QueueMetrics(self.inbox, self.bounce_q, self.config.get_cluster(), self.metrics).start()
+        SmartstackRegistrationMetrics(self.config.get_cluster(), self.metrics).start()
         self.inbox.start()
         self.log.info("Starting all watcher threads")
         self.start_watchers()
@@ -188,6 +216,8 @@ class DeployDaemon(PaastaThread):
         self.log.info("Prioritising services that we know need a bounce...")
         if self.config.get_deployd_startup_oracle_enabled():
             self.prioritise_bouncing_services()
+        self.log.info("Starting marathon app snapshot")
+        self.start_marathon_apps_snapshot()
         self.log.info("Starting worker threads")
         self.start_workers()
         self.started = True
@@ -197,7 +227,7 @@ class DeployDaemon(PaastaThread):
     def main_loop(self):
         while True:
             try:
-                message = self.control.get(block=False)
+                message = self.control.get(timeout=HEALTH_CHECK_INTERVAL)
             except Empty:
                 message = None
             if message == "ABORT":
@@ -210,7 +240,6 @@ class DeployDaemon(PaastaThread):
                 self.log.error("All workers have died, committing suicide!")
                 sys.exit(1)
             self.check_and_start_workers()
-            time.sleep(0.1)
 
     def all_watchers_running(self):
         return all([watcher.is_alive() for watcher in self.watcher_threads])
@@ -224,17 +253,39 @@ class DeployDaemon(PaastaThread):
         for i in range(number_of_dead_workers):
             self.log.error("Detected a dead worker, starting a replacement thread")
             worker_no = len(self.workers) + 1
-            worker = PaastaDeployWorker(worker_no, self.inbox_q, self.bounce_q, self.config, self.metrics)
+            worker = PaastaDeployWorker(
+                worker_no,
+                self.inbox_q,
+                self.bounce_q,
+                self.config,
+                self.metrics,
+                marathon_apps_snapshot=self.marathon_apps_snapshot,
+            )
             worker.start()
             self.workers.append(worker)
 
     def stop(self):
         self.control.put("ABORT")
 
+    def start_marathon_apps_snapshot(self):
+        self.marathon_apps_snapshot = MarathonAppsSnapshot(
+            clients=get_marathon_clients_from_config(),
+            max_age=self.config.get_deployd_marathon_snapshot_max_age(),
+            resync_interval=self.config.get_deployd_marathon_snapshot_resync_interval(),
+        )
+        self.marathon_apps_snapshot.start()
+
     def start_workers(self):
         self.workers = []
         for i in range(self.config.get_deployd_number_workers()):
-            worker = PaastaDeployWorker(i, self.inbox_q, self.bounce_q, self.config, self.metrics)
+            worker = PaastaDeployWorker(
+                i,
+                self.inbox_q,
+                self.bounce_q,
+                self.config,
+                self.metrics,
+                marathon_apps_snapshot=self.marathon_apps_snapshot,
+            )
             worker.start()
             self.workers.append(worker)
 
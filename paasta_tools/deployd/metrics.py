@@ -1,6 +1,7 @@
 import time
 
 from paasta_tools.deployd.common import PaastaThread
+from paasta_tools.smartstack_tools import get_smartstack_registration_service
 
 
 class QueueMetrics(PaastaThread):
@@ -21,3 +22,21 @@ class QueueMetrics(PaastaThread):
             self.inbox_gauge.set(len(self.inbox.keys()))
             self.bounce_q_gauge.set(self.bounce_q.qsize())
             time.sleep(20)
+
+
+class SmartstackRegistrationMetrics(PaastaThread):
+    def __init__(self, cluster, metrics_provider):
+        super().__init__()
+        self.daemon = True
+        self.registration_service = get_smartstack_registration_service()
+        self.metrics = metrics_provider
+        self.gauges = {
+            name: self.metrics.create_gauge(f"smartstack_registration.{name}", paasta_cluster=cluster)
+            for name in ('hits', 'misses', 'hit_rate', 'staleness')
+        }
+
+    def run(self):
+        while True:
+            for name, value in self.registration_service.get_metrics().items():
+                self.gauges[name].set(value)
+            time.sleep(20)
@@ -13,6 +13,7 @@ from kazoo.recipe.watchers import ChildrenWatch
 from kazoo.recipe.watchers import DataWatch
 from requests.exceptions import RequestException
 
+from paasta_tools import soa_config_cache
 from paasta_tools.deployd.common import get_marathon_clients_from_config
 from paasta_tools.deployd.common import get_service_instances_needing_update
 from paasta_tools.deployd.common import PaastaThread
@@ -317,6 +318,7 @@ class YelpSoaEventHandler(pyinotify.ProcessEvent):
 
     def process_default(self, event):
         self.log.debug(event)
+        soa_config_cache.invalidate(event.pathname)
         self.watch_new_folder(event)
         service_name = self.get_service_name_from_event(event)
         if service_name:
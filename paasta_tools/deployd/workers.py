@@ -13,7 +13,7 @@ BounceResults = namedtuple('BounceResults', ['bounce_again_in_seconds', 'return_
 
 
 class PaastaDeployWorker(PaastaThread):
-    def __init__(self, worker_number, inbox_q, bounce_q, config, metrics_provider):
+    def __init__(self, worker_number, inbox_q, bounce_q, config, metrics_provider, marathon_apps_snapshot=None):
         super().__init__()
         self.daemon = True
         self.name = f"Worker{worker_number}"
@@ -21,6 +21,7 @@ class PaastaDeployWorker(PaastaThread):
         self.bounce_q = bounce_q
         self.metrics = metrics_provider
         self.config = config
+        self.marathon_apps_snapshot = marathon_apps_snapshot
         self.cluster = self.config.get_cluster()
         self.setup()
 
@@ -92,7 +93,6 @@ class PaastaDeployWorker(PaastaThread):
                     failures=failures,
                 )
                 self.inbox_q.put(service_instance)
-            time.sleep(0.1)
 
     def process_service_instance(self, service_instance):
         bounce_timers = self.setup_timers(service_instance)
@@ -105,7 +105,12 @@ class PaastaDeployWorker(PaastaThread):
             clients=self.marathon_clients,
             soa_dir=marathon_tools.DEFAULT_SOA_DIR,
             marathon_apps_with_clients=None,
+            marathon_apps_snapshot=self.marathon_apps_snapshot,
         )
+        if self.marathon_apps_snapshot:
+            # we may just have changed the apps for this instance so make sure
+            # the next bounce sees them as they are now
+            self.marathon_apps_snapshot.invalidate(service_instance.service, service_instance.instance)
 
         bounce_timers.setup_marathon.stop()
         self.log.info("setup marathon completed with exit code {} for {}.{}".format(
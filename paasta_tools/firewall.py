@@ -7,10 +7,12 @@ import json
 import logging
 import os.path
 import re
+import time
 from contextlib import contextmanager
 
 from paasta_tools import iptables
 from paasta_tools.cli.utils import get_instance_config
+from paasta_tools.container_index import service_container
 from paasta_tools.marathon_tools import get_all_namespaces_for_service
 from paasta_tools.utils import get_running_mesos_docker_containers
 from paasta_tools.utils import load_system_paasta_config
@@ -92,8 +94,7 @@ class ServiceGroup(collections.namedtuple(
         return tuple(rules)
 
     def update_rules(self, soa_dir, synapse_service_dir):
-        iptables.ensure_chain(self.chain_name, self.get_rules(soa_dir, synapse_service_dir))
-        iptables.reorder_chain(self.chain_name)
+        _update_chains({self.chain_name: self.get_rules(soa_dir, synapse_service_dir)})
 
     @property
     def log_prefix(self):
@@ -332,31 +333,27 @@ def _cidr_rules(conf):
                 )
 
 
-def services_running_here():
-    """Generator helper that yields (service, instance, mac address) of both
+def services_running_here(container_index=None):
+    """Generator helper that yields (service, instance, mac address, ip) of both
     marathon and chronos tasks.
-    """
-    for container in get_running_mesos_docker_containers():
-        if container['HostConfig']['NetworkMode'] != 'bridge':
-            continue
-
-        service = container['Labels'].get('paasta_service')
-        instance = container['Labels'].get('paasta_instance')
-
-        if service is None or instance is None:
-            continue
 
-        network_info = container['NetworkSettings']['Networks']['bridge']
+    Containers are read from container_index if one is given, instead of
+    listing them through docker.
+    """
+    if container_index is not None:
+        yield from container_index.containers()
+        return
 
-        mac = network_info['MacAddress']
-        ip = network_info['IPAddress']
-        yield service, instance, mac, ip
+    for container in get_running_mesos_docker_containers():
+        found = service_container(container)
+        if found is not None:
+            yield found
 
 
-def active_service_groups():
+def active_service_groups(container_index=None):
     """Return active service groups."""
     service_groups = collections.defaultdict(set)
-    for service, instance, mac, ip in services_running_here():
+    for service, instance, mac, ip in services_running_here(container_index):
         # TODO: only include macs that start with MAC_ADDRESS_PREFIX?
         service_groups[ServiceGroup(service, instance)].add(mac)
     return service_groups
@@ -374,99 +371,105 @@ def _dns_servers():
                 yield parts[1]
 
 
+def shared_chains():
+    """Return {chain name: rules} for the chains shared by all services."""
+    return {
+        'PAASTA-DNS': _dns_chain_rules(),
+        'PAASTA-INTERNET': _internet_chain_rules(),
+        'PAASTA-COMMON': _common_chain_rules(),
+    }
+
+
 def ensure_shared_chains():
-    _ensure_dns_chain()
-    _ensure_internet_chain()
-    _ensure_common_chain()
+    _update_chains(shared_chains())
 
 
-def _ensure_common_chain():
+def _common_chain_rules():
     """The common chain allows access for all services to certain resources."""
-    iptables.ensure_chain(
-        'PAASTA-COMMON',
+    return (
+        # Allow return traffic for incoming connections
+        iptables.Rule(
+            protocol='ip',
+            src='0.0.0.0/0.0.0.0',
+            dst='0.0.0.0/0.0.0.0',
+            target='ACCEPT',
+            matches=(
+                ('conntrack', (('ctstate', ('ESTABLISHED',)),)),
+            ),
+            target_parameters=(),
+        ),
+        _yocalhost_rule(1463, 'scribed'),
+        _yocalhost_rule(8125, 'metrics-relay', protocol='udp'),
+        _yocalhost_rule(3030, 'sensu'),
+        iptables.Rule(
+            protocol='ip',
+            src='0.0.0.0/0.0.0.0',
+            dst='0.0.0.0/0.0.0.0',
+            target='PAASTA-DNS',
+            matches=(),
+            target_parameters=(),
+        ),
+    )
+
+
+def _dns_chain_rules():
+    return tuple(itertools.chain.from_iterable(
         (
-            # Allow return traffic for incoming connections
             iptables.Rule(
-                protocol='ip',
+                protocol='udp',
                 src='0.0.0.0/0.0.0.0',
-                dst='0.0.0.0/0.0.0.0',
+                dst=f'{dns_server}/255.255.255.255',
                 target='ACCEPT',
                 matches=(
-                    ('conntrack', (('ctstate', ('ESTABLISHED',)),)),
+                    ('udp', (('dport', ('53',)),)),
                 ),
                 target_parameters=(),
             ),
-            _yocalhost_rule(1463, 'scribed'),
-            _yocalhost_rule(8125, 'metrics-relay', protocol='udp'),
-            _yocalhost_rule(3030, 'sensu'),
+            # DNS goes over TCP sometimes, too!
             iptables.Rule(
-                protocol='ip',
+                protocol='tcp',
                 src='0.0.0.0/0.0.0.0',
-                dst='0.0.0.0/0.0.0.0',
-                target='PAASTA-DNS',
-                matches=(),
+                dst=f'{dns_server}/255.255.255.255',
+                target='ACCEPT',
+                matches=(
+                    ('tcp', (('dport', ('53',)),)),
+                ),
                 target_parameters=(),
             ),
-        ),
-    )
+        )
+        for dns_server in _dns_servers()
+    ))
 
 
-def _ensure_dns_chain():
-    iptables.ensure_chain(
-        'PAASTA-DNS',
-        tuple(itertools.chain.from_iterable(
-            (
-                iptables.Rule(
-                    protocol='udp',
-                    src='0.0.0.0/0.0.0.0',
-                    dst=f'{dns_server}/255.255.255.255',
-                    target='ACCEPT',
-                    matches=(
-                        ('udp', (('dport', ('53',)),)),
-                    ),
-                    target_parameters=(),
-                ),
-                # DNS goes over TCP sometimes, too!
-                iptables.Rule(
-                    protocol='tcp',
-                    src='0.0.0.0/0.0.0.0',
-                    dst=f'{dns_server}/255.255.255.255',
-                    target='ACCEPT',
-                    matches=(
-                        ('tcp', (('dport', ('53',)),)),
-                    ),
-                    target_parameters=(),
-                ),
-            )
-            for dns_server in _dns_servers()
-        )),
+def _internet_chain_rules():
+    return (
+        iptables.Rule(
+            protocol='ip',
+            src='0.0.0.0/0.0.0.0',
+            dst='0.0.0.0/0.0.0.0',
+            target='ACCEPT',
+            matches=(),
+            target_parameters=(),
+        ),
+    ) + tuple(
+        iptables.Rule(
+            protocol='ip',
+            src='0.0.0.0/0.0.0.0',
+            dst=ip_range,
+            target='RETURN',
+            matches=(),
+            target_parameters=(),
+        )
+        for ip_range in PRIVATE_IP_RANGES
     )
 
 
-def _ensure_internet_chain():
-    iptables.ensure_chain(
-        'PAASTA-INTERNET',
-        (
-            iptables.Rule(
-                protocol='ip',
-                src='0.0.0.0/0.0.0.0',
-                dst='0.0.0.0/0.0.0.0',
-                target='ACCEPT',
-                matches=(),
-                target_parameters=(),
-            ),
-        ) + tuple(
-            iptables.Rule(
-                protocol='ip',
-                src='0.0.0.0/0.0.0.0',
-                dst=ip_range,
-                target='RETURN',
-                matches=(),
-                target_parameters=(),
-            )
-            for ip_range in PRIVATE_IP_RANGES
-        ),
-    )
+def service_chain_rules(service_groups, soa_dir, synapse_service_dir):
+    """Return {chain name: rules} for service groups."""
+    return {
+        service.chain_name: service.get_rules(soa_dir, synapse_service_dir)
+        for service in service_groups
+    }
 
 
 def ensure_service_chains(service_groups, soa_dir, synapse_service_dir):
@@ -476,11 +479,8 @@ def ensure_service_chains(service_groups, soa_dir, synapse_service_dir):
 
     Returns dictionary {[service chain] => [list of mac addresses]}.
     """
-    chains = {}
-    for service, macs in service_groups.items():
-        service.update_rules(soa_dir, synapse_service_dir)
-        chains[service.chain_name] = macs
-    return chains
+    _update_chains(service_chain_rules(service_groups, soa_dir, synapse_service_dir))
+    return {service.chain_name: macs for service, macs in service_groups.items()}
 
 
 def dispatch_rule(chain, mac):
@@ -496,54 +496,68 @@ def dispatch_rule(chain, mac):
     )
 
 
-def ensure_dispatch_chains(service_chains):
-    paasta_rules = set(itertools.chain.from_iterable(
+JUMP_TO_PAASTA = iptables.Rule(
+    protocol='ip',
+    src='0.0.0.0/0.0.0.0',
+    dst='0.0.0.0/0.0.0.0',
+    target='PAASTA',
+    matches=(),
+    target_parameters=(),
+)
+
+
+def dispatch_rules(service_chains):
+    """Return the PAASTA chain's rules, sending traffic from each mac address to its service chain.
+
+    service_chains is a dict {[service chain] => [list of mac addresses]}.
+    """
+    return set(itertools.chain.from_iterable(
         (
             dispatch_rule(chain, mac)
             for mac in macs
         )
         for chain, macs in service_chains.items()
-
     ))
-    iptables.ensure_chain('PAASTA', paasta_rules)
 
-    jump_to_paasta = iptables.Rule(
-        protocol='ip',
-        src='0.0.0.0/0.0.0.0',
-        dst='0.0.0.0/0.0.0.0',
-        target='PAASTA',
-        matches=(),
-        target_parameters=(),
-    )
-    iptables.ensure_rule('INPUT', jump_to_paasta)
-    iptables.ensure_rule('FORWARD', jump_to_paasta)
 
+def _is_service_chain(chain):
+    return chain.startswith('PAASTA.')
 
-def garbage_collect_old_service_chains(desired_chains):
-    current_paasta_chains = {
-        chain
-        for chain in iptables.all_chains()
-        if chain.startswith('PAASTA.')
-    }
-    for chain in current_paasta_chains - set(desired_chains):
-        iptables.delete_chain(chain)
+
+def _update_chains(chains, required_rules=None, garbage_collect=None):
+    """Apply chains with iptables.ensure_chains and log how long it took and how much changed."""
+    start = time.monotonic()
+    changed = iptables.ensure_chains(chains, required_rules=required_rules, garbage_collect=garbage_collect)
+    log.info(f'Updated {len(chains)} iptables chains in {time.monotonic() - start:.3f}s, {changed} rules changed')
+    return changed
 
 
 def general_update(soa_dir, synapse_service_dir):
-    """Update iptables to match the current PaaSTA state."""
-    ensure_shared_chains()
-    service_chains = ensure_service_chains(active_service_groups(), soa_dir, synapse_service_dir)
-    ensure_dispatch_chains(service_chains)
-    garbage_collect_old_service_chains(service_chains)
+    """Update iptables to match the current PaaSTA state.
+
+    The whole ruleset is computed up front and applied in a single iptables commit, which also garbage collects
+    the chains of services no longer running here.
+
+    Returns the number of rules that changed.
+    """
+    service_groups = active_service_groups()
+    chains = shared_chains()
+    chains.update(service_chain_rules(service_groups, soa_dir, synapse_service_dir))
+    chains['PAASTA'] = dispatch_rules({service.chain_name: macs for service, macs in service_groups.items()})
+    return _update_chains(
+        chains,
+        required_rules={'INPUT': (JUMP_TO_PAASTA,), 'FORWARD': (JUMP_TO_PAASTA,)},
+        garbage_collect=_is_service_chain,
+    )
 
 
 def prepare_new_container(soa_dir, synapse_service_dir, service, instance, mac):
     """Update iptables to include rules for a new (not yet running) MAC address
     """
-    ensure_shared_chains()  # probably already set, but just to be safe
     service_group = ServiceGroup(service, instance)
-    service_group.update_rules(soa_dir, synapse_service_dir)
-    iptables.insert_rule('PAASTA', dispatch_rule(service_group.chain_name, mac))
+    chains = shared_chains()  # probably already set, but just to be safe
+    chains[service_group.chain_name] = service_group.get_rules(soa_dir, synapse_service_dir)
+    _update_chains(chains, required_rules={'PAASTA': (dispatch_rule(service_group.chain_name, mac),)})
 
 
 @contextmanager
@@ -8,7 +8,7 @@ import sys
 
 import syslogmp
 
-from paasta_tools.firewall import services_running_here
+from paasta_tools.container_index import get_container_index
 from paasta_tools.utils import _log
 from paasta_tools.utils import configure_log
 from paasta_tools.utils import load_system_paasta_config
@@ -82,11 +82,11 @@ def parse_syslog(data):
 
 
 def lookup_service_instance_by_ip(ip_lookup):
-    for service, instance, mac, ip in services_running_here():
-        if ip == ip_lookup:
-            return (service, instance)
-    log.info(f'Unable to find container for ip {ip_lookup}')
-    return (None, None)
+    container = get_container_index().by_ip(ip_lookup)
+    if container is None:
+        log.info(f'Unable to find container for ip {ip_lookup}')
+        return (None, None)
+    return (container.service, container.instance)
 
 
 def parse_args(argv=None):
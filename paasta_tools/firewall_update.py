@@ -10,6 +10,7 @@ from inotify.constants import IN_MOVED_TO
 
 from paasta_tools import firewall
 from paasta_tools.cli.utils import get_instance_config
+from paasta_tools.container_index import get_container_index
 from paasta_tools.utils import DEFAULT_SOA_DIR
 from paasta_tools.utils import load_system_paasta_config
 from paasta_tools.utils import TimeoutError
@@ -67,18 +68,23 @@ def run_daemon(args):
     inotify = Inotify(block_duration_s=1)  # event_gen blocks for 1 second
     inotify.add_watch(args.synapse_service_dir.encode(), IN_MOVED_TO | IN_MODIFY)
     services_by_dependencies_time = 0
+    container_index = get_container_index()
 
     for event in inotify.event_gen():  # blocks for only up to 1 second at a time
         if services_by_dependencies_time + args.update_secs < time.time():
             services_by_dependencies = smartstack_dependencies_of_running_firewalled_services(
                 soa_dir=args.soa_dir,
+                container_index=container_index,
             )
             services_by_dependencies_time = time.time()
 
         if event is None:
             continue
 
-        process_inotify_event(event, services_by_dependencies, args.soa_dir, args.synapse_service_dir)
+        process_inotify_event(
+            event, services_by_dependencies, args.soa_dir, args.synapse_service_dir,
+            container_index=container_index,
+        )
 
 
 def run_cron(args):
@@ -86,7 +92,7 @@ def run_cron(args):
         firewall.general_update(args.soa_dir, args.synapse_service_dir)
 
 
-def process_inotify_event(event, services_by_dependencies, soa_dir, synapse_service_dir):
+def process_inotify_event(event, services_by_dependencies, soa_dir, synapse_service_dir, container_index=None):
     filename = event[3].decode()
     log.debug(f'process_inotify_event on {filename}')
 
@@ -101,7 +107,7 @@ def process_inotify_event(event, services_by_dependencies, soa_dir, synapse_serv
     # filter active_service_groups() down to just the names in services_to_update
     service_groups = {
         service_group: macs
-        for service_group, macs in firewall.active_service_groups().items()
+        for service_group, macs in firewall.active_service_groups(container_index).items()
         if service_group in services_to_update
     }
 
@@ -119,9 +125,9 @@ def process_inotify_event(event, services_by_dependencies, soa_dir, synapse_serv
         )
 
 
-def smartstack_dependencies_of_running_firewalled_services(soa_dir=DEFAULT_SOA_DIR):
+def smartstack_dependencies_of_running_firewalled_services(soa_dir=DEFAULT_SOA_DIR, container_index=None):
     dependencies_to_services = defaultdict(set)
-    for service, instance, _, _ in firewall.services_running_here():
+    for service, instance, _, _ in firewall.services_running_here(container_index):
         config = get_instance_config(
             service, instance,
             load_system_paasta_config().get_cluster(),
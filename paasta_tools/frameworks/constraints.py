@@ -1,87 +1,141 @@
 #!/usr/bin/env python
+import functools
 import re
 from typing import Any
 from typing import Callable
 from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Sequence
+from typing import Tuple
 
 from paasta_tools.utils import paasta_print
 
 
-ConstraintState = Dict[str, Dict[str, Any]]
-ConstraintOp = Callable[[str, str, str, ConstraintState], bool]
+# (attribute name, offer value of the attribute) -> number of tasks placed on offers with that value. Shared by
+# MAX_PER and UNIQUE constraints. Values are ints, so a copy of the state only needs dict(state).
+ConstraintState = Dict[Tuple[str, str], int]
+# arguments: offer value, attribute, state
+ConstraintCheck = Callable[[str, str, ConstraintState], bool]
 
 
-def max_per(constraint_value, offer_value, attribute, state: ConstraintState):
-    if not constraint_value:
-        constraint_value = 1
-    state_value = state.get('MAX_PER', {}).get(attribute, {}).get(offer_value, 0)
-    return state_value <= int(constraint_value)
+def max_per(constraint_value: Any) -> ConstraintCheck:
+    limit = int(constraint_value) if constraint_value else 1
 
+    def check(offer_value: str, attribute: str, state: ConstraintState) -> bool:
+        return state.get((attribute, offer_value), 0) <= limit
+    return check
 
-# lambda arg: [constraint value, offer value, attribute, state]
+
+def like(constraint_value: Any) -> ConstraintCheck:
+    match = re.compile(constraint_value).match
+    return lambda offer_value, *_: match(offer_value) is not None
+
+
+def unlike(constraint_value: Any) -> ConstraintCheck:
+    match = re.compile(constraint_value).match
+    return lambda offer_value, *_: match(offer_value) is None
+
+
+# op -> function of the constraint value returning the check for offers
 # example constraint: ['pool', 'MAX_PER', 5]
 #   constraint value: 5
 #   offer value:      default
 #   attribute:        pool
-#   state:            {'MAX_PER' => {'pool' => {'default' => 6}}}
-CONS_OPS: Dict[str, ConstraintOp] = {
-    'EQUALS': lambda cv, ov, *_: cv == ov,
-    'LIKE': lambda cv, ov, *_: bool(re.match(cv, ov)),
-    'UNLIKE': lambda cv, ov, *_: not(re.match(cv, ov)),
+#   state:            {('pool', 'default'): 6}
+CONS_OPS: Dict[str, Callable[[Any], ConstraintCheck]] = {
+    'EQUALS': lambda cv: lambda ov, *_: cv == ov,
+    'LIKE': like,
+    'UNLIKE': unlike,
     'MAX_PER': max_per,
     'UNIQUE': max_per,
 }
 
+# ops whose checks depend on how many tasks were placed, so placing a task has to update the state
+COUNTED_OPS = {'MAX_PER', 'UNIQUE'}
+
+
+def offer_attributes(offer) -> Dict[str, str]:
+    """The offer's text attributes by name. If an attribute appears more than once, the first value wins.
+
+    Offers read back from a task store are plain dicts rather than objects, so those are read with item access.
+    """
+    attributes: Dict[str, str] = {}
+    if isinstance(offer, dict):
+        for attribute in offer.get('attributes', []):
+            attributes.setdefault(attribute['name'], attribute.get('text', {}).get('value'))
+    else:
+        for attribute in offer.attributes:
+            attributes.setdefault(attribute.name, attribute.text.value)
+    return attributes
+
+
+class CompiledConstraints:
+    """A list of constraints turned into checks once, so matching offers against them is a few dict lookups.
+
+    Regexes are compiled and MAX_PER limits parsed up front. Offers are checked by the name -> value dict from
+    offer_attributes, which callers can build once per offer and reuse for every task they try to place on it.
+    """
+
+    def __init__(self, constraints: Sequence[Sequence[Any]]) -> None:
+        self.constraints = constraints
+        self.checks: List[Tuple[Sequence[Any], ConstraintCheck]] = []
+        for constraint in constraints:
+            attr, op, val = constraint
+            try:
+                self.checks.append((constraint, CONS_OPS[op](val)))
+            except Exception as err:
+                paasta_print("Error while compiling constraint: [{} {} {}] {}".format(attr, op, val, str(err)))
+                raise err
+        self.counted_attributes = [attr for attr, op, _ in constraints if op in COUNTED_OPS]
+
+    def check(self, attributes: Mapping[str, str], state: ConstraintState) -> bool:
+        """Returns True if all constraints are satisfied by an offer's attributes, returns False otherwise. Prints a
+        error message and re-raises if an error was thrown."""
+        for (attr, op, val), check in self.checks:
+            try:
+                offer_value = attributes.get(attr)
+                if offer_value is None:
+                    paasta_print("Attribute not found for a constraint: %s" % attr)
+                    return False
+                elif not check(offer_value, attr, state):
+                    paasta_print("Constraint not satisfied: [{} {} {}] for {} with {}".format(
+                        attr, op, val, offer_value, state,
+                    ))
+                    return False
+            except Exception as err:
+                paasta_print("Error while matching constraint: [{} {} {}] {}".format(
+                    attr, op, val, str(err),
+                ))
+                raise err
+        return True
 
-def nested_inc(op, _, attr_val, attr_name, state, step=1):
-    """Increments relevant counter by step from args array"""
-    oph = state.setdefault(op, {})
-    nameh = oph.setdefault(attr_name, {})
-    nameh.setdefault(attr_val, 0)
-    nameh[attr_val] += step
-    return state
+    def update(self, attributes: Mapping[str, str], state: ConstraintState, step: int=1) -> None:
+        """Mutates state to account for step tasks placed on (or, when negative, removed from) an offer"""
+        for attr in self.counted_attributes:
+            offer_value = attributes.get(attr)
+            if offer_value is not None:
+                key = (attr, offer_value)
+                state[key] = state.get(key, 0) + step
 
 
-# lambda args same as CONS_OPS + update step
-UPDATE_OPS = {
-    'EQUALS': lambda *_: None,
-    'LIKE': lambda *_: None,
-    'UNLIKE': lambda *_: None,
-    'MAX_PER': lambda *args: nested_inc('MAX_PER', *args),
-    'UNIQUE': lambda *args: nested_inc('MAX_PER', *args),
-}
+@functools.lru_cache(maxsize=64)
+def _compile_constraints(constraints: Tuple[Tuple[Any, ...], ...]) -> CompiledConstraints:
+    return CompiledConstraints(constraints)
+
+
+def compile_constraints(constraints: Sequence[Sequence[Any]]) -> CompiledConstraints:
+    """CompiledConstraints for constraints, reusing the last ones compiled for an equal list"""
+    return _compile_constraints(tuple(tuple(constraint) for constraint in constraints))
 
 
 def check_offer_constraints(offer, constraints, state):
     """Returns True if all constraints are satisfied by offer's attributes,
     returns False otherwise. Prints a error message and re-raises if an error
     was thrown."""
-    for (attr, op, val) in constraints:
-        try:
-            offer_attr = next(
-                (x for x in offer.attributes if x.name == attr), None,
-            )
-            if offer_attr is None:
-                paasta_print("Attribute not found for a constraint: %s" % attr)
-                return False
-            elif not(CONS_OPS[op](val, offer_attr.text.value, offer_attr.name, state)):
-                paasta_print("Constraint not satisfied: [{} {} {}] for {} with {}".format(
-                    attr, op, val, offer_attr.text.value, state,
-                ))
-                return False
-        except Exception as err:
-            paasta_print("Error while matching constraint: [{} {} {}] {}".format(
-                attr, op, val, str(err),
-            ))
-            raise err
-
-    return True
+    return compile_constraints(constraints).check(offer_attributes(offer), state)
 
 
 def update_constraint_state(offer, constraints, state, step=1):
-    """Mutates state for each offer attribute found in constraints by calling
-    relevant UPDATE_OP lambda"""
-    for (attr, op, val) in constraints:
-        for oa in offer.attributes:
-            if attr == oa.name:
-                UPDATE_OPS[op](val, oa.text.value, attr, state, step)
+    """Mutates state for each offer attribute found in constraints"""
+    compile_constraints(constraints).update(offer_attributes(offer), state, step)
@@ -22,9 +22,9 @@ from pymesos.interface import Scheduler
 from paasta_tools import bounce_lib
 from paasta_tools import drain_lib
 from paasta_tools import mesos_tools
-from paasta_tools.frameworks.constraints import check_offer_constraints
+from paasta_tools.frameworks.constraints import compile_constraints
 from paasta_tools.frameworks.constraints import ConstraintState
-from paasta_tools.frameworks.constraints import update_constraint_state
+from paasta_tools.frameworks.constraints import offer_attributes
 from paasta_tools.frameworks.native_service_config import load_paasta_native_job_config
 from paasta_tools.frameworks.native_service_config import NativeServiceConfig
 from paasta_tools.frameworks.native_service_config import TaskInfo
@@ -110,6 +110,9 @@ class NativeScheduler(Scheduler):
         self.blacklisted_slaves: Dict[str, float] = {}
         self.blacklist_timeout = 3600
 
+        # forget tasks this long after they stopped running
+        self.max_dead_task_age = 3600
+
         if service_config is not None:
             self.service_config = service_config
             self.service_config.config_dict.update(self.service_config_overrides)  # type: ignore
@@ -289,8 +292,10 @@ class NativeScheduler(Scheduler):
         task_mem = self.service_config.get_mem()
         task_cpus = self.service_config.get_cpus()
 
+        offer_attrs = offer_attributes(offer)
+
         # don't mutate existing state
-        new_constraint_state = copy.deepcopy(state)
+        new_constraint_state = dict(state)
         total = 0
         failed_constraints = 0
         while self.need_more_tasks(base_task['name'], self.task_store.get_all_tasks(), tasks):
@@ -304,10 +309,7 @@ class NativeScheduler(Scheduler):
             ):
                 break
 
-            if not(check_offer_constraints(
-                offer, self.constraints,
-                new_constraint_state,
-            )):
+            if not(self.compiled_constraints.check(offer_attrs, new_constraint_state)):
                 failed_constraints += 1
                 break
 
@@ -328,7 +330,7 @@ class NativeScheduler(Scheduler):
             remainingMem -= task_mem
             remainingPorts -= {task_port}
 
-            update_constraint_state(offer, self.constraints, new_constraint_state)
+            self.compiled_constraints.update(offer_attrs, new_constraint_state)
 
         # raise constraint error but only if no other tasks fit/fail the offer
         if total > 0 and failed_constraints == total:
@@ -357,6 +359,7 @@ class NativeScheduler(Scheduler):
         self.load_config()
         self.kill_tasks_if_necessary(driver)
         self.check_blacklisted_slaves_for_timeout()
+        self.task_store.garbage_collect_old_tasks(self.max_dead_task_age)
 
     def statusUpdate(self, driver: MesosSchedulerDriver, update: Dict):
         if self.frozen:
@@ -377,8 +380,8 @@ class NativeScheduler(Scheduler):
 
         if task_params.mesos_task_state not in LIVE_TASK_STATES:
             with self.constraint_state_lock:
-                update_constraint_state(
-                    task_params.offer, self.constraints,
+                self.compiled_constraints.update(
+                    offer_attributes(task_params.offer),
                     self.constraint_state, step=-1,
                 )
 
@@ -548,6 +551,7 @@ class NativeScheduler(Scheduler):
 
     def reload_constraints(self):
         self.constraints = self.service_config.get_constraints() or []
+        self.compiled_constraints = compile_constraints(self.constraints)
 
     def blacklist_slave(self, agent_id: str):
         log.debug("Blacklisting slave: %s" % agent_id)
@@ -1,7 +1,12 @@
 import copy
 import json
+import threading
+import time
 from typing import Any
 from typing import Dict
+from typing import List
+from typing import Optional
+from typing import Set
 from typing import Tuple
 from typing import Type
 from typing import TypeVar
@@ -12,9 +17,14 @@ from kazoo.exceptions import BadVersionError
 from kazoo.exceptions import NodeExistsError
 from kazoo.exceptions import NoNodeError
 from kazoo.protocol.states import ZnodeStat
+from kazoo.recipe.watchers import ChildrenWatch
+from kazoo.recipe.watchers import DataWatch
 
 from paasta_tools.utils import _log
 
+# Mesos task states a task never comes back from
+TERMINAL_TASK_STATES = ('TASK_FINISHED', 'TASK_FAILED', 'TASK_KILLED', 'TASK_LOST', 'TASK_ERROR')
+
 
 class MesosTaskParametersIsImmutableError(Exception):
     pass
@@ -93,9 +103,16 @@ class TaskStore:
         """Returns a dictionary of task_id -> MesosTaskParameters for all known tasks."""
         raise NotImplementedError()
 
+    def get_all_tasks_with_mtime(self) -> Dict[str, Tuple[MesosTaskParameters, float]]:
+        """Like get_all_tasks, but also returns the unix timestamp each task was last written at."""
+        raise NotImplementedError()
+
     def overwrite_task(self, task_id: str, params: MesosTaskParameters) -> None:
         raise NotImplementedError()
 
+    def delete_task(self, task_id: str) -> None:
+        raise NotImplementedError()
+
     def add_task_if_doesnt_exist(self, task_id: str, **kwargs) -> None:
         """Add a task if it does not already exist. If it already exists, do nothing."""
         if self.get_task(task_id) is not None:
@@ -114,9 +131,11 @@ class TaskStore:
         return merged_params
 
     def garbage_collect_old_tasks(self, max_dead_task_age: float) -> None:
-        # TODO: call me.
-        # TODO: implement in base class.
-        raise NotImplementedError()
+        """Delete tasks that have been in a terminal state, and not written to, for over max_dead_task_age seconds."""
+        now = time.time()
+        for task_id, (params, mtime) in self.get_all_tasks_with_mtime().items():
+            if params.mesos_task_state in TERMINAL_TASK_STATES and now - mtime > max_dead_task_age:
+                self.delete_task(task_id)
 
     def close(self):
         pass
@@ -125,6 +144,7 @@ class TaskStore:
 class DictTaskStore(TaskStore):
     def __init__(self, service_name, instance_name, framework_id, system_paasta_config):
         self.tasks: Dict[str, MesosTaskParameters] = {}
+        self.mtimes: Dict[str, float] = {}
         super().__init__(service_name, instance_name, framework_id, system_paasta_config)
 
     def get_task(self, task_id: str) -> MesosTaskParameters:
@@ -134,12 +154,27 @@ class DictTaskStore(TaskStore):
         """Returns a dictionary of task_id -> MesosTaskParameters for all known tasks."""
         return dict(self.tasks)
 
+    def get_all_tasks_with_mtime(self) -> Dict[str, Tuple[MesosTaskParameters, float]]:
+        return {task_id: (params, self.mtimes[task_id]) for task_id, params in self.tasks.items()}
+
     def overwrite_task(self, task_id: str, params: MesosTaskParameters) -> None:
         # serialize/deserialize to make sure the returned values are the same format as ZKTaskStore.
         self.tasks[task_id] = MesosTaskParameters.deserialize(params.serialize())
+        self.mtimes[task_id] = time.time()
+
+    def delete_task(self, task_id: str) -> None:
+        self.tasks.pop(task_id, None)
+        self.mtimes.pop(task_id, None)
 
 
 class ZKTaskStore(TaskStore):
+    """Tasks are stored as one znode per task.
+
+    Reads are served from an in-memory mirror of the znodes, kept current by a children watch on the task store and a
+    data watch on every task, so they never round trip to ZooKeeper. Writes go to ZooKeeper with version checks and
+    then straight into the mirror, so a scheduler sees its own writes without waiting for the watches to fire.
+    """
+
     def __init__(self, service_name, instance_name, framework_id, system_paasta_config):
         super().__init__(service_name, instance_name, framework_id, system_paasta_config)
         self.zk_hosts = system_paasta_config.get_zk_hosts()
@@ -161,21 +196,40 @@ class ZKTaskStore(TaskStore):
         self.zk_client.start()
         self.zk_client.ensure_path('/')
 
+        # task_id -> (params, stat of the znode they were read from or written with). Watch callbacks run on kazoo's
+        # event thread, so all access goes through the lock.
+        self._tasks: Dict[str, Tuple[MesosTaskParameters, ZnodeStat]] = {}
+        self._watched_task_ids: Set[str] = set()
+        self._tasks_lock = threading.Lock()
+        # Both watches fetch their initial state before returning, so the mirror is complete once this returns.
+        ChildrenWatch(self.zk_client, '/', self._on_children_changed)
+
     def close(self):
         self.zk_client.stop()
         self.zk_client.close()
 
     def get_task(self, task_id: str) -> MesosTaskParameters:
-        params, stat = self._get_task(task_id)
+        params, stat = self._get_cached_task(task_id)
         return params
 
+    def _get_cached_task(self, task_id: str) -> Tuple[Optional[MesosTaskParameters], Optional[ZnodeStat]]:
+        with self._tasks_lock:
+            return self._tasks.get(task_id, (None, None))
+
     def _get_task(self, task_id: str) -> Tuple[MesosTaskParameters, ZnodeStat]:
-        """Like get_task, but also returns the ZnodeStat that self.zk_client.get() returns """
+        """Like get_task, but reads from ZooKeeper and also returns the ZnodeStat that self.zk_client.get() returns"""
         try:
             data, stat = self.zk_client.get('/%s' % task_id)
-            return MesosTaskParameters.deserialize(data), stat
         except NoNodeError:
             return None, None
+        params = self._deserialize(task_id, data)
+        if params is None:
+            return None, None
+        return params, stat
+
+    def _deserialize(self, task_id: str, data: bytes) -> Optional[MesosTaskParameters]:
+        try:
+            return MesosTaskParameters.deserialize(data)
         except json.decoder.JSONDecodeError:
             _log(
                 service=self.service_name,
@@ -184,47 +238,100 @@ class ZKTaskStore(TaskStore):
                 component='deploy',
                 line=f'Warning: found non-json-decodable value in zookeeper for task {task_id}: {data}',
             )
-            return None, None
+            return None
 
     def get_all_tasks(self):
-        all_tasks = {}
+        with self._tasks_lock:
+            return {task_id: params for task_id, (params, stat) in self._tasks.items()}
+
+    def get_all_tasks_with_mtime(self):
+        with self._tasks_lock:
+            return {task_id: (params, stat.mtime / 1000) for task_id, (params, stat) in self._tasks.items()}
 
-        for child_path in self.zk_client.get_children('/'):
+    def _on_children_changed(self, children: List[str]) -> None:
+        for child_path in children:
             task_id = self._task_id_from_zk_path(child_path)
-            params = self.get_task(task_id)
+            with self._tasks_lock:
+                if task_id in self._watched_task_ids:
+                    continue
+                self._watched_task_ids.add(task_id)
+            DataWatch(self.zk_client, self._zk_path_from_task_id(task_id), self._task_watcher(task_id))
+
+    def _task_watcher(self, task_id: str):
+        def on_task_changed(data, stat, event=None):
+            if stat is None:
+                # The znode is gone. Returning False stops the watch; a new one is set up if the task comes back.
+                with self._tasks_lock:
+                    self._tasks.pop(task_id, None)
+                    self._watched_task_ids.discard(task_id)
+                return False
             # sometimes there are bogus child ZK nodes. Ignore them.
-            if params is not None:
-                all_tasks[task_id] = params
+            self._cache_task(task_id, self._deserialize(task_id, data), stat)
+            return None
+        return on_task_changed
+
+    def _cache_task(self, task_id: str, params: Optional[MesosTaskParameters], stat: ZnodeStat) -> None:
+        """Mirror params as of stat, unless the mirror already holds a later write to the task"""
+        with self._tasks_lock:
+            cached = self._tasks.get(task_id)
+            if cached is not None and cached[1].mzxid > stat.mzxid:
+                return
+            if params is None:
+                self._tasks.pop(task_id, None)
+            else:
+                self._tasks[task_id] = (params, stat)
 
-        return all_tasks
+    def _refresh_task(self, task_id: str) -> Tuple[MesosTaskParameters, ZnodeStat]:
+        """Read the task from ZooKeeper into the mirror, for when the mirror turned out to be behind"""
+        params, stat = self._get_task(task_id)
+        if stat is None:
+            with self._tasks_lock:
+                self._tasks.pop(task_id, None)
+        else:
+            self._cache_task(task_id, params, stat)
+        return params, stat
 
     def update_task(self, task_id: str, **kwargs):
-        retry = True
-        while retry:
-            retry = False
-            existing_task, stat = self._get_task(task_id)
-
-            zk_path = self._zk_path_from_task_id(task_id)
+        zk_path = self._zk_path_from_task_id(task_id)
+        existing_task, stat = self._get_cached_task(task_id)
+        while True:
             if existing_task:
                 merged_params = existing_task.merge(**kwargs)
                 try:
-                    self.zk_client.set(zk_path, merged_params.serialize(), version=stat.version)
-                except BadVersionError:
-                    retry = True
+                    new_stat = self.zk_client.set(zk_path, merged_params.serialize(), version=stat.version)
+                except (BadVersionError, NoNodeError):
+                    # Someone else wrote the task since our copy was mirrored.
+                    existing_task, stat = self._refresh_task(task_id)
+                    continue
+                self._cache_task(task_id, merged_params, new_stat)
             else:
                 merged_params = MesosTaskParameters(**kwargs)
                 try:
                     self.zk_client.create(zk_path, merged_params.serialize())
                 except NodeExistsError:
-                    retry = True
-
-        return merged_params
+                    existing_task, stat = self._refresh_task(task_id)
+                    continue
+                # create() doesn't return the new znode's stat, which the next update needs for its version check.
+                self._refresh_task(task_id)
+            return merged_params
 
     def overwrite_task(self, task_id: str, params: MesosTaskParameters, version=-1) -> None:
+        zk_path = self._zk_path_from_task_id(task_id)
+        try:
+            stat = self.zk_client.set(zk_path, params.serialize(), version=version)
+        except NoNodeError:
+            self.zk_client.create(zk_path, params.serialize())
+            self._refresh_task(task_id)
+        else:
+            self._cache_task(task_id, params, stat)
+
+    def delete_task(self, task_id: str) -> None:
         try:
-            self.zk_client.set(self._zk_path_from_task_id(task_id), params.serialize(), version=version)
+            self.zk_client.delete(self._zk_path_from_task_id(task_id))
         except NoNodeError:
-            self.zk_client.create(self._zk_path_from_task_id(task_id), params.serialize())
+            pass
+        with self._tasks_lock:
+            self._tasks.pop(task_id, None)
 
     def _zk_path_from_task_id(self, task_id: str) -> str:
         return '/%s' % task_id
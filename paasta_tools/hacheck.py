@@ -11,16 +11,29 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import asyncio
+import functools
 import re
+import threading
+import time
+import weakref
 from typing import Dict
+from typing import MutableMapping
+from typing import Optional
+from typing import Tuple
 
-import aiohttp
 from mypy_extensions import TypedDict
 
+from paasta_tools.mesos import session_pool
 from paasta_tools.utils import get_user_agent
 
 HACHECK_CONN_TIMEOUT = 30
 HACHECK_READ_TIMEOUT = 10
+# Connections kept open to the hacheck of each agent, and to all hachecks, by each event loop
+HACHECK_MAX_CONNECTIONS_PER_HOST = 4
+HACHECK_MAX_CONNECTIONS = 100
+# How long the state of a spool is reused for
+HACHECK_SPOOL_TTL = 5
 
 SpoolInfo = TypedDict(
     'SpoolInfo',
@@ -34,59 +47,149 @@ SpoolInfo = TypedDict(
     total=False,
 )
 
+SPOOL_REGEX = re.compile(''.join([
+    "^",
+    r"Service (?P<service>.+)",
+    r" in (?P<state>.+) state",
+    r"(?: since (?P<since>[0-9.]+))?",
+    r"(?: until (?P<until>[0-9.]+))?",
+    r"(?:: (?P<reason>.*))?",
+    "$",
+]))
 
-async def post_spool(url: str, status: str, data: Dict['str', 'str']) -> None:
-    async with aiohttp.ClientSession(
-        conn_timeout=HACHECK_CONN_TIMEOUT,
-        read_timeout=HACHECK_READ_TIMEOUT,
-    ) as session:
-        async with session.post(
+
+def parse_spool(status: int, response_text: str) -> SpoolInfo:
+    if status == 200:
+        return {
+            'state': 'up',
+        }
+
+    match = SPOOL_REGEX.match(response_text)
+    groupdict = match.groupdict()
+    info: SpoolInfo = {}
+    info['service'] = groupdict['service']
+    info['state'] = groupdict['state']
+    if 'since' in groupdict:
+        info['since'] = float(groupdict['since'] or 0)
+    if 'until' in groupdict:
+        info['until'] = float(groupdict['until'] or 0)
+    if 'reason' in groupdict:
+        info['reason'] = groupdict['reason']
+    return info
+
+
+class HacheckClient:
+    """Talks to the hacheck on each agent over pooled keep-alive connections.
+
+    Each event loop gets one session, capped at max_connections_per_host connections to any one agent and
+    max_connections overall, so checking the spools of thousands of tasks opens a handful of connections per agent and
+    queues the rest of the requests on them. Lookups of the same spool are coalesced while in flight and their results
+    reused for spool_ttl seconds, so e.g. is_draining and is_safe_to_kill of the same task in one bounce round only ask
+    hacheck once. Posting to a spool forgets what we knew about it.
+
+    One client is shared by the whole process, e.g. by deployd workers each running their own event loop in their own
+    thread, so the cached and in-flight lookups are only touched with _lock held.
+    """
+
+    def __init__(
+        self,
+        spool_ttl: float=HACHECK_SPOOL_TTL,
+        max_connections: int=HACHECK_MAX_CONNECTIONS,
+        max_connections_per_host: int=HACHECK_MAX_CONNECTIONS_PER_HOST,
+    ) -> None:
+        self.spool_ttl = spool_ttl
+        self.session_config = {
+            'response_timeout': HACHECK_READ_TIMEOUT,
+            'conn_timeout': HACHECK_CONN_TIMEOUT,
+            'max_connections': max_connections,
+            'max_connections_per_host': max_connections_per_host,
+        }
+        self.spools: Dict[str, Tuple[float, SpoolInfo]] = {}
+        self.in_flight: MutableMapping[
+            asyncio.AbstractEventLoop, Dict[str, 'asyncio.Future[SpoolInfo]'],
+        ] = weakref.WeakKeyDictionary()
+        self.requests = 0
+        self._lock = threading.Lock()
+
+    async def post_spool(self, url: str, status: str, data: Dict[str, str]) -> None:
+        with self._lock:
+            self.requests += 1
+        async with session_pool.get_session(self.session_config).post(
             url,
             data=data,
             headers={'User-Agent': get_user_agent()},
         ) as resp:
             resp.raise_for_status()
+        # A lookup that was in flight while we posted may have seen the old state, so don't let it be reused either
+        with self._lock:
+            self.spools.pop(url, None)
+            for in_flight in list(self.in_flight.values()):
+                in_flight.pop(url, None)
 
-
-async def get_spool(spool_url: str) -> SpoolInfo:
-    """Query hacheck for the state of a task, and parse the result into a dictionary."""
-    if spool_url is None:
-        return None
-
-    # TODO: aiohttp says not to create a session per request. Fix this.
-    async with aiohttp.ClientSession(
-        conn_timeout=HACHECK_CONN_TIMEOUT,
-        read_timeout=HACHECK_READ_TIMEOUT,
-    ) as session:
-        async with session.get(
+    async def _fetch_spool(self, spool_url: str) -> SpoolInfo:
+        with self._lock:
+            self.requests += 1
+        async with session_pool.get_session(self.session_config).get(
             spool_url,
             headers={'User-Agent': get_user_agent()},
         ) as response:
-            if response.status == 200:
-                return {
-                    'state': 'up',
-                }
-
-            regex = ''.join([
-                "^",
-                r"Service (?P<service>.+)",
-                r" in (?P<state>.+) state",
-                r"(?: since (?P<since>[0-9.]+))?",
-                r"(?: until (?P<until>[0-9.]+))?",
-                r"(?:: (?P<reason>.*))?",
-                "$",
-            ])
-
-            response_text = await response.text()
-            match = re.match(regex, response_text)
-            groupdict = match.groupdict()
-            info: SpoolInfo = {}
-            info['service'] = groupdict['service']
-            info['state'] = groupdict['state']
-            if 'since' in groupdict:
-                info['since'] = float(groupdict['since'] or 0)
-            if 'until' in groupdict:
-                info['until'] = float(groupdict['until'] or 0)
-            if 'reason' in groupdict:
-                info['reason'] = groupdict['reason']
-            return info
+            return parse_spool(response.status, await response.text())
+
+    def _fetched(
+        self,
+        in_flight: Dict[str, 'asyncio.Future[SpoolInfo]'],
+        spool_url: str,
+        future: 'asyncio.Future[SpoolInfo]',
+    ) -> None:
+        with self._lock:
+            if in_flight.get(spool_url) is not future:
+                # forgotten by post_spool
+                return
+            del in_flight[spool_url]
+            if not future.cancelled() and future.exception() is None:
+                self._cache_spool(spool_url, future.result())
+
+    def _cache_spool(self, spool_url: str, info: SpoolInfo) -> None:
+        """Must be called with _lock held"""
+        now = time.time()
+        self.spools.pop(spool_url, None)
+        self.spools[spool_url] = (now, info)
+        # Entries are kept oldest first, so the expired ones are at the front
+        while self.spools:
+            oldest_url = next(iter(self.spools))
+            if now - self.spools[oldest_url][0] < self.spool_ttl:
+                break
+            del self.spools[oldest_url]
+
+    async def get_spool(self, spool_url: str) -> Optional[SpoolInfo]:
+        """Query hacheck for the state of a task, and parse the result into a dictionary."""
+        if spool_url is None:
+            return None
+
+        with self._lock:
+            cached = self.spools.get(spool_url)
+            if cached is not None and time.time() - cached[0] < self.spool_ttl:
+                return cached[1]
+
+            in_flight = self.in_flight.setdefault(asyncio.get_event_loop(), {})
+            future = in_flight.get(spool_url)
+            if future is None:
+                future = in_flight[spool_url] = asyncio.ensure_future(self._fetch_spool(spool_url))
+                future.add_done_callback(functools.partial(self._fetched, in_flight, spool_url))
+        return await asyncio.shield(future)
+
+
+_hacheck_client = HacheckClient()
+
+
+def get_hacheck_client() -> HacheckClient:
+    return _hacheck_client
+
+
+async def post_spool(url: str, status: str, data: Dict['str', 'str']) -> None:
+    await get_hacheck_client().post_spool(url=url, status=status, data=data)
+
+
+async def get_spool(spool_url: str) -> SpoolInfo:
+    """Query hacheck for the state of a task, and parse the result into a dictionary."""
+    return await get_hacheck_client().get_spool(spool_url)
@@ -158,6 +158,99 @@ def ensure_chain(chain, rules):
         delete_rules(chain, extra_rules)
 
 
+def ensure_chains(chains, required_rules=None, garbage_collect=None):
+    """Idempotently bring several chains to their desired rules in a single commit.
+
+    chains maps chain names to the exact set of rules each should have. Missing
+    chains are created, and rules end up in the order ensure_chain followed by
+    reorder_chain would leave them in: new rules in front of existing ones,
+    then REJECT and LOG rules moved last.
+
+    required_rules maps chain names to rules that must be in those chains, like
+    ensure_rule; any other rules in them are left alone.
+
+    Chains not in chains for which garbage_collect(chain_name) is true are
+    deleted, after every other change so nothing still jumps to them.
+
+    Current rules are read from one snapshot of the filter table and all changes
+    are staged in an iptables_txn, so however many rules change the kernel sees
+    one update. Returns the number of rules inserted, moved or deleted.
+    """
+    table = iptc.Table(iptc.Table.FILTER)
+    with iptables_txn(table):
+        table.refresh()
+        existing = {chain.name for chain in table.chains}
+        for chain_name in chains:
+            if chain_name not in existing:
+                log.debug(f'creating chain: {chain_name}')
+                table.create_chain(chain_name)
+
+        changed = 0
+        for chain_name, rules in chains.items():
+            changed += _update_chain(iptc.Chain(table, chain_name), rules)
+
+        for chain_name, rules in (required_rules or {}).items():
+            if chain_name not in existing and chain_name not in chains:
+                raise ChainDoesNotExist(chain_name)
+            chain = iptc.Chain(table, chain_name)
+            current_rules = {Rule.from_iptc(rule) for rule in chain.rules}
+            for rule in rules:
+                if rule not in current_rules:
+                    log.debug(f'adding rule to {chain_name}: {rule}')
+                    chain.insert_rule(rule.to_iptc())
+                    current_rules.add(rule)
+                    changed += 1
+
+        if garbage_collect is not None:
+            for chain_name in sorted(existing - set(chains)):
+                if garbage_collect(chain_name):
+                    log.debug(f'deleting chain: {chain_name}')
+                    chain = iptc.Chain(table, chain_name)
+                    changed += len(chain.rules)
+                    chain.flush()
+                    chain.delete()
+    return changed
+
+
+def _update_chain(chain, rules):
+    """Stage the changes making an existing chain hold exactly rules.
+
+    Returns the number of rules inserted, moved or deleted.
+    """
+    current = [(Rule.from_iptc(rule), rule) for rule in chain.rules]
+    current_rules = {rule for rule, _ in current}
+    wanted = set(rules)
+    changed = 0
+
+    for rule, iptc_rule in current:
+        if rule not in wanted:
+            log.debug(f'deleting rule from {chain.name}: {rule}')
+            chain.delete_rule(iptc_rule)
+            changed += 1
+    layout = [rule for rule, _ in current if rule in wanted]
+
+    # Like ensure_chain, which inserts each new rule at the front, new rules
+    # end up before existing ones and in reverse order
+    new_rules = [rule for rule in dict.fromkeys(rules) if rule not in current_rules]
+    desired = [rule for _, rule in sorted(enumerate(new_rules[::-1] + layout), key=_rule_sort_key)]
+
+    new_rules_set = set(new_rules)
+    for index, rule in enumerate(desired):
+        if rule in new_rules_set:
+            log.debug(f'adding rule to {chain.name}: {rule}')
+            chain.insert_rule(rule.to_iptc(), index)
+            layout.insert(index, rule)
+            changed += 1
+
+    # layout is now a permutation of desired, so replacing misplaced rules reorders the chain
+    for index, rule in enumerate(desired):
+        if layout[index] != rule:
+            log.debug(f'reordering chain {chain.name} rule {rule} to #{index}')
+            chain.replace_rule(rule.to_iptc(), index)
+            changed += 1
+    return changed
+
+
 def _rule_sort_key(rule_tuple):
     old_index, rule = rule_tuple
     target_name = rule.target
@@ -15,8 +15,12 @@
 import copy
 import logging
 import math
+import threading
+import time
+from collections import defaultdict
 from datetime import datetime
 from typing import Any
+from typing import Callable
 from typing import Dict
 from typing import List
 from typing import Mapping
@@ -31,6 +35,7 @@ import requests
 import service_configuration_lib
 from kubernetes import client as kube_client
 from kubernetes import config as kube_config
+from kubernetes import watch as kube_watch
 from kubernetes.client import models
 from kubernetes.client import V1AWSElasticBlockStoreVolumeSource
 from kubernetes.client import V1beta1PodDisruptionBudget
@@ -95,6 +100,9 @@ log = logging.getLogger(__name__)
 CONFIG_HASH_BLACKLIST = {'replicas'}
 KUBE_DEPLOY_STATEGY_MAP = {'crossover': 'RollingUpdate', 'downthenup': 'Recreate'}
 KUBE_DEPLOY_STATEGY_REVMAP = {v: k for k, v in KUBE_DEPLOY_STATEGY_MAP.items()}
+# How long a single watch request is held open before the informer re-issues it
+INFORMER_WATCH_TIMEOUT_SECONDS = 300
+INFORMER_RETRY_BACKOFF_SECONDS = 5
 KubeDeployment = NamedTuple(
     'KubeDeployment', [
         ('service', str),
@@ -804,6 +812,154 @@ def get_kubernetes_services_running_here_for_nerve(
     return nerve_list
 
 
+class ResourceVersionExpired(Exception):
+    pass
+
+
+class KubeResourceCache:
+    """In-memory copy of one kind of object in the paasta namespace, kept up to date with list+watch.
+
+    The cache is only trustworthy while synced is set: it is cleared whenever the watch breaks and set again once a
+    fresh list has been loaded. Objects handed out are shared between callers and must not be mutated.
+    """
+
+    def __init__(
+        self,
+        kind: str,
+        list_func: Callable[..., Any],
+        namespace: str='paasta',
+        watch_timeout: int=INFORMER_WATCH_TIMEOUT_SECONDS,
+    ) -> None:
+        self.kind = kind
+        self.list_func = list_func
+        self.namespace = namespace
+        self.watch_timeout = watch_timeout
+        self.lock = threading.Lock()
+        self.objects_by_name: Dict[str, Any] = {}
+        self.names_by_service_instance: Dict[Tuple[str, str], Set[str]] = defaultdict(set)
+        self.resource_version: Optional[str] = None
+        self.synced = threading.Event()
+        self.stopped = threading.Event()
+
+    @staticmethod
+    def _service_instance(obj: Any) -> Optional[Tuple[str, str]]:
+        labels = obj.metadata.labels or {}
+        if 'service' in labels and 'instance' in labels:
+            return (labels['service'], labels['instance'])
+        return None
+
+    def _store(self, obj: Any) -> None:
+        self._remove(obj.metadata.name)
+        self.objects_by_name[obj.metadata.name] = obj
+        service_instance = self._service_instance(obj)
+        if service_instance is not None:
+            self.names_by_service_instance[service_instance].add(obj.metadata.name)
+
+    def _remove(self, name: str) -> None:
+        obj = self.objects_by_name.pop(name, None)
+        if obj is None:
+            return
+        service_instance = self._service_instance(obj)
+        if service_instance is not None:
+            names = self.names_by_service_instance[service_instance]
+            names.discard(name)
+            if not names:
+                del self.names_by_service_instance[service_instance]
+
+    def relist(self) -> None:
+        response = self.list_func(namespace=self.namespace)
+        with self.lock:
+            self.objects_by_name = {}
+            self.names_by_service_instance = defaultdict(set)
+            for obj in response.items:
+                self._store(obj)
+            self.resource_version = response.metadata.resource_version
+        self.synced.set()
+
+    def apply_event(self, event: Mapping[str, Any]) -> None:
+        if event['type'] == 'ERROR':
+            # Almost always a 410 Gone: our resourceVersion has been compacted away and we have to relist
+            raise ResourceVersionExpired(event.get('raw_object'))
+        obj = event['object']
+        with self.lock:
+            if event['type'] == 'DELETED':
+                self._remove(obj.metadata.name)
+            else:
+                self._store(obj)
+            self.resource_version = obj.metadata.resource_version
+
+    def watch(self) -> None:
+        """Apply events from one watch request, starting at the resourceVersion of the last list or event seen."""
+        stream = kube_watch.Watch().stream(
+            self.list_func,
+            namespace=self.namespace,
+            resource_version=self.resource_version,
+            timeout_seconds=self.watch_timeout,
+        )
+        for event in stream:
+            self.apply_event(event)
+            if self.stopped.is_set():
+                return
+
+    def run(self) -> None:
+        while not self.stopped.is_set():
+            try:
+                if not self.synced.is_set():
+                    self.relist()
+                self.watch()
+            except ResourceVersionExpired:
+                log.info(f"{self.kind} informer resourceVersion expired, relisting")
+                self.synced.clear()
+            except Exception:
+                log.exception(f"Error in {self.kind} informer, relisting in {INFORMER_RETRY_BACKOFF_SECONDS}s")
+                self.synced.clear()
+                self.stopped.wait(INFORMER_RETRY_BACKOFF_SECONDS)
+
+    def get(self, name: str) -> Optional[Any]:
+        with self.lock:
+            return self.objects_by_name.get(name)
+
+    def for_service_instance(self, service: str, instance: str) -> List[Any]:
+        with self.lock:
+            names = self.names_by_service_instance.get((service, instance), set())
+            return [self.objects_by_name[name] for name in sorted(names)]
+
+
+class KubeInformer:
+    """Watches the pods, deployments and statefulsets in the paasta namespace so read paths can be served from
+    memory rather than costing an apiserver request each."""
+
+    def __init__(self, kube_client: 'KubeClient') -> None:
+        self.pods = KubeResourceCache('pod', kube_client.core.list_namespaced_pod)
+        self.deployments = KubeResourceCache('deployment', kube_client.deployments.list_namespaced_deployment)
+        self.stateful_sets = KubeResourceCache('statefulset', kube_client.deployments.list_namespaced_stateful_set)
+        self.threads: List[threading.Thread] = []
+
+    @property
+    def caches(self) -> Sequence[KubeResourceCache]:
+        return (self.pods, self.deployments, self.stateful_sets)
+
+    def start(self) -> None:
+        for cache in self.caches:
+            thread = threading.Thread(target=cache.run, name=f'KubeInformer-{cache.kind}', daemon=True)
+            thread.start()
+            self.threads.append(thread)
+
+    def stop(self) -> None:
+        for cache in self.caches:
+            cache.stopped.set()
+
+    def has_synced(self) -> bool:
+        return all(cache.synced.is_set() for cache in self.caches)
+
+    def wait_for_sync(self, timeout: float) -> bool:
+        deadline = time.time() + timeout
+        for cache in self.caches:
+            if not cache.synced.wait(max(deadline - time.time(), 0)):
+                return False
+        return True
+
+
 class KubeClient:
     def __init__(self) -> None:
         kube_config.load_kube_config(config_file='/etc/kubernetes/admin.conf')
@@ -814,6 +970,21 @@ class KubeClient:
         self.deployments = kube_client.AppsV1Api()
         self.core = kube_client.CoreV1Api()
         self.policy = kube_client.PolicyV1beta1Api()
+        self.informer: Optional[KubeInformer] = None
+
+    def start_informer(self) -> KubeInformer:
+        """Start watching the paasta namespace. Until the informer has synced reads keep going to the apiserver."""
+        if self.informer is None:
+            self.informer = KubeInformer(self)
+            self.informer.start()
+        return self.informer
+
+
+def get_synced_informer(kube_client: KubeClient) -> Optional[KubeInformer]:
+    informer = getattr(kube_client, 'informer', None)
+    if isinstance(informer, KubeInformer) and informer.has_synced():
+        return informer
+    return None
 
 
 def ensure_paasta_namespace(kube_client: KubeClient) -> None:
@@ -844,15 +1015,17 @@ def list_deployments(
         namespace='paasta',
         label_selector=label_selector,
     )
-    return [
-        KubeDeployment(
-            service=item.metadata.labels['service'],
-            instance=item.metadata.labels['instance'],
-            git_sha=item.metadata.labels['git_sha'],
-            config_sha=item.metadata.labels['config_sha'],
-            replicas=item.spec.replicas,
-        ) for item in deployments.items + stateful_sets.items
-    ]
+    return [kube_deployment_for_app(item) for item in deployments.items + stateful_sets.items]
+
+
+def kube_deployment_for_app(app: Union[V1Deployment, V1StatefulSet]) -> KubeDeployment:
+    return KubeDeployment(
+        service=app.metadata.labels['service'],
+        instance=app.metadata.labels['instance'],
+        git_sha=app.metadata.labels['git_sha'],
+        config_sha=app.metadata.labels['config_sha'],
+        replicas=app.spec.replicas,
+    )
 
 
 def max_unavailable(instance_count: int, bounce_margin_factor: float) -> int:
@@ -898,11 +1071,32 @@ def list_all_deployments(kube_client: KubeClient) -> Sequence[KubeDeployment]:
     return list_deployments(kube_client)
 
 
+def list_all_pod_disruption_budgets(
+    kube_client: KubeClient,
+) -> Mapping[Tuple[str, str], V1beta1PodDisruptionBudget]:
+    """Returns the poddisruptionbudgets in the paasta namespace, keyed by the (service, instance) they select."""
+    pod_disruption_budgets = kube_client.policy.list_namespaced_pod_disruption_budget(namespace='paasta')
+    by_service_instance: Dict[Tuple[str, str], V1beta1PodDisruptionBudget] = {}
+    for pod_disruption_budget in pod_disruption_budgets.items:
+        selector = pod_disruption_budget.spec.selector
+        match_labels = (selector and selector.match_labels) or {}
+        if 'service' in match_labels and 'instance' in match_labels:
+            by_service_instance[(match_labels['service'], match_labels['instance'])] = pod_disruption_budget
+    return by_service_instance
+
+
 def list_matching_deployments(
     service: str,
     instance: str,
     kube_client: KubeClient,
 ) -> Sequence[KubeDeployment]:
+    informer = get_synced_informer(kube_client)
+    if informer is not None:
+        return [
+            kube_deployment_for_app(app)
+            for app in informer.deployments.for_service_instance(service, instance) +
+            informer.stateful_sets.for_service_instance(service, instance)
+        ]
     return list_deployments(kube_client, f'instance={instance},service={service}')
 
 
@@ -911,6 +1105,9 @@ def pods_for_service_instance(
     instance: str,
     kube_client: KubeClient,
 ) -> Sequence[V1Pod]:
+    informer = get_synced_informer(kube_client)
+    if informer is not None:
+        return informer.pods.for_service_instance(service, instance)
     return kube_client.core.list_namespaced_pod(
         namespace='paasta',
         label_selector=f'service={service},instance={instance}',
@@ -931,6 +1128,12 @@ def get_kubernetes_app_by_name(
     name: str,
     kube_client: KubeClient,
 ) -> Union[V1Deployment, V1StatefulSet]:
+    informer = get_synced_informer(kube_client)
+    if informer is not None:
+        # On a miss the app may simply be newer than our last event, so fall back to asking the apiserver
+        app = informer.deployments.get(name) or informer.stateful_sets.get(name)
+        if app is not None:
+            return app
     try:
         app = kube_client.deployments.read_namespaced_deployment_status(
             name=name,
@@ -119,7 +119,7 @@ def get_service_instances_that_need_bouncing(marathon_clients, soa_dir):
     undesired_apps_and_clients = actual_ids_and_clients.symmetric_difference(desired_ids_and_clients)
     apps_that_need_bouncing = {long_job_id_to_short_job_id(app_id) for app_id, client in undesired_apps_and_clients}
 
-    draining_hosts = get_draining_hosts()
+    draining_hosts = frozenset(get_draining_hosts())
 
     for (app_id, client), app in current_apps_with_clients.items():
         short_app_id = long_job_id_to_short_job_id(app_id)
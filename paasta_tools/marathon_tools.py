@@ -46,7 +46,10 @@ from marathon.models.app import MarathonApp
 from marathon.models.app import MarathonTask
 from marathon.models.queue import MarathonQueueItem
 from mypy_extensions import TypedDict
+from typing_extensions import Protocol
 
+from paasta_tools import shared_cache
+from paasta_tools import soa_config_cache
 from paasta_tools.long_running_service_tools import BounceMethodConfigDict
 from paasta_tools.long_running_service_tools import InvalidHealthcheckMode
 from paasta_tools.long_running_service_tools import load_service_namespace_config
@@ -94,6 +97,9 @@ PUPPET_SERVICE_DIR = '/etc/nerve/puppet_services.d'
 # These should be things that PaaSTA/Marathon knows how to change without requiring a bounce.
 CONFIG_HASH_BLACKLIST = {'instances', 'backoff_seconds', 'min_instances', 'max_instances'}
 
+# How long app lists stay in the shared cache, when one is configured (see paasta_tools.shared_cache)
+SHARED_CACHE_TTL = 5
+
 log = logging.getLogger(__name__)
 logging.getLogger('marathon').setLevel(logging.WARNING)
 
@@ -352,12 +358,12 @@ def load_marathon_service_config_no_cache(
                              should also be loaded
     :param soa_dir: The SOA configuration directory to read from
     :returns: A dictionary of whatever was in the config for the service instance"""
-    general_config = service_configuration_lib.read_service_configuration(
+    general_config = soa_config_cache.read_service_configuration(
         service,
         soa_dir=soa_dir,
     )
     marathon_conf_file = "marathon-%s" % cluster
-    instance_configs = service_configuration_lib.read_extra_service_information(
+    instance_configs = soa_config_cache.read_extra_service_information(
         service,
         marathon_conf_file,
         soa_dir=soa_dir,
@@ -372,7 +378,12 @@ def load_marathon_service_config_no_cache(
             f"{instance} not found in config file {soa_dir}/{service}/{marathon_conf_file}.yaml.",
         )
 
-    general_config = deep_merge_dictionaries(overrides=instance_configs[instance], defaults=general_config)
+    # Both configs are shared with the soa_config_cache; deep_merge_dictionaries copies the defaults but not the
+    # overrides, and users of the MarathonServiceConfig may mutate its config_dict
+    general_config = deep_merge_dictionaries(
+        overrides=copy.deepcopy(instance_configs[instance]),
+        defaults=general_config,
+    )
 
     branch_dict: Optional[BranchDictV2] = None
     if load_deployments:
@@ -867,7 +878,20 @@ class MarathonDeployStatus:
 def get_marathon_app_deploy_status(client: MarathonClient, app: MarathonApp=None) -> int:
     # Check the launch queue to see if an app is blocked
     is_overdue, backoff_seconds = get_app_queue_status(client, app.id)
+    return _get_marathon_app_deploy_status(app, is_overdue, backoff_seconds)
+
+
+def get_marathon_app_deploy_status_from_queue(app: MarathonApp, app_queue_item: Optional[MarathonQueueItem]) -> int:
+    """Same as get_marathon_app_deploy_status, for callers that have already fetched the app's launch queue item"""
+    is_overdue, backoff_seconds = get_app_queue_status_from_queue(app_queue_item)
+    return _get_marathon_app_deploy_status(app, is_overdue, backoff_seconds)
+
 
+def _get_marathon_app_deploy_status(
+    app: MarathonApp,
+    is_overdue: Optional[bool],
+    backoff_seconds: Optional[float],
+) -> int:
     # Based on conditions at https://mesosphere.github.io/marathon/docs/marathon-ui.html
     if is_overdue:
         deploy_status = MarathonDeployStatus.Waiting
@@ -1397,6 +1421,22 @@ def get_all_marathon_apps(
     client: MarathonClient,
     service_name: Optional[str]=None,
     embed_tasks: bool=False,
+) -> List[MarathonApp]:
+    cache = shared_cache.get_shared_cache()
+    if cache is None:
+        return _get_all_marathon_apps(client, service_name, embed_tasks)
+    return cache.get(
+        'marathon_apps',
+        key=(client.servers, service_name, embed_tasks),
+        fetch=lambda: _get_all_marathon_apps(client, service_name, embed_tasks),
+        ttl=SHARED_CACHE_TTL,
+    )
+
+
+def _get_all_marathon_apps(
+    client: MarathonClient,
+    service_name: Optional[str],
+    embed_tasks: bool,
 ) -> List[MarathonApp]:
     if service_name:
         return client.list_apps(embed_tasks=embed_tasks, app_id='/' + format_job_id(service=service_name, instance=''))
@@ -1416,6 +1456,20 @@ def get_marathon_apps_with_clients(
     return marathon_apps_with_clients
 
 
+class MarathonAppsSnapshotProtocol(Protocol):
+    """Anything that can stand in for get_marathon_apps_with_clients for one service instance, like the snapshot of
+    marathon apps that paasta-deployd shares between its workers."""
+
+    def get_apps_with_clients(
+        self,
+        service: str,
+        instance: str,
+        clients: Collection[MarathonClient],
+        max_age: Optional[float]=None,
+    ) -> List[Tuple[MarathonApp, MarathonClient]]:
+        raise NotImplementedError()
+
+
 def kill_task(client: MarathonClient, app_id: str, task_id: str, scale: bool) -> Optional[MarathonTask]:
     """Wrapper to the official kill_task method that is tolerant of errors"""
     try:
@@ -1488,20 +1542,17 @@ def is_old_task_missing_healthchecks(task: MarathonTask, app: MarathonApp) -> bo
     return False
 
 
-def get_num_at_risk_tasks(app: MarathonApp, draining_hosts: List[str]) -> int:
+def get_num_at_risk_tasks(app: MarathonApp, draining_hosts: Collection[str]) -> int:
     """Determine how many of an application's tasks are running on
     at-risk (Mesos Maintenance Draining) hosts.
 
     :param app: A marathon application
-    :param draining_hosts: A list of hostnames that are marked as draining.
+    :param draining_hosts: The hostnames that are marked as draining, ideally as a set.
                            See paasta_tools.mesos_maintenance.get_draining_hosts
     :returns: An integer representing the number of tasks running on at-risk hosts
     """
-    hosts_tasks_running_on = [task.host for task in app.tasks]
-    num_at_risk_tasks = 0
-    for host in hosts_tasks_running_on:
-        if host in draining_hosts:
-            num_at_risk_tasks += 1
+    draining_hosts = frozenset(draining_hosts)
+    num_at_risk_tasks = sum(1 for task in app.tasks if task.host in draining_hosts)
     log.debug("%s has %d tasks running on at-risk hosts." % (app.id, num_at_risk_tasks))
     return num_at_risk_tasks
 
@@ -24,6 +24,8 @@ DEFAULTS = {
     "log_level": "warning",
     "master": "localhost:5050",
     "max_workers": 5,
+    "max_connections": 100,
+    "max_connections_per_host": 10,
     "scheme": "http",
     "response_timeout": 5,
 }
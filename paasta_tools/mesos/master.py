@@ -13,12 +13,12 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
-import fnmatch
 import itertools
 import json
 import logging
 import os
 import re
+from typing import Any
 from typing import List
 from urllib.parse import urljoin
 from urllib.parse import urlparse
@@ -30,18 +30,21 @@ from mypy_extensions import TypedDict
 from retry import retry
 
 from . import exceptions
-from . import framework
 from . import log
 from . import mesos_file
-from . import slave
-from . import task
+from . import session_pool
 from . import util
 from . import zookeeper
+from .state_index import MesosStateIndex
+from paasta_tools import shared_cache
 from paasta_tools.async_utils import async_ttl_cache
 from paasta_tools.utils import get_user_agent
 
 ZOOKEEPER_TIMEOUT = 1
 
+# How long state and frameworks snapshots stay in the shared cache, when one is configured
+SHARED_CACHE_TTL = 15
+
 INVALID_PATH = "{0} does not have a valid path. Did you forget /mesos?"
 
 MISSING_MASTER = """unable to connect to a master at {0}.
@@ -66,6 +69,7 @@ class MesosMaster:
 
     def __init__(self, config):
         self.config = config
+        self._state_index_for = (None, None, None)
 
     def __str__(self):
         return "<master: {}>".format(self.key())
@@ -102,19 +106,17 @@ class MesosMaster:
             host = self.host
 
         try:
-            async with aiohttp.ClientSession(
-                conn_timeout=self.config["response_timeout"],
-                read_timeout=self.config["response_timeout"],
-            ) as session:
+            session = session_pool.get_session(self.config)
+            with session_pool.track_in_flight():
                 async with session.request(
                     method=method,
                     url=urljoin(host, url),
                     headers=headers,
                     **kwargs,
                 ) as resp:
-                    # if nobody awaits resp.text() or resp.json() before we exit the session context manager, then the
-                    # http connection gets closed before we read the response; then later calls to resp.text/json will
-                    # fail.
+                    # if nobody awaits resp.text() or resp.json() before we exit the response context manager, then the
+                    # http connection gets released back to the pool before we read the response; then later calls to
+                    # resp.text/json will fail.
                     await resp.text()
                     return resp
 
@@ -206,13 +208,34 @@ class MesosMaster:
         else:
             return cfg
 
+    async def _fetch_shared(self, endpoint: str, url: str) -> Any:
+        """Fetch the json at url, through the host's shared cache if one is configured"""
+        async def fetch():
+            return await (await self.fetch(url, cached=True)).json()
+
+        cache = shared_cache.get_shared_cache()
+        if cache is None:
+            return await fetch()
+        return await cache.get_async(endpoint, key=(self.key(), url), fetch=fetch, ttl=SHARED_CACHE_TTL)
+
     @async_ttl_cache(ttl=15)
     async def state(self) -> MesosState:
-        return await (await self.fetch("/master/state.json", cached=True)).json()
+        return await self._fetch_shared('mesos_state', "/master/state.json")
 
     async def state_summary(self) -> MesosState:
         return await (await self.fetch("/master/state-summary")).json()
 
+    async def state_index(self) -> MesosStateIndex:
+        """An index over the current (cached) frameworks and state snapshots. It is only rebuilt when one of the
+        snapshots has been refetched."""
+        frameworks = await self._frameworks()
+        state = await self.state()
+        cached_frameworks, cached_state, index = self._state_index_for
+        if cached_frameworks is not frameworks or cached_state is not state:
+            index = MesosStateIndex(self, frameworks, state)
+            self._state_index_for = (frameworks, state, index)
+        return index
+
     @async_ttl_cache(ttl=0)
     async def slave(self, fltr):
         lst = await self.slaves(fltr)
@@ -235,11 +258,8 @@ class MesosMaster:
         return lst[0]
 
     async def slaves(self, fltr=""):
-        return [
-            slave.MesosSlave(self.config, x)
-            for x in (await self.state())['slaves']
-            if fltr == x['id']
-        ]
+        match = (await self.state_index()).slave(fltr)
+        return [match] if match is not None else []
 
     async def _task_list(self, active_only=False):
         keys = ["tasks"]
@@ -271,17 +291,13 @@ class MesosMaster:
 
     # XXX - need to filter on task state as well as id
     async def tasks(self, fltr="", active_only=False):
-        return [
-            task.Task(self, x)
-            for x in await self._task_list(active_only)
-            if fltr in x['id'] or fnmatch.fnmatch(x['id'], fltr)
-        ]
+        return (await self.state_index()).tasks(fltr, active_only=active_only)
 
     async def framework(self, fwid):
-        return list(filter(
-            lambda x: x.id == fwid,
-            await self.frameworks(),
-        ))[0]
+        match = (await self.state_index()).framework(fwid)
+        if match is None:
+            raise IndexError(f"No framework with id {fwid}")
+        return match
 
     async def _framework_list(self, active_only=False):
         keys = ["frameworks"]
@@ -291,11 +307,10 @@ class MesosMaster:
 
     @async_ttl_cache(ttl=15)
     async def _frameworks(self):
-        return await (await self.fetch("/master/frameworks", cached=True)).json()
+        return await self._fetch_shared('mesos_frameworks', "/master/frameworks")
 
     async def frameworks(self, active_only=False):
-        return [framework.Framework(f)
-                for f in await self._framework_list(active_only)]
+        return (await self.state_index()).frameworks(active_only=active_only)
 
     async def teardown(self, framework_id):
         return await self.post(
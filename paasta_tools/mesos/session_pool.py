@@ -0,0 +1,114 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Connection-pooled aiohttp sessions shared by all requests to mesos masters and agents (and the hacheck on them).
+
+aiohttp sessions (and their connectors) are bound to the event loop they were created on, so we keep one set of
+sessions per loop. Within a loop, every request with the same timeout and connection limits reuses the same session,
+which keeps connections to each host alive between requests.
+"""
+import asyncio
+import contextlib
+import weakref
+from typing import Any
+from typing import Dict
+from typing import MutableMapping
+from typing import Tuple
+
+import aiohttp
+
+
+DEFAULT_MAX_CONNECTIONS = 100
+DEFAULT_MAX_CONNECTIONS_PER_HOST = 10
+DEFAULT_KEEPALIVE_TIMEOUT = 15
+
+_sessions: MutableMapping[asyncio.AbstractEventLoop, Dict[Tuple, aiohttp.ClientSession]] = weakref.WeakKeyDictionary()
+
+_metrics = {
+    'pool_hits': 0,
+    'pool_misses': 0,
+    'in_flight': 0,
+}
+
+
+def get_session_pool_metrics() -> Dict[str, int]:
+    """Return counts of how often a pooled session was reused (pool_hits) or had to be created (pool_misses), and
+    how many requests are currently in flight through the pool."""
+    return dict(_metrics)
+
+
+def get_session(config: Dict[str, Any]) -> aiohttp.ClientSession:
+    """Return the pooled session for the current event loop matching the timeout and connection limits in config
+    (a mesos cli config, as returned by paasta_tools.mesos.cfg.load_mesos_config). A conn_timeout in config overrides
+    response_timeout for establishing connections."""
+    loop = asyncio.get_event_loop()
+    discard_sessions_for_closed_loops()
+    key = (
+        config["response_timeout"],
+        config.get("max_connections", DEFAULT_MAX_CONNECTIONS),
+        config.get("max_connections_per_host", DEFAULT_MAX_CONNECTIONS_PER_HOST),
+        config.get("conn_timeout", config["response_timeout"]),
+    )
+    loop_sessions = _sessions.setdefault(loop, {})
+    session = loop_sessions.get(key)
+    if session is not None and not session.closed:
+        _metrics['pool_hits'] += 1
+        return session
+
+    _metrics['pool_misses'] += 1
+    response_timeout, max_connections, max_connections_per_host, conn_timeout = key
+    session = aiohttp.ClientSession(
+        connector=aiohttp.TCPConnector(
+            limit=max_connections,
+            limit_per_host=max_connections_per_host,
+            keepalive_timeout=DEFAULT_KEEPALIVE_TIMEOUT,
+            loop=loop,
+        ),
+        conn_timeout=conn_timeout,
+        read_timeout=response_timeout,
+        loop=loop,
+    )
+    loop_sessions[key] = session
+    return session
+
+
+def discard_sessions_for_closed_loops() -> None:
+    """Sessions hold a reference to their loop, so we have to drop them ourselves once a loop has been closed (e.g.
+    at the end of a_sync.block) rather than rely on the weak reference."""
+    for loop in [loop for loop in _sessions.keys() if loop.is_closed()]:
+        for session in _sessions.pop(loop).values():
+            if session.connector is not None:
+                try:
+                    session.connector.close()
+                except RuntimeError:
+                    # closing the transports needs the (closed) loop; the sockets get closed when collected instead
+                    pass
+            session.detach()
+
+
+@contextlib.contextmanager
+def track_in_flight():
+    _metrics['in_flight'] += 1
+    try:
+        yield
+    finally:
+        _metrics['in_flight'] -= 1
+
+
+async def close_sessions() -> None:
+    """Close the pooled sessions for the current event loop. Call this before closing a loop you created yourself."""
+    loop_sessions = _sessions.pop(asyncio.get_event_loop(), {})
+    for session in loop_sessions.values():
+        await session.close()
@@ -19,6 +19,7 @@ import aiohttp
 
 from . import exceptions
 from . import mesos_file
+from . import session_pool
 from . import util
 from paasta_tools.async_utils import async_ttl_cache
 from paasta_tools.utils import get_user_agent
@@ -49,10 +50,8 @@ class MesosSlave:
 
     async def fetch(self, url, **kwargs) -> aiohttp.ClientResponse:
         headers = {'User-Agent': get_user_agent()}
-        async with aiohttp.ClientSession(
-            conn_timeout=self.config["response_timeout"],
-            read_timeout=self.config["response_timeout"],
-        ) as session:
+        session = session_pool.get_session(self.config)
+        with session_pool.track_in_flight():
             try:
                 async with session.get(
                     urljoin(self.host, url),
@@ -0,0 +1,146 @@
+# Licensed to the Apache Software Foundation (ASF) under one
+# or more contributor license agreements.  See the NOTICE file
+# distributed with this work for additional information
+# regarding copyright ownership.  The ASF licenses this file
+# to you under the Apache License, Version 2.0 (the
+# "License"); you may not use this file except in compliance
+# with the License.  You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+"""Hash indexes over one snapshot of the mesos master's frameworks and state.
+
+Building Task/MesosSlave/Framework wrappers for every task in the cluster and then scanning them is O(all tasks) per
+lookup. A MesosStateIndex is built once per fetched snapshot and answers lookups by task id, app id prefix, agent id,
+hostname and framework id with dict lookups, creating wrappers only for the objects actually returned.
+"""
+import fnmatch
+from collections import defaultdict
+from typing import Any
+from typing import Dict
+from typing import List
+from typing import Mapping
+from typing import Optional
+from typing import Set
+
+from .framework import Framework
+from .slave import MesosSlave
+from .task import Task
+
+
+class MesosStateIndex:
+
+    def __init__(self, master, frameworks: Mapping[str, Any], state: Mapping[str, Any]) -> None:
+        self.master = master
+        self.frameworks_by_id: Dict[str, Dict] = {}
+        self.active_framework_ids: Set[str] = set()
+        self.all_tasks: List[Dict] = []
+        self.active_tasks: List[Dict] = []
+        # Tasks of frameworks that haven't reregistered with the master since it failed over
+        self.orphan_tasks: List[Dict] = list(state.get("orphan_tasks", []))
+        self.tasks_by_id: Dict[str, List[Dict]] = defaultdict(list)
+        self.tasks_by_id_prefix: Dict[str, List[Dict]] = defaultdict(list)
+        self.tasks_by_slave_id: Dict[str, List[Dict]] = defaultdict(list)
+        self.tasks_by_framework_id: Dict[str, List[Dict]] = defaultdict(list)
+        self.slaves_by_id: Dict[str, Dict] = {}
+        self.slaves_by_hostname: Dict[str, List[Dict]] = defaultdict(list)
+
+        self._task_wrappers: Dict[int, Task] = {}
+        self._slave_wrappers: Dict[str, MesosSlave] = {}
+        self._framework_wrappers: Dict[str, Framework] = {}
+        self._filtered_tasks: Dict[Any, List[Task]] = {}
+
+        for fw in frameworks.get("frameworks", []):
+            self.active_framework_ids.add(fw["id"])
+            self._add_framework(fw, active=True)
+        for fw in frameworks.get("completed_frameworks", []):
+            self._add_framework(fw, active=False)
+
+        self._active_task_refs = {id(raw_task) for raw_task in self.active_tasks}
+
+        for agent in state.get("slaves", []):
+            self.slaves_by_id[agent["id"]] = agent
+            self.slaves_by_hostname[agent["hostname"]].append(agent)
+
+    def _add_framework(self, fw: Dict, active: bool) -> None:
+        self.frameworks_by_id[fw["id"]] = fw
+        for key in ("tasks", "completed_tasks"):
+            for raw_task in fw.get(key, []):
+                self.all_tasks.append(raw_task)
+                if active and key == "tasks":
+                    self.active_tasks.append(raw_task)
+                task_id = raw_task["id"]
+                self.tasks_by_id[task_id].append(raw_task)
+                parts = task_id.split(".")
+                for i in range(1, len(parts) + 1):
+                    self.tasks_by_id_prefix[".".join(parts[:i])].append(raw_task)
+                self.tasks_by_slave_id[raw_task.get("slave_id")].append(raw_task)
+                self.tasks_by_framework_id[raw_task.get("framework_id")].append(raw_task)
+
+    def wrap_task(self, raw_task: Dict) -> Task:
+        try:
+            return self._task_wrappers[id(raw_task)]
+        except KeyError:
+            wrapped = self._task_wrappers[id(raw_task)] = Task(self.master, raw_task)
+            return wrapped
+
+    def wrap_tasks(self, raw_tasks: List[Dict], active_only: bool=False) -> List[Task]:
+        if active_only:
+            raw_tasks = [t for t in raw_tasks if id(t) in self._active_task_refs]
+        return [self.wrap_task(t) for t in raw_tasks]
+
+    def tasks(self, fltr: str="", active_only: bool=False) -> List[Task]:
+        """Same semantics as MesosMaster.tasks: tasks whose id contains fltr or matches it as a glob. Results are
+        remembered for the lifetime of the index."""
+        key = (fltr, active_only)
+        if key not in self._filtered_tasks:
+            raw_tasks = self.active_tasks if active_only else self.all_tasks
+            if fltr:
+                raw_tasks = [t for t in raw_tasks if fltr in t["id"] or fnmatch.fnmatch(t["id"], fltr)]
+            self._filtered_tasks[key] = [self.wrap_task(t) for t in raw_tasks]
+        return list(self._filtered_tasks[key])
+
+    def tasks_with_id(self, task_id: str) -> List[Task]:
+        return self.wrap_tasks(self.tasks_by_id.get(task_id, []))
+
+    def tasks_with_id_prefix(self, prefix: str, active_only: bool=False) -> List[Task]:
+        """Tasks whose id starts with the given whole dot-separated components, e.g. an app id or service.instance."""
+        return self.wrap_tasks(self.tasks_by_id_prefix.get(prefix.lstrip("/"), []), active_only=active_only)
+
+    def tasks_on_slave(self, slave_id: str, active_only: bool=False) -> List[Task]:
+        return self.wrap_tasks(self.tasks_by_slave_id.get(slave_id, []), active_only=active_only)
+
+    def tasks_for_framework(self, framework_id: str, active_only: bool=False) -> List[Task]:
+        return self.wrap_tasks(self.tasks_by_framework_id.get(framework_id, []), active_only=active_only)
+
+    def slave(self, slave_id: str) -> Optional[MesosSlave]:
+        """Returns None if there is no agent with this id"""
+        raw_slave = self.slaves_by_id.get(slave_id)
+        if raw_slave is None:
+            return None
+        if slave_id not in self._slave_wrappers:
+            self._slave_wrappers[slave_id] = MesosSlave(self.master.config, raw_slave)
+        return self._slave_wrappers[slave_id]
+
+    def slaves_with_hostname(self, hostname: str) -> List[MesosSlave]:
+        return [self.slave(raw_slave["id"]) for raw_slave in self.slaves_by_hostname.get(hostname, [])]
+
+    def framework(self, framework_id: str) -> Optional[Framework]:
+        """Returns None if there is no framework with this id"""
+        raw_framework = self.frameworks_by_id.get(framework_id)
+        if raw_framework is None:
+            return None
+        if framework_id not in self._framework_wrappers:
+            self._framework_wrappers[framework_id] = Framework(raw_framework)
+        return self._framework_wrappers[framework_id]
+
+    def frameworks(self, active_only: bool=False) -> List[Framework]:
+        return [
+            self.framework(framework_id) for framework_id in self.frameworks_by_id
+            if not active_only or framework_id in self.active_framework_ids
+        ]
@@ -31,6 +31,7 @@ from paasta_tools.mesos_tools import get_count_running_tasks_on_slave
 from paasta_tools.mesos_tools import get_mesos_leader
 from paasta_tools.mesos_tools import get_mesos_master
 from paasta_tools.mesos_tools import MESOS_MASTER_PORT
+from paasta_tools.utils import time_cache
 from paasta_tools.utils import to_bytes
 
 
@@ -39,6 +40,8 @@ Hostname = namedtuple('Hostname', ['host', 'ip'])
 Credentials = namedtuple('Credentials', ['file', 'principal', 'secret'])
 Resource = namedtuple('Resource', ['name', 'amount'])
 MAINTENANCE_ROLE = 'maintenance'
+# How long a snapshot of the draining hosts is shared between callers in the same process
+DRAINING_HOSTS_SNAPSHOT_TTL = 20
 
 
 def base_api():
@@ -190,6 +193,17 @@ def get_draining_hosts():
     return get_hosts_with_state(state='draining_machines')
 
 
+@time_cache(ttl=DRAINING_HOSTS_SNAPSHOT_TTL)
+def get_draining_hosts_snapshot():
+    """Returns the hostnames that are marked as draining, as of a snapshot taken at most
+    DRAINING_HOSTS_SNAPSHOT_TTL seconds ago. Meant for code that bounces many services in a row,
+    so that a sweep costs one maintenance status request rather than one per service.
+
+    :returns: a frozenset of strings representing hostnames
+    """
+    return frozenset(get_draining_hosts())
+
+
 def get_down_hosts():
     """Returns a list of hostnames that are marked as down
 
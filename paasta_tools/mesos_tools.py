@@ -761,26 +761,21 @@ async def get_mesos_task_count_by_slave(
     :param pool: pool of slaves to return (None means all)
     :returns: list of slave dicts {'task_count': SlaveTaskCount}
     """
-    all_mesos_tasks = await get_all_running_tasks()  # empty string = all app ids
+    state_index = await get_mesos_master().state_index()
     slaves = {
         slave['id']: {'count': 0, 'slave': slave, 'batch_count': 0} for slave in mesos_state.get('slaves', [])
     }
-    for task in all_mesos_tasks:
-        try:
-            task_slave = await task.slave()
-            if task_slave['id'] not in slaves:
-                log.debug("Slave {} not found for task".format(task_slave['id']))
-                continue
-            else:
-                slaves[task_slave['id']]['count'] += 1
-                task_framework = await task.framework()
-                log.debug(f"Task framework: {task_framework.name}")
-                # Marathon is only framework that runs service. Others are batch.
-                if not task_framework.name.startswith(MARATHON_FRAMEWORK_NAME_PREFIX):
-                    slaves[task_slave['id']]['batch_count'] += 1
-        except SlaveDoesNotExist:
-            log.debug("Tried to get mesos slaves for task {}, but none existed.".format(task['id']))
+    for raw_task in state_index.all_tasks + state_index.orphan_tasks:
+        if raw_task['state'] != 'TASK_RUNNING':
+            continue
+        if raw_task['slave_id'] not in slaves:
+            log.debug("Slave {} not found for task".format(raw_task['slave_id']))
             continue
+        slaves[raw_task['slave_id']]['count'] += 1
+        task_framework = state_index.frameworks_by_id.get(raw_task['framework_id'], {})
+        # Marathon is only framework that runs service. Others are batch.
+        if not task_framework.get('name', '').startswith(MARATHON_FRAMEWORK_NAME_PREFIX):
+            slaves[raw_task['slave_id']]['batch_count'] += 1
     if slaves_list:
         for slave in slaves_list:
             slave['task_counts'] = SlaveTaskCount(**slaves[slave['task_counts'].slave['id']])
@@ -843,15 +838,19 @@ def terminate_framework(framework_id):
 
 
 async def get_tasks_from_app_id(app_id, slave_hostname=None):
-    tasks = await get_running_tasks_from_frameworks(app_id)
+    state_index = await get_mesos_master().state_index()
+    tasks = filter_running_tasks(state_index.tasks_with_id_prefix(app_id))
     if slave_hostname:
-        tasks = [task for task in tasks if await filter_task_by_hostname(task, slave_hostname)]
+        tasks = [
+            task for task in tasks
+            if state_index.slaves_by_id.get(task['slave_id'], {}).get('hostname', '').startswith(slave_hostname)
+        ]
     return tasks
 
 
 async def get_task(task_id, app_id=''):
-    tasks = await get_running_tasks_from_frameworks(app_id)
-    tasks = [task for task in tasks if filter_task_by_task_id(task, task_id)]
+    state_index = await get_mesos_master().state_index()
+    tasks = [task for task in filter_running_tasks(state_index.tasks_with_id(task_id)) if app_id in task['id']]
     if len(tasks) < 1:
         raise TaskNotFound(f"Couldn't find task for given id: {task_id}")
     if len(tasks) > 1:
@@ -18,11 +18,14 @@ Usage: ./setup_kubernetes_job.py <service.instance> [options]
 Command line options:
 
 - -d <SOA_DIR>, --soa-dir <SOA_DIR>: Specify a SOA config dir to read from
+- -j <N>, --max-workers <N>: How many instances to reconcile at once
 - -v, --verbose: Verbose output
 """
 import argparse
 import logging
 import sys
+from concurrent.futures import ThreadPoolExecutor
+from typing import Mapping
 from typing import Optional
 from typing import Sequence
 from typing import Tuple
@@ -42,6 +45,7 @@ from paasta_tools.kubernetes_tools import InvalidKubernetesConfig
 from paasta_tools.kubernetes_tools import KubeClient
 from paasta_tools.kubernetes_tools import KubeDeployment
 from paasta_tools.kubernetes_tools import list_all_deployments
+from paasta_tools.kubernetes_tools import list_all_pod_disruption_budgets
 from paasta_tools.kubernetes_tools import load_kubernetes_service_config_no_cache
 from paasta_tools.kubernetes_tools import max_unavailable
 from paasta_tools.kubernetes_tools import pod_disruption_budget_for_service_instance
@@ -57,6 +61,8 @@ from paasta_tools.utils import SPACER
 
 log = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+
 
 def parse_args() -> argparse.Namespace:
     parser = argparse.ArgumentParser(description='Creates marathon jobs.')
@@ -70,6 +76,11 @@ def parse_args() -> argparse.Namespace:
         default=DEFAULT_SOA_DIR,
         help="define a different soa config directory",
     )
+    parser.add_argument(
+        '-j', '--max-workers', dest="max_workers", type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="how many instances to reconcile at once (default %(default)s)",
+    )
     parser.add_argument(
         '-v', '--verbose', action='store_true',
         dest="verbose", default=False,
@@ -94,6 +105,7 @@ def main() -> None:
         kube_client=kube_client,
         service_instances=args.service_instance_list,
         soa_dir=soa_dir,
+        max_workers=args.max_workers,
     )
     sys.exit(0 if setup_kube_succeeded else 1)
 
@@ -102,10 +114,16 @@ def setup_kube_deployments(
     kube_client: KubeClient,
     service_instances: Sequence[str],
     soa_dir: str=DEFAULT_SOA_DIR,
+    max_workers: int=DEFAULT_MAX_WORKERS,
 ) -> bool:
+    """Reconcile every one of service_instances with what is running in kubernetes.
+
+    The deployments, statefulsets and poddisruptionbudgets are listed once up front and looked up by (service,
+    instance), and the instances are reconciled max_workers at a time, so the only other API calls made are the ones
+    that change something.
+    """
     succeeded = True
-    if service_instances:
-        deployments = list_all_deployments(kube_client)
+    service_instance_pairs = []
     for service_instance in service_instances:
         try:
             service, instance, _, __ = decompose_job_id(service_instance)
@@ -113,13 +131,27 @@ def setup_kube_deployments(
             log.error("Invalid service instance specified. Format is service%sinstance." % SPACER)
             succeeded = False
         else:
-            if reconcile_kubernetes_deployment(
-                kube_client=kube_client,
-                service=service,
-                instance=instance,
-                kube_deployments=deployments,
-                soa_dir=soa_dir,
-            )[0]:
+            service_instance_pairs.append((service, instance))
+    if not service_instance_pairs:
+        return succeeded
+
+    deployments = {(kd.service, kd.instance): kd for kd in list_all_deployments(kube_client)}
+    pod_disruption_budgets = list_all_pod_disruption_budgets(kube_client)
+
+    def reconcile(service_instance_pair: Tuple[str, str]) -> Tuple[int, Optional[int]]:
+        service, instance = service_instance_pair
+        return reconcile_kubernetes_deployment(
+            kube_client=kube_client,
+            service=service,
+            instance=instance,
+            kube_deployments=deployments,
+            soa_dir=soa_dir,
+            pod_disruption_budgets=pod_disruption_budgets,
+        )
+
+    with ThreadPoolExecutor(max_workers=max_workers) as executor:
+        for status, _ in executor.map(reconcile, service_instance_pairs):
+            if status:
                 succeeded = False
     return succeeded
 
@@ -128,9 +160,17 @@ def reconcile_kubernetes_deployment(
     kube_client: KubeClient,
     service: str,
     instance: str,
-    kube_deployments: Sequence[KubeDeployment],
+    kube_deployments: Mapping[Tuple[str, str], KubeDeployment],
     soa_dir: str,
+    pod_disruption_budgets: Optional[Mapping[Tuple[str, str], V1beta1PodDisruptionBudget]]=None,
 ) -> Tuple[int, Optional[int]]:
+    """Create or update the deployment or statefulset of one instance if it differs from what kube_deployments says
+    is running, and make sure its poddisruptionbudget is right.
+
+    :param kube_deployments: the KubeDeployments currently running, keyed by (service, instance)
+    :param pod_disruption_budgets: the existing poddisruptionbudgets keyed by (service, instance), as returned by
+                                   list_all_pod_disruption_budgets. If not given, this instance's is read from the API.
+    """
     try:
         service_instance_config = load_kubernetes_service_config_no_cache(
             service,
@@ -162,13 +202,14 @@ def reconcile_kubernetes_deployment(
         replicas=formatted_application.spec.replicas,
     )
 
-    if not (service, instance) in [(kd.service, kd.instance) for kd in kube_deployments]:
+    existing_deployment = kube_deployments.get((service, instance))
+    if existing_deployment is None:
         log.debug(f"{desired_deployment} does not exist so creating")
         create_kubernetes_application(
             kube_client=kube_client,
             application=formatted_application,
         )
-    elif desired_deployment not in kube_deployments:
+    elif desired_deployment != existing_deployment:
         log.debug(f"{desired_deployment} exists but config_sha or git_sha doesn't match or number of instances changed")
         update_kubernetes_application(
             kube_client=kube_client,
@@ -185,6 +226,7 @@ def reconcile_kubernetes_deployment(
             instance_count=service_instance_config.get_desired_instances(),
             bounce_margin_factor=service_instance_config.get_bounce_margin_factor(),
         ),
+        existing_pod_disruption_budgets=pod_disruption_budgets,
     )
     return 0, None
 
@@ -194,22 +236,26 @@ def ensure_pod_disruption_budget(
         service: str,
         instance: str,
         min_instances: int,
+        existing_pod_disruption_budgets: Optional[Mapping[Tuple[str, str], V1beta1PodDisruptionBudget]]=None,
 ) -> V1beta1PodDisruptionBudget:
     pdr = pod_disruption_budget_for_service_instance(
         service=service,
         instance=instance,
         min_instances=min_instances,
     )
-    try:
-        existing_pdr = kube_client.policy.read_namespaced_pod_disruption_budget(
-            name=pdr.metadata.name,
-            namespace=pdr.metadata.namespace,
-        )
-    except ApiException as e:
-        if e.status == 404:
-            existing_pdr = None
-        else:
-            raise
+    if existing_pod_disruption_budgets is not None:
+        existing_pdr = existing_pod_disruption_budgets.get((service, instance))
+    else:
+        try:
+            existing_pdr = kube_client.policy.read_namespaced_pod_disruption_budget(
+                name=pdr.metadata.name,
+                namespace=pdr.metadata.namespace,
+            )
+        except ApiException as e:
+            if e.status == 404:
+                existing_pdr = None
+            else:
+                raise
 
     if existing_pdr:
         if existing_pdr.spec.min_available != pdr.spec.min_available:
@@ -74,7 +74,7 @@ from paasta_tools.marathon_tools import get_num_at_risk_tasks
 from paasta_tools.marathon_tools import kill_given_tasks
 from paasta_tools.marathon_tools import MarathonClient
 from paasta_tools.mesos.exceptions import NoSlavesAvailableError
-from paasta_tools.mesos_maintenance import get_draining_hosts
+from paasta_tools.mesos_maintenance import get_draining_hosts_snapshot
 from paasta_tools.mesos_maintenance import reserve_all_resources
 from paasta_tools.utils import _log
 from paasta_tools.utils import compose_job_id
@@ -432,7 +432,11 @@ def get_tasks_by_state_for_app(
         'at_risk': set(),
     }
 
-    happy_tasks = bounce_lib.get_happy_tasks(app, service, nerve_ns, system_paasta_config, **bounce_health_params)
+    happy_task_ids = {
+        task.id for task in
+        bounce_lib.get_happy_tasks(app, service, nerve_ns, system_paasta_config, **bounce_health_params)
+    }
+    draining_hosts = frozenset(draining_hosts)
 
     async def categorize_task(task: MarathonTask) -> None:
         try:
@@ -446,7 +450,7 @@ def get_tasks_by_state_for_app(
         else:
             if is_draining is True:
                 state = 'draining'
-            elif task in happy_tasks:
+            elif task.id in happy_task_ids:
                 if task.host in draining_hosts:
                     state = 'at_risk'
                 else:
@@ -628,7 +632,7 @@ def deploy_service(
         return (1, errormsg, None)
 
     try:
-        draining_hosts = get_draining_hosts()
+        draining_hosts = get_draining_hosts_snapshot()
     except ReadTimeout as e:
         errormsg = "ReadTimeout encountered trying to get draining hosts: %s" % e
         return (1, errormsg, 60)
@@ -870,6 +874,7 @@ def deploy_marathon_service(
     clients: marathon_tools.MarathonClients,
     soa_dir: str,
     marathon_apps_with_clients: Optional[Collection[Tuple[MarathonApp, MarathonClient]]],
+    marathon_apps_snapshot: Optional['marathon_tools.MarathonAppsSnapshotProtocol']=None,
 ) -> Tuple[int, float]:
     """deploy the service instance given and process return code
     if there was an error we send a sensu alert.
@@ -879,6 +884,8 @@ def deploy_marathon_service(
     :param clients: A MarathonClients object
     :param soa_dir: Path to yelpsoa configs
     :param marathon_apps: A list of all marathon app objects
+    :param marathon_apps_snapshot: If marathon_apps is None, read the apps from this
+        shared snapshot instead of listing every app on every client
     :returns: A tuple of (status, bounce_in_seconds) to be used by paasta-deployd
         bounce_in_seconds instructs how long until the deployd should try another bounce
         None means that it is in a steady state and doesn't need to bounce again
@@ -903,7 +910,13 @@ def deploy_marathon_service(
                 log.error(error_msg)
                 return 1, None
 
-            if marathon_apps_with_clients is None:
+            if marathon_apps_with_clients is None and marathon_apps_snapshot is not None:
+                marathon_apps_with_clients = marathon_apps_snapshot.get_apps_with_clients(
+                    service=service,
+                    instance=instance,
+                    clients=clients.get_all_clients_for_service(job_config=service_instance_config),
+                )
+            elif marathon_apps_with_clients is None:
                 marathon_apps_with_clients = marathon_tools.get_marathon_apps_with_clients(
                     clients=clients.get_all_clients_for_service(job_config=service_instance_config),
                     embed_tasks=True,
@@ -19,15 +19,28 @@ Reads from the soa_dir /nail/etc/services by default.
 
 The script will load the service configuration file, generate a Tron configuration
 file for it, and send the updated file to Tron.
+
+With --manifest, the digest of the last config pushed for each namespace is kept in
+a local file and namespaces whose generated config hasn't changed since are skipped
+without contacting Tron at all.
 """
 import argparse
+import json
 import logging
 import sys
+import time
+from concurrent.futures import ThreadPoolExecutor
 
 from paasta_tools import tron_tools
+from paasta_tools.tron.client import config_hash
+from paasta_tools.utils import atomic_file_write
 
 log = logging.getLogger(__name__)
 
+DEFAULT_MAX_WORKERS = 8
+
+UPDATED, SKIPPED, FAILED = 'updated', 'skipped', 'failed'
+
 
 def parse_args():
     parser = argparse.ArgumentParser(
@@ -69,10 +82,72 @@ def parse_args():
         help="Cluster to read configs for. Defaults to the configuration in /etc/paasta",
         default=None,
     )
+    parser.add_argument(
+        '-j',
+        '--max-workers',
+        dest='max_workers',
+        type=int,
+        default=DEFAULT_MAX_WORKERS,
+        help="Number of namespaces to generate and push concurrently. Defaults to %(default)s",
+    )
+    parser.add_argument(
+        '--manifest',
+        dest='manifest_path',
+        metavar='PATH',
+        default=None,
+        help="File recording the digest of the last config pushed for each namespace. "
+             "Namespaces whose config is unchanged since are skipped without contacting Tron.",
+    )
     args = parser.parse_args()
     return args
 
 
+def load_manifest(path):
+    try:
+        with open(path) as f:
+            return json.load(f)
+    except (OSError, ValueError):
+        log.warning(f'Could not read namespace manifest {path}, every namespace will be checked against Tron')
+        return {}
+
+
+def write_manifest(path, manifest):
+    with atomic_file_write(path) as f:
+        json.dump(manifest, f, sort_keys=True, indent=2)
+
+
+def sync_namespace(client, service, cluster, soa_dir, dry_run=False, manifest=None):
+    """Generate the config for one namespace and push it to Tron if it changed.
+
+    :param manifest: namespace -> digest of the config last pushed. If the generated config matches it nothing is
+        sent; otherwise it is updated in place once Tron has the new config.
+    :returns: tuple of (status, seconds spent generating the config, seconds spent talking to Tron)
+    """
+    start = time.time()
+    new_config = tron_tools.create_complete_config(
+        cluster=cluster,
+        service=service,
+        soa_dir=soa_dir,
+    )
+    generation_time = time.time() - start
+
+    if dry_run:
+        log.info(f"Would update {service} to:")
+        log.info(f"{new_config}")
+        return UPDATED, generation_time, 0.0
+
+    new_hash = config_hash(new_config)
+    if manifest is not None and manifest.get(service) == new_hash:
+        return SKIPPED, generation_time, 0.0
+
+    start = time.time()
+    updated = client.update_namespace(service, new_config)
+    push_time = time.time() - start
+    if manifest is not None:
+        manifest[service] = new_hash
+    return (UPDATED if updated else SKIPPED), generation_time, push_time
+
+
 def main():
     args = parse_args()
     log_level = logging.DEBUG if args.verbose else logging.INFO
@@ -100,41 +175,60 @@ def main():
         log.warning("No namespaces found")
         sys.exit(0)
 
+    client = None
     if not args.dry_run:
-        client = tron_tools.get_tron_client()
+        client = tron_tools.get_tron_client(pool_maxsize=args.max_workers)
 
-    updated = []
-    failed = []
-    skipped = []
+    manifest = None
+    if args.manifest_path and not args.dry_run:
+        manifest = load_manifest(args.manifest_path)
+        if args.all_namespaces:
+            # Forget namespaces that are gone, so one that comes back is pushed even if its config is identical
+            manifest = {service: digest for service, digest in manifest.items() if service in services}
 
-    for service in sorted(services):
+    def sync(service):
         try:
-            new_config = tron_tools.create_complete_config(
-                cluster=args.cluster,
+            status, generation_time, push_time = sync_namespace(
+                client=client,
                 service=service,
+                cluster=args.cluster,
                 soa_dir=args.soa_dir,
+                dry_run=args.dry_run,
+                manifest=manifest,
             )
-            if args.dry_run:
-                log.info(f"Would update {service} to:")
-                log.info(f"{new_config}")
-                updated.append(service)
-            else:
-                if client.update_namespace(service, new_config):
-                    updated.append(service)
-                    log.debug(f'Updated {service}')
-                else:
-                    skipped.append(service)
-                    log.debug(f'Skipped {service}')
         except Exception as e:
             log.error(f'Update for {service} failed: {str(e)}')
             log.debug(f'Exception while updating {service}', exc_info=1)
-            failed.append(service)
+            return service, FAILED, None, None
+        log.debug(
+            f'{status.capitalize()} {service} '
+            f'(generate: {generation_time * 1000:.0f}ms, push: {push_time * 1000:.0f}ms)',
+        )
+        return service, status, generation_time, push_time
+
+    with ThreadPoolExecutor(max_workers=args.max_workers) as executor:
+        results = list(executor.map(sync, sorted(services)))
+
+    if manifest is not None:
+        write_manifest(args.manifest_path, manifest)
+
+    updated = [service for service, status, _, _ in results if status == UPDATED]
+    failed = [service for service, status, _, _ in results if status == FAILED]
+    skipped = [service for service, status, _, _ in results if status == SKIPPED]
+    timings = [(service, gen, push) for service, _, gen, push in results if gen is not None]
 
     skipped_report = skipped if args.verbose else len(skipped)
     log.info(
         f'Updated following namespaces: {updated}, '
         f'failed: {failed}, skipped: {skipped_report}',
     )
+    if timings:
+        slowest = max(timings, key=lambda timing: timing[1] + timing[2])
+        log.info(
+            f'Generating configs took {sum(t[1] for t in timings):.1f}s and pushing them '
+            f'{sum(t[2] for t in timings):.1f}s in total; slowest namespace was {slowest[0]} '
+            f'(generate: {slowest[1] * 1000:.0f}ms, push: {slowest[2] * 1000:.0f}ms)',
+        )
 
     sys.exit(1 if failed else 0)
 
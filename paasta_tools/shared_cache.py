@@ -0,0 +1,200 @@
+"""A cache shared by all the processes on a host, e.g. the gunicorn workers of paasta-api.
+
+Entries are pickled into files under a directory, by default on /dev/shm so they never leave memory. Refreshes are
+single flight: when an entry is missing or stale the first process to take the entry's flock fetches it upstream,
+while every other process waits on the lock and then reads what was written, so one upstream fetch serves all of
+them.
+
+Entries are unpickled, so the directory must belong to the current user and be accessible to nobody else: a
+SharedCache refuses any other directory, e.g. one another user created first on /dev/shm. Entries and lock files
+older than max_age are swept periodically, so callers must only key entries on a bounded set of values.
+
+Nothing is cached until configure() is called; callers fetch directly while get_shared_cache() returns None.
+"""
+import asyncio
+import fcntl
+import hashlib
+import logging
+import os
+import pickle
+import stat
+import tempfile
+import time
+from collections import Counter
+from collections import defaultdict
+from typing import Any
+from typing import Awaitable
+from typing import Callable
+from typing import Dict
+from typing import Optional
+from typing import Tuple
+
+from paasta_tools.metrics.metrics_lib import BaseMetrics
+from paasta_tools.metrics.metrics_lib import CounterProtocol
+
+log = logging.getLogger(__name__)
+
+DEFAULT_SHARED_CACHE_DIR = '/dev/shm/paasta-api-cache'
+# Entries older than this are deleted, they are stale for any ttl in use
+DEFAULT_MAX_AGE = 300
+# How often each process sweeps old entries
+SWEEP_INTERVAL = 60
+
+# Outcomes of a lookup: a fresh entry was read without waiting, a fresh entry was read after waiting for another
+# process to refresh it, or this process fetched it upstream
+HIT = 'hit'
+COALESCED = 'coalesced'
+MISS = 'miss'
+
+_MISSING = object()
+
+
+class SharedCache:
+
+    def __init__(self, path: str, metrics: Optional[BaseMetrics]=None, max_age: float=DEFAULT_MAX_AGE) -> None:
+        os.makedirs(path, mode=0o700, exist_ok=True)
+        st = os.lstat(path)
+        if not stat.S_ISDIR(st.st_mode) or st.st_uid != os.geteuid() or stat.S_IMODE(st.st_mode) != 0o700:
+            raise PermissionError(
+                f"Refusing to use {path} as a shared cache: it must be a directory owned by uid {os.geteuid()} "
+                f"with mode 0700",
+            )
+        self.path = path
+        self.metrics = metrics
+        self.max_age = max_age
+        self._last_sweep = time.time()
+        # endpoint -> outcome -> count, for this process only
+        self.stats: Dict[str, Counter] = defaultdict(Counter)
+        self._counters: Dict[Tuple[str, str], CounterProtocol] = {}
+
+    def entry_path(self, endpoint: str, key: Any) -> str:
+        digest = hashlib.sha1(repr(key).encode('utf8')).hexdigest()
+        return os.path.join(self.path, f'{endpoint}-{digest}')
+
+    def get(self, endpoint: str, key: Any, fetch: Callable[[], Any], ttl: float) -> Any:
+        """Return the value cached under (endpoint, key) if it is younger than ttl seconds, otherwise fetch(),
+        cache and return it. Exceptions from fetch() are raised and nothing is cached."""
+        path = self.entry_path(endpoint, key)
+        value = self._read(path, ttl)
+        if value is not _MISSING:
+            self._record(endpoint, HIT)
+            return value
+
+        lock_file = open(path + '.lock', 'a')
+        try:
+            fcntl.flock(lock_file, fcntl.LOCK_EX)
+            value = self._read(path, ttl)
+            if value is not _MISSING:
+                self._record(endpoint, COALESCED)
+                return value
+            self._record(endpoint, MISS)
+            value = fetch()
+            self._write(path, value)
+            return value
+        finally:
+            lock_file.close()
+
+    async def get_async(self, endpoint: str, key: Any, fetch: Callable[[], Awaitable[Any]], ttl: float) -> Any:
+        """Same as get, for a coroutine function. Waiting for the lock happens in the default executor so the event
+        loop isn't blocked while another process refreshes the entry."""
+        path = self.entry_path(endpoint, key)
+        value = self._read(path, ttl)
+        if value is not _MISSING:
+            self._record(endpoint, HIT)
+            return value
+
+        lock_file = open(path + '.lock', 'a')
+        try:
+            await asyncio.get_event_loop().run_in_executor(None, fcntl.flock, lock_file, fcntl.LOCK_EX)
+            value = self._read(path, ttl)
+            if value is not _MISSING:
+                self._record(endpoint, COALESCED)
+                return value
+            self._record(endpoint, MISS)
+            value = await fetch()
+            self._write(path, value)
+            return value
+        finally:
+            lock_file.close()
+
+    def _read(self, path: str, ttl: float) -> Any:
+        try:
+            with open(path, 'rb') as f:
+                fetched_at, value = pickle.load(f)
+        except FileNotFoundError:
+            return _MISSING
+        except Exception:
+            log.warning(f"Ignoring unreadable shared cache entry {path}", exc_info=True)
+            return _MISSING
+        if time.time() - fetched_at >= ttl:
+            return _MISSING
+        return value
+
+    def _write(self, path: str, value: Any) -> None:
+        tmp_path = None
+        try:
+            with tempfile.NamedTemporaryFile(dir=self.path, prefix='.tmp-', delete=False) as f:
+                tmp_path = f.name
+                pickle.dump((time.time(), value), f, protocol=pickle.HIGHEST_PROTOCOL)
+            os.rename(tmp_path, path)
+        except Exception:
+            # Not being able to share a value must not fail the request that fetched it
+            log.warning(f"Could not write shared cache entry {path}", exc_info=True)
+            if tmp_path is not None:
+                try:
+                    os.unlink(tmp_path)
+                except OSError:
+                    pass
+        if time.time() - self._last_sweep >= SWEEP_INTERVAL:
+            self.sweep()
+
+    def sweep(self) -> None:
+        """Delete entries, lock files and leftover temporary files older than max_age"""
+        self._last_sweep = now = time.time()
+        try:
+            names = os.listdir(self.path)
+        except OSError:
+            log.warning(f"Could not sweep shared cache {self.path}", exc_info=True)
+            return
+        for name in names:
+            path = os.path.join(self.path, name)
+            try:
+                if now - os.lstat(path).st_mtime < self.max_age:
+                    continue
+                if name.endswith('.lock'):
+                    # Only remove locks nobody holds; the worst a race here can do is let two processes refresh the
+                    # same entry at once
+                    with open(path, 'a') as lock_file:
+                        fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                        os.unlink(path)
+                else:
+                    os.unlink(path)
+            except OSError:
+                # Vanished, or a lock someone holds
+                continue
+
+    def _record(self, endpoint: str, outcome: str) -> None:
+        self.stats[endpoint][outcome] += 1
+        if self.metrics is not None:
+            if (endpoint, outcome) not in self._counters:
+                self._counters[(endpoint, outcome)] = self.metrics.create_counter(f'{endpoint}.{outcome}')
+            self._counters[(endpoint, outcome)].count()
+
+
+_shared_cache: Optional[SharedCache] = None
+
+
+def configure(path: Optional[str], metrics: Optional[BaseMetrics]=None) -> Optional[SharedCache]:
+    """Share cached values through path from now on, or stop sharing them if path is None"""
+    global _shared_cache
+    _shared_cache = None
+    if path:
+        try:
+            _shared_cache = SharedCache(path, metrics=metrics)
+        except OSError:
+            log.error(f"Not sharing cached values through {path}", exc_info=True)
+    return _shared_cache
+
+
+def get_shared_cache() -> Optional[SharedCache]:
+    return _shared_cache
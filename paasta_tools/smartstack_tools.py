@@ -14,6 +14,8 @@
 import collections
 import csv
 import socket
+import threading
+import time
 from typing import cast
 from typing import Collection
 from typing import Container
@@ -21,7 +23,9 @@ from typing import DefaultDict
 from typing import Dict
 from typing import Iterable
 from typing import List
+from typing import Mapping
 from typing import Optional
+from typing import Set
 from typing import Tuple
 from typing import TypeVar
 
@@ -50,6 +54,153 @@ HaproxyBackend = TypedDict(
 )
 
 
+# How long the stats fetched from a synapse haproxy are reused for
+HAPROXY_STATS_TTL = 2
+
+
+class HaproxyStats:
+    """The backends listed in one haproxy stats CSV, indexed by pxname.
+
+    Rows are kept as lists and only turned into HaproxyBackend dicts for the services actually asked for, so
+    looking up a few services on a host with tens of thousands of backends is cheap.
+    """
+
+    def __init__(self, fieldnames: List[str], rows_by_pxname: Dict[str, List[Tuple[int, List[str]]]]) -> None:
+        self.fieldnames = fieldnames
+        self.rows_by_pxname = rows_by_pxname
+        self._up_ip_ports: Dict[str, Set[Tuple[str, int]]] = {}
+
+    @classmethod
+    def from_csv(cls, lines: Iterable[str]) -> 'HaproxyStats':
+        reader = csv.reader(lines)
+        try:
+            header = next(reader)
+        except StopIteration:
+            return cls([], {})
+        # clean up two irregularities of the CSV output: there's a leading "# "
+        # for no good reason, and there's a trailing comma on every line.
+        fieldnames = [name[2:] if name.startswith('# ') else name for name in header]
+        if fieldnames and fieldnames[-1] == '':
+            fieldnames.pop()
+        pxname_index = fieldnames.index('pxname')
+        svname_index = fieldnames.index('svname')
+
+        rows_by_pxname: Dict[str, List[Tuple[int, List[str]]]] = {}
+        for row_number, row in enumerate(reader):
+            # ignore the fictional FRONTEND/BACKEND hosts
+            if len(row) <= svname_index or row[svname_index] in ('FRONTEND', 'BACKEND'):
+                continue
+            rows_by_pxname.setdefault(row[pxname_index], []).append((row_number, row))
+        return cls(fieldnames, rows_by_pxname)
+
+    def _to_backend(self, row: List[str]) -> HaproxyBackend:
+        return cast(HaproxyBackend, dict(zip(self.fieldnames, row)))
+
+    def get_backends(self, services: Optional[Container[str]]=None) -> List[HaproxyBackend]:
+        """Returns the backends of the given services (all services if None), in the order haproxy listed them."""
+        if services is None:
+            pxnames: Collection[str] = self.rows_by_pxname.keys()
+        elif isinstance(services, Iterable) and not isinstance(services, str):
+            pxnames = set(services)
+        else:
+            pxnames = [pxname for pxname in self.rows_by_pxname if pxname in services]
+        rows = [row for pxname in pxnames for row in self.rows_by_pxname.get(pxname, [])]
+        if len(pxnames) > 1:
+            rows.sort(key=lambda numbered_row: numbered_row[0])
+        return [self._to_backend(row) for _, row in rows]
+
+    def get_up_ip_ports(self, service: str) -> Set[Tuple[str, int]]:
+        """Returns the (ip, port) of each UP backend of service. Worked out once per service."""
+        ip_ports = self._up_ip_ports.get(service)
+        if ip_ports is None:
+            ip_ports = set()
+            for backend in self.get_backends([service]):
+                if backend_is_up(backend):
+                    ip, port, _ = ip_port_hostname_from_svname(backend['svname'])
+                    ip_ports.add((ip, port))
+            self._up_ip_ports[service] = ip_ports
+        return ip_ports
+
+
+class HaproxyStatsClient:
+    """Fetches haproxy stats from synapse hosts over pooled keep-alive connections, reusing the parsed stats of
+    each host for ttl seconds. Safe to share between threads: concurrent lookups against a stale host wait for a
+    single fetch rather than each making their own."""
+
+    def __init__(self, ttl: float=HAPROXY_STATS_TTL) -> None:
+        self.ttl = ttl
+        self._lock = threading.Lock()
+        self._session: Optional[requests.Session] = None
+        self._cache: Dict[str, Tuple[float, HaproxyStats]] = {}
+        self._uri_locks: Dict[str, threading.Lock] = {}
+        self.hits = 0
+        self.misses = 0
+        self.staleness = 0.0
+
+    @property
+    def session(self) -> requests.Session:
+        with self._lock:
+            if self._session is None:
+                session = requests.Session()
+                session.headers.update({'User-Agent': get_user_agent()})
+                # retry 3 times, and keep a connection pool for plenty of synapse hosts at once
+                for prefix in ('http://', 'https://'):
+                    session.mount(prefix, requests.adapters.HTTPAdapter(max_retries=3, pool_connections=100))
+                self._session = session
+            return self._session
+
+    def fetch_csv(self, synapse_uri: str) -> str:
+        # timeout after 1 second
+        return self.session.get(synapse_uri, timeout=1).text
+
+    def get_stats(
+        self,
+        synapse_host: str,
+        synapse_port: int,
+        synapse_haproxy_url_format: str,
+    ) -> HaproxyStats:
+        synapse_uri = synapse_haproxy_url_format.format(host=synapse_host, port=synapse_port)
+        with self._lock:
+            uri_lock = self._uri_locks.setdefault(synapse_uri, threading.Lock())
+        with uri_lock:
+            now = time.time()
+            with self._lock:
+                cached = self._cache.get(synapse_uri)
+                if cached is not None and now - cached[0] < self.ttl:
+                    self.hits += 1
+                    self.staleness = now - cached[0]
+                    return cached[1]
+
+            stats = HaproxyStats.from_csv(self.fetch_csv(synapse_uri).splitlines())
+            with self._lock:
+                self.misses += 1
+                self.staleness = 0.0
+                # drop the stats of hosts nobody has asked about lately
+                self._cache = {uri: entry for uri, entry in self._cache.items() if now - entry[0] < self.ttl}
+                self._cache[synapse_uri] = (now, stats)
+                self._uri_locks = {uri: lock for uri, lock in self._uri_locks.items() if uri in self._cache}
+            return stats
+
+    def get_metrics(self) -> Dict[str, float]:
+        """Returns how many lookups were answered from already fetched stats (hits) or needed a fetch (misses), the
+        fraction of hits, and the age in seconds of the stats used by the latest lookup (staleness)."""
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                'hits': self.hits,
+                'misses': self.misses,
+                'hit_rate': self.hits / lookups if lookups else 0.0,
+                'staleness': self.staleness,
+            }
+
+
+_haproxy_stats_client = HaproxyStatsClient()
+
+
+def get_haproxy_stats_client() -> HaproxyStatsClient:
+    return _haproxy_stats_client
+
+
 def retrieve_haproxy_csv(
     synapse_host: str,
     synapse_port: int,
@@ -62,20 +213,7 @@ def retrieve_haproxy_csv(
     :returns reader: a csv.DictReader object
     """
     synapse_uri = synapse_haproxy_url_format.format(host=synapse_host, port=synapse_port)
-
-    # timeout after 1 second and retry 3 times
-    haproxy_request = requests.Session()
-    haproxy_request.headers.update({'User-Agent': get_user_agent()})
-    haproxy_request.mount(
-        'http://',
-        requests.adapters.HTTPAdapter(max_retries=3),
-    )
-    haproxy_request.mount(
-        'https://',
-        requests.adapters.HTTPAdapter(max_retries=3),
-    )
-    haproxy_response = haproxy_request.get(synapse_uri, timeout=1)
-    haproxy_data = haproxy_response.text
+    haproxy_data = get_haproxy_stats_client().fetch_csv(synapse_uri)
     reader = csv.DictReader(haproxy_data.splitlines())
     return reader
 
@@ -123,24 +261,12 @@ def get_multiple_backends(
                        services or the requested service
     """
 
-    reader = retrieve_haproxy_csv(synapse_host, synapse_port, synapse_haproxy_url_format=synapse_haproxy_url_format)
-    backends = []
-
-    for line in reader:
-        # clean up two irregularities of the CSV output, relative to
-        # DictReader's behavior there's a leading "# " for no good reason:
-        line['pxname'] = line.pop('# pxname')
-        # and there's a trailing comma on every line:
-        line.pop('')
-
-        # Look for the service in question and ignore the fictional
-        # FRONTEND/BACKEND hosts, use starts_with so that hosts that are UP
-        # with 1/X healthchecks to go before going down get counted as UP:
-        ha_slave, ha_service = line['svname'], line['pxname']
-        if (services is None or ha_service in services) and ha_slave not in ('FRONTEND', 'BACKEND'):
-            backends.append(cast(HaproxyBackend, line))
-
-    return backends
+    stats = get_haproxy_stats_client().get_stats(
+        synapse_host=synapse_host,
+        synapse_port=synapse_port,
+        synapse_haproxy_url_format=synapse_haproxy_url_format,
+    )
+    return stats.get_backends(services)
 
 
 def load_smartstack_info_for_service(
@@ -409,6 +535,53 @@ def match_backends_and_tasks(
     return backend_task_pairs
 
 
+class SmartstackRegistrationService:
+    """Answers which marathon tasks are registered in smartstack, for any number of services at once.
+
+    Lookups go through the shared HaproxyStatsClient, so the haproxy stats of each synapse host are fetched at most
+    once per its ttl however many bounces ask about that host in the meantime, and the UP backends of each service
+    are indexed by (ip, port) once per fetched stats. Safe to share between threads.
+    """
+
+    def get_registered_tasks(
+        self,
+        synapse_host: str,
+        synapse_port: int,
+        synapse_haproxy_url_format: str,
+        tasks_by_service: Mapping[str, Iterable[marathon_tools.MarathonTask]],
+    ) -> Dict[str, List[marathon_tools.MarathonTask]]:
+        """Returns, for each service (nerve_ns) in tasks_by_service, those of its tasks that the haproxy on
+        synapse_host has an UP backend for. Matches tasks to backends the same way as get_registered_marathon_tasks.
+        """
+        stats = get_haproxy_stats_client().get_stats(
+            synapse_host=synapse_host,
+            synapse_port=synapse_port,
+            synapse_haproxy_url_format=synapse_haproxy_url_format,
+        )
+        ips_by_host: Dict[str, str] = {}
+        registered_tasks: Dict[str, List[marathon_tools.MarathonTask]] = {}
+        for service, tasks in tasks_by_service.items():
+            ip_ports = stats.get_up_ip_ports(service)
+            registered_tasks[service] = []
+            for task in tasks:
+                if task.host not in ips_by_host:
+                    ips_by_host[task.host] = socket.gethostbyname(task.host)
+                if any((ips_by_host[task.host], port) in ip_ports for port in task.ports):
+                    registered_tasks[service].append(task)
+        return registered_tasks
+
+    def get_metrics(self) -> Dict[str, float]:
+        """The hits, misses, hit rate and staleness of the haproxy stats lookups, see HaproxyStatsClient.get_metrics"""
+        return get_haproxy_stats_client().get_metrics()
+
+
+_smartstack_registration_service = SmartstackRegistrationService()
+
+
+def get_smartstack_registration_service() -> SmartstackRegistrationService:
+    return _smartstack_registration_service
+
+
 _MesosSlaveDict = TypeVar('_MesosSlaveDict', bound=Dict)  # no type has been defined in mesos_tools for these yet.
 
 
@@ -458,14 +631,29 @@ class SmartstackReplicationChecker:
         :returns: a dict {'location_type': {'service.instance': int}}
         """
         replication_info = {}
-        attribute_slave_dict = self._get_allowed_locations_and_slaves(instance_config)
-        instance_pool = instance_config.get_pool()
-        for location, slaves in attribute_slave_dict.items():
-            slave_to_check = self._get_first_slave_in_pool(slaves, instance_pool)
-            hostname = slave_to_check['hostname']
+        for location, hostname in self.get_synapse_hosts_for_instance(instance_config).items():
             replication_info[location] = self._get_replication_info(location, hostname, instance_config)
         return replication_info
 
+    def get_synapse_hosts_for_instance(self, instance_config: InstanceConfig) -> Dict[str, str]:
+        """Returns the host whose synapse haproxy we would ask about the instance in each discoverable location.
+
+        :param instance_config: An instance of MarathonServiceConfig.
+        :returns: a dict {'location_type': 'hostname'}
+        """
+        attribute_slave_dict = self._get_allowed_locations_and_slaves(instance_config)
+        instance_pool = instance_config.get_pool()
+        return {
+            location: self._get_first_slave_in_pool(slaves, instance_pool)['hostname']
+            for location, slaves in attribute_slave_dict.items()
+        }
+
+    def prefetch_replication_for_location(self, location: str, hostname: str) -> None:
+        """Fetch the replication of all services in a location so later calls of get_replication_for_instance
+        don't have to. Safe to call from several threads for different locations."""
+        if location not in self._cache:
+            self._cache[location] = self._get_replication_for_host(hostname)
+
     def _get_first_slave_in_pool(
         self,
         slaves: List[_MesosSlaveDict],
@@ -476,6 +664,14 @@ class SmartstackReplicationChecker:
                 return slave
         return slaves[0]
 
+    def _get_replication_for_host(self, hostname: str) -> Dict[str, int]:
+        # locations served by the same host share its haproxy stats through the HaproxyStatsClient
+        return get_replication_for_all_services(
+            synapse_host=hostname,
+            synapse_port=self._synapse_port,
+            synapse_haproxy_url_format=self._synapse_haproxy_url_format,
+        )
+
     def _get_replication_info(
         self,
         location: str,
@@ -492,11 +688,7 @@ class SmartstackReplicationChecker:
         """
         full_name = compose_job_id(instance_config.service, instance_config.instance)
         if location not in self._cache:
-            self._cache[location] = get_replication_for_all_services(
-                synapse_host=hostname,
-                synapse_port=self._synapse_port,
-                synapse_haproxy_url_format=self._synapse_haproxy_url_format,
-            )
+            self._cache[location] = self._get_replication_for_host(hostname)
         return {full_name: self._cache[location][full_name]}
 
     def _get_allowed_locations_and_slaves(self, instance_config: InstanceConfig) -> Dict[str, List[dict]]:
@@ -0,0 +1,141 @@
+"""A process-wide cache of parsed soa-configs files.
+
+Entries are keyed on the paths they were loaded from and are only reused while the
+(mtime, size, inode) of every one of those files is unchanged, so a full enumeration
+of the cluster's services only re-parses the files that changed since the last one.
+The cache is bounded and evicts the least recently used entries first.
+
+Cached values are shared between every caller that loads them, so callers must not mutate what they get back;
+copy it first, as deep_merge_dictionaries does for its defaults.
+"""
+import json
+import logging
+import os
+import threading
+from collections import OrderedDict
+from typing import Any
+from typing import Callable
+from typing import Optional
+from typing import Sequence
+from typing import Tuple
+
+import service_configuration_lib
+
+log = logging.getLogger(__name__)
+
+DEFAULT_MAX_ENTRIES = 16384
+
+StatKey = Optional[Tuple[int, int, int]]
+
+# The files service_configuration_lib.read_service_configuration reads for a service
+SERVICE_CONFIGURATION_FILES = (
+    'port',
+    'vip',
+    'lb.yaml',
+    'monitoring.yaml',
+    'deploy.yaml',
+    'data.yaml',
+    'smartstack.yaml',
+    'service.yaml',
+    'dependencies.yaml',
+)
+
+
+def stat_key(path: str) -> StatKey:
+    try:
+        st = os.stat(path)
+    except OSError:
+        return None
+    return (st.st_mtime_ns, st.st_size, st.st_ino)
+
+
+class SoaConfigCache:
+    """Thread safe LRU cache of values loaded from files on disk.
+
+    Values are not copied on the way in or out, so a hit costs no more than the stats of its files.
+    """
+
+    def __init__(self, max_entries: int=DEFAULT_MAX_ENTRIES) -> None:
+        self.max_entries = max_entries
+        self.lock = threading.Lock()
+        # key -> (paths, stat keys of those paths, value)
+        self.entries: OrderedDict = OrderedDict()
+        self.hits = 0
+        self.misses = 0
+
+    def load(self, key: Any, paths: Sequence[str], loader: Callable[[], Any]) -> Any:
+        """Return loader() as of the current contents of paths, calling it only if one of paths has changed since
+        the value cached under key was loaded. Nothing is cached when none of paths exists."""
+        stats = tuple(stat_key(path) for path in paths)
+        with self.lock:
+            entry = self.entries.get(key)
+            if entry is not None and entry[1] == stats:
+                self.entries.move_to_end(key)
+                self.hits += 1
+                return entry[2]
+            self.misses += 1
+
+        value = loader()
+        if any(stats):
+            with self.lock:
+                self.entries[key] = (tuple(paths), stats, value)
+                self.entries.move_to_end(key)
+                while len(self.entries) > self.max_entries:
+                    self.entries.popitem(last=False)
+        return value
+
+    def invalidate(self, path: Optional[str]=None) -> None:
+        """Forget every entry loaded from path, or from anything under it if it is a directory. With no path the
+        whole cache is cleared."""
+        with self.lock:
+            if path is None:
+                self.entries.clear()
+                return
+            path = os.path.abspath(path)
+            prefix = path.rstrip(os.sep) + os.sep
+            stale = [
+                key for key, (paths, _, _) in self.entries.items()
+                if any(p == path or p.startswith(prefix) for p in paths)
+            ]
+            for key in stale:
+                del self.entries[key]
+        if stale:
+            log.debug(f"Invalidated {len(stale)} cached soa-configs entries for {path}")
+
+    def __len__(self) -> int:
+        return len(self.entries)
+
+
+soa_config_cache = SoaConfigCache()
+
+
+def invalidate(path: Optional[str]=None) -> None:
+    soa_config_cache.invalidate(path)
+
+
+def read_extra_service_information(service: str, extra_info: str, soa_dir: str) -> Any:
+    """Cached equivalent of service_configuration_lib.read_extra_service_information"""
+    path = os.path.join(os.path.abspath(soa_dir), service, extra_info + '.yaml')
+    return soa_config_cache.load(
+        key=('extra_service_information', path),
+        paths=[path],
+        loader=lambda: service_configuration_lib.read_extra_service_information(service, extra_info, soa_dir=soa_dir),
+    )
+
+
+def read_service_configuration(service: str, soa_dir: str) -> Any:
+    """Cached equivalent of service_configuration_lib.read_service_configuration"""
+    service_dir = os.path.join(os.path.abspath(soa_dir), service)
+    return soa_config_cache.load(
+        key=('service_configuration', service_dir),
+        paths=[os.path.join(service_dir, name) for name in SERVICE_CONFIGURATION_FILES],
+        loader=lambda: service_configuration_lib.read_service_configuration(service, soa_dir=soa_dir),
+    )
+
+
+def read_json_file(path: str) -> Any:
+    """json.load the file at path, raising the usual OSError if it can't be read"""
+    def loader() -> Any:
+        with open(path) as f:
+            return json.load(f)
+    return soa_config_cache.load(key=('json', os.path.abspath(path)), paths=[os.path.abspath(path)], loader=loader)
@@ -10,11 +10,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import hashlib
 import logging
 from urllib.parse import urljoin
 
 import requests
 import yaml
+from requests.adapters import HTTPAdapter
 
 from paasta_tools.utils import get_user_agent
 
@@ -22,17 +24,30 @@ from paasta_tools.utils import get_user_agent
 log = logging.getLogger(__name__)
 
 
+DEFAULT_POOL_MAXSIZE = 10
+
+
 class TronRequestError(Exception):
     pass
 
 
+def config_hash(config):
+    """The digest Tron reports as the 'hash' of a namespace's config text"""
+    return hashlib.sha1(config.encode('utf-8')).hexdigest()
+
+
 class TronClient:
     """
     Client for interacting with a Tron master.
     """
 
-    def __init__(self, url):
+    def __init__(self, url, pool_maxsize=DEFAULT_POOL_MAXSIZE):
         self.master_url = url
+        # One keep-alive session shared by every request; safe to use from several threads at once
+        self.session = requests.Session()
+        adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_maxsize)
+        self.session.mount('http://', adapter)
+        self.session.mount('https://', adapter)
 
     def _request(self, method, url, data):
         headers = {'User-Agent': get_user_agent()}
@@ -42,10 +57,10 @@ class TronClient:
         }
         if method == 'GET':
             kwargs['params'] = data
-            response = requests.get(**kwargs)
+            response = self.session.get(**kwargs)
         elif method == 'POST':
             kwargs['data'] = data
-            response = requests.post(**kwargs)
+            response = self.session.post(**kwargs)
         else:
             raise ValueError(f'Unrecognized method: {method}')
 
@@ -91,7 +106,11 @@ class TronClient:
         )
 
         if skip_if_unchanged:
-            if yaml.load(new_config) == yaml.load(current_config['config']):
+            # Comparing digests first saves parsing both documents in the common unchanged case
+            if (
+                current_config.get('hash') == config_hash(new_config) or
+                yaml.load(new_config) == yaml.load(current_config['config'])
+            ):
                 log.debug('No change in config, skipping update.')
                 return
 
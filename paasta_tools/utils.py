@@ -11,6 +11,7 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import atexit
 import contextlib
 import copy
 import datetime
@@ -72,6 +73,7 @@ from kazoo.client import KazooClient
 from mypy_extensions import TypedDict
 
 import paasta_tools.cli.fsm
+from paasta_tools import soa_config_cache
 
 
 # DO NOT CHANGE SPACER, UNLESS YOU'RE PREPARED TO CHANGE ALL INSTANCES
@@ -1158,7 +1160,8 @@ def format_log_line(
     validate_log_component(component)
     if not timestamp:
         timestamp = _now()
-    line = remove_ansi_escape_sequences(line)
+    if '\x1b' in line:
+        line = remove_ansi_escape_sequences(line)
     message = json.dumps(
         {
             'timestamp': timestamp,
@@ -1306,6 +1309,141 @@ class FileLogWriter(LogWriter):
             )
 
 
+@register_log_writer('buffered_file')
+class BufferedFileLogWriter(FileLogWriter):
+    """A FileLogWriter for processes that log many lines in bursts, like deployd and setup_marathon_job during big
+    bounces.
+
+    Lines are buffered in memory per path and written by a background thread, every flush_interval seconds or as soon
+    as a path has max_buffer_bytes waiting. Each path's batch goes out with a single write call, so a batch is as
+    atomic as a line written by FileLogWriter. Up to max_open_files files are kept open between batches, and a file is
+    reopened if it has been rotated away. Anything still buffered is written at exit.
+    """
+
+    def __init__(
+        self,
+        path_format: str,
+        mode: str='a+',
+        line_delimeter: str='\n',
+        flock: bool=False,
+        flush_interval: float=1.0,
+        max_buffer_bytes: int=64 * 1024,
+        max_open_files: int=64,
+    ) -> None:
+        super().__init__(path_format, mode=mode, line_delimeter=line_delimeter, flock=flock)
+        self.flush_interval = flush_interval
+        self.max_buffer_bytes = max_buffer_bytes
+        self.max_open_files = max_open_files
+        # path -> encoded lines waiting to be written, and their total size
+        self._buffers: Dict[str, List[bytes]] = {}
+        self._buffered_bytes: Dict[str, int] = {}
+        self._buffers_lock = threading.Lock()
+        # Held while writing, so batches for a path are written in the order they were buffered
+        self._write_lock = threading.Lock()
+        # path -> open file, least recently written first
+        self._files: Dict[str, io.FileIO] = OrderedDict()
+        self._wakeup = threading.Event()
+        self._flusher_pid: Optional[int] = None
+        atexit.register(self.flush)
+
+    def log(
+        self,
+        service: str,
+        line: str,
+        component: str,
+        level: str=DEFAULT_LOGLEVEL,
+        cluster: str=ANY_CLUSTER,
+        instance: str=ANY_INSTANCE,
+    ) -> None:
+        if self._flusher_pid != os.getpid():
+            self._start_flusher()
+
+        path = self.format_path(service, component, level, cluster, instance)
+        to_write = "{}{}".format(
+            format_log_line(level, cluster, service, instance, component, line),
+            self.line_delimeter,
+        ).encode('UTF-8')
+
+        with self._buffers_lock:
+            self._buffers.setdefault(path, []).append(to_write)
+            buffered_bytes = self._buffered_bytes.get(path, 0) + len(to_write)
+            self._buffered_bytes[path] = buffered_bytes
+        if buffered_bytes >= self.max_buffer_bytes:
+            self._wakeup.set()
+
+    def _start_flusher(self) -> None:
+        if self._flusher_pid is not None:
+            # We were forked after logging: the parent still writes the lines it had buffered, and its flusher thread
+            # and any lock it held at the time of the fork didn't come along, so start over.
+            self._buffers, self._buffered_bytes = {}, {}
+            self._buffers_lock, self._write_lock = threading.Lock(), threading.Lock()
+            self._files = OrderedDict()
+        self._flusher_pid = os.getpid()
+        threading.Thread(target=self._flush_periodically, name='log-flusher', daemon=True).start()
+
+    def _flush_periodically(self) -> None:
+        while True:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                paasta_print(f"Could not flush buffered log lines: {type(e).__name__}: {e}", file=sys.stderr)
+
+    def flush(self) -> None:
+        """Write every buffered line, with one write per path."""
+        if self._flusher_pid is not None and self._flusher_pid != os.getpid():
+            # A forked child that hasn't logged yet: the buffered lines are its parent's to write, and a lock held at
+            # the time of the fork would never be released here.
+            return
+        with self._write_lock:
+            with self._buffers_lock:
+                buffers, self._buffers, self._buffered_bytes = self._buffers, {}, {}
+            for path, lines in buffers.items():
+                self._write(path, b''.join(lines))
+
+    def _write(self, path: str, to_write: bytes) -> None:
+        try:
+            f = self._open(path)
+            with self.maybe_flock(f):
+                # remove type ignore comment below once https://github.com/python/typeshed/pull/1541 is merged.
+                f.write(to_write)  # type: ignore
+        except IOError as e:
+            self._close(path)
+            paasta_print(
+                "Could not log to {}: {}: {} -- would have logged: {}".format(
+                    path, type(e).__name__, str(e), to_write.decode('UTF-8'),
+                ),
+                file=sys.stderr,
+            )
+
+    def _open(self, path: str) -> io.FileIO:
+        f = self._files.pop(path, None)
+        if f is not None:
+            try:
+                stat, fstat = os.stat(path), os.fstat(f.fileno())
+                rotated = (stat.st_dev, stat.st_ino) != (fstat.st_dev, fstat.st_ino)
+            except FileNotFoundError:
+                rotated = True
+            if rotated:
+                f.close()
+                f = None
+        if f is None:
+            f = io.FileIO(path, mode=self.mode, closefd=True)
+            while len(self._files) >= self.max_open_files:
+                self._files.pop(next(iter(self._files))).close()
+        self._files[path] = f
+        return f
+
+    def _close(self, path: str) -> None:
+        f = self._files.pop(path, None)
+        if f is not None:
+            try:
+                f.close()
+            except IOError:
+                pass
+
+
 @contextlib.contextmanager
 def flock(fd: _AnyIO) -> Iterator[None]:
     try:
@@ -1458,6 +1596,8 @@ SystemPaastaConfigDict = TypedDict(
         'deployd_startup_bounce_rate': float,
         'deployd_log_level': str,
         'deployd_startup_oracle_enabled': bool,
+        'deployd_marathon_snapshot_max_age': float,
+        'deployd_marathon_snapshot_resync_interval': float,
         'cluster_autoscaling_draining_enabled': bool,
         'cluster_autoscaler_max_decrease': float,
         'cluster_autoscaler_max_increase': float,
@@ -1855,6 +1995,22 @@ class SystemPaastaConfig:
         """
         return self.config_dict.get("deployd_log_level", 'INFO')
 
+    def get_deployd_marathon_snapshot_max_age(self) -> float:
+        """Get the number of seconds deployd workers may use cached marathon apps
+        for a service instance before fetching them again
+
+        :return: float
+        """
+        return float(self.config_dict.get("deployd_marathon_snapshot_max_age", 10))
+
+    def get_deployd_marathon_snapshot_resync_interval(self) -> float:
+        """Get the number of seconds between full refreshes of deployd's marathon
+        app snapshot
+
+        :return: float
+        """
+        return float(self.config_dict.get("deployd_marathon_snapshot_resync_interval", 300))
+
     def get_use_mesos_healthchecks(self) -> bool:
         """Get a boolean indicating whether HTTP(S) healthchecks should
         be driven by Mesos, rather than Marathon
@@ -2247,7 +2403,7 @@ def list_all_instances_for_service(
 
 def get_tron_instance_list_from_yaml(service: str, conf_file: str, soa_dir: str) -> Collection[Tuple[str, str]]:
     instance_list = []
-    tron_config_content = service_configuration_lib.read_extra_service_information(
+    tron_config_content = soa_config_cache.read_extra_service_information(
         service,
         conf_file,
         soa_dir=soa_dir,
@@ -2261,7 +2417,7 @@ def get_tron_instance_list_from_yaml(service: str, conf_file: str, soa_dir: str)
 
 def get_instance_list_from_yaml(service: str, conf_file: str, soa_dir: str) -> Collection[Tuple[str, str]]:
     instance_list = []
-    instances = service_configuration_lib.read_extra_service_information(
+    instances = soa_config_cache.read_extra_service_information(
         service,
         conf_file,
         soa_dir=soa_dir,
@@ -2385,9 +2541,9 @@ def get_docker_client() -> Client:
         return Client(base_url=get_docker_host(), **client_opts)
 
 
-def get_running_mesos_docker_containers() -> List[Dict]:
+def get_running_mesos_docker_containers(filters: Optional[Dict[str, Any]]=None) -> List[Dict]:
     client = get_docker_client()
-    running_containers = client.containers()
+    running_containers = client.containers(filters=filters)
     return [container for container in running_containers if "mesos-" in container["Names"][0]]
 
 
@@ -2426,8 +2582,7 @@ class NoDeploymentsAvailable(Exception):
 def load_deployments_json(service: str, soa_dir: str=DEFAULT_SOA_DIR) -> 'DeploymentsJsonV1':
     deployment_file = os.path.join(soa_dir, service, 'deployments.json')
     if os.path.isfile(deployment_file):
-        with open(deployment_file) as f:
-            return DeploymentsJsonV1(json.load(f)['v1'])
+        return DeploymentsJsonV1(soa_config_cache.read_json_file(deployment_file)['v1'])
     else:
         e = f"{deployment_file} was not found. 'generate_deployments_for_service --service {service}' must be run first"
         raise NoDeploymentsAvailable(e)
@@ -2436,8 +2591,7 @@ def load_deployments_json(service: str, soa_dir: str=DEFAULT_SOA_DIR) -> 'Deploy
 def load_v2_deployments_json(service: str, soa_dir: str=DEFAULT_SOA_DIR) -> 'DeploymentsJsonV2':
     deployment_file = os.path.join(soa_dir, service, 'deployments.json')
     if os.path.isfile(deployment_file):
-        with open(deployment_file) as f:
-            return DeploymentsJsonV2(service=service, config_dict=json.load(f)['v2'])
+        return DeploymentsJsonV2(service=service, config_dict=soa_config_cache.read_json_file(deployment_file)['v2'])
     else:
         e = f"{deployment_file} was not found. 'generate_deployments_for_service --service {service}' must be run first"
         raise NoDeploymentsAvailable(e)
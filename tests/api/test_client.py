@@ -11,10 +11,13 @@
 # WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
 # See the License for the specific language governing permissions and
 # limitations under the License.
+import json
+
 import mock
 from bravado.exception import HTTPError
 from bravado.requests_client import RequestsResponseAdapter
 
+from paasta_tools.api import client
 from paasta_tools.api.client import get_paasta_api_client
 from paasta_tools.cli.cmds.status import paasta_status_on_api_endpoint
 
@@ -30,6 +33,25 @@ def test_get_paasta_api_client(system_paasta_config):
         assert client
 
 
+def test_get_paasta_api_client_is_cached(system_paasta_config):
+    system_paasta_config.config_dict['api_endpoints']['other_cluster'] = 'http://other_cluster:5054'
+    with mock.patch.dict(
+        'paasta_tools.api.client._clients', clear=True,
+    ), mock.patch(
+        'paasta_tools.api.client.json.load', autospec=True, side_effect=json.load,
+    ) as mock_json_load:
+        client.load_swagger_spec.cache_clear()
+        first = get_paasta_api_client('fake_cluster', system_paasta_config)
+        assert get_paasta_api_client('fake_cluster', system_paasta_config) is first
+        assert get_paasta_api_client('fake_cluster', system_paasta_config, http_res=True) is not first
+
+        other = get_paasta_api_client('other_cluster', system_paasta_config)
+        assert other is not first
+        assert other.swagger_spec.spec_dict['host'] == 'other_cluster:5054'
+        assert first.swagger_spec.spec_dict['host'] == 'fake_cluster:5054'
+        assert mock_json_load.call_count == 1
+
+
 class Struct:
     """
     convert a dictionary to an object
@@ -25,7 +25,7 @@ from paasta_tools.chronos_tools import ChronosJobConfig
 
 
 @mock.patch('paasta_tools.api.views.instance.marathon_job_status', autospec=True)
-@mock.patch('paasta_tools.api.views.instance.marathon_tools.get_matching_appids', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.marathon_tools.get_all_marathon_apps', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.marathon_tools.load_marathon_service_config', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.validate_service_instance', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.get_actual_deployments', autospec=True)
@@ -33,7 +33,7 @@ def test_instances_status_marathon(
     mock_get_actual_deployments,
     mock_validate_service_instance,
     mock_load_marathon_service_config,
-    mock_get_matching_appids,
+    mock_get_all_marathon_apps,
     mock_marathon_job_status,
 ):
     settings.cluster = 'fake_cluster'
@@ -47,7 +47,11 @@ def test_instances_status_marathon(
 
     settings.marathon_clients = mock.Mock()
 
-    mock_get_matching_appids.return_value = ['a', 'b']
+    mock_get_all_marathon_apps.return_value = [
+        mock.Mock(id='/fake--service.fake--instance.git1.config1'),
+        mock.Mock(id='/fake--service.fake--instance.git2.config2'),
+        mock.Mock(id='/fake--service.other--instance.git1.config1'),
+    ]
     mock_service_config = marathon_tools.MarathonServiceConfig(
         service='fake_service',
         cluster='fake_cluster',
@@ -64,6 +68,7 @@ def test_instances_status_marathon(
     response = instance.instance_status(request)
     assert response['marathon']['bounce_method'] == 'fake_bounce'
     assert response['marathon']['desired_state'] == 'start'
+    assert response['marathon']['app_count'] == 2
 
 
 @mock.patch('paasta_tools.api.views.instance.chronos_tools.load_chronos_config', autospec=True)
@@ -168,10 +173,11 @@ def test_marathon_job_status_verbose(
     app.instances = 5
     app.tasks_running = 5
     app.deployments = []
-    app.id = 'mock_app_id'
+    app.id = '/mock_app_id'
 
     client = mock.create_autospec(marathon.MarathonClient)
-    client.get_app.return_value = app
+    client.list_apps.return_value = [app]
+    client.list_queue.return_value = []
 
     job_config = mock.create_autospec(marathon_tools.MarathonServiceConfig)
     job_config.format_marathon_app_dict.return_value = {'id': 'mock_app_id'}
@@ -191,6 +197,91 @@ def test_marathon_job_status_verbose(
     assert mstatus == expected
 
 
+def test_marathon_job_status_shares_snapshot():
+    delayed_app = mock.create_autospec(marathon.models.app.MarathonApp)
+    delayed_app.id = '/delayed_app_id'
+    delayed_app.tasks_running = 0
+    queue_item = mock.Mock(app=delayed_app)
+    queue_item.delay.overdue = False
+    queue_item.delay.time_left_seconds = 30
+
+    client = mock.create_autospec(marathon.MarathonClient)
+    client.list_apps.return_value = [delayed_app]
+    client.list_queue.return_value = [queue_item]
+    snapshot = instance.StatusSnapshot(['fake_service'])
+
+    statuses = []
+    for app_id in ('delayed_app_id', 'missing_app_id'):
+        job_config = mock.create_autospec(marathon_tools.MarathonServiceConfig)
+        job_config.format_marathon_app_dict.return_value = {'id': app_id}
+        job_config.get_instances.return_value = 1
+        mstatus = {}
+        instance.marathon_job_status(mstatus, client, job_config, verbose=False, snapshot=snapshot)
+        statuses.append(mstatus)
+
+    assert statuses == [
+        {
+            'app_id': 'delayed_app_id',
+            'expected_instance_count': 1,
+            'deploy_status': 'Delayed',
+            'running_instance_count': 0,
+            'backoff_seconds': 30,
+        },
+        {
+            'app_id': 'missing_app_id',
+            'expected_instance_count': 1,
+            'deploy_status': 'NotRunning',
+            'running_instance_count': 0,
+        },
+    ]
+    client.list_apps.assert_called_once_with(embed_tasks=False, app_id='/fake--service.')
+    client.list_queue.assert_called_once_with()
+
+
+@mock.patch('paasta_tools.api.views.instance.get_instance_status', autospec=True)
+@mock.patch('paasta_tools.api.views.instance.get_service_instance_list', autospec=True)
+def test_instances_status(mock_get_service_instance_list, mock_get_instance_status):
+    settings.cluster = 'fake_cluster'
+    settings.soa_dir = '/fake/soa'
+    mock_get_service_instance_list.return_value = [('fake_service', 'main'), ('fake_service', 'canary')]
+
+    def get_instance_status(service, instance, verbose, snapshot):
+        if instance == 'canary':
+            raise ApiFailure('deployment key fake_cluster.canary not found', 404)
+        return {'service': service, 'instance': instance}
+    mock_get_instance_status.side_effect = get_instance_status
+
+    request = testing.DummyRequest()
+    request.swagger_data = {'service': 'fake_service', 'instances': ['other.main', 'fake_service.main']}
+    assert instance.instances_status(request) == [
+        {'service': 'fake_service', 'instance': 'main'},
+        {
+            'service': 'fake_service',
+            'instance': 'canary',
+            'error_code': 404,
+            'error_message': 'deployment key fake_cluster.canary not found',
+        },
+        {'service': 'other', 'instance': 'main'},
+    ]
+    mock_get_service_instance_list.assert_called_once_with('fake_service', cluster='fake_cluster', soa_dir='/fake/soa')
+    snapshots = {call[0][3] for call in mock_get_instance_status.call_args_list}
+    assert len(snapshots) == 1
+    assert snapshots.pop().service is None
+
+
+def test_instances_status_bad_request():
+    request = testing.DummyRequest()
+    request.swagger_data = {}
+    with raises(ApiFailure) as excinfo:
+        instance.instances_status(request)
+    assert excinfo.value.err == 400
+
+    request.swagger_data = {'instances': ['no_instance']}
+    with raises(ApiFailure) as excinfo:
+        instance.instances_status(request)
+    assert excinfo.value.err == 400
+
+
 @mock.patch('paasta_tools.api.views.instance.add_executor_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.add_slave_info', autospec=True)
 @mock.patch('paasta_tools.api.views.instance.instance_status', autospec=True)
@@ -0,0 +1,29 @@
+import mock
+from pyramid import testing
+
+from paasta_tools.api.views.metastatus import metastatus
+from paasta_tools.shared_cache import SharedCache
+
+
+@mock.patch('paasta_tools.api.views.metastatus.get_output', autospec=True, return_value=('output', 0))
+def test_metastatus_shares_known_flags(mock_get_output, tmpdir):
+    cache = SharedCache(str(tmpdir.join('cache')))
+    with mock.patch('paasta_tools.api.views.metastatus.shared_cache._shared_cache', cache, autospec=None):
+        for cmd_args in (['-v', '-a'], ['-a', '-v']):
+            request = testing.DummyRequest()
+            request.swagger_data = {'cmd_args': cmd_args}
+            assert metastatus(request) == {'output': 'output', 'exit_code': 0}
+    assert mock_get_output.call_count == 1
+
+
+@mock.patch('paasta_tools.api.views.metastatus.get_output', autospec=True, return_value=('output', 0))
+def test_metastatus_does_not_share_other_args(mock_get_output, tmpdir):
+    cache = SharedCache(str(tmpdir.join('cache')))
+    with mock.patch('paasta_tools.api.views.metastatus.shared_cache._shared_cache', cache, autospec=None):
+        for cmd_args in (['-g', 'region'], ['-v', '-v']):
+            request = testing.DummyRequest()
+            request.swagger_data = {'cmd_args': cmd_args}
+            metastatus(request)
+            metastatus(request)
+    assert mock_get_output.call_count == 4
+    assert cache.stats == {}
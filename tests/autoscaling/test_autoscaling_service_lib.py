@@ -16,6 +16,7 @@ from datetime import timedelta
 
 import asynctest
 import mock
+from kazoo.exceptions import BadVersionError
 from kazoo.exceptions import NoNodeError
 from pytest import raises
 from requests.exceptions import Timeout
@@ -1646,7 +1647,7 @@ def test_serialize_and_deserialize_historical_load():
 
     serialized = autoscaling_service_lib.serialize_historical_load(fake_data)
     assert len(serialized) == 50 * autoscaling_service_lib.SIZE_PER_HISTORICAL_LOAD_RECORD
-    assert autoscaling_service_lib.deserialize_historical_load(serialized) == fake_data
+    assert list(autoscaling_service_lib.deserialize_historical_load(serialized)) == fake_data
 
 
 def test_serialize_historical_load_trims_oldest_data():
@@ -1658,9 +1659,128 @@ def test_serialize_historical_load_trims_oldest_data():
     assert deserialized_long[-1] == (62999, 1)
 
 
-@mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_historical_load', autospec=True)
+def test_fetch_historical_load_from_chunks():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.ZookeeperPool', autospec=True,
+    ) as mock_zookeeper_pool:
+        mock_zk = mock_zookeeper_pool.return_value.__enter__.return_value
+        mock_zk.get_children.return_value = ['chunk0000000002', 'chunk0000000001']
+        chunks = {
+            '/foo/historical_load_chunks/chunk0000000001': autoscaling_service_lib.serialize_historical_load([(1, 10)]),
+            '/foo/historical_load_chunks/chunk0000000002': autoscaling_service_lib.serialize_historical_load([(2, 20)]),
+        }
+        mock_zk.get_async.side_effect = lambda path: mock.Mock(get=mock.Mock(return_value=(chunks[path], None)))
+        ret = autoscaling_service_lib.fetch_historical_load('/foo')
+        assert list(ret) == [(1, 10), (2, 20)]
+
+
+def test_fetch_historical_load_legacy_node():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.ZookeeperPool', autospec=True,
+    ) as mock_zookeeper_pool:
+        mock_zk = mock_zookeeper_pool.return_value.__enter__.return_value
+        mock_zk.get_children.side_effect = NoNodeError
+        mock_zk.get.return_value = (autoscaling_service_lib.serialize_historical_load([(1, 10)]), None)
+        assert list(autoscaling_service_lib.fetch_historical_load('/foo')) == [(1, 10)]
+        mock_zk.get.assert_called_with('/foo/historical_load')
+
+        mock_zk.get.side_effect = NoNodeError
+        assert list(autoscaling_service_lib.fetch_historical_load('/foo')) == []
+
+
+def test_append_historical_load_to_newest_chunk():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.ZookeeperPool', autospec=True,
+    ) as mock_zookeeper_pool:
+        mock_zk = mock_zookeeper_pool.return_value.__enter__.return_value
+        mock_zk.get_children.return_value = ['chunk0000000001', 'chunk0000000002']
+        newest_chunk = autoscaling_service_lib.serialize_historical_load([(1, 10)])
+        mock_zk.get.return_value = (newest_chunk, mock.Mock(version=3))
+        autoscaling_service_lib.append_historical_load((2, 20), '/foo')
+        mock_zk.get.assert_called_with('/foo/historical_load_chunks/chunk0000000002')
+        mock_zk.set.assert_called_with(
+            '/foo/historical_load_chunks/chunk0000000002',
+            autoscaling_service_lib.serialize_historical_load([(1, 10), (2, 20)]),
+            version=3,
+        )
+        assert not mock_zk.create.called
+
+
+def test_append_historical_load_retries_on_conflicting_write():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.ZookeeperPool', autospec=True,
+    ) as mock_zookeeper_pool:
+        mock_zk = mock_zookeeper_pool.return_value.__enter__.return_value
+        mock_zk.get_children.return_value = ['chunk0000000001']
+        first = autoscaling_service_lib.serialize_historical_load([(1, 10)])
+        second = autoscaling_service_lib.serialize_historical_load([(1, 10), (2, 20)])
+        mock_zk.get.side_effect = [(first, mock.Mock(version=3)), (second, mock.Mock(version=4))]
+        mock_zk.set.side_effect = [BadVersionError, None]
+        autoscaling_service_lib.append_historical_load((3, 30), '/foo')
+        assert mock_zk.set.call_args_list == [
+            mock.call(
+                '/foo/historical_load_chunks/chunk0000000001',
+                autoscaling_service_lib.serialize_historical_load([(1, 10), (3, 30)]),
+                version=3,
+            ),
+            mock.call(
+                '/foo/historical_load_chunks/chunk0000000001',
+                autoscaling_service_lib.serialize_historical_load([(1, 10), (2, 20), (3, 30)]),
+                version=4,
+            ),
+        ]
+        assert not mock_zk.create.called
+
+
+def test_append_historical_load_starts_new_chunk_and_trims():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.ZookeeperPool', autospec=True,
+    ) as mock_zookeeper_pool:
+        mock_zk = mock_zookeeper_pool.return_value.__enter__.return_value
+        max_chunks = autoscaling_service_lib.MAX_HISTORICAL_LOAD_CHUNKS
+        chunk_names = ['chunk%010d' % i for i in range(max_chunks)]
+        mock_zk.get_children.side_effect = [chunk_names, chunk_names + ['chunk%010d' % max_chunks]]
+        full_chunk = autoscaling_service_lib.serialize_historical_load(
+            [(1, 10)] * autoscaling_service_lib.HISTORICAL_LOAD_RECORDS_PER_CHUNK,
+        )
+        mock_zk.get.return_value = (full_chunk, mock.Mock(version=3))
+        autoscaling_service_lib.append_historical_load((2, 20), '/foo')
+        assert not mock_zk.set.called
+        mock_zk.create.assert_called_once_with(
+            '/foo/historical_load_chunks/chunk',
+            autoscaling_service_lib.serialize_historical_load([(2, 20)]),
+            sequence=True,
+            makepath=True,
+        )
+        mock_zk.delete.assert_called_once_with('/foo/historical_load_chunks/chunk0000000000')
+
+
+def test_append_historical_load_migrates_legacy_node():
+    with mock.patch(
+        'paasta_tools.autoscaling.autoscaling_service_lib.ZookeeperPool', autospec=True,
+    ) as mock_zookeeper_pool:
+        mock_zk = mock_zookeeper_pool.return_value.__enter__.return_value
+        legacy = autoscaling_service_lib.serialize_historical_load([(1, 10)])
+        mock_zk.get_children.side_effect = [NoNodeError, ['chunk0000000000']]
+        mock_zk.get.side_effect = [(legacy, None), (legacy, mock.Mock(version=0))]
+        autoscaling_service_lib.append_historical_load((2, 20), '/foo')
+        mock_zk.create.assert_called_once_with(
+            '/foo/historical_load_chunks/chunk',
+            legacy,
+            sequence=True,
+            makepath=True,
+        )
+        mock_zk.delete.assert_called_once_with('/foo/historical_load')
+        mock_zk.set.assert_called_once_with(
+            '/foo/historical_load_chunks/chunk0000000000',
+            autoscaling_service_lib.serialize_historical_load([(1, 10), (2, 20)]),
+            version=0,
+        )
+
+
+@mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.append_historical_load', autospec=True)
 @mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.fetch_historical_load', autospec=True, return_value=[])
-def test_proportional_decision_policy(mock_save_historical_load, mock_fetch_historical_load):
+def test_proportional_decision_policy(mock_append_historical_load, mock_fetch_historical_load):
 
     common_kwargs = {
         'zookeeper_path': '/test',
@@ -1717,9 +1837,9 @@ def test_proportional_decision_policy(mock_save_historical_load, mock_fetch_hist
     )
 
 
-@mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_historical_load', autospec=True)
+@mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.append_historical_load', autospec=True)
 @mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.fetch_historical_load', autospec=True, return_value=[])
-def test_proportional_decision_policy_nonzero_offset(mock_save_historical_load, mock_fetch_historical_load):
+def test_proportional_decision_policy_nonzero_offset(mock_append_historical_load, mock_fetch_historical_load):
     common_kwargs = {
         'zookeeper_path': '/test',
         'current_instances': 10,
@@ -1776,9 +1896,9 @@ def test_proportional_decision_policy_nonzero_offset(mock_save_historical_load,
     )
 
 
-@mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.save_historical_load', autospec=True)
+@mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.append_historical_load', autospec=True)
 @mock.patch('paasta_tools.autoscaling.autoscaling_service_lib.fetch_historical_load', autospec=True, return_value=[])
-def test_proportional_decision_policy_good_enough(mock_save_historical_load, mock_fetch_historical_load):
+def test_proportional_decision_policy_good_enough(mock_append_historical_load, mock_fetch_historical_load):
     assert 0 == autoscaling_service_lib.proportional_decision_policy(
         zookeeper_path='/test',
         current_instances=100,
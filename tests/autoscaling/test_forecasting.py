@@ -83,3 +83,43 @@ def test_linreg_forecast_policy():
         linreg_window_seconds=7,
         linreg_extrapolation_seconds=0,
     )
+
+
+def test_forecast_policies_accept_historical_load():
+    historical_load = forecasting.HistoricalLoad([1, 2, 3, 4, 5, 6, 7], [100, 120, 140, 160, 180, 200, 220])
+    assert 170 == forecasting.moving_average_forecast_policy(
+        historical_load,
+        moving_average_window_seconds=5,
+    )
+    assert 1000 == forecasting.linreg_forecast_policy(
+        historical_load,
+        linreg_window_seconds=7,
+        linreg_extrapolation_seconds=39,
+    )
+
+
+def test_linreg_forecast_policy_unix_timestamps():
+    historical_load = [(1500000000 + t, 100 + 0.5 * t) for t in range(0, 1800, 10)]
+    forecast = forecasting.linreg_forecast_policy(
+        historical_load,
+        linreg_window_seconds=1800,
+        linreg_extrapolation_seconds=100,
+    )
+    assert abs(forecast - (100 + 0.5 * 1890)) < 1e-6
+
+
+def test_historical_load_roundtrip():
+    historical_load = forecasting.HistoricalLoad.from_records([(1, 10), (2, 20)])
+    historical_load.append((3, 30))
+    assert len(historical_load) == 3
+    assert historical_load[-1] == (3, 30)
+    assert list(historical_load[1:]) == [(2, 20), (3, 30)]
+    decoded = forecasting.HistoricalLoad.from_interleaved_bytes(historical_load.to_interleaved_bytes())
+    assert list(decoded) == [(1, 10), (2, 20), (3, 30)]
+
+
+def test_historical_load_window():
+    sorted_load = forecasting.HistoricalLoad.from_records([(1, 10), (2, 20), (3, 30), (4, 40)])
+    assert list(sorted_load.window(2, 3)) == [(2, 20), (3, 30)]
+    unsorted_load = forecasting.HistoricalLoad.from_records([(3, 30), (1, 10), (4, 40), (2, 20)])
+    assert list(unsorted_load.window(2, 3)) == [(3, 30), (2, 20)]
@@ -0,0 +1,50 @@
+import mock
+import pytest
+
+from paasta_tools.cli import cli
+from paasta_tools.cli import command_manifest
+
+
+def test_command_manifest_is_up_to_date():
+    with open(cli.COMMAND_MANIFEST_PATH) as f:
+        assert f.read() == cli.format_command_manifest(cli.build_command_manifest()), \
+            'paasta_tools/cli/command_manifest.py is stale, run `make command-manifest`'
+
+
+def test_format_command_manifest_round_trips():
+    manifest = [('mod', 'cmd', 'a long help string ' * 10 + '\n\nwith "quotes"'), ('other', 'hidden', None)]
+    namespace = {}
+    exec(cli.format_command_manifest(manifest), namespace)
+    assert namespace['COMMANDS'] == manifest
+
+
+@pytest.mark.parametrize('argv,env,expected', [
+    (['status', '-s', 'foo'], {}, 'status'),
+    (['-V'], {}, None),
+    ([], {'_ARGCOMPLETE': '1', 'COMP_LINE': 'paasta logs -s fo', 'COMP_POINT': '17'}, 'logs'),
+    ([], {'_ARGCOMPLETE': '1', 'COMP_LINE': 'paasta sta', 'COMP_POINT': '10'}, 'sta'),
+    ([], {'_ARGCOMPLETE': '1', 'COMP_LINE': 'paasta logs -s "fo', 'COMP_POINT': '18'}, 'logs'),
+])
+def test_get_requested_command(argv, env, expected):
+    with mock.patch.dict('os.environ', env, clear=True):
+        assert cli.get_requested_command(argv) == expected
+
+
+def test_parse_args_only_loads_requested_command():
+    with mock.patch(
+        'paasta_tools.cli.cli.add_subparser', autospec=True, side_effect=cli.add_subparser,
+    ) as mock_add_subparser:
+        args, parser = cli.parse_args(['list', '--all'])
+    assert [call[0][0] for call in mock_add_subparser.call_args_list] == ['list']
+    assert args.all is True
+
+    commands = {name for _, name, _ in command_manifest.COMMANDS}
+    assert set(parser._subparsers._group_actions[0].choices) == commands | {'help'}
+
+
+def test_parse_args_loads_every_command_of_the_module():
+    with mock.patch(
+        'paasta_tools.cli.cli.add_subparser', autospec=True, side_effect=cli.add_subparser,
+    ) as mock_add_subparser:
+        cli.parse_args(['restart', '-s', 'foo', '-c', 'bar', '-i', 'main'])
+    assert [call[0][0] for call in mock_add_subparser.call_args_list] == ['start_stop_restart']
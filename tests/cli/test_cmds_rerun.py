@@ -152,8 +152,10 @@ def test_rerun_validations(test_case, capfd, system_paasta_config):
     ) as mock_load_system_paasta_config, patch(
         'paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True,
     ) as mock_read_chronos_jobs_for_service, patch(
-        'service_configuration_lib.read_services_configuration', autospec=True,
-    ) as mock_read_services_configuration:
+        'paasta_tools.chronos_tools.os.listdir', autospec=True,
+    ) as mock_listdir, patch.dict(
+        'paasta_tools.chronos_tools._chronos_job_graphs', clear=True,
+    ):
         (
             rerun_args,
             mock_figure_out_service_name.return_value,
@@ -185,7 +187,7 @@ def test_rerun_validations(test_case, capfd, system_paasta_config):
             'dependent_instance2': {'parents': ['{}.{}'.format(_service_name, 'dependent_instance1')]},
         }
 
-        mock_read_services_configuration.return_value = [_service_name]
+        mock_listdir.return_value = [_service_name]
 
         args = MagicMock()
         args.service = rerun_args[0]
@@ -15,6 +15,7 @@ from collections import namedtuple
 from typing import Dict
 from typing import Set
 
+from bravado.exception import HTTPError
 from mock import ANY
 from mock import call
 from mock import MagicMock
@@ -25,6 +26,7 @@ from pytest import mark
 from pytest import raises
 
 from paasta_tools import utils
+from paasta_tools.api.client import CONNECTION_POOL_SIZE
 from paasta_tools.cli.cmds import status
 from paasta_tools.cli.cmds.status import apply_args_filters
 from paasta_tools.cli.cmds.status import missing_deployments_message
@@ -144,6 +146,67 @@ def test_report_status_for_cluster_displays_deployed_service(
     )
 
 
+@patch('paasta_tools.cli.cmds.status.print_status_from_api', autospec=True)
+@patch('paasta_tools.cli.cmds.status.get_paasta_api_client', autospec=True)
+def test_report_status_for_cluster_requests_all_instances_in_one_request(
+    mock_get_paasta_api_client,
+    mock_print_status_from_api,
+    system_paasta_config,
+):
+    mock_service = mock_get_paasta_api_client.return_value.service
+    main_status, canary_status = Mock(instance='main'), Mock(instance='canary')
+    mock_service.status_instances.return_value.result.return_value = [canary_status, main_status]
+    mock_print_status_from_api.side_effect = [200, 500]
+
+    return_code, _ = status.report_status_for_cluster(
+        service='fake_service',
+        cluster='fake_cluster',
+        deploy_pipeline=['fake_cluster.main', 'fake_cluster.canary'],
+        actual_deployments={'fake_cluster.main': 'sha', 'fake_cluster.canary': 'sha'},
+        instance_whitelist=set(),
+        system_paasta_config=system_paasta_config,
+        use_api_endpoint=True,
+    )
+    assert return_code == 1
+    mock_get_paasta_api_client.assert_called_once_with('fake_cluster', system_paasta_config)
+    mock_service.status_instances.assert_called_once_with(instances=['fake_service.main', 'fake_service.canary'])
+    assert mock_service.status_instance.call_count == 0
+    assert mock_print_status_from_api.call_args_list == [
+        call('fake_service', 'main', main_status),
+        call('fake_service', 'canary', canary_status),
+    ]
+
+
+@patch('paasta_tools.cli.cmds.status.get_paasta_api_client', autospec=True)
+def test_get_instance_statuses_from_api_falls_back_to_one_request_per_instance(
+    mock_get_paasta_api_client,
+    system_paasta_config,
+):
+    mock_service = mock_get_paasta_api_client.return_value.service
+    # a paasta-api without the bulk endpoint
+    mock_service.status_instances.side_effect = HTTPError(Mock(status_code=404))
+    mock_service.status_instance.side_effect = lambda service, instance: Mock(result=Mock(return_value=f'{instance}'))
+
+    assert status.get_instance_statuses_from_api(
+        'fake_cluster', 'fake_service', ['main', 'canary'], system_paasta_config,
+    ) == {'main': 'main', 'canary': 'canary'}
+    assert mock_service.status_instance.call_count == 2
+
+
+def test_get_api_status_executor_is_shared_per_client():
+    client, other_client = Mock(), Mock()
+    executor = status.get_api_status_executor(client)
+    assert status.get_api_status_executor(client) is executor
+    assert status.get_api_status_executor(other_client) is not executor
+    assert executor._max_workers == CONNECTION_POOL_SIZE
+
+
+def test_print_status_from_api_bulk_error(capfd):
+    error = Mock(error_code=404, error_message='No such instance')
+    assert status.print_status_from_api('fake_service', 'main', error) == 404
+    assert capfd.readouterr()[0] == 'No such instance\n'
+
+
 @patch('paasta_tools.cli.cmds.status.execute_paasta_serviceinit_on_remote_master', autospec=True)
 @patch('paasta_tools.cli.cmds.status.report_invalid_whitelist_values', autospec=True)
 def test_report_status_for_cluster_displays_multiple_lines_from_execute_paasta_serviceinit_on_remote_master(
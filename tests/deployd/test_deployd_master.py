@@ -35,6 +35,7 @@ from paasta_tools.deployd.master import Inbox  # noqa
 from paasta_tools.deployd.master import DeployDaemon  # noqa
 from paasta_tools.deployd.master import DedupedPriorityQueue  # noqa
 from paasta_tools.deployd.master import main  # noqa
+from paasta_tools.deployd.master import HEALTH_CHECK_INTERVAL  # noqa
 
 
 class TestDedupedPriorityQueue(unittest.TestCase):
@@ -104,33 +105,38 @@ class TestInbox(unittest.TestCase):
 
     def test_process_inbox(self):
         self.mock_inbox_q.get.side_effect = Empty
-        self.mock_inbox_q.empty.return_value = True
-        self.inbox.to_bounce = {}
         with mock.patch(
             'paasta_tools.deployd.master.Inbox.process_service_instance', autospec=True,
         ) as mock_process_service_instance, mock.patch(
             'paasta_tools.deployd.master.Inbox.process_to_bounce', autospec=True,
         ) as mock_process_to_bounce, mock.patch(
-            'time.sleep', autospec=True,
-        ):
+            'paasta_tools.deployd.master.Inbox.seconds_until_next_bounce', autospec=True,
+        ) as mock_seconds_until_next_bounce:
+            mock_seconds_until_next_bounce.return_value = 5
             self.inbox.process_inbox()
-            self.mock_inbox_q.get.assert_called_with(block=False)
+            self.mock_inbox_q.get.assert_called_with(timeout=5)
             assert not mock_process_service_instance.called
-            assert not mock_process_to_bounce.called
+            assert mock_process_to_bounce.called
 
-            mock_si = mock.Mock()
-            self.mock_inbox_q.get.side_effect = None
-            self.mock_inbox_q.get.return_value = mock_si
-            self.mock_inbox_q.empty.return_value = False
+            mock_si_1 = mock.Mock()
+            mock_si_2 = mock.Mock()
+            self.mock_inbox_q.get.side_effect = [mock_si_1, mock_si_2, Empty]
+            self.mock_inbox_q.qsize.return_value = 5
             self.inbox.process_inbox()
-            mock_process_service_instance.assert_called_with(self.inbox, mock_si)
-            assert not mock_process_to_bounce.called
+            assert mock_process_service_instance.call_args_list == [
+                mock.call(self.inbox, mock_si_1),
+                mock.call(self.inbox, mock_si_2),
+            ]
+            self.mock_inbox_q.get.assert_called_with(block=False)
 
-            self.inbox.to_bounce = {'service.instance': mock_si}
-            self.mock_inbox_q.empty.return_value = True
-            self.inbox.process_inbox()
-            mock_process_service_instance.assert_called_with(self.inbox, mock_si)
-            assert mock_process_to_bounce.called
+    def test_seconds_until_next_bounce(self):
+        assert self.inbox.seconds_until_next_bounce() is None
+        with mock.patch('time.time', autospec=True, return_value=50):
+            self.inbox.process_service_instance(mock.Mock(service='universe', instance='c137', bounce_by=60))
+            self.inbox.process_service_instance(mock.Mock(service='universe', instance='c138', bounce_by=55))
+            assert self.inbox.seconds_until_next_bounce() == 5
+            self.inbox.process_service_instance(mock.Mock(service='universe', instance='c139', bounce_by=40))
+            assert self.inbox.seconds_until_next_bounce() == 0
 
     def test_process_service_instance(self):
         mock_service_instance = mock.Mock(service='universe', instance='c137')
@@ -160,15 +166,28 @@ class TestInbox(unittest.TestCase):
             'time.time', autospec=True,
         ) as mock_time:
             mock_time.return_value = 50
-            mock_service_instance_1 = mock.Mock(bounce_by=10)
-            mock_service_instance_2 = mock.Mock(bounce_by=60)
-            self.inbox.to_bounce = {
-                'universe.c137': mock_service_instance_1,
-                'universe.c138': mock_service_instance_2,
-            }
+            mock_service_instance_1 = mock.Mock(service='universe', instance='c137', bounce_by=10)
+            mock_service_instance_2 = mock.Mock(service='universe', instance='c138', bounce_by=60)
+            self.inbox.process_service_instance(mock_service_instance_1)
+            self.inbox.process_service_instance(mock_service_instance_2)
             self.inbox.process_to_bounce()
             self.mock_bounce_q.put.assert_called_with(mock_service_instance_1.priority, mock_service_instance_1)
             assert self.mock_bounce_q.put.call_count == 1
+            assert self.inbox.to_bounce == {'universe.c138': mock_service_instance_2}
+
+    def test_process_to_bounce_skips_superseded(self):
+        with mock.patch(
+            'time.time', autospec=True,
+        ) as mock_time:
+            mock_time.return_value = 50
+            mock_service_instance_1 = mock.Mock(service='universe', instance='c137', bounce_by=40)
+            mock_service_instance_2 = mock.Mock(service='universe', instance='c137', bounce_by=20)
+            self.inbox.process_service_instance(mock_service_instance_1)
+            self.inbox.process_service_instance(mock_service_instance_2)
+            self.inbox.process_to_bounce()
+            self.mock_bounce_q.put.assert_called_once_with(mock_service_instance_2.priority, mock_service_instance_2)
+            assert self.inbox.to_bounce == {}
+            assert self.inbox.bounce_schedule == []
 
     def tearDown(self):
         self.inbox.to_bounce = {}
@@ -221,6 +240,8 @@ class TestDeployDaemon(unittest.TestCase):
         with mock.patch(
             'paasta_tools.deployd.master.QueueMetrics', autospec=True,
         ) as mock_q_metrics, mock.patch(
+            'paasta_tools.deployd.master.SmartstackRegistrationMetrics', autospec=True,
+        ) as mock_registration_metrics, mock.patch(
             'paasta_tools.deployd.master.get_metrics_interface', autospec=True,
         ) as mock_get_metrics_interface, mock.patch(
             'paasta_tools.deployd.master.DeployDaemon.start_watchers', autospec=True,
@@ -229,6 +250,8 @@ class TestDeployDaemon(unittest.TestCase):
         ) as mock_prioritise_bouncing_services, mock.patch(
             'paasta_tools.deployd.master.DeployDaemon.add_all_services', autospec=True,
         ) as mock_add_all_services, mock.patch(
+            'paasta_tools.deployd.master.DeployDaemon.start_marathon_apps_snapshot', autospec=True,
+        ) as mock_start_marathon_apps_snapshot, mock.patch(
             'paasta_tools.deployd.master.DeployDaemon.start_workers', autospec=True,
         ) as mock_start_workers, mock.patch(
             'paasta_tools.deployd.master.DeployDaemon.main_loop', autospec=True,
@@ -243,9 +266,12 @@ class TestDeployDaemon(unittest.TestCase):
                 mock_get_metrics_interface.return_value,
             )
             assert mock_q_metrics.return_value.start.called
+            mock_registration_metrics.assert_called_with('westeros-prod', mock_get_metrics_interface.return_value)
+            assert mock_registration_metrics.return_value.start.called
             assert mock_start_watchers.called
             assert mock_add_all_services.called
             assert not mock_prioritise_bouncing_services.called
+            assert mock_start_marathon_apps_snapshot.called
             assert mock_start_workers.called
             assert mock_main_loop.called
 
@@ -288,11 +314,10 @@ class TestDeployDaemon(unittest.TestCase):
 
             mock_all_workers_dead.return_value = False
             mock_all_watchers_running.return_value = True
-            mock_sleep.side_effect = [None, LoopBreak]
-            self.deployd.control.get.side_effect = Empty
-            with raises(LoopBreak):
-                self.deployd.main_loop()
-            assert mock_sleep.call_count == 2
+            self.deployd.control.get.side_effect = [Empty, None, "ABORT"]
+            self.deployd.main_loop()
+            self.deployd.control.get.assert_called_with(timeout=HEALTH_CHECK_INTERVAL)
+            assert not mock_sleep.called
             assert mock_check_and_start_workers.call_count == 2
 
     def test_all_watchers_running(self):
@@ -361,6 +386,23 @@ class TestDeployDaemon(unittest.TestCase):
         self.deployd.stop()
         self.deployd.control.put.assert_called_with("ABORT")
 
+    def test_start_marathon_apps_snapshot(self):
+        with mock.patch(
+            'paasta_tools.deployd.master.MarathonAppsSnapshot', autospec=True,
+        ) as mock_snapshot_class, mock.patch(
+            'paasta_tools.deployd.master.get_marathon_clients_from_config', autospec=True,
+        ) as mock_get_marathon_clients_from_config:
+            self.deployd.config.get_deployd_marathon_snapshot_max_age = mock.Mock(return_value=10)
+            self.deployd.config.get_deployd_marathon_snapshot_resync_interval = mock.Mock(return_value=300)
+            self.deployd.start_marathon_apps_snapshot()
+            mock_snapshot_class.assert_called_with(
+                clients=mock_get_marathon_clients_from_config.return_value,
+                max_age=10,
+                resync_interval=300,
+            )
+            assert mock_snapshot_class.return_value.start.called
+            assert self.deployd.marathon_apps_snapshot == mock_snapshot_class.return_value
+
     def test_start_workers(self):
         with mock.patch(
             'paasta_tools.deployd.master.PaastaDeployWorker', autospec=True,
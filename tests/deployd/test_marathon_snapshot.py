@@ -0,0 +1,138 @@
+import json
+
+import mock
+
+from paasta_tools.deployd import marathon_snapshot
+
+
+def make_fake_app(app_id):
+    app = mock.Mock()
+    app.id = app_id
+    return app
+
+
+def make_fake_client(apps, servers=('http://marathon1',)):
+    def list_apps(embed_tasks=False, app_id=None):
+        return [app for app in apps if app_id is None or app_id in app.id]
+    return mock.Mock(servers=list(servers), list_apps=mock.Mock(side_effect=list_apps))
+
+
+def test_get_job_key_from_app_id():
+    assert marathon_snapshot.get_job_key_from_app_id('/universe.c137.gitabc.configdef') == 'universe.c137'
+    assert marathon_snapshot.get_job_key_from_app_id('universe.c137') == 'universe.c137'
+
+
+def test_get_app_ids_from_event():
+    assert marathon_snapshot.get_app_ids_from_event({'appId': '/a.b.c.d'}) == ['/a.b.c.d']
+    assert marathon_snapshot.get_app_ids_from_event({'runSpecId': '/a.b.c.d'}) == ['/a.b.c.d']
+    assert marathon_snapshot.get_app_ids_from_event({'appDefinition': {'id': '/a.b.c.d'}}) == ['/a.b.c.d']
+    assert marathon_snapshot.get_app_ids_from_event(
+        {'plan': {'target': {'apps': [{'id': '/a.b.c.d'}, {'id': '/e.f.g.h'}]}}},
+    ) == ['/a.b.c.d', '/e.f.g.h']
+    assert marathon_snapshot.get_app_ids_from_event({'eventType': 'event_stream_attached'}) == []
+
+
+class TestMarathonShardSnapshot:
+    def setup_method(self, method):
+        self.apps = [
+            make_fake_app('/universe.c137.gitabc.config1'),
+            make_fake_app('/universe.c137.gitabc.config2'),
+            make_fake_app('/universe.c138.gitabc.config1'),
+        ]
+        self.client = make_fake_client(self.apps)
+        self.shard = marathon_snapshot.MarathonShardSnapshot(self.client)
+
+    def test_full_sync(self):
+        with mock.patch('time.time', autospec=True, return_value=100):
+            self.shard.full_sync()
+        self.client.list_apps.assert_called_with(embed_tasks=True)
+        assert set(self.shard.apps['universe.c137'].keys()) == {
+            '/universe.c137.gitabc.config1',
+            '/universe.c137.gitabc.config2',
+        }
+        assert self.shard.last_full_sync == 100
+
+    def test_full_sync_keeps_newer_dirty_marks(self):
+        self.shard.dirty = {'universe.c137': 50, 'universe.c138': 150}
+        with mock.patch('time.time', autospec=True, return_value=100):
+            self.shard.full_sync()
+        assert self.shard.dirty == {'universe.c138': 150}
+
+    def test_get_apps_served_from_snapshot(self):
+        with mock.patch('time.time', autospec=True, return_value=100):
+            self.shard.full_sync()
+            self.client.list_apps.reset_mock()
+            apps = self.shard.get_apps('universe.c138', max_age=10)
+        assert apps == [self.apps[2]]
+        assert not self.client.list_apps.called
+
+    def test_get_apps_refreshes_stale(self):
+        with mock.patch('time.time', autospec=True, return_value=100):
+            self.shard.full_sync()
+        self.client.list_apps.reset_mock()
+        with mock.patch('time.time', autospec=True, return_value=200):
+            apps = self.shard.get_apps('universe.c138', max_age=10)
+        assert apps == [self.apps[2]]
+        self.client.list_apps.assert_called_once_with(embed_tasks=True, app_id='/universe.c138')
+        assert self.shard.refreshed_at['universe.c138'] == 200
+
+    def test_get_apps_refreshes_dirty(self):
+        with mock.patch('time.time', autospec=True, return_value=100):
+            self.shard.full_sync()
+            self.shard.mark_dirty('universe.c137')
+            self.client.list_apps.reset_mock()
+            self.apps.pop(0)
+            apps = self.shard.get_apps('universe.c137', max_age=10)
+        assert [app.id for app in apps] == ['/universe.c137.gitabc.config2']
+        assert self.client.list_apps.call_count == 1
+        assert 'universe.c137' not in self.shard.dirty
+
+
+def test_marathon_event_listener_process_event():
+    mock_shard = mock.Mock()
+    listener = marathon_snapshot.MarathonEventListener(mock_shard)
+    listener.process_event(json.dumps({'eventType': 'status_update_event', 'appId': '/universe.c137.gitabc.config1'}))
+    mock_shard.mark_dirty.assert_called_once_with('universe.c137')
+
+    mock_shard.reset_mock()
+    listener.process_event('not json')
+    assert not mock_shard.mark_dirty.called
+
+
+class TestMarathonAppsSnapshot:
+    def setup_method(self, method):
+        self.apps = [
+            make_fake_app('/universe.c137.gitabc.config1'),
+            make_fake_app('/universe.c138.gitabc.config1'),
+        ]
+        self.snapshot_client = make_fake_client(self.apps)
+        mock_clients = mock.Mock(get_all_clients=mock.Mock(return_value=[self.snapshot_client]))
+        self.snapshot = marathon_snapshot.MarathonAppsSnapshot(mock_clients, max_age=10, resync_interval=300)
+
+    def test_get_apps_with_clients_returns_callers_client(self):
+        callers_client = make_fake_client([])
+        ret = self.snapshot.get_apps_with_clients('universe', 'c137', [callers_client])
+        assert ret == [(self.apps[0], callers_client)]
+        assert not callers_client.list_apps.called
+
+    def test_get_apps_with_clients_unknown_client(self):
+        other_client = make_fake_client(self.apps, servers=('http://marathon2',))
+        ret = self.snapshot.get_apps_with_clients('universe', 'c138', [other_client])
+        assert ret == [(self.apps[1], other_client)]
+        other_client.list_apps.assert_called_with(embed_tasks=True, app_id='/universe.c138')
+
+    def test_invalidate(self):
+        self.snapshot.invalidate('universe', 'c137')
+        for shard in self.snapshot.shards.values():
+            assert 'universe.c137' in shard.dirty
+
+    def test_start(self):
+        with mock.patch(
+            'paasta_tools.deployd.marathon_snapshot.MarathonEventListener', autospec=True,
+        ) as mock_listener, mock.patch(
+            'paasta_tools.deployd.marathon_snapshot.MarathonSnapshotResync', autospec=True,
+        ) as mock_resync:
+            self.snapshot.start()
+            assert mock_listener.return_value.start.called
+            mock_resync.assert_called_with(self.snapshot, 300)
+            assert mock_resync.return_value.start.called
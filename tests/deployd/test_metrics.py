@@ -23,5 +23,19 @@ class TestQueueMetrics(unittest.TestCase):
             assert self.mock_gauge.set.call_count == 3
 
 
+class TestSmartstackRegistrationMetrics(unittest.TestCase):
+    def setUp(self):
+        mock_metrics_provider = mock.Mock()
+        self.mock_gauge = mock.Mock()
+        mock_metrics_provider.create_gauge = mock.Mock(return_value=self.mock_gauge)
+        self.metrics = metrics.SmartstackRegistrationMetrics("mock-cluster", mock_metrics_provider)
+
+    def test_run(self):
+        with mock.patch('time.sleep', autospec=True, side_effect=LoopBreak):
+            with raises(LoopBreak):
+                self.metrics.run()
+            assert self.mock_gauge.set.call_count == 4
+
+
 class LoopBreak(Exception):
     pass
@@ -564,9 +564,11 @@ class TestYelpSoaEventHandler(unittest.TestCase):
             assert not mock_bounce_service.called
 
     def test_process_default(self):
-        mock_event = mock.Mock(path='/folder/universe')
+        mock_event = mock.Mock(path='/folder/universe', pathname='/folder/universe/marathon-blah.yaml')
         type(mock_event).name = 'marathon-blah.yaml'
         with mock.patch(
+            'paasta_tools.deployd.watchers.soa_config_cache.invalidate', autospec=True,
+        ) as mock_invalidate, mock.patch(
             'paasta_tools.deployd.watchers.YelpSoaEventHandler.bounce_service', autospec=True,
         ) as mock_bounce_service, mock.patch(
             'paasta_tools.deployd.watchers.YelpSoaEventHandler.watch_new_folder', autospec=True,
@@ -575,6 +577,7 @@ class TestYelpSoaEventHandler(unittest.TestCase):
         ) as mock_get_service_name_from_event:
             mock_get_service_name_from_event.return_value = None
             self.handler.process_default(mock_event)
+            mock_invalidate.assert_called_with('/folder/universe/marathon-blah.yaml')
             mock_watch_folder.assert_called_with(self.handler, mock_event)
             mock_get_service_name_from_event.assert_called_with(self.handler, mock_event)
             assert not mock_bounce_service.called
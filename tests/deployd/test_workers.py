@@ -79,8 +79,6 @@ class TestPaastaDeployWorker(unittest.TestCase):
         with mock.patch(
             'time.time', autospec=True, return_value=1,
         ), mock.patch(
-            'time.sleep', autospec=True,
-        ) as mock_sleep, mock.patch(
             'paasta_tools.deployd.workers.PaastaDeployWorker.process_service_instance', autospec=True,
         ) as mock_process_service_instance:
             mock_timers = mock.Mock()
@@ -90,14 +88,13 @@ class TestPaastaDeployWorker(unittest.TestCase):
                 bounce_timers=mock_timers,
             )
             mock_process_service_instance.return_value = mock_bounce_results
-            mock_sleep.side_effect = LoopBreak
             mock_si = mock.Mock(
                 service='universe',
                 instance='c137',
                 failures=0,
                 priority=0,
             )
-            self.mock_bounce_q.get.return_value = mock_si
+            self.mock_bounce_q.get.side_effect = [mock_si, LoopBreak]
             with raises(LoopBreak):
                 self.worker.run()
             mock_process_service_instance.assert_called_with(self.worker, mock_si)
@@ -118,6 +115,7 @@ class TestPaastaDeployWorker(unittest.TestCase):
                 failures=1,
                 priority=0,
             )
+            self.mock_bounce_q.get.side_effect = [mock_si, LoopBreak]
             with raises(LoopBreak):
                 self.worker.run()
             mock_process_service_instance.assert_called_with(self.worker, mock_si)
@@ -129,7 +127,7 @@ class TestPaastaDeployWorker(unittest.TestCase):
                 failures=0,
                 priority=0,
             )
-            self.mock_bounce_q.get.return_value = mock_si
+            self.mock_bounce_q.get.side_effect = [mock_si, LoopBreak]
             mock_process_service_instance.side_effect = Exception
             mock_queued_si = BaseServiceInstance(
                 service='universe',
@@ -177,6 +175,7 @@ class TestPaastaDeployWorker(unittest.TestCase):
                 clients=self.worker.marathon_clients,
                 soa_dir=DEFAULT_SOA_DIR,
                 marathon_apps_with_clients=None,
+                marathon_apps_snapshot=None,
             )
             assert mock_setup_timers.return_value.setup_marathon.stop.called
             assert not mock_setup_timers.return_value.processed_by_worker.start.called
@@ -195,11 +194,37 @@ class TestPaastaDeployWorker(unittest.TestCase):
                 clients=self.worker.marathon_clients,
                 soa_dir=DEFAULT_SOA_DIR,
                 marathon_apps_with_clients=None,
+                marathon_apps_snapshot=None,
             )
             assert mock_setup_timers.return_value.setup_marathon.stop.called
             assert mock_setup_timers.return_value.processed_by_worker.start.called
             assert not mock_setup_timers.return_value.bounce_length.stop.called
 
+    def test_process_service_instance_with_snapshot(self):
+        mock_snapshot = mock.Mock()
+        self.worker.marathon_apps_snapshot = mock_snapshot
+        with mock.patch(
+            'paasta_tools.deployd.workers.PaastaDeployWorker.setup_timers', autospec=True,
+        ), mock.patch(
+            'paasta_tools.deployd.workers.deploy_marathon_service', autospec=True, return_value=(0, 60),
+        ) as mock_deploy_marathon_service:
+            self.worker.marathon_clients = mock.Mock()
+            mock_si = mock.Mock(
+                service='universe',
+                instance='c137',
+                failures=0,
+            )
+            self.worker.process_service_instance(mock_si)
+            mock_deploy_marathon_service.assert_called_with(
+                service='universe',
+                instance='c137',
+                clients=self.worker.marathon_clients,
+                soa_dir=DEFAULT_SOA_DIR,
+                marathon_apps_with_clients=None,
+                marathon_apps_snapshot=mock_snapshot,
+            )
+            mock_snapshot.invalidate.assert_called_with('universe', 'c137')
+
 
 class LoopBreak(Exception):
     pass
@@ -1,41 +1,64 @@
+import pytest
 from mock import Mock
 
 from paasta_tools.frameworks import constraints
 
 
-def test_nested_inc_increments_by_step():
-    op = 'MAX_PER'
-    av = 'default'
-    an = 'pool'
-    st: constraints.ConstraintState = {}
-    constraints.nested_inc(op, None, av, an, st, 3)
-    assert st['MAX_PER']['pool']['default'] == 3
-
-    constraints.nested_inc(op, None, av, an, st, -1)
-    assert st['MAX_PER']['pool']['default'] == 2
+def _offer(**attributes):
+    attrs = []
+    for name, value in attributes.items():
+        attr = Mock(text=Mock(value=value))
+        attr.configure_mock(name=name)
+        attrs.append(attr)
+    return Mock(attributes=attrs)
 
 
 def test_check_offer_constraints_returns_true_when_satisfied():
-    attr = Mock(text=Mock(value='test'))
-    attr.configure_mock(name='pool')
-    offer = Mock(attributes=[attr])
+    offer = _offer(pool='test')
     cons = [
         ['pool', 'MAX_PER', '5'],
         ['pool', 'EQUALS', 'test'],
         ['pool', 'LIKE', 'te.*$'],
         ['pool', 'UNLIKE', 'ta.*'],
     ]
-    state = {'MAX_PER': {'pool': {'test': 0}}}
+    state = {('pool', 'test'): 0}
     assert constraints.check_offer_constraints(offer, cons, state) is True
-    state = {'MAX_PER': {'pool': {'test': 6}}}
+    state = {('pool', 'test'): 6}
     assert constraints.check_offer_constraints(offer, cons, state) is False
 
 
+def test_check_offer_constraints_missing_attribute():
+    assert constraints.check_offer_constraints(_offer(pool='test'), [['region', 'EQUALS', 'a']], {}) is False
+
+
 def test_update_constraint_state_increments_counters():
-    attr = Mock(text=Mock(value='test'))
-    attr.configure_mock(name='pool')
-    offer = Mock(attributes=[attr])
+    offer = _offer(pool='test')
     cons = [['pool', 'MAX_PER', '5']]
     state: constraints.ConstraintState = {}
     constraints.update_constraint_state(offer, cons, state)
-    assert state['MAX_PER']['pool']['test'] == 1
+    assert state == {('pool', 'test'): 1}
+
+
+def test_compiled_constraints():
+    compiled = constraints.compile_constraints([
+        ['region', 'UNIQUE', None],
+        ['pool', 'LIKE', 'def'],
+        ['pool', 'EQUALS', 'default'],
+    ])
+    assert constraints.compile_constraints((('region', 'UNIQUE', None), ('pool', 'LIKE', 'def'),
+                                            ('pool', 'EQUALS', 'default'))) is compiled
+
+    attributes = constraints.offer_attributes(_offer(pool='default', region='uswest1'))
+    state: constraints.ConstraintState = {}
+    assert compiled.check(attributes, state) is True
+    compiled.update(attributes, state, step=2)
+    assert state == {('region', 'uswest1'): 2}
+    assert compiled.check(attributes, state) is False
+    compiled.update(attributes, state, step=-1)
+    assert compiled.check(attributes, state) is True
+    assert compiled.check({'pool': 'other', 'region': 'uswest1'}, {}) is False
+
+
+def test_compiled_constraints_bad_op():
+    with pytest.raises(KeyError):
+        constraints.CompiledConstraints([['pool', 'NEAR', 'default']])
@@ -50,22 +50,50 @@ class TestMesosTaskParameters:
         assert MesosTaskParameters.deserialize(json.dumps(param_dict)) == MesosTaskParameters(**param_dict)
 
 
+def test_DictTaskStore_garbage_collect_old_tasks():
+    task_store = DictTaskStore(service_name="foo", instance_name="bar", framework_id='foo', system_paasta_config=None)
+    with mock.patch('paasta_tools.frameworks.task_store.time.time', autospec=True, return_value=1000):
+        task_store.add_task_if_doesnt_exist("old_dead", mesos_task_state="TASK_FINISHED")
+        task_store.add_task_if_doesnt_exist("old_live", mesos_task_state="TASK_RUNNING")
+    with mock.patch('paasta_tools.frameworks.task_store.time.time', autospec=True, return_value=1500):
+        task_store.add_task_if_doesnt_exist("new_dead", mesos_task_state="TASK_KILLED")
+        task_store.garbage_collect_old_tasks(max_dead_task_age=300)
+
+    assert set(task_store.get_all_tasks()) == {"old_live", "new_dead"}
+
+
 class TestZKTaskStore:
     @pytest.yield_fixture
     def mock_zk_client(self):
         spec_zk_client = KazooClient()
         mock_zk_client = mock.Mock(spec=spec_zk_client)
+        # The watch recipes need a real handler for their locks and retries
+        mock_zk_client.handler = spec_zk_client.handler
+        mock_zk_client.retry.side_effect = lambda func, *args, **kwargs: func(*args, **kwargs)
+        mock_zk_client.get_children.return_value = []
+        mock_zk_client.exists.return_value = None
         with mock.patch('paasta_tools.frameworks.task_store.KazooClient', autospec=True, return_value=mock_zk_client):
             yield mock_zk_client
 
-    def test_get_task(self, mock_zk_client):
-        zk_task_store = ZKTaskStore(
+    @pytest.fixture
+    def zk_task_store(self, mock_zk_client):
+        return ZKTaskStore(
             service_name="a",
             instance_name="b",
             framework_id="c",
             system_paasta_config=mock.Mock(),
         )
 
+    def _zk_data(self, tasks):
+        """Make zk_client.get return the given task_id -> (json, ZnodeStat) data, raising NoNodeError for others"""
+        def get(path, watch=None):
+            try:
+                return tasks[path.lstrip('/')]
+            except KeyError:
+                raise NoNodeError()
+        return get
+
+    def test_get_task(self, zk_task_store):
         fake_znodestat = mock.Mock()
         zk_task_store.zk_client.get.return_value = ('{"health": "healthy"}', fake_znodestat)
         params, stat = zk_task_store._get_task("d")
@@ -73,87 +101,122 @@ class TestZKTaskStore:
         assert stat == fake_znodestat
         assert params.health == "healthy"
 
-    def test_update_task(self, mock_zk_client):
-        zk_task_store = ZKTaskStore(
-            service_name="a",
-            instance_name="b",
-            framework_id="c",
-            system_paasta_config=mock.Mock(),
+    def test_reads_come_from_watches(self, mock_zk_client):
+        mock_zk_client.get_children.return_value = ['task1', 'task2', 'bogus']
+        mock_zk_client.get.side_effect = self._zk_data({
+            'task1': ('{"health": "healthy"}', mock.Mock(mzxid=1, mtime=1000)),
+            'task2': ('{"mesos_task_state": "TASK_RUNNING"}', mock.Mock(mzxid=2, mtime=2000)),
+            'bogus': ('not json', mock.Mock(mzxid=3, mtime=3000)),
+        })
+        with mock.patch('paasta_tools.frameworks.task_store._log', autospec=True):
+            zk_task_store = ZKTaskStore(
+                service_name="a",
+                instance_name="b",
+                framework_id="c",
+                system_paasta_config=mock.Mock(),
+            )
+        assert mock_zk_client.get.call_count == 3
+
+        for _ in range(2):
+            assert zk_task_store.get_all_tasks() == {
+                'task1': MesosTaskParameters(health='healthy'),
+                'task2': MesosTaskParameters(mesos_task_state='TASK_RUNNING'),
+            }
+            assert zk_task_store.get_task('task1') == MesosTaskParameters(health='healthy')
+            assert zk_task_store.get_task('nope') is None
+        assert zk_task_store.get_all_tasks_with_mtime()['task2'] == (
+            MesosTaskParameters(mesos_task_state='TASK_RUNNING'), 2,
         )
+        assert mock_zk_client.get.call_count == 3
 
-        # Happy case - task exists, no conflict on update.
-        fake_znodestat = mock.Mock(version=1)
-        zk_task_store.zk_client.get.return_value = ('{"health": "healthy"}', fake_znodestat)
-        new_params = zk_task_store.update_task("task_id", is_draining=True)
-        assert new_params.is_draining is True
-        assert new_params.health == 'healthy'
+    def test_watchers_follow_changes(self, zk_task_store):
+        on_changed = zk_task_store._task_watcher('task1')
+        on_changed('{"health": "healthy"}', mock.Mock(mzxid=5))
+        assert zk_task_store.get_task('task1') == MesosTaskParameters(health='healthy')
 
-        # Second happy case - no task exists.
-        fake_znodestat = mock.Mock(version=1)
-        zk_task_store.zk_client.get.side_effect = NoNodeError()
+        # a stale read doesn't overwrite a later write
+        on_changed('{"health": "sick"}', mock.Mock(mzxid=4))
+        assert zk_task_store.get_task('task1') == MesosTaskParameters(health='healthy')
+
+        assert on_changed(None, None) is False
+        assert zk_task_store.get_all_tasks() == {}
+
+    def test_update_task(self, zk_task_store):
+        zk_client = zk_task_store.zk_client
+
+        # No task exists; after creating it the new znode is read back for its version.
+        zk_client.get.side_effect = [
+            ('{"is_draining": true}', mock.Mock(version=0, mzxid=1)),
+        ]
         new_params = zk_task_store.update_task("task_id", is_draining=True)
+        zk_client.create.assert_called_once_with('/task_id', mock.ANY)
         assert new_params.is_draining is True
         assert new_params.health is None
 
+        # Happy case - task exists, no conflict on update. Nothing is read from ZooKeeper.
+        zk_client.get.reset_mock()
+        zk_client.set.return_value = mock.Mock(version=1, mzxid=2)
+        new_params = zk_task_store.update_task("task_id", health='healthy')
+        zk_client.set.assert_called_once_with('/task_id', mock.ANY, version=0)
+        assert not zk_client.get.called
+        assert new_params == MesosTaskParameters(is_draining=True, health='healthy')
+        assert zk_task_store.get_task("task_id") == new_params
+
         # Someone changed our data out from underneath us.
-        zk_task_store.zk_client.get.reset_mock()
-        zk_task_store.zk_client.set.reset_mock()
-        zk_task_store.zk_client.get.side_effect = [
-            ('{"health": "healthy"}', mock.Mock(version=1)),
-            ('{"health": "healthy", "offer": "offer"}', mock.Mock(version=2)),
-            ('{"health": "healthy", "offer": "offer", "resources": "resources"}', mock.Mock(version=3)),
+        zk_client.set.reset_mock()
+        zk_client.get.side_effect = [
+            ('{"health": "healthy", "offer": "offer"}', mock.Mock(version=2, mzxid=3)),
+            ('{"health": "healthy", "offer": "offer", "resources": "resources"}', mock.Mock(version=3, mzxid=4)),
         ]
-        zk_task_store.zk_client.set.side_effect = [
+        zk_client.set.side_effect = [
             BadVersionError,
             BadVersionError,
-            None,
+            mock.Mock(version=4, mzxid=5),
         ]
-        new_params = zk_task_store.update_task("task_id", is_draining=True)
-        assert zk_task_store.zk_client.get.call_count == 3
-        zk_task_store.zk_client.get.assert_has_calls([
-            mock.call('/task_id'),
-            mock.call('/task_id'),
-            mock.call('/task_id'),
-        ])
-        assert zk_task_store.zk_client.set.call_count == 3
-        zk_task_store.zk_client.set.assert_has_calls([
+        new_params = zk_task_store.update_task("task_id", is_draining=False)
+        assert zk_client.get.call_count == 2
+        zk_client.set.assert_has_calls([
             mock.call('/task_id', mock.ANY, version=1),
             mock.call('/task_id', mock.ANY, version=2),
             mock.call('/task_id', mock.ANY, version=3),
         ])
-        assert new_params.is_draining is True
+        assert new_params.is_draining is False
         assert new_params.health == 'healthy'
         assert new_params.offer == 'offer'
         assert new_params.resources == 'resources'
 
+    def test_update_task_create_conflict(self, zk_task_store):
+        zk_client = zk_task_store.zk_client
         # Data wasn't there when we read it, but then was when we tried to create it
-        zk_task_store.zk_client.get.reset_mock()
-        zk_task_store.zk_client.set.reset_mock()
-        zk_task_store.zk_client.create.reset_mock()
-        zk_task_store.zk_client.get.side_effect = [
-            NoNodeError,
-            ('{"health": "healthy"}', mock.Mock(version=1)),
+        zk_client.get.side_effect = [
+            ('{"health": "healthy"}', mock.Mock(version=1, mzxid=1)),
         ]
-        zk_task_store.zk_client.create.side_effect = [
+        zk_client.create.side_effect = [
             NodeExistsError,
         ]
-        zk_task_store.zk_client.set.side_effect = [
-            None,
+        zk_client.set.side_effect = [
+            mock.Mock(version=2, mzxid=2),
         ]
         new_params = zk_task_store.update_task("task_id", is_draining=True)
-        assert zk_task_store.zk_client.get.call_count == 2
-        zk_task_store.zk_client.get.assert_has_calls([
-            mock.call('/task_id'),
-            mock.call('/task_id'),
-        ])
-        assert zk_task_store.zk_client.create.call_count == 1
-        zk_task_store.zk_client.create.assert_has_calls([
-            mock.call('/task_id', mock.ANY),
-        ])
-        assert zk_task_store.zk_client.set.call_count == 1
-        zk_task_store.zk_client.set.assert_has_calls([
-            mock.call('/task_id', mock.ANY, version=1),
-        ])
+        zk_client.get.assert_called_once_with('/task_id')
+        zk_client.create.assert_called_once_with('/task_id', mock.ANY)
+        zk_client.set.assert_called_once_with('/task_id', mock.ANY, version=1)
         assert new_params.is_draining is True
         assert new_params.health == 'healthy'
         assert new_params.offer is None
+
+    def test_overwrite_task(self, zk_task_store):
+        zk_client = zk_task_store.zk_client
+        zk_client.set.return_value = mock.Mock(version=3, mzxid=3)
+        zk_task_store.overwrite_task('task_id', MesosTaskParameters(health='healthy'), version=2)
+        zk_client.set.assert_called_once_with('/task_id', mock.ANY, version=2)
+        assert zk_task_store.get_task('task_id') == MesosTaskParameters(health='healthy')
+
+    def test_garbage_collect_old_tasks(self, zk_task_store):
+        zk_task_store._task_watcher('dead')('{"mesos_task_state": "TASK_FAILED"}', mock.Mock(mzxid=1, mtime=1000000))
+        zk_task_store._task_watcher('live')('{"mesos_task_state": "TASK_RUNNING"}', mock.Mock(mzxid=2, mtime=1000000))
+        zk_task_store.zk_client.delete.side_effect = [None]
+        with mock.patch('paasta_tools.frameworks.task_store.time.time', autospec=True, return_value=2000):
+            zk_task_store.garbage_collect_old_tasks(max_dead_task_age=600)
+        zk_task_store.zk_client.delete.assert_called_once_with('/dead')
+        assert set(zk_task_store.get_all_tasks()) == {'live'}
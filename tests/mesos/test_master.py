@@ -3,44 +3,36 @@ from asynctest import patch
 from mock import call
 from mock import Mock
 from pytest import mark
+from pytest import raises
 
 from paasta_tools.mesos import framework
 from paasta_tools.mesos import master
-from paasta_tools.mesos import task
+from paasta_tools.mesos import state_index
+from paasta_tools.shared_cache import SharedCache
 
 
 @mark.asyncio
 async def test_frameworks():
-    with patch.object(master.MesosMaster, '_framework_list', autospec=True) as mock_framework_list:
-        fake_frameworks = [
-            {
-                'name': 'test_framework1',
-            },
-            {
-                'name': 'test_framework2',
-            },
-        ]
-        mock_framework_list.return_value = fake_frameworks
-        expected_frameworks = [framework.Framework(config) for config in fake_frameworks]
+    fake_frameworks = {
+        'frameworks': [{'id': 'fw1', 'name': 'test_framework1'}],
+        'completed_frameworks': [{'id': 'fw2', 'name': 'test_framework2'}],
+    }
+    with patch.object(
+        master.MesosMaster, '_frameworks', autospec=True, return_value=fake_frameworks,
+    ), patch.object(
+        master.MesosMaster, 'state', autospec=True, return_value={'slaves': []},
+    ):
         mesos_master = master.MesosMaster({})
-        assert expected_frameworks == await mesos_master.frameworks()
-
-
-@mark.asyncio
-async def test_framework_list_includes_completed_frameworks():
-    with patch.object(master.MesosMaster, '_framework_list', autospec=True) as mock_framework_list:
-        fake_frameworks = [
-            {
-                'name': 'test_framework1',
-            },
-            {
-                'name': 'test_framework2',
-            },
+        assert await mesos_master.frameworks() == [
+            framework.Framework(fake_frameworks['frameworks'][0]),
+            framework.Framework(fake_frameworks['completed_frameworks'][0]),
         ]
-        mock_framework_list.return_value = fake_frameworks
-        expected_frameworks = [framework.Framework(config) for config in fake_frameworks]
-        mesos_master = master.MesosMaster({})
-        assert expected_frameworks == await mesos_master.frameworks()
+        assert await mesos_master.frameworks(active_only=True) == [
+            framework.Framework(fake_frameworks['frameworks'][0]),
+        ]
+        assert await mesos_master.framework('fw2') == framework.Framework(fake_frameworks['completed_frameworks'][0])
+        with raises(IndexError):
+            await mesos_master.framework('fw3')
 
 
 @mark.asyncio
@@ -56,6 +48,18 @@ async def test__frameworks():
         assert ret == mock_frameworks
 
 
+@mark.asyncio
+async def test__frameworks_shared_cache(tmpdir):
+    with patch.object(master.MesosMaster, 'fetch', autospec=True) as mock_fetch, patch(
+        'paasta_tools.mesos.master.shared_cache._shared_cache', SharedCache(str(tmpdir.join('cache'))), autospec=None,
+    ):
+        mock_fetch.return_value = CoroutineMock(json=CoroutineMock(return_value={'frameworks': []}))
+        for _ in range(2):
+            mesos_master = master.MesosMaster({'master': 'mesos.somewhere:5050'})
+            assert await mesos_master._fetch_shared('mesos_frameworks', "/master/frameworks") == {'frameworks': []}
+        assert mock_fetch.call_count == 1
+
+
 @mark.asyncio
 async def test__framework_list():
     mock_frameworks = Mock()
@@ -107,25 +111,52 @@ async def test__task_list():
 
 @mark.asyncio
 async def test_tasks():
+    mock_task_1 = {'id': 'aaa', 'slave_id': 's1', 'framework_id': 'fw1'}
+    mock_task_2 = {'id': 'bbb', 'slave_id': 's1', 'framework_id': 'fw1'}
     with patch.object(
-        master.MesosMaster, '_task_list', autospec=True,
-    ) as mock__task_list, patch.object(
-        task, 'Task', autospec=True,
+        master.MesosMaster, '_frameworks', autospec=True, return_value={
+            'frameworks': [{'id': 'fw1', 'tasks': [mock_task_1], 'completed_tasks': [mock_task_2]}],
+        },
+    ), patch.object(
+        master.MesosMaster, 'state', autospec=True, return_value={'slaves': []},
+    ), patch.object(
+        state_index, 'Task', autospec=True,
     ) as mock_task:
-
-        mock_task_1 = {'id': 'aaa'}
-        mock_task_2 = {'id': 'bbb'}
-        mock__task_list.return_value = [mock_task_1, mock_task_2]
-        mock_task.return_value = Mock()
+        mock_task.side_effect = lambda mesos_master, items: Mock(items=items)
         mesos_master = master.MesosMaster({})
         ret = await mesos_master.tasks()
         mock_task.assert_has_calls([
             call(mesos_master, mock_task_1),
             call(mesos_master, mock_task_2),
         ])
-        mock__task_list.assert_called_with(mesos_master, False)
-        expected = [mock_task.return_value, mock_task.return_value]
-        assert list(ret) == expected
+        assert [t.items for t in ret] == [mock_task_1, mock_task_2]
+        assert [t.items for t in await mesos_master.tasks(active_only=True)] == [mock_task_1]
+        assert [t.items for t in await mesos_master.tasks('b*')] == [mock_task_2]
+        # wrappers are reused for the same snapshot
+        assert mock_task.call_count == 2
+
+
+@mark.asyncio
+async def test_state_index_is_rebuilt_per_snapshot():
+    mesos_master = master.MesosMaster({})
+    mesos_master._frameworks = CoroutineMock(return_value={'frameworks': []})
+    mesos_master.state = CoroutineMock(return_value={'slaves': []})
+    first = await mesos_master.state_index()
+    assert await mesos_master.state_index() is first
+
+    mesos_master.state.return_value = {'slaves': []}
+    assert await mesos_master.state_index() is not first
+
+
+@mark.asyncio
+async def test_slaves():
+    mock_slave = {'id': 's1', 'hostname': 'host1'}
+    mesos_master = master.MesosMaster({})
+    mesos_master._frameworks = CoroutineMock(return_value={'frameworks': []})
+    mesos_master.state = CoroutineMock(return_value={'slaves': [mock_slave]})
+    assert [s['hostname'] for s in await mesos_master.slaves('s1')] == ['host1']
+    assert await mesos_master.slaves('s2') == []
+    assert await mesos_master.slaves() == []
 
 
 @mark.asyncio
@@ -0,0 +1,59 @@
+import asyncio
+
+from paasta_tools.mesos import session_pool
+
+
+FAKE_CONFIG = {
+    "response_timeout": 5,
+    "max_connections": 20,
+    "max_connections_per_host": 2,
+}
+
+
+def test_get_session_reuses_session_per_loop():
+    loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(loop)
+    try:
+        before = session_pool.get_session_pool_metrics()
+        session = session_pool.get_session(FAKE_CONFIG)
+        assert session_pool.get_session(FAKE_CONFIG) is session
+        after = session_pool.get_session_pool_metrics()
+        assert after['pool_misses'] == before['pool_misses'] + 1
+        assert after['pool_hits'] == before['pool_hits'] + 1
+
+        assert session.connector.limit == 20
+        assert session.connector.limit_per_host == 2
+        assert session_pool.get_session(dict(FAKE_CONFIG, response_timeout=10)) is not session
+        assert session_pool.get_session(dict(FAKE_CONFIG, conn_timeout=30)) is not session
+
+        loop.run_until_complete(session_pool.close_sessions())
+        assert session.closed
+    finally:
+        loop.close()
+        asyncio.set_event_loop(None)
+
+
+def test_get_session_discards_closed_loops():
+    old_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(old_loop)
+    old_session = session_pool.get_session(FAKE_CONFIG)
+    old_loop.close()
+
+    new_loop = asyncio.new_event_loop()
+    asyncio.set_event_loop(new_loop)
+    try:
+        new_session = session_pool.get_session(FAKE_CONFIG)
+        assert new_session is not old_session
+        assert old_session.closed
+        assert old_loop not in session_pool._sessions
+        new_loop.run_until_complete(session_pool.close_sessions())
+    finally:
+        new_loop.close()
+        asyncio.set_event_loop(None)
+
+
+def test_track_in_flight():
+    before = session_pool.get_session_pool_metrics()['in_flight']
+    with session_pool.track_in_flight():
+        assert session_pool.get_session_pool_metrics()['in_flight'] == before + 1
+    assert session_pool.get_session_pool_metrics()['in_flight'] == before
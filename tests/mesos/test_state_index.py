@@ -0,0 +1,97 @@
+from mock import Mock
+
+from paasta_tools.mesos.state_index import MesosStateIndex
+
+
+def _index():
+    frameworks = {
+        'frameworks': [
+            {
+                'id': 'marathon',
+                'name': 'marathon',
+                'tasks': [
+                    {'id': 'svc.main.gita.configa.uuid1', 'slave_id': 'a1', 'framework_id': 'marathon'},
+                    {'id': 'svc.main.gita.configa.uuid2', 'slave_id': 'a2', 'framework_id': 'marathon'},
+                    {'id': 'svc.canary.gita.configb.uuid3', 'slave_id': 'a2', 'framework_id': 'marathon'},
+                ],
+                'completed_tasks': [
+                    {'id': 'svc.main.gitold.configa.uuid0', 'slave_id': 'a1', 'framework_id': 'marathon'},
+                ],
+            },
+        ],
+        'completed_frameworks': [
+            {
+                'id': 'old',
+                'name': 'chronos',
+                'tasks': [{'id': 'svc.main.gitold.configa.uuid9', 'slave_id': 'a1', 'framework_id': 'old'}],
+            },
+        ],
+    }
+    state = {
+        'slaves': [
+            {'id': 'a1', 'hostname': 'host1'},
+            {'id': 'a2', 'hostname': 'host2'},
+        ],
+        'orphan_tasks': [{'id': 'svc.main.gitorphan.configa.uuid7', 'slave_id': 'a2', 'framework_id': 'gone'}],
+    }
+    return MesosStateIndex(Mock(config={}), frameworks, state)
+
+
+def _ids(tasks):
+    return sorted(task['id'] for task in tasks)
+
+
+def test_tasks_with_id_prefix():
+    index = _index()
+    assert _ids(index.tasks_with_id_prefix('svc.main')) == [
+        'svc.main.gita.configa.uuid1',
+        'svc.main.gita.configa.uuid2',
+        'svc.main.gitold.configa.uuid0',
+        'svc.main.gitold.configa.uuid9',
+    ]
+    assert _ids(index.tasks_with_id_prefix('/svc.main.gita.configa', active_only=True)) == [
+        'svc.main.gita.configa.uuid1',
+        'svc.main.gita.configa.uuid2',
+    ]
+    # only whole components match
+    assert index.tasks_with_id_prefix('svc.mai') == []
+
+
+def test_tasks_by_id_slave_and_framework():
+    index = _index()
+    assert _ids(index.tasks_with_id('svc.canary.gita.configb.uuid3')) == ['svc.canary.gita.configb.uuid3']
+    assert index.tasks_with_id('nope') == []
+    assert _ids(index.tasks_on_slave('a1', active_only=True)) == ['svc.main.gita.configa.uuid1']
+    assert _ids(index.tasks_for_framework('old')) == ['svc.main.gitold.configa.uuid9']
+
+
+def test_tasks_keeps_filter_semantics():
+    index = _index()
+    assert len(index.tasks()) == 5
+    assert len(index.tasks(active_only=True)) == 3
+    assert _ids(index.tasks('canary')) == ['svc.canary.gita.configb.uuid3']
+    assert _ids(index.tasks('*uuid[12]')) == ['svc.main.gita.configa.uuid1', 'svc.main.gita.configa.uuid2']
+
+
+def test_orphan_tasks():
+    index = _index()
+    assert _ids(index.orphan_tasks) == ['svc.main.gitorphan.configa.uuid7']
+    # orphans belong to no known framework, so framework task lookups don't return them
+    assert 'svc.main.gitorphan.configa.uuid7' not in _ids(index.tasks())
+    assert MesosStateIndex(Mock(config={}), {}, {}).orphan_tasks == []
+
+
+def test_wrappers_are_reused():
+    index = _index()
+    first = index.tasks_with_id('svc.canary.gita.configb.uuid3')[0]
+    assert index.tasks_on_slave('a2')[-1] is first
+    assert index.slave('a1') is index.slaves_with_hostname('host1')[0]
+    assert index.framework('old') is index.frameworks()[1]
+
+
+def test_missing_lookups():
+    index = _index()
+    assert index.slave('a3') is None
+    assert index.slaves_with_hostname('host3') == []
+    assert index.framework('nope') is None
+    assert [fw.id for fw in index.frameworks(active_only=True)] == ['marathon']
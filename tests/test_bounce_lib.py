@@ -20,6 +20,8 @@ from requests.exceptions import RequestException
 
 from paasta_tools import bounce_lib
 from paasta_tools import utils
+from paasta_tools.smartstack_tools import HaproxyStatsClient
+from paasta_tools.smartstack_tools import SmartstackRegistrationService
 
 
 class TestBounceLib:
@@ -169,14 +171,15 @@ class TestBounceLib:
         service = 'foo'
         nerve_ns = 'bar'
         fake_task = mock.Mock(name='fake_task', host='foo', ports=[123456])
-        fake_backend = {
-            "svname": "foo_256.256.256.256:123456",
-            "status": "UP",
-        }
+        fake_csv = '# pxname,svname,status,\nfoo.bar,foo_256.256.256.256:123456,UP,\n'
 
         with mock.patch(
-            'paasta_tools.smartstack_tools.get_multiple_backends', autospec=True,
-            return_value=[fake_backend],
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+            return_value=SmartstackRegistrationService(),
+        ), mock.patch(
+            'paasta_tools.smartstack_tools._haproxy_stats_client', HaproxyStatsClient(), autospec=None,
+        ), mock.patch(
+            'paasta_tools.smartstack_tools.HaproxyStatsClient.fetch_csv', autospec=True, return_value=fake_csv,
         ):
             with mock.patch('socket.gethostbyname', autospec=True, return_value='256.256.256.256'):
                 assert [fake_task] == bounce_lib.filter_tasks_in_smartstack(
@@ -186,7 +189,14 @@ class TestBounceLib:
                     self.fake_system_paasta_config(),
                 )
 
-        with mock.patch('paasta_tools.smartstack_tools.get_multiple_backends', autospec=True, return_value=[]):
+        with mock.patch(
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+            return_value=SmartstackRegistrationService(),
+        ), mock.patch(
+            'paasta_tools.smartstack_tools._haproxy_stats_client', HaproxyStatsClient(), autospec=None,
+        ), mock.patch(
+            'paasta_tools.smartstack_tools.HaproxyStatsClient.fetch_csv', autospec=True, return_value='',
+        ):
             with mock.patch('socket.gethostbyname', autospec=True, return_value='256.256.256.256'):
                 assert [] == bounce_lib.filter_tasks_in_smartstack(
                     [fake_task], service, nerve_ns,
@@ -194,9 +204,11 @@ class TestBounceLib:
                 )
 
         with mock.patch(
-            'paasta_tools.bounce_lib.get_registered_marathon_tasks', autospec=True,
-            side_effect=[[fake_task], [ConnectionError], [RequestException]],
-        ):
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+        ) as mock_get_smartstack_registration_service:
+            mock_get_smartstack_registration_service.return_value.get_registered_tasks.side_effect = [
+                {'foo.bar': [fake_task]}, ConnectionError, RequestException,
+            ]
             assert [fake_task] == bounce_lib.filter_tasks_in_smartstack(
                 [fake_task],
                 service,
@@ -216,6 +228,25 @@ class TestBounceLib:
                 self.fake_system_paasta_config(),
             )
 
+    def test_filter_tasks_in_smartstack_shares_fetches_between_bounces(self):
+        fake_task = mock.Mock(name='fake_task', host='foo', ports=[123456])
+        fake_csv = '# pxname,svname,status,\nfoo.bar,foo_256.256.256.256:123456,UP,\n'
+        registration_service = SmartstackRegistrationService()
+        with mock.patch(
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+            return_value=registration_service,
+        ), mock.patch(
+            'paasta_tools.smartstack_tools._haproxy_stats_client', HaproxyStatsClient(), autospec=None,
+        ), mock.patch(
+            'paasta_tools.smartstack_tools.HaproxyStatsClient.fetch_csv', autospec=True, return_value=fake_csv,
+        ) as mock_fetch_csv, mock.patch(
+            'socket.gethostbyname', autospec=True, return_value='256.256.256.256',
+        ):
+            for service in ('foo', 'baz'):
+                bounce_lib.filter_tasks_in_smartstack([fake_task], service, 'bar', self.fake_system_paasta_config())
+            assert mock_fetch_csv.call_count == 1
+            assert registration_service.get_metrics()['hits'] == 1
+
     def test_get_happy_tasks_when_running_without_healthchecks_defined(self):
         """All running tasks with no health checks results are healthy if the app does not define healthchecks"""
         tasks = [mock.Mock(health_check_results=[]) for _ in range(5)]
@@ -303,8 +334,11 @@ class TestBounceLib:
         tasks = [mock.Mock(health_check_results=[mock.Mock(alive=True)]) for i in range(5)]
         fake_app = mock.Mock(tasks=tasks, health_checks=[])
         with mock.patch(
-            'paasta_tools.bounce_lib.get_registered_marathon_tasks', return_value=tasks[2:], autospec=True,
-        ):
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+        ) as mock_get_smartstack_registration_service:
+            mock_get_smartstack_registration_service.return_value.get_registered_tasks.return_value = {
+                'service.namespace': tasks[2:],
+            }
             actual = bounce_lib.get_happy_tasks(
                 fake_app, 'service', 'namespace', self.fake_system_paasta_config(),
                 check_haproxy=True,
@@ -318,8 +352,11 @@ class TestBounceLib:
         tasks = [mock.Mock(health_check_results=[mock.Mock(alive=False)]) for i in range(5)]
         fake_app = mock.Mock(tasks=tasks, health_checks=[])
         with mock.patch(
-            'paasta_tools.bounce_lib.get_registered_marathon_tasks', return_value=tasks[2:], autospec=True,
-        ):
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+        ) as mock_get_smartstack_registration_service:
+            mock_get_smartstack_registration_service.return_value.get_registered_tasks.return_value = {
+                'service.namespace': tasks[2:],
+            }
             actual = bounce_lib.get_happy_tasks(
                 fake_app, 'service', 'namespace', self.fake_system_paasta_config(),
                 check_haproxy=True,
@@ -333,9 +370,10 @@ class TestBounceLib:
         tasks = [mock.Mock(health_check_results=[mock.Mock(alive=True)], host='fake_host1') for i in range(5)]
         fake_app = mock.Mock(tasks=tasks, health_checks=[])
         with mock.patch(
-            'paasta_tools.bounce_lib.get_registered_marathon_tasks',
-            side_effect=[tasks[2:]], autospec=True,
-        ) as get_registered_marathon_tasks_patch:
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+        ) as mock_get_smartstack_registration_service:
+            get_registered_tasks_patch = mock_get_smartstack_registration_service.return_value.get_registered_tasks
+            get_registered_tasks_patch.side_effect = [{'service.namespace': tasks[2:]}]
             actual = bounce_lib.get_happy_tasks(
                 fake_app, 'service', 'namespace', self.fake_system_paasta_config(),
                 check_haproxy=True,
@@ -343,20 +381,20 @@ class TestBounceLib:
             expected = tasks[2:]
             assert actual == expected
 
-            get_registered_marathon_tasks_patch.assert_called_once_with(
-                'fake_host1',
-                123456,
-                utils.DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT,
-                'service.namespace',
-                tasks,
+            get_registered_tasks_patch.assert_called_once_with(
+                synapse_host='fake_host1',
+                synapse_port=123456,
+                synapse_haproxy_url_format=utils.DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT,
+                tasks_by_service={'service.namespace': tasks},
             )
 
     def test_filter_tasks_in_smartstack_only_calls_n_hosts(self):
         tasks = [mock.Mock(health_check_results=[mock.Mock(alive=True)], host=f'fake_host{i}') for i in range(5)]
         with mock.patch(
-            'paasta_tools.bounce_lib.get_registered_marathon_tasks',
-            return_value=tasks, autospec=True,
-        ) as get_registered_marathon_tasks_patch:
+            'paasta_tools.bounce_lib.get_smartstack_registration_service', autospec=True,
+        ) as mock_get_smartstack_registration_service:
+            get_registered_tasks_patch = mock_get_smartstack_registration_service.return_value.get_registered_tasks
+            get_registered_tasks_patch.return_value = {'service.nerve_ns': tasks}
             actual = bounce_lib.filter_tasks_in_smartstack(
                 tasks,
                 service='service',
@@ -365,7 +403,7 @@ class TestBounceLib:
                 max_hosts_to_query=3,
             )
             assert actual == tasks
-            assert get_registered_marathon_tasks_patch.call_count == 3
+            assert get_registered_tasks_patch.call_count == 3
 
     def test_flatten_tasks(self):
         """Simple check of flatten_tasks."""
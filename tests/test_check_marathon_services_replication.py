@@ -628,7 +628,7 @@ def test_send_event_if_under_replication_critical(instance_config):
 def test_main(instance_config):
     soa_dir = 'anw'
     crit = 1
-    args = mock.Mock(soa_dir=soa_dir, crit=crit, verbose=False)
+    args = mock.Mock(soa_dir=soa_dir, crit=crit, verbose=False, pipelined=False)
     instance_config.get_docker_image.return_value = True
     with mock.patch(
         'paasta_tools.check_marathon_services_replication.parse_args',
@@ -666,3 +666,109 @@ def test_main(instance_config):
         )
         instance_config.get_docker_image.assert_called_once_with()
         assert mock_check_service_replication.called
+
+
+def test_main_pipelined(instance_config):
+    args = mock.Mock(soa_dir='anw', verbose=False, pipelined=True, max_workers=2)
+    with mock.patch(
+        'paasta_tools.check_marathon_services_replication.parse_args',
+        return_value=args, autospec=True,
+    ), mock.patch(
+        'paasta_tools.check_marathon_services_replication.load_system_paasta_config',
+        autospec=True,
+    ) as mock_load_system_paasta_config, mock.patch(
+        'paasta_tools.check_marathon_services_replication.marathon_tools.get_marathon_clients',
+        autospec=True,
+    ) as mock_get_marathon_clients, mock.patch(
+        'paasta_tools.check_marathon_services_replication.get_slaves',
+        autospec=True,
+    ), mock.patch(
+        'paasta_tools.check_marathon_services_replication.SmartstackReplicationChecker',
+        autospec=True,
+    ) as mock_smartstack_replication_checker, mock.patch(
+        'paasta_tools.check_marathon_services_replication.check_all_services_replication_pipelined',
+        autospec=True,
+    ) as mock_check_all_services_replication_pipelined, mock.patch(
+        'paasta_tools.check_marathon_services_replication.get_metrics_interface',
+        autospec=True,
+    ):
+        mock_get_marathon_clients.return_value.get_all_clients.return_value = []
+        mock_load_system_paasta_config.return_value.get_cluster.return_value = 'fake_cluster'
+        check_marathon_services_replication.main()
+        mock_check_all_services_replication_pipelined.assert_called_once_with(
+            soa_dir='anw',
+            cluster='fake_cluster',
+            all_tasks=[],
+            smartstack_replication_checker=mock_smartstack_replication_checker.return_value,
+            max_workers=2,
+            timings=mock.ANY,
+        )
+
+
+def test_check_all_services_replication_pipelined():
+    smartstack_instance = mock.Mock(job_id='a.main')
+    smartstack_instance_2 = mock.Mock(job_id='b.main')
+    marathon_instance = mock.Mock(job_id='a.batch')
+    mock_checker = mock.Mock()
+    mock_checker.get_synapse_hosts_for_instance.side_effect = lambda ic: {
+        'a.main': {'uswest1-prod': 'host1', 'useast1-prod': 'host2'},
+        'b.main': {'uswest1-prod': 'host3'},
+    }[ic.job_id]
+    with mock.patch(
+        'paasta_tools.check_marathon_services_replication.list_services',
+        autospec=True,
+        return_value=['a', 'b', 'broken'],
+    ), mock.patch(
+        'paasta_tools.check_marathon_services_replication.get_deployed_instance_configs',
+        autospec=True,
+    ) as mock_get_deployed_instance_configs, mock.patch(
+        'paasta_tools.check_marathon_services_replication.is_checked_in_smartstack',
+        autospec=True,
+        side_effect=lambda ic: ic is not marathon_instance,
+    ), mock.patch(
+        'paasta_tools.check_marathon_services_replication.check_service_replication',
+        autospec=True,
+    ) as mock_check_service_replication:
+        def get_deployed_instance_configs(service, soa_dir, cluster):
+            if service == 'broken':
+                raise Exception("bad yaml")
+            return {'a': [smartstack_instance, marathon_instance], 'b': [smartstack_instance_2]}[service]
+        mock_get_deployed_instance_configs.side_effect = get_deployed_instance_configs
+        timings = check_marathon_services_replication.StageTimings()
+
+        check_marathon_services_replication.check_all_services_replication_pipelined(
+            soa_dir='soa_dir',
+            cluster='fake_cluster',
+            all_tasks=[],
+            smartstack_replication_checker=mock_checker,
+            max_workers=2,
+            timings=timings,
+        )
+
+        # each location is only fetched once, whichever instance asked for it first
+        assert mock_checker.prefetch_replication_for_location.call_count == 2
+        assert {c[0][0] for c in mock_checker.prefetch_replication_for_location.call_args_list} == {
+            'uswest1-prod', 'useast1-prod',
+        }
+        checked = {c[1]['instance_config'] for c in mock_check_service_replication.call_args_list}
+        assert checked == {smartstack_instance, smartstack_instance_2, marathon_instance}
+        assert set(timings.busy) == {'load_configs', 'fetch_haproxy', 'check_and_send_events'}
+
+
+def test_stage_timings_report():
+    timings = check_marathon_services_replication.StageTimings()
+    with mock.patch(
+        'paasta_tools.check_marathon_services_replication.time.time', autospec=True, side_effect=[1, 3, 2, 5],
+    ):
+        with timings.time('fetch_haproxy'):
+            pass
+        with timings.time('fetch_haproxy'):
+            pass
+    mock_metrics = mock.Mock()
+    timings.report(mock_metrics, 'fake_cluster')
+    mock_metrics.create_gauge.assert_has_calls([
+        mock.call('fetch_haproxy.wall_seconds', paasta_cluster='fake_cluster'),
+        mock.call().set(4),
+        mock.call('fetch_haproxy.busy_seconds', paasta_cluster='fake_cluster'),
+        mock.call().set(5),
+    ])
@@ -138,12 +138,13 @@ def test_clone_job_dependent_jobs(
         ('testcluster', 'testservice', 'test_dependent_instance_2', True, True,),
     ),
 )
+@mock.patch.dict('paasta_tools.chronos_tools._chronos_job_graphs', clear=True)
 @mock.patch('paasta_tools.chronos_rerun.clone_job', autospec=True)
 @mock.patch('paasta_tools.chronos_rerun.chronos_tools.get_job_type', autospec=True)
 @mock.patch('paasta_tools.chronos_rerun.remove_parents', autospec=True)
 @mock.patch('paasta_tools.chronos_tools.create_complete_config', autospec=True)
 @mock.patch('paasta_tools.chronos_tools.load_v2_deployments_json', autospec=True)
-@mock.patch('service_configuration_lib.read_services_configuration', autospec=True)
+@mock.patch('paasta_tools.chronos_tools.os.listdir', autospec=True)
 @mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True)
 @mock.patch('paasta_tools.chronos_tools.get_chronos_client', autospec=True)
 @mock.patch('paasta_tools.chronos_tools.load_chronos_config', autospec=True)
@@ -153,7 +154,7 @@ def test_chronos_rerun_main_with_independent_job(
     mock_load_chronos_config,
     mock_get_chronos_client,
     mock_read_chronos_jobs_for_service,
-    mock_read_services_configuration,
+    mock_listdir,
     mock_load_v2_deployments_json,
     mock_create_complete_config,
     mock_remove_parents,
@@ -182,7 +183,7 @@ def test_chronos_rerun_main_with_independent_job(
     def gen_dependent_job(service, instance):
         return dict(parents=f'{service}.{instance}', **generic_config_dict)
 
-    mock_read_services_configuration.return_value = [service]
+    mock_listdir.return_value = [service]
     mock_read_chronos_jobs_for_service.return_value = {
         'test_independent_instance_1': gen_scheduled_job(),
         'test_dependent_instance_1': gen_scheduled_job(),
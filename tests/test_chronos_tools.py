@@ -1990,16 +1990,16 @@ class TestChronosTools:
         mock_get_local_slave_state.assert_called_once_with(hostname=None)
         assert expected == actual
 
-    @mock.patch('service_configuration_lib.read_services_configuration', autospec=True)
+    @mock.patch('paasta_tools.chronos_tools.os.listdir', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.load_v2_deployments_json', autospec=True)
     def test__get_related_jobs_and_configs_only_independent_jobs(
-        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_read_services_configuration,
+        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_listdir,
     ):
         mock_load_v2_deployments_json.return_value.get_branch_dict.return_value = self.fake_branch_dict
         mock_read_chronos_jobs_for_service.return_value = self.fake_config_file
-        mock_read_services_configuration.return_value = [self.fake_service]
-        jobs, configs = _get_related_jobs_and_configs(cluster=self.fake_cluster, ttl=-1)  # ttl=-1 to disable cache
+        mock_listdir.return_value = [self.fake_service]
+        jobs, configs = _get_related_jobs_and_configs(cluster=self.fake_cluster, use_cache=False)
 
         expected_jobs = {
             (self.fake_service, self.fake_job_name): {(self.fake_service, self.fake_job_name)},
@@ -2023,34 +2023,34 @@ class TestChronosTools:
         assert jobs == expected_jobs
         assert configs == expected_configs
 
-    @mock.patch('service_configuration_lib.read_services_configuration', autospec=True)
+    @mock.patch('paasta_tools.chronos_tools.os.listdir', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.load_v2_deployments_json', autospec=True)
     def test__get_related_jobs_and_configs_only_independent_jobs_skips_non_deployed_services(
-        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_read_services_configuration,
+        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_listdir,
     ):
         mock_load_v2_deployments_json.return_value.get_branch_dict.side_effect = NoDeploymentsAvailable
         mock_read_chronos_jobs_for_service.return_value = self.fake_config_file
-        mock_read_services_configuration.return_value = [self.fake_service]
-        jobs, configs = _get_related_jobs_and_configs(cluster=self.fake_cluster, ttl=-1)  # ttl=-1 to disable cache
+        mock_listdir.return_value = [self.fake_service]
+        jobs, configs = _get_related_jobs_and_configs(cluster=self.fake_cluster, use_cache=False)
 
         assert jobs == {}
         assert configs == {}
 
-    @mock.patch('service_configuration_lib.read_services_configuration', autospec=True)
+    @mock.patch('paasta_tools.chronos_tools.os.listdir', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.load_v2_deployments_json', autospec=True)
     def test__get_related_jobs_and_configs_with_dependent_jobs(
-        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_read_services_configuration,
+        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_listdir,
     ):
         mock_load_v2_deployments_json.return_value.get_branch_dict.return_value = self.fake_branch_dict
         mock_read_chronos_jobs_for_service.return_value = {
             self.fake_job_name: self.fake_config_dict,
             self.fake_dependent_job_name: self.fake_dependent_job_config_dict,
         }
-        mock_read_services_configuration.return_value = [self.fake_service]
+        mock_listdir.return_value = [self.fake_service]
 
-        jobs, configs = _get_related_jobs_and_configs(cluster=self.fake_cluster, ttl=-1)  # ttl=-1 to disable cache
+        jobs, configs = _get_related_jobs_and_configs(cluster=self.fake_cluster, use_cache=False)
 
         related_jobs = {(self.fake_service, self.fake_job_name), (self.fake_service, self.fake_dependent_job_name)}
         expected_jobs = {
@@ -2076,15 +2076,15 @@ class TestChronosTools:
         assert jobs == expected_jobs
         assert configs == expected_configs
 
-    @mock.patch('service_configuration_lib.read_services_configuration', autospec=True)
+    @mock.patch('paasta_tools.chronos_tools.os.listdir', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.load_v2_deployments_json', autospec=True)
     def test_get_related_jobs_configs_only_independent_jobs(
-        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_read_services_configuration,
+        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_listdir,
     ):
         mock_load_v2_deployments_json.return_value.get_branch_dict.return_value = self.fake_branch_dict
         mock_read_chronos_jobs_for_service.return_value = self.fake_config_file
-        mock_read_services_configuration.return_value = [self.fake_service]
+        mock_listdir.return_value = [self.fake_service]
         related_jobs_configs = get_related_jobs_configs(
             cluster=self.fake_cluster, service=self.fake_service, instance=self.fake_job_name, use_cache=False,
         )
@@ -2100,18 +2100,18 @@ class TestChronosTools:
 
         assert related_jobs_configs == expected_related_jobs_configs
 
-    @mock.patch('service_configuration_lib.read_services_configuration', autospec=True)
+    @mock.patch('paasta_tools.chronos_tools.os.listdir', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True)
     @mock.patch('paasta_tools.chronos_tools.load_v2_deployments_json', autospec=True)
     def test_get_related_jobs_configs_with_dependent_jobs(
-        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_read_services_configuration,
+        self, mock_load_v2_deployments_json, mock_read_chronos_jobs_for_service, mock_listdir,
     ):
         mock_load_v2_deployments_json.return_value.get_branch_dict.return_value = self.fake_branch_dict
         mock_read_chronos_jobs_for_service.return_value = {
             self.fake_job_name: self.fake_config_dict,
             self.fake_dependent_job_name: self.fake_dependent_job_config_dict,
         }
-        mock_read_services_configuration.return_value = [self.fake_service]
+        mock_listdir.return_value = [self.fake_service]
         related_jobs_configs = get_related_jobs_configs(
             cluster=self.fake_cluster, service=self.fake_service, instance=self.fake_job_name, use_cache=False,
         )
@@ -2177,3 +2177,90 @@ class TestChronosTools:
                 'paasta_secrets': {'SOME': 'hash'},
             }
             assert ret == expected
+
+
+def _fake_chronos_job_config(service, instance, parents=None):
+    config_dict = {'cmd': '/bin/true'}
+    if parents is not None:
+        config_dict['parents'] = parents
+    else:
+        config_dict['schedule'] = 'R/2015-03-25T19:36:35Z/PT5M'
+    return ChronosJobConfig(
+        service=service, cluster='penguin', instance=instance, config_dict=config_dict, branch_dict=None,
+    )
+
+
+def test_chronos_job_graph_only_reloads_changed_services(tmpdir):
+    jobs = {
+        'svc1': {'a': None, 'b': ['svc1.a']},
+        'svc2': {'c': ['svc1.b'], 'd': None},
+    }
+    for service in jobs:
+        tmpdir.mkdir(service).join('chronos-penguin.yaml').write('a')
+    tmpdir.mkdir('no-chronos-jobs')
+    jobs['no-chronos-jobs'] = {}
+
+    with mock.patch(
+        'paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True,
+        side_effect=lambda service, cluster, soa_dir, ttl: jobs[service],
+    ) as mock_read_chronos_jobs_for_service, mock.patch(
+        'paasta_tools.chronos_tools.load_chronos_job_config', autospec=True,
+        side_effect=lambda service, instance, cluster, soa_dir: _fake_chronos_job_config(
+            service, instance, jobs[service][instance],
+        ),
+    ):
+        graph = chronos_tools.ChronosJobGraph('penguin', soa_dir=str(tmpdir), refresh_interval=0)
+        graph.refresh()
+        assert mock_read_chronos_jobs_for_service.call_count == 3
+        assert graph.related_jobs('svc2', 'c') == {('svc1', 'a'), ('svc1', 'b'), ('svc2', 'c')}
+        assert graph.related_jobs('svc2', 'd') == {('svc2', 'd')}
+        assert graph.topological_sort('svc1', 'b') == [('svc1', 'a'), ('svc1', 'b'), ('svc2', 'c')]
+
+        graph.refresh()
+        assert mock_read_chronos_jobs_for_service.call_count == 3
+
+        jobs['svc2'] = {'d': ['svc1.a']}
+        tmpdir.join('svc2', 'chronos-penguin.yaml').write('ab')
+        graph.refresh()
+        assert mock_read_chronos_jobs_for_service.call_count == 4
+        assert graph.related_jobs('svc1', 'a') == {('svc1', 'a'), ('svc1', 'b'), ('svc2', 'd')}
+        assert ('svc2', 'c') not in graph.configs
+
+        graph.refresh(force=True)
+        assert mock_read_chronos_jobs_for_service.call_count == 7
+
+
+def test_chronos_job_graph_refreshes_at_most_once_per_interval(tmpdir):
+    tmpdir.mkdir('svc').join('chronos-penguin.yaml').write('a')
+    with mock.patch(
+        'paasta_tools.chronos_tools.read_chronos_jobs_for_service', autospec=True, return_value={'a': {}},
+    ) as mock_read_chronos_jobs_for_service, mock.patch(
+        'paasta_tools.chronos_tools.load_chronos_job_config', autospec=True,
+        side_effect=lambda service, instance, cluster, soa_dir: _fake_chronos_job_config(service, instance),
+    ), mock.patch(
+        'paasta_tools.chronos_tools.time.monotonic', autospec=True, side_effect=[100, 104, 104, 110],
+    ):
+        graph = chronos_tools.ChronosJobGraph('penguin', soa_dir=str(tmpdir), refresh_interval=5)
+        graph.refresh()
+        assert mock_read_chronos_jobs_for_service.call_count == 1
+
+        tmpdir.join('svc', 'chronos-penguin.yaml').write('ab')
+        graph.refresh()
+        assert mock_read_chronos_jobs_for_service.call_count == 1
+        graph.refresh(force=True)
+        assert mock_read_chronos_jobs_for_service.call_count == 2
+
+        tmpdir.join('svc', 'chronos-penguin.yaml').write('abc')
+        graph.refresh()
+        assert mock_read_chronos_jobs_for_service.call_count == 3
+
+
+def test_chronos_job_graph_topological_sort_cycle():
+    graph = chronos_tools.ChronosJobGraph('penguin')
+    graph.configs_by_service = {'svc': {
+        ('svc', 'a'): _fake_chronos_job_config('svc', 'a', ['svc.b']),
+        ('svc', 'b'): _fake_chronos_job_config('svc', 'b', ['svc.a']),
+    }}
+    graph._rebuild()
+    with raises(ValueError):
+        graph.topological_sort('svc', 'a')
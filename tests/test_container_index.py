@@ -0,0 +1,130 @@
+import mock
+import pytest
+
+from paasta_tools import container_index
+from paasta_tools.container_index import ContainerIndex
+from paasta_tools.container_index import ServiceContainer
+
+
+def _container(container_id, service, instance, mac, ip, network_mode='bridge'):
+    return {
+        'Id': container_id,
+        'HostConfig': {'NetworkMode': network_mode},
+        'Labels': {'paasta_service': service, 'paasta_instance': instance},
+        'NetworkSettings': {
+            'Networks': {
+                'bridge': {
+                    'MacAddress': mac,
+                    'IPAddress': ip,
+                },
+            },
+        },
+    }
+
+
+@pytest.yield_fixture
+def mock_get_running_mesos_docker_containers():
+    with mock.patch.object(
+        container_index, 'get_running_mesos_docker_containers', autospec=True,
+        return_value=[
+            _container('abc', 'myservice', 'main', '02:42:a9:fe:00:0a', '1.1.1.1'),
+            _container('def', 'myservice', 'canary', '02:42:a9:fe:00:0b', '2.2.2.2'),
+            _container('ghi', 'myservice', 'batch', None, None, network_mode='host'),
+            {'Id': 'jkl', 'HostConfig': {'NetworkMode': 'bridge'}, 'Labels': {}},
+        ],
+    ) as m:
+        yield m
+
+
+def test_service_container():
+    assert container_index.service_container(
+        _container('abc', 'myservice', 'main', '02:42:a9:fe:00:0a', '1.1.1.1'),
+    ) == ServiceContainer('myservice', 'main', '02:42:a9:fe:00:0a', '1.1.1.1')
+    assert container_index.service_container(
+        _container('abc', 'myservice', 'main', None, None, network_mode='host'),
+    ) is None
+    assert container_index.service_container(
+        {'HostConfig': {'NetworkMode': 'bridge'}, 'Labels': {'paasta_service': 'myservice'}},
+    ) is None
+
+
+def test_resync(mock_get_running_mesos_docker_containers):
+    index = ContainerIndex()
+    with mock.patch.object(container_index.time, 'time', autospec=True, return_value=1000.5):
+        assert index.resync() == 1000
+
+    main = ServiceContainer('myservice', 'main', '02:42:a9:fe:00:0a', '1.1.1.1')
+    assert index.by_ip('1.1.1.1') == main
+    assert index.by_mac('02:42:A9:FE:00:0A') == main
+    assert index.by_id('abc') == main
+    assert index.by_ip('3.3.3.3') is None
+    assert sorted(index.containers()) == [
+        ServiceContainer('myservice', 'canary', '02:42:a9:fe:00:0b', '2.2.2.2'),
+        main,
+    ]
+    assert mock_get_running_mesos_docker_containers.call_count == 1
+
+
+def test_handle_event(mock_get_running_mesos_docker_containers):
+    index = ContainerIndex()
+    index.resync()
+
+    # a new container is given the address of one that just died
+    mock_get_running_mesos_docker_containers.return_value = [
+        _container('xyz', 'otherservice', 'main', '02:42:a9:fe:00:0a', '1.1.1.1'),
+    ]
+    index.handle_event({'status': 'start', 'id': 'xyz'})
+    mock_get_running_mesos_docker_containers.assert_called_with(filters={'id': 'xyz'})
+    index.handle_event({'status': 'die', 'id': 'abc'})
+
+    other = ServiceContainer('otherservice', 'main', '02:42:a9:fe:00:0a', '1.1.1.1')
+    assert index.by_ip('1.1.1.1') == other
+    assert index.by_mac('02:42:a9:fe:00:0a') == other
+    assert index.by_id('abc') is None
+
+    index.handle_event({'status': 'die', 'id': 'xyz'})
+    assert index.by_ip('1.1.1.1') is None
+    assert index.by_mac('02:42:a9:fe:00:0a') is None
+
+    # unrelated events don't touch docker
+    mock_get_running_mesos_docker_containers.reset_mock()
+    index.handle_event({'status': 'start'})
+    index.handle_event({'status': 'die', 'id': 'unknown'})
+    assert mock_get_running_mesos_docker_containers.called is False
+
+
+def test_follow_events(mock_get_running_mesos_docker_containers):
+    index = ContainerIndex(resync_interval=60)
+    with mock.patch.object(
+        container_index, 'get_docker_client', autospec=True,
+    ) as mock_get_docker_client, mock.patch.object(
+        index, 'handle_event', autospec=True,
+    ) as mock_handle_event:
+        mock_get_docker_client.return_value.events.return_value = iter([{'status': 'die', 'id': 'abc'}])
+        index.follow_events(1000)
+
+    mock_get_docker_client.return_value.events.assert_called_once_with(
+        since=1000,
+        until=1060,
+        filters={'event': ['start', 'die']},
+        decode=True,
+    )
+    assert mock_handle_event.mock_calls == [mock.call({'status': 'die', 'id': 'abc'})]
+
+
+def test_get_container_index():
+    with mock.patch.object(
+        container_index, '_container_index', None,
+    ), mock.patch.object(
+        container_index.ContainerIndex, 'start', autospec=True,
+    ) as mock_start, mock.patch.object(
+        container_index.os, 'getpid', autospec=True, return_value=100,
+    ) as mock_getpid:
+        index = container_index.get_container_index()
+        assert container_index.get_container_index() is index
+        assert mock_start.call_count == 1
+
+        # after a fork the child starts its own index
+        mock_getpid.return_value = 101
+        assert container_index.get_container_index() is not index
+        assert mock_start.call_count == 2
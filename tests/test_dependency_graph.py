@@ -0,0 +1,37 @@
+import pytest
+
+from paasta_tools.dependency_graph import topological_sort
+from paasta_tools.dependency_graph import UnionFind
+
+
+def test_union_find_components():
+    union_find = UnionFind()
+    union_find.union('a', 'b')
+    union_find.union('c', 'd')
+    union_find.union('b', 'd')
+    union_find.add('e')
+    components = union_find.components()
+    assert components['a'] == {'a', 'b', 'c', 'd'}
+    assert components['a'] is components['d']
+    assert components['e'] == {'e'}
+    assert union_find.find('c') == union_find.find('a')
+
+
+def test_topological_sort():
+    parents = {'c': ['a', 'b'], 'b': ['a'], 'd': ['not-a-node']}
+    assert topological_sort(['c', 'b', 'a', 'd'], parents) == ['a', 'd', 'b', 'c']
+
+
+def test_topological_sort_cycle():
+    with pytest.raises(ValueError):
+        topological_sort(['a', 'b', 'c'], {'a': ['c'], 'b': ['a'], 'c': ['b']})
+
+
+def test_deep_chains_do_not_recurse():
+    depth = 20000
+    parents = {i: [i - 1] for i in range(1, depth)}
+    assert topological_sort(reversed(range(depth)), parents) == list(range(depth))
+    union_find = UnionFind()
+    for i in range(1, depth):
+        union_find.union(i - 1, i)
+    assert len(union_find.components()[0]) == depth
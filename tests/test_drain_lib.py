@@ -19,6 +19,7 @@ import pytest
 from pytest import raises
 
 from paasta_tools import drain_lib
+from paasta_tools import hacheck
 
 
 def test_register_drain_method():
@@ -56,6 +57,20 @@ def mock_ClientSession(**fake_session_kwargs):
         yield
 
 
+@contextlib.contextmanager
+def mock_hacheck_session(**fake_session_kwargs):
+    fake_session = asynctest.MagicMock(
+        name="session",
+        **fake_session_kwargs,
+    )
+    with mock.patch(
+        'paasta_tools.hacheck.session_pool.get_session', autospec=True, return_value=fake_session,
+    ), mock.patch.object(
+        hacheck, '_hacheck_client', hacheck.HacheckClient(),
+    ):
+        yield fake_session
+
+
 class TestHacheckDrainMethod:
     drain_method = drain_lib.HacheckDrainMethod(
         service="srv",
@@ -105,7 +120,7 @@ class TestHacheckDrainMethod:
             ),
         )
         fake_task = mock.Mock(host="fake_host", ports=[54321])
-        with mock_ClientSession(
+        with mock_hacheck_session(
             get=mock.Mock(
                 return_value=asynctest.MagicMock(
                     __aenter__=asynctest.CoroutineMock(return_value=fake_response),
@@ -123,7 +138,7 @@ class TestHacheckDrainMethod:
             ),
         )
         fake_task = mock.Mock(host="fake_host", ports=[54321])
-        with mock_ClientSession(
+        with mock_hacheck_session(
             get=mock.Mock(
                 return_value=asynctest.MagicMock(
                     __aenter__=asynctest.CoroutineMock(return_value=fake_response),
@@ -86,11 +86,24 @@ def test_services_running_here():
     )
 
 
+def test_services_running_here_from_container_index():
+    container_index = mock.Mock(**{
+        'containers.return_value': [
+            ('myservice', 'hassecurity', '02:42:a9:fe:00:0a', '1.1.1.1'),
+        ],
+    })
+    with mock.patch.object(firewall, 'get_running_mesos_docker_containers', autospec=True) as mock_list:
+        assert tuple(firewall.services_running_here(container_index)) == (
+            ('myservice', 'hassecurity', '02:42:a9:fe:00:0a', '1.1.1.1'),
+        )
+    assert mock_list.called is False
+
+
 @pytest.yield_fixture
 def mock_services_running_here():
     with mock.patch.object(
         firewall, 'services_running_here', autospec=True,
-        side_effect=lambda: iter((
+        side_effect=lambda container_index=None: iter((
             ('example_happyhour', 'main', '02:42:a9:fe:00:00', '1.1.1.1'),
             ('example_happyhour', 'main', '02:42:a9:fe:00:01', '2.2.2.2'),
             ('example_happyhour', 'batch', '02:42:a9:fe:00:02', '3.3.3.3'),
@@ -396,16 +409,15 @@ def test_service_group_rules_empty_when_service_is_deleted(service_group, mock_s
         assert service_group.get_rules(DEFAULT_SOA_DIR, firewall.DEFAULT_SYNAPSE_SERVICE_DIR) == ()
 
 
-@mock.patch.object(iptables, 'ensure_chain', autospec=True)
-@mock.patch.object(iptables, 'reorder_chain', autospec=True)
-def test_service_group_update_rules(reorder_mock, ensure_mock, service_group):
+@mock.patch.object(iptables, 'ensure_chains', autospec=True, return_value=0)
+def test_service_group_update_rules(ensure_mock, service_group):
     with mock.patch.object(type(service_group), 'get_rules', return_value=mock.sentinel.RULES):
         service_group.update_rules(DEFAULT_SOA_DIR, firewall.DEFAULT_SYNAPSE_SERVICE_DIR)
     ensure_mock.assert_called_once_with(
-        service_group.chain_name,
-        mock.sentinel.RULES,
+        {service_group.chain_name: mock.sentinel.RULES},
+        required_rules=None,
+        garbage_collect=None,
     )
-    reorder_mock.assert_called_once_with(service_group.chain_name)
 
 
 def test_active_service_groups(mock_service_config, mock_services_running_here):
@@ -424,13 +436,8 @@ def test_active_service_groups(mock_service_config, mock_services_running_here):
     }
 
 
-def test_ensure_internet_chain():
-    with mock.patch.object(iptables, 'ensure_chain', autospec=True) as m:
-        firewall._ensure_internet_chain()
-    call, = m.call_args_list
-    args, _ = call
-    assert args[0] == 'PAASTA-INTERNET'
-    assert args[1] == (
+def test_internet_chain_rules():
+    assert firewall._internet_chain_rules() == (
         EMPTY_RULE._replace(target='ACCEPT'),
         EMPTY_RULE._replace(dst='127.0.0.0/255.0.0.0', target='RETURN'),
         EMPTY_RULE._replace(dst='10.0.0.0/255.0.0.0', target='RETURN'),
@@ -459,9 +466,8 @@ def mock_active_service_groups():
     return groups
 
 
-@mock.patch.object(iptables, 'reorder_chain', autospec=True)
-def test_ensure_service_chains(mock_reorder_chain, mock_active_service_groups, mock_service_config):
-    with mock.patch.object(iptables, 'ensure_chain', autospec=True) as m:
+def test_ensure_service_chains(mock_active_service_groups, mock_service_config):
+    with mock.patch.object(iptables, 'ensure_chains', autospec=True, return_value=0) as m:
         assert firewall.ensure_service_chains(
             mock_active_service_groups,
             DEFAULT_SOA_DIR,
@@ -475,74 +481,68 @@ def test_ensure_service_chains(mock_reorder_chain, mock_active_service_groups, m
                 'fe:a3:a3:da:2d:31',
             },
         }
-    assert len(m.mock_calls) == 2
-    assert mock.call('PAASTA.cool_servi.397dba3c1f', mock.ANY) in m.mock_calls
-    assert mock.call('PAASTA.dumb_servi.8fb64b4f63', mock.ANY) in m.mock_calls
-    assert mock.call('PAASTA.cool_servi.397dba3c1f') in mock_reorder_chain.mock_calls
-    assert mock.call('PAASTA.dumb_servi.8fb64b4f63') in mock_reorder_chain.mock_calls
-
+    call, = m.call_args_list
+    args, _ = call
+    assert set(args[0]) == {'PAASTA.cool_servi.397dba3c1f', 'PAASTA.dumb_servi.8fb64b4f63'}
 
-def test_ensure_dispatch_chains():
-    with mock.patch.object(
-        iptables, 'ensure_rule', autospec=True,
-    ) as mock_ensure_rule, mock.patch.object(
-        iptables, 'ensure_chain', autospec=True,
-    ) as mock_ensure_chain:
-        firewall.ensure_dispatch_chains({
-            'chain1': {'mac1', 'mac2'},
-            'chain2': {'mac3'},
-        })
-
-    assert mock_ensure_chain.mock_calls == [mock.call(
-        'PAASTA', {
-            EMPTY_RULE._replace(
-                target='chain1', matches=(('mac', (('mac-source', ('MAC1',)),)),),
-            ),
-            EMPTY_RULE._replace(
-                target='chain1', matches=(('mac', (('mac-source', ('MAC2',)),)),),
-            ),
-            EMPTY_RULE._replace(
-                target='chain2', matches=(('mac', (('mac-source', ('MAC3',)),)),),
-            ),
-        },
-    )]
 
-    assert mock_ensure_rule.mock_calls == [
-        mock.call('INPUT', EMPTY_RULE._replace(target='PAASTA')),
-        mock.call('FORWARD', EMPTY_RULE._replace(target='PAASTA')),
-    ]
+def test_dispatch_rules():
+    assert firewall.dispatch_rules({
+        'chain1': {'mac1', 'mac2'},
+        'chain2': {'mac3'},
+    }) == {
+        EMPTY_RULE._replace(
+            target='chain1', matches=(('mac', (('mac-source', ('MAC1',)),)),),
+        ),
+        EMPTY_RULE._replace(
+            target='chain1', matches=(('mac', (('mac-source', ('MAC2',)),)),),
+        ),
+        EMPTY_RULE._replace(
+            target='chain2', matches=(('mac', (('mac-source', ('MAC3',)),)),),
+        ),
+    }
 
 
-def test_garbage_collect_old_service_chains():
+@mock.patch.object(firewall.ServiceGroup, 'get_rules', return_value=mock.sentinel.RULES)
+@mock.patch.object(firewall, 'shared_chains', return_value={'PAASTA-COMMON': mock.sentinel.COMMON_RULES})
+@mock.patch.object(iptables, 'ensure_chains', autospec=True, return_value=3)
+def test_general_update(ensure_chains_mock, shared_chains_mock, get_rules_mock):
     with mock.patch.object(
-        iptables, 'delete_chain', autospec=True,
-    ) as mock_delete_chain, mock.patch.object(
-        iptables, 'all_chains', autospec=True, return_value={
-            'INPUT',
-            'OUTPUT',
-            'FORWARD',
-            'DOCKER',
-            'PAASTA',
-            'PAASTA-INTERNET',
-            'PAASTA.chain1',
-            'PAASTA.chain3',
+        firewall, 'active_service_groups', autospec=True, return_value={
+            firewall.ServiceGroup('myservice', 'myinstance'): {'00:00:00:00:00:00'},
         },
     ):
-        firewall.garbage_collect_old_service_chains({
-            'PAASTA.chain1': {'mac1', 'mac2'},
-            'PAASTA.chain2': {'mac3'},
-        })
+        assert firewall.general_update(DEFAULT_SOA_DIR, firewall.DEFAULT_SYNAPSE_SERVICE_DIR) == 3
+
+    ensure_chains_mock.assert_called_once_with(
+        {
+            'PAASTA-COMMON': mock.sentinel.COMMON_RULES,
+            'PAASTA.myservice.7e8522249a': mock.sentinel.RULES,
+            'PAASTA': {
+                EMPTY_RULE._replace(
+                    target='PAASTA.myservice.7e8522249a',
+                    matches=(('mac', (('mac-source', ('00:00:00:00:00:00',)),)),),
+                ),
+            },
+        },
+        required_rules={
+            'INPUT': (EMPTY_RULE._replace(target='PAASTA'),),
+            'FORWARD': (EMPTY_RULE._replace(target='PAASTA'),),
+        },
+        garbage_collect=firewall._is_service_chain,
+    )
 
-    assert mock_delete_chain.mock_calls == [
-        mock.call('PAASTA.chain3'),
-    ]
+
+def test_is_service_chain():
+    assert firewall._is_service_chain('PAASTA.chain1') is True
+    assert firewall._is_service_chain('PAASTA-INTERNET') is False
+    assert firewall._is_service_chain('DOCKER') is False
 
 
 @mock.patch.object(firewall.ServiceGroup, 'get_rules', return_value=mock.sentinel.RULES)
-@mock.patch.object(iptables, 'reorder_chain', autospec=True)
-@mock.patch.object(iptables, 'ensure_chain', autospec=True)
-@mock.patch.object(iptables, 'insert_rule', autospec=True)
-def test_prepare_new_container(insert_rule_mock, ensure_chain_mock, reorder_chain_mock, get_rules_mock):
+@mock.patch.object(firewall, 'shared_chains', return_value={'PAASTA-COMMON': mock.sentinel.COMMON_RULES})
+@mock.patch.object(iptables, 'ensure_chains', autospec=True, return_value=0)
+def test_prepare_new_container(ensure_chains_mock, shared_chains_mock, get_rules_mock):
     firewall.prepare_new_container(
         DEFAULT_SOA_DIR,
         firewall.DEFAULT_SYNAPSE_SERVICE_DIR,
@@ -550,24 +550,21 @@ def test_prepare_new_container(insert_rule_mock, ensure_chain_mock, reorder_chai
         'myinstance',
         '00:00:00:00:00:00',
     )
-    assert ensure_chain_mock.mock_calls == [
-        mock.call('PAASTA-DNS', mock.ANY),
-        mock.call('PAASTA-INTERNET', mock.ANY),
-        mock.call('PAASTA-COMMON', mock.ANY),
-        mock.call('PAASTA.myservice.7e8522249a', mock.sentinel.RULES),
-    ]
-    assert reorder_chain_mock.mock_calls == [
-        mock.call('PAASTA.myservice.7e8522249a'),
-    ]
-    assert insert_rule_mock.mock_calls == [
-        mock.call(
-            'PAASTA',
-            EMPTY_RULE._replace(
-                target='PAASTA.myservice.7e8522249a',
-                matches=(('mac', (('mac-source', ('00:00:00:00:00:00',)),)),),
+    ensure_chains_mock.assert_called_once_with(
+        {
+            'PAASTA-COMMON': mock.sentinel.COMMON_RULES,
+            'PAASTA.myservice.7e8522249a': mock.sentinel.RULES,
+        },
+        required_rules={
+            'PAASTA': (
+                EMPTY_RULE._replace(
+                    target='PAASTA.myservice.7e8522249a',
+                    matches=(('mac', (('mac-source', ('00:00:00:00:00:00',)),)),),
+                ),
             ),
-        ),
-    ]
+        },
+        garbage_collect=None,
+    )
 
 
 @pytest.mark.parametrize(
@@ -602,22 +599,15 @@ def test_dns_servers(tmpdir, resolv_conf, expected):
         assert tuple(firewall._dns_servers()) == expected
 
 
-def test_ensure_dns_chain(tmpdir):
+def test_dns_chain_rules(tmpdir):
     path = tmpdir.join('resolv.conf')
     path.write(
         'nameserver 8.8.8.8\n'
         'nameserver 8.8.4.4\n',
     )
-    with mock.patch.object(
-        iptables, 'ensure_chain', autospec=True,
-    ) as m, mock.patch.object(
-        firewall, 'RESOLV_CONF', path.strpath,
-    ):
-        firewall._ensure_dns_chain()
-    call, = m.call_args_list
-    args, _ = call
-    assert args[0] == 'PAASTA-DNS'
-    assert args[1] == (
+    with mock.patch.object(firewall, 'RESOLV_CONF', path.strpath):
+        rules = firewall._dns_chain_rules()
+    assert rules == (
         EMPTY_RULE._replace(
             dst='8.8.8.8/255.255.255.255',
             target='ACCEPT',
@@ -653,13 +643,8 @@ def test_ensure_dns_chain(tmpdir):
     )
 
 
-def test_ensure_common_chain():
-    with mock.patch.object(iptables, 'ensure_chain', autospec=True) as m:
-        firewall._ensure_common_chain()
-    call, = m.call_args_list
-    args, _ = call
-    assert args[0] == 'PAASTA-COMMON'
-    assert args[1] == (
+def test_common_chain_rules():
+    assert firewall._common_chain_rules() == (
         EMPTY_RULE._replace(
             target='ACCEPT',
             matches=(
@@ -2,6 +2,7 @@ import mock
 import pytest
 
 from paasta_tools import firewall_logging
+from paasta_tools.container_index import ServiceContainer
 
 
 @mock.patch.object(firewall_logging, 'lookup_service_instance_by_ip')
@@ -49,14 +50,13 @@ def test_syslog_to_paasta_log_bad_message(mock_lookup_service_instance_by_ip, sy
     assert mock_log.mock_calls == []
 
 
-@mock.patch.object(
-    firewall_logging, 'services_running_here', return_value=[
-        ('service1', 'instance1', '00:00:00:00:00', '1.1.1.1'),
-        ('service1', 'instance2', '00:00:00:00:00', '2.2.2.2'),
-    ],
-)
+@mock.patch.object(firewall_logging, 'get_container_index', autospec=True)
 @mock.patch.object(firewall_logging, 'log')
-def test_lookup_service_instance_by_ip(my_mock_log, mock_services_running_here):
+def test_lookup_service_instance_by_ip(my_mock_log, mock_get_container_index):
+    mock_get_container_index.return_value.by_ip.side_effect = {
+        '1.1.1.1': ServiceContainer('service1', 'instance1', '00:00:00:00:00', '1.1.1.1'),
+        '2.2.2.2': ServiceContainer('service1', 'instance2', '00:00:00:00:00', '2.2.2.2'),
+    }.get
     assert firewall_logging.lookup_service_instance_by_ip('1.1.1.1') == ('service1', 'instance1')
     assert firewall_logging.lookup_service_instance_by_ip('2.2.2.2') == ('service1', 'instance2')
     assert firewall_logging.lookup_service_instance_by_ip('3.3.3.3') == (None, None)
@@ -120,9 +120,10 @@ def test_smartstack_dependencies_of_running_firewalled_services(_, __, tmpdir):
     }
 
 
+@mock.patch.object(firewall_update, 'get_container_index', autospec=True)
 @mock.patch.object(firewall_update, 'smartstack_dependencies_of_running_firewalled_services', autospec=True)
 @mock.patch.object(firewall_update, 'process_inotify_event', side_effect=StopIteration, autospec=True)
-def test_run_daemon(process_inotify_mock, smartstack_deps_mock, mock_daemon_args):
+def test_run_daemon(process_inotify_mock, smartstack_deps_mock, get_container_index_mock, mock_daemon_args):
     class kill_after_too_long:
         def __init__(self):
             self.count = 0
@@ -141,6 +142,9 @@ def test_run_daemon(process_inotify_mock, smartstack_deps_mock, mock_daemon_args
     assert smartstack_deps_mock.call_count > 0
     assert process_inotify_mock.call_args[0][0][3] == b'mydep.depinstance.json'
     assert process_inotify_mock.call_args[0][1] == {}
+    # containers are looked up in the index rather than listed on every event
+    assert smartstack_deps_mock.call_args[1]['container_index'] == get_container_index_mock.return_value
+    assert process_inotify_mock.call_args[1]['container_index'] == get_container_index_mock.return_value
 
 
 @mock.patch.object(firewall, 'firewall_flock', autospec=True)
@@ -1,4 +1,7 @@
+import asyncio
 import contextlib
+import threading
+import time
 
 import asynctest
 import mock
@@ -7,50 +10,36 @@ import pytest
 from paasta_tools import hacheck
 
 
+FAKE_SPOOL_TEXT = "Service service in down state since 1435694078.778886 until 1435694178.780000: Drained by Paasta"
+
+
 @contextlib.contextmanager
-def mock_ClientSession(**fake_session_kwargs):
+def mock_hacheck_session(**fake_session_kwargs):
+    """Give a fresh HacheckClient whose pooled session is a mock."""
     fake_session = asynctest.MagicMock(
         name="session",
         **fake_session_kwargs,
     )
-
-    class FakeClientSession:
-        def __init__(self, *args, **kwargs):
-            ...
-
-        async def __aenter__(*args):
-            return fake_session
-
-        async def __aexit__(*args):
-            pass
-
     with mock.patch(
-        'aiohttp.ClientSession',
-        new=FakeClientSession,
-        autospec=False,
+        'paasta_tools.hacheck.session_pool.get_session', autospec=True, return_value=fake_session,
+    ), mock.patch.object(
+        hacheck, '_hacheck_client', hacheck.HacheckClient(),
     ):
-        yield
+        yield fake_session
 
 
-@pytest.mark.asyncio
-async def test_get_spool():
-    fake_response = mock.Mock(
-        status=503,
-        text=asynctest.CoroutineMock(
-            return_value="Service service in down state since 1435694078.778886 "
-                         "until 1435694178.780000: Drained by Paasta",
+def mock_response(status, text):
+    return asynctest.MagicMock(
+        __aenter__=asynctest.CoroutineMock(
+            return_value=mock.Mock(status=status, text=asynctest.CoroutineMock(return_value=text)),
         ),
     )
-    fake_task = mock.Mock(host="fake_host", ports=[54321])
 
-    with mock_ClientSession(
-        get=asynctest.Mock(
-            return_value=asynctest.MagicMock(
-                __aenter__=asynctest.CoroutineMock(return_value=fake_response),
-            ),
-        ),
-    ):
-        actual = await hacheck.get_spool(fake_task)
+
+@pytest.mark.asyncio
+async def test_get_spool():
+    with mock_hacheck_session(get=asynctest.Mock(return_value=mock_response(503, FAKE_SPOOL_TEXT))):
+        actual = await hacheck.get_spool('http://fake_host:6666/spool/service/54321/status')
 
     expected = {
         'service': 'service',
@@ -66,3 +55,112 @@ async def test_get_spool():
 async def test_get_spool_handles_no_ports():
     actual = await hacheck.get_spool(None)
     assert actual is None
+
+
+@pytest.mark.asyncio
+async def test_get_spool_coalesces_and_reuses_lookups():
+    url = 'http://fake_host:6666/spool/service/54321/status'
+    with mock_hacheck_session(get=asynctest.Mock(return_value=mock_response(200, ''))) as fake_session:
+        results = await asyncio.gather(*[hacheck.get_spool(url) for _ in range(5)])
+        assert results == [{'state': 'up'}] * 5
+        assert await hacheck.get_spool(url) == {'state': 'up'}
+        assert fake_session.get.call_count == 1
+        assert hacheck.get_hacheck_client().requests == 1
+
+        with mock.patch('paasta_tools.hacheck.time.time', autospec=True, return_value=time.time() + 60):
+            await hacheck.get_spool(url)
+        assert fake_session.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_post_spool_forgets_cached_state():
+    url = 'http://fake_host:6666/spool/service/54321/status'
+    with mock_hacheck_session(
+        get=asynctest.Mock(return_value=mock_response(200, '')),
+        post=asynctest.Mock(return_value=mock_response(200, '')),
+    ) as fake_session:
+        await hacheck.get_spool(url)
+        await hacheck.post_spool(url, 'down', {'status': 'down'})
+        await hacheck.get_spool(url)
+        assert fake_session.get.call_count == 2
+        fake_session.post.assert_called_once_with(url, data={'status': 'down'}, headers=mock.ANY)
+
+
+@pytest.mark.asyncio
+async def test_post_spool_ignores_lookup_in_flight():
+    url = 'http://fake_host:6666/spool/service/54321/status'
+    with mock_hacheck_session(
+        get=asynctest.Mock(return_value=mock_response(200, '')),
+        post=asynctest.Mock(return_value=mock_response(200, '')),
+    ) as fake_session:
+        # the lookup started before the post still answers its callers, but isn't reused
+        lookup = asyncio.ensure_future(hacheck.get_spool(url))
+        await asyncio.sleep(0)
+        await hacheck.post_spool(url, 'down', {'status': 'down'})
+        assert await lookup == {'state': 'up'}
+        assert hacheck.get_hacheck_client().spools == {}
+        await hacheck.get_spool(url)
+        assert fake_session.get.call_count == 2
+
+
+@pytest.mark.asyncio
+async def test_failed_post_spool_keeps_cached_state():
+    url = 'http://fake_host:6666/spool/service/54321/status'
+    failed_post = mock_response(500, '')
+    failed_post.__aenter__.return_value.raise_for_status.side_effect = Exception('500')
+    with mock_hacheck_session(
+        get=asynctest.Mock(return_value=mock_response(200, '')),
+        post=asynctest.Mock(return_value=failed_post),
+    ) as fake_session:
+        await hacheck.get_spool(url)
+        with pytest.raises(Exception):
+            await hacheck.post_spool(url, 'down', {'status': 'down'})
+        await hacheck.get_spool(url)
+        assert fake_session.get.call_count == 1
+
+
+@pytest.mark.asyncio
+async def test_get_spool_prunes_expired_entries():
+    with mock_hacheck_session(get=asynctest.Mock(return_value=mock_response(200, ''))):
+        client = hacheck.get_hacheck_client()
+        with mock.patch('paasta_tools.hacheck.time.time', autospec=True, return_value=1000):
+            await hacheck.get_spool('http://host1:6666/spool/service/1/status')
+            await hacheck.get_spool('http://host2:6666/spool/service/2/status')
+        with mock.patch('paasta_tools.hacheck.time.time', autospec=True, return_value=1000 + client.spool_ttl):
+            await hacheck.get_spool('http://host3:6666/spool/service/3/status')
+        assert list(client.spools) == ['http://host3:6666/spool/service/3/status']
+
+
+@pytest.mark.asyncio
+async def test_post_spool_while_another_thread_gets_spool():
+    url = 'http://fake_host:6666/spool/service/54321/status'
+    other_thread_done = threading.Event()
+
+    class PausingDict(dict):
+        def values(self):
+            for value in super().values():
+                # give the other thread a chance to add its event loop while we're iterating
+                other_thread.start()
+                other_thread_done.wait(timeout=0.5)
+                yield value
+
+    def get_spool_in_other_thread():
+        loop = asyncio.new_event_loop()
+        try:
+            asyncio.set_event_loop(loop)
+            loop.run_until_complete(hacheck.get_spool(url))
+        finally:
+            loop.close()
+            other_thread_done.set()
+
+    other_thread = threading.Thread(target=get_spool_in_other_thread)
+    # each request gets its own response, whose coroutine mocks belong to the event loop of the thread awaiting them
+    with mock_hacheck_session(
+        get=asynctest.Mock(side_effect=lambda *args, **kwargs: mock_response(200, '')),
+        post=asynctest.Mock(side_effect=lambda *args, **kwargs: mock_response(200, '')),
+    ):
+        client = hacheck.get_hacheck_client()
+        client.in_flight = PausingDict({mock.sentinel.some_loop: {}})
+        await hacheck.post_spool(url, 'down', {'status': 'down'})
+        other_thread.join()
+        assert url in client.spools
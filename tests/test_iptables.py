@@ -192,6 +192,98 @@ def test_ensure_chain_creates_chain_if_doesnt_exist():
     ]
 
 
+def _named_mock(name):
+    m = mock.Mock()
+    m.name = name
+    return m
+
+
+def test_ensure_chains(mock_Table, mock_Chain):
+    mock_Table.return_value.chains = [_named_mock('INPUT'), _named_mock('PAASTA'), _named_mock('PAASTA.old')]
+    mock_Chain.return_value.rules = []
+    with mock.patch.object(
+        iptables, '_update_chain', autospec=True, return_value=2,
+    ) as mock_update_chain:
+        changed = iptables.ensure_chains(
+            {'PAASTA': {EMPTY_RULE._replace(target='PAASTA.new')}, 'PAASTA.new': ()},
+            required_rules={'INPUT': (EMPTY_RULE._replace(target='PAASTA'),)},
+            garbage_collect=lambda chain: chain.startswith('PAASTA.'),
+        )
+
+    assert changed == 5
+    table = mock_Table.return_value
+    assert table.create_chain.mock_calls == [mock.call('PAASTA.new')]
+    assert mock_update_chain.mock_calls == [
+        mock.call(mock_Chain.return_value, {EMPTY_RULE._replace(target='PAASTA.new')}),
+        mock.call(mock_Chain.return_value, ()),
+    ]
+    rule, = mock_Chain.return_value.insert_rule.call_args[0]
+    assert iptables.Rule.from_iptc(rule) == EMPTY_RULE._replace(target='PAASTA')
+    assert mock_Chain.return_value.flush.call_count == 1
+    assert mock_Chain.return_value.delete.call_count == 1
+    # everything was applied in one commit
+    assert table.commit.call_count == 1
+
+
+def test_ensure_chains_required_rule_in_missing_chain(mock_Table, mock_Chain):
+    mock_Table.return_value.chains = []
+    with pytest.raises(iptables.ChainDoesNotExist):
+        iptables.ensure_chains({}, required_rules={'PAASTA': (EMPTY_RULE._replace(target='DROP'),)})
+    assert mock_Table.return_value.commit.called is False
+
+
+def _rule_calls(method):
+    return [(iptables.Rule.from_iptc(args[0]),) + args[1:] for args, _ in method.call_args_list]
+
+
+def test_update_chain():
+    reject = EMPTY_RULE._replace(
+        target='REJECT',
+        target_parameters=(
+            ('reject-with', ('icmp-port-unreachable',)),
+        ),
+    )
+    drop = EMPTY_RULE._replace(target='DROP')
+    old_accept = EMPTY_RULE._replace(target='ACCEPT', src='1.0.0.0/255.255.255.0')
+    new_accept = EMPTY_RULE._replace(target='ACCEPT', src='2.0.0.0/255.255.255.0')
+    chain = _named_mock('PAASTA.service')
+    chain.rules = [reject.to_iptc(), old_accept.to_iptc(), drop.to_iptc()]
+
+    assert iptables._update_chain(chain, (drop, new_accept, reject)) == 4
+
+    assert chain.delete_rule.mock_calls == [mock.call(chain.rules[1])]
+    # the new rule goes in front, then REJECT is moved last
+    assert _rule_calls(chain.insert_rule) == [(new_accept, 0)]
+    assert _rule_calls(chain.replace_rule) == [(drop, 1), (reject, 2)]
+
+
+def test_update_chain_unchanged():
+    chain = _named_mock('PAASTA-INTERNET')
+    rules = (
+        EMPTY_RULE._replace(dst='10.0.0.0/255.0.0.0', target='RETURN'),
+        EMPTY_RULE._replace(target='ACCEPT'),
+    )
+    chain.rules = [rule.to_iptc() for rule in rules]
+
+    assert iptables._update_chain(chain, rules[::-1]) == 0
+    assert chain.delete_rule.called is False
+    assert chain.insert_rule.called is False
+    assert chain.replace_rule.called is False
+
+
+def test_update_chain_new_rules_inserted_in_front():
+    chain = _named_mock('PAASTA-INTERNET')
+    chain.rules = []
+    rules = (
+        EMPTY_RULE._replace(target='ACCEPT'),
+        EMPTY_RULE._replace(dst='10.0.0.0/255.0.0.0', target='RETURN'),
+    )
+
+    assert iptables._update_chain(chain, rules) == 2
+    assert _rule_calls(chain.insert_rule) == [(rules[1], 0), (rules[0], 1)]
+    assert chain.replace_rule.called is False
+
+
 def test_ensure_rule_does_not_exist():
     with mock.patch.object(
         iptables, 'list_chain', return_value=(
@@ -44,20 +44,26 @@ from paasta_tools.kubernetes_tools import get_kubernetes_app_by_name
 from paasta_tools.kubernetes_tools import get_kubernetes_app_deploy_status
 from paasta_tools.kubernetes_tools import get_kubernetes_services_running_here
 from paasta_tools.kubernetes_tools import get_kubernetes_services_running_here_for_nerve
+from paasta_tools.kubernetes_tools import get_synced_informer
 from paasta_tools.kubernetes_tools import InvalidKubernetesConfig
 from paasta_tools.kubernetes_tools import KubeClient
 from paasta_tools.kubernetes_tools import KubeDeployment
+from paasta_tools.kubernetes_tools import KubeInformer
 from paasta_tools.kubernetes_tools import KubernetesDeploymentConfig
 from paasta_tools.kubernetes_tools import KubernetesDeploymentConfigDict
 from paasta_tools.kubernetes_tools import KubernetesDeployStatus
+from paasta_tools.kubernetes_tools import KubeResourceCache
 from paasta_tools.kubernetes_tools import KubeService
 from paasta_tools.kubernetes_tools import list_all_deployments
+from paasta_tools.kubernetes_tools import list_all_pod_disruption_budgets
+from paasta_tools.kubernetes_tools import list_matching_deployments
 from paasta_tools.kubernetes_tools import load_kubernetes_service_config
 from paasta_tools.kubernetes_tools import load_kubernetes_service_config_no_cache
 from paasta_tools.kubernetes_tools import max_unavailable
 from paasta_tools.kubernetes_tools import pod_disruption_budget_for_service_instance
 from paasta_tools.kubernetes_tools import pods_for_service_instance
 from paasta_tools.kubernetes_tools import read_all_registrations_for_service_instance
+from paasta_tools.kubernetes_tools import ResourceVersionExpired
 from paasta_tools.kubernetes_tools import update_deployment
 from paasta_tools.kubernetes_tools import update_stateful_set
 from paasta_tools.utils import AwsEbsVolume
@@ -1070,6 +1076,18 @@ def test_max_unavailable(instances, bmf):
     assert type(res) is int
 
 
+def test_list_all_pod_disruption_budgets():
+    mock_pdrs = [mock.Mock(), mock.Mock(), mock.Mock(), mock.Mock()]
+    mock_pdrs[0].spec.selector.match_labels = {'service': 'kurupt', 'instance': 'fm'}
+    mock_pdrs[1].spec.selector.match_labels = {'app': 'not-paasta'}
+    mock_pdrs[2].spec.selector.match_labels = None
+    mock_pdrs[3].spec.selector = None
+    mock_client = mock.Mock()
+    mock_client.policy.list_namespaced_pod_disruption_budget.return_value = mock.Mock(items=mock_pdrs)
+    assert list_all_pod_disruption_budgets(mock_client) == {('kurupt', 'fm'): mock_pdrs[0]}
+    mock_client.policy.list_namespaced_pod_disruption_budget.assert_called_with(namespace='paasta')
+
+
 def test_pod_disruption_budget_for_service_instance():
     x = pod_disruption_budget_for_service_instance(
         service='foo',
@@ -1231,6 +1249,126 @@ def test_pods_for_service_instance():
     ) == mock_client.core.list_namespaced_pod.return_value.items
 
 
+def _kube_object(name, resource_version='1', **labels):
+    obj = mock.Mock()
+    obj.metadata.name = name
+    obj.metadata.labels = labels
+    obj.metadata.resource_version = resource_version
+    return obj
+
+
+def test_KubeResourceCache_relist_and_events():
+    pod_1 = _kube_object('kurupt-fm-1', service='kurupt', instance='fm')
+    pod_2 = _kube_object('kurupt-fm-2', service='kurupt', instance='fm')
+    mock_list = mock.Mock(return_value=mock.Mock(items=[pod_1, _kube_object('unlabelled')]))
+    mock_list.return_value.metadata.resource_version = '10'
+    cache = KubeResourceCache('pod', mock_list)
+    cache.relist()
+    mock_list.assert_called_once_with(namespace='paasta')
+    assert cache.synced.is_set()
+    assert cache.resource_version == '10'
+    assert cache.for_service_instance('kurupt', 'fm') == [pod_1]
+    assert cache.get('unlabelled') is not None
+
+    cache.apply_event({'type': 'ADDED', 'object': pod_2})
+    assert cache.for_service_instance('kurupt', 'fm') == [pod_1, pod_2]
+    relabelled = _kube_object('kurupt-fm-2', resource_version='12', service='kurupt', instance='garage')
+    cache.apply_event({'type': 'MODIFIED', 'object': relabelled})
+    assert cache.for_service_instance('kurupt', 'fm') == [pod_1]
+    assert cache.for_service_instance('kurupt', 'garage') == [relabelled]
+    cache.apply_event({'type': 'DELETED', 'object': pod_1})
+    assert cache.for_service_instance('kurupt', 'fm') == []
+    assert cache.get('kurupt-fm-1') is None
+    assert cache.resource_version == '1'
+
+    with pytest.raises(ResourceVersionExpired):
+        cache.apply_event({'type': 'ERROR', 'object': None, 'raw_object': {'code': 410}})
+
+
+def test_KubeResourceCache_run_relists_after_watch_errors():
+    cache = KubeResourceCache('pod', mock.Mock())
+
+    def fake_watch():
+        if mock_watch.call_count == 1:
+            raise ResourceVersionExpired()
+        cache.stopped.set()
+
+    with mock.patch.object(cache, 'relist', autospec=True) as mock_relist, mock.patch.object(
+        cache, 'watch', autospec=True, side_effect=fake_watch,
+    ) as mock_watch:
+        mock_relist.side_effect = cache.synced.set
+        cache.run()
+    assert mock_relist.call_count == 2
+    assert mock_watch.call_count == 2
+
+
+def test_KubeResourceCache_watch():
+    pod = _kube_object('kurupt-fm-1', resource_version='11', service='kurupt', instance='fm')
+    mock_list = mock.Mock()
+    cache = KubeResourceCache('pod', mock_list, watch_timeout=30)
+    cache.resource_version = '10'
+    with mock.patch('paasta_tools.kubernetes_tools.kube_watch.Watch', autospec=True) as mock_watch:
+        mock_watch.return_value.stream.return_value = [{'type': 'ADDED', 'object': pod}]
+        cache.watch()
+        mock_watch.return_value.stream.assert_called_once_with(
+            mock_list, namespace='paasta', resource_version='10', timeout_seconds=30,
+        )
+    assert cache.get('kurupt-fm-1') == pod
+    assert cache.resource_version == '11'
+
+
+def test_KubeClient_start_informer():
+    with mock.patch(
+        'paasta_tools.kubernetes_tools.kube_config.load_kube_config', autospec=True,
+    ), mock.patch(
+        'paasta_tools.kubernetes_tools.kube_client', autospec=True,
+    ), mock.patch(
+        'paasta_tools.kubernetes_tools.KubeInformer', autospec=True,
+    ) as mock_informer:
+        client = KubeClient()
+        assert client.informer is None
+        assert client.start_informer() == mock_informer.return_value
+        assert client.start_informer() == mock_informer.return_value
+        mock_informer.return_value.start.assert_called_once_with()
+
+
+def _synced_informer_client():
+    mock_client = mock.Mock()
+    mock_client.informer = KubeInformer(mock_client)
+    for cache in mock_client.informer.caches:
+        cache.synced.set()
+    return mock_client
+
+
+def test_reads_served_from_synced_informer():
+    mock_client = _synced_informer_client()
+    pod = _kube_object('kurupt-fm-1', service='kurupt', instance='fm')
+    deployment = _kube_object('kurupt-fm', service='kurupt', instance='fm', git_sha='a12345', config_sha='b12345')
+    deployment.spec.replicas = 3
+    with mock_client.informer.pods.lock:
+        mock_client.informer.pods._store(pod)
+    with mock_client.informer.deployments.lock:
+        mock_client.informer.deployments._store(deployment)
+
+    assert pods_for_service_instance('kurupt', 'fm', mock_client) == [pod]
+    assert list_matching_deployments('kurupt', 'fm', mock_client) == [
+        KubeDeployment(service='kurupt', instance='fm', git_sha='a12345', config_sha='b12345', replicas=3),
+    ]
+    assert get_kubernetes_app_by_name('kurupt-fm', mock_client) == deployment
+    assert not mock_client.core.list_namespaced_pod.called
+    assert not mock_client.deployments.list_namespaced_deployment.called
+    assert not mock_client.deployments.read_namespaced_deployment_status.called
+
+    # a miss may just be an app newer than the cache, so it is read from the apiserver
+    assert get_kubernetes_app_by_name('kurupt-new', mock_client) == \
+        mock_client.deployments.read_namespaced_deployment_status.return_value
+
+    mock_client.informer.pods.synced.clear()
+    assert get_synced_informer(mock_client) is None
+    assert pods_for_service_instance('kurupt', 'fm', mock_client) == \
+        mock_client.core.list_namespaced_pod.return_value.items
+
+
 def test_get_active_shas_for_service():
     mock_pod_list = [
         mock.Mock(metadata=mock.Mock(labels={
@@ -24,11 +24,14 @@ from pytest import raises
 
 from paasta_tools import long_running_service_tools
 from paasta_tools import marathon_tools
+from paasta_tools import soa_config_cache
 from paasta_tools.marathon_serviceinit import desired_state_human
 from paasta_tools.marathon_tools import FormattedMarathonAppDict
 from paasta_tools.marathon_tools import MarathonContainerInfo
 from paasta_tools.marathon_tools import MarathonServiceConfigDict
 from paasta_tools.mesos.exceptions import NoSlavesAvailableError
+from paasta_tools.shared_cache import SharedCache
+from paasta_tools.soa_config_cache import SoaConfigCache
 from paasta_tools.utils import BranchDictV2
 from paasta_tools.utils import compose_job_id
 from paasta_tools.utils import DeploymentsJsonV2
@@ -137,6 +140,25 @@ class TestMarathonTools:
                     soa_dir=fake_dir,
                 )
 
+    def test_load_marathon_service_config_no_cache_does_not_share_cached_configs(self, tmpdir):
+        service_dir = tmpdir.mkdir('jazz')
+        service_dir.join('service.yaml').write('env:\n  FOO: bar\n')
+        service_dir.join('marathon-amnesia.yaml').write('solo:\n  env:\n    BAZ: qux\n  extra_volumes: []\n')
+        with mock.patch.object(soa_config_cache, 'soa_config_cache', SoaConfigCache()):
+            config = marathon_tools.load_marathon_service_config_no_cache(
+                'jazz', 'solo', 'amnesia', load_deployments=False, soa_dir=str(tmpdir),
+            )
+            config.config_dict['env']['FOO'] = 'mutated'
+            config.config_dict['env']['BAZ'] = 'mutated'
+            config.config_dict['extra_volumes'].append({})
+
+            config = marathon_tools.load_marathon_service_config_no_cache(
+                'jazz', 'solo', 'amnesia', load_deployments=False, soa_dir=str(tmpdir),
+            )
+            assert soa_config_cache.soa_config_cache.hits == 2
+        assert config.config_dict['env'] == {'FOO': 'bar', 'BAZ': 'qux'}
+        assert config.config_dict['extra_volumes'] == []
+
     def test_read_service_config(self):
         fake_name = 'jazz'
         fake_instance = 'solo'
@@ -1702,6 +1724,16 @@ class TestMarathonTools:
         actual = marathon_tools.get_all_marathon_apps(fake_client)
         assert actual == apps
 
+    def test_get_all_marathon_apps_shared_cache(self, tmpdir):
+        apps = [MarathonApp(id='/fake--service.fake--instance.bouncingold')]
+        fake_client = mock.Mock(list_apps=mock.Mock(return_value=apps), servers=['http://marathon'])
+        cache = SharedCache(str(tmpdir.join('cache')))
+        with mock.patch('paasta_tools.marathon_tools.shared_cache._shared_cache', cache, autospec=None):
+            for _ in range(2):
+                actual = marathon_tools.get_all_marathon_apps(fake_client, service_name='fake_service')
+                assert [app.id for app in actual] == ['/fake--service.fake--instance.bouncingold']
+        fake_client.list_apps.assert_called_once_with(embed_tasks=False, app_id='/fake--service.')
+
 
 class TestMarathonServiceConfig:
 
@@ -2572,6 +2604,20 @@ def test_get_app_queue_status():
     assert is_overdue is False
 
 
+def test_get_marathon_app_deploy_status_from_queue():
+    app = mock.create_autospec(marathon.models.app.MarathonApp)
+    app.deployments = []
+    app.instances = 3
+    app.tasks_running = 3
+    queue_item = mock.create_autospec(marathon.models.queue.MarathonQueueItem)
+    queue_item.delay = mock.Mock(overdue=True, time_left_seconds=0)
+
+    assert marathon_tools.get_marathon_app_deploy_status_from_queue(app, None) == \
+        marathon_tools.MarathonDeployStatus.Running
+    assert marathon_tools.get_marathon_app_deploy_status_from_queue(app, queue_item) == \
+        marathon_tools.MarathonDeployStatus.Waiting
+
+
 def test_is_task_healthy():
     mock_hcrs = [mock.Mock(alive=False), mock.Mock(alive=False)]
     mock_task = mock.Mock(health_check_results=mock_hcrs)
@@ -2689,3 +2735,9 @@ def test_rendezvous_hash_roughly_fractional_change():
     num_same = len([1 for x, y in zip(first_results, second_results) if x == y])
     assert num_same > 8900
     assert num_same < 9100
+
+
+def test_get_num_at_risk_tasks():
+    fake_app = mock.Mock(tasks=[mock.Mock(host=f'host{i % 3}') for i in range(6)])
+    assert marathon_tools.get_num_at_risk_tasks(fake_app, draining_hosts=['host0', 'host2', 'host9']) == 4
+    assert marathon_tools.get_num_at_risk_tasks(fake_app, draining_hosts=frozenset()) == 0
@@ -34,6 +34,7 @@ from paasta_tools.mesos_maintenance import drain
 from paasta_tools.mesos_maintenance import friendly_status
 from paasta_tools.mesos_maintenance import get_down_hosts
 from paasta_tools.mesos_maintenance import get_draining_hosts
+from paasta_tools.mesos_maintenance import get_draining_hosts_snapshot
 from paasta_tools.mesos_maintenance import get_hosts_forgotten_down
 from paasta_tools.mesos_maintenance import get_hosts_forgotten_draining
 from paasta_tools.mesos_maintenance import get_hosts_past_maintenance_end
@@ -739,6 +740,17 @@ def test_get_draining_hosts(
     assert mock_get_hosts_with_state.call_args == expected_args
 
 
+@mock.patch('paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True)
+def test_get_draining_hosts_snapshot(
+    mock_get_draining_hosts,
+):
+    mock_get_draining_hosts.return_value = ['fake-host1', 'fake-host2']
+    assert get_draining_hosts_snapshot(ttl=0) == frozenset(['fake-host1', 'fake-host2'])
+    mock_get_draining_hosts.return_value = ['fake-host3']
+    assert get_draining_hosts_snapshot() == frozenset(['fake-host1', 'fake-host2'])
+    assert mock_get_draining_hosts.call_count == 1
+
+
 @mock.patch('paasta_tools.mesos_maintenance.get_hosts_with_state', autospec=True)
 def test_get_down_hosts(
     mock_get_hosts_with_state,
@@ -26,6 +26,7 @@ from paasta_tools import mesos
 from paasta_tools import mesos_tools
 from paasta_tools import utils
 from paasta_tools.marathon_tools import format_job_id
+from paasta_tools.mesos import master
 from paasta_tools.utils import PaastaColors
 
 
@@ -604,90 +605,80 @@ def test_slave_pid_to_ip():
     assert ret == '10.40.31.172'
 
 
+def _mock_master_with_state_index(frameworks, slaves=(), orphan_tasks=()):
+    mock_master = master.MesosMaster({})
+    mock_master._frameworks = asynctest.CoroutineMock(return_value=frameworks)
+    mock_master.state = asynctest.CoroutineMock(
+        return_value={'slaves': list(slaves), 'orphan_tasks': list(orphan_tasks)},
+    )
+    return mock_master
+
+
 @mark.asyncio
 async def test_get_mesos_task_count_by_slave():
-    with asynctest.patch('paasta_tools.mesos_tools.get_all_running_tasks', autospec=True) as mock_get_all_running_tasks:
-        mock_chronos = mock.Mock()
-        mock_chronos.name = 'chronos'
-        mock_marathon = mock.Mock()
-        mock_marathon.name = 'marathon'
-        mock_task1 = mock.Mock()
-        mock_task1.slave = asynctest.CoroutineMock(return_value={'id': 'slave1'})
-        mock_task1.framework = asynctest.CoroutineMock(return_value=mock_chronos)
-        mock_task2 = mock.Mock()
-        mock_task2.slave = asynctest.CoroutineMock(return_value={'id': 'slave1'})
-        mock_task2.framework = asynctest.CoroutineMock(return_value=mock_marathon)
-        mock_task3 = mock.Mock()
-        mock_task3.slave = asynctest.CoroutineMock(return_value={'id': 'slave2'})
-        mock_task3.framework = asynctest.CoroutineMock(return_value=mock_marathon)
-        mock_task4 = mock.Mock()
-        mock_task4.slave = asynctest.CoroutineMock(return_value={'id': 'slave2'})
-        mock_task4.framework = asynctest.CoroutineMock(return_value=mock_marathon)
-        mock_tasks = [mock_task1, mock_task2, mock_task3, mock_task4]
-        mock_get_all_running_tasks.return_value = mock_tasks
-        mock_slave_1 = {'id': 'slave1', 'attributes': {'pool': 'default'}, 'hostname': 'host1'}
-        mock_slave_2 = {'id': 'slave2', 'attributes': {'pool': 'default'}, 'hostname': 'host2'}
-        mock_slave_3 = {'id': 'slave3', 'attributes': {'pool': 'another'}, 'hostname': 'host3'}
-        mock_mesos_state = {'slaves': [mock_slave_1, mock_slave_2, mock_slave_3]}
+    def running_task(slave_id, framework_id, state='TASK_RUNNING'):
+        return {'id': 'task', 'slave_id': slave_id, 'framework_id': framework_id, 'state': state}
+
+    frameworks = {
+        'frameworks': [
+            {'id': 'chronos_id', 'name': 'chronos', 'tasks': [running_task('slave1', 'chronos_id')]},
+            {
+                'id': 'marathon_id',
+                'name': 'marathon',
+                'tasks': [
+                    running_task('slave1', 'marathon_id'),
+                    running_task('slave2', 'marathon_id'),
+                    running_task('slave2', 'marathon_id'),
+                    running_task('slave3', 'marathon_id', state='TASK_KILLED'),
+                    running_task('gone', 'marathon_id'),
+                ],
+                'completed_tasks': [running_task('slave3', 'marathon_id', state='TASK_FINISHED')],
+            },
+        ],
+        'completed_frameworks': [
+            {'id': 'old_id', 'name': 'marathon', 'tasks': [running_task('slave2', 'unknown_id')]},
+        ],
+    }
+    mock_slave_1 = {'id': 'slave1', 'attributes': {'pool': 'default'}, 'hostname': 'host1'}
+    mock_slave_2 = {'id': 'slave2', 'attributes': {'pool': 'default'}, 'hostname': 'host2'}
+    mock_slave_3 = {'id': 'slave3', 'attributes': {'pool': 'another'}, 'hostname': 'host3'}
+    mock_mesos_state = {'slaves': [mock_slave_1, mock_slave_2, mock_slave_3]}
+    with asynctest.patch(
+        'paasta_tools.mesos_tools.get_mesos_master', autospec=True,
+        return_value=_mock_master_with_state_index(
+            frameworks, orphan_tasks=[
+                running_task('slave1', 'orphaned_id'),
+                running_task('slave1', 'orphaned_id', state='TASK_FINISHED'),
+            ],
+        ),
+    ):
         ret = await mesos_tools.get_mesos_task_count_by_slave(mock_mesos_state, pool='default')
-        assert mock_get_all_running_tasks.called
+        # tasks whose framework we can't find, including orphans, count as batch
         expected = [
-            {'task_counts': mesos_tools.SlaveTaskCount(count=2, batch_count=1, slave=mock_slave_1)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=2, batch_count=0, slave=mock_slave_2)},
+            {'task_counts': mesos_tools.SlaveTaskCount(count=3, batch_count=2, slave=mock_slave_1)},
+            {'task_counts': mesos_tools.SlaveTaskCount(count=3, batch_count=1, slave=mock_slave_2)},
         ]
         assert len(ret) == len(expected) and utils.sort_dicts(ret) == utils.sort_dicts(expected)
+
         ret = await mesos_tools.get_mesos_task_count_by_slave(mock_mesos_state, pool=None)
-        assert mock_get_all_running_tasks.called
         expected = [
-            {'task_counts': mesos_tools.SlaveTaskCount(count=2, batch_count=1, slave=mock_slave_1)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=2, batch_count=0, slave=mock_slave_2)},
+            {'task_counts': mesos_tools.SlaveTaskCount(count=3, batch_count=2, slave=mock_slave_1)},
+            {'task_counts': mesos_tools.SlaveTaskCount(count=3, batch_count=1, slave=mock_slave_2)},
             {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_3)},
         ]
         assert len(ret) == len(expected) and utils.sort_dicts(ret) == utils.sort_dicts(expected)
 
         # test slaves_list override
-        mock_task2 = mock.Mock()
-        mock_task2.slave = asynctest.CoroutineMock(return_value={'id': 'slave2'})
-        mock_task2.framework = asynctest.CoroutineMock(return_value=mock_marathon)
-        mock_tasks = [mock_task1, mock_task2, mock_task3, mock_task4]
-        mock_get_all_running_tasks.return_value = mock_tasks
-        mock_slaves_list = [
-            {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_1)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_2)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_3)},
-        ]
-        ret = await mesos_tools.get_mesos_task_count_by_slave(
-            mock_mesos_state,
-            slaves_list=mock_slaves_list,
-        )
-        expected = [
-            {'task_counts': mesos_tools.SlaveTaskCount(count=1, batch_count=1, slave=mock_slave_1)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=3, batch_count=0, slave=mock_slave_2)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_3)},
-        ]
-        assert len(ret) == len(expected) and utils.sort_dicts(ret) == utils.sort_dicts(expected)
-
-        # test SlaveDoesNotExist exception handling
-        mock_task2.__getitem__ = mock.Mock(side_effect="fakeid")
-        mock_task2.slave = asynctest.CoroutineMock(return_value=mock.Mock(
-            __getitem__=mock.Mock(side_effect=mesos.exceptions.SlaveDoesNotExist),
-        ))
-        # we expect to handle this SlaveDoesNotExist exception gracefully, and continue on to handle other tasks
-        mock_tasks = [mock_task1, mock_task2, mock_task3, mock_task4]
-        mock_get_all_running_tasks.return_value = mock_tasks
         mock_slaves_list = [
             {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_1)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_2)},
             {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_3)},
         ]
         ret = await mesos_tools.get_mesos_task_count_by_slave(
             mock_mesos_state,
             slaves_list=mock_slaves_list,
         )
-        # we expect mock_slave_2 to only count 2 tasks, as one of them returned a SlaveDoesNotExist exception
         expected = [
-            {'task_counts': mesos_tools.SlaveTaskCount(count=1, batch_count=1, slave=mock_slave_1)},
-            {'task_counts': mesos_tools.SlaveTaskCount(count=2, batch_count=0, slave=mock_slave_2)},
+            {'task_counts': mesos_tools.SlaveTaskCount(count=3, batch_count=2, slave=mock_slave_1)},
             {'task_counts': mesos_tools.SlaveTaskCount(count=0, batch_count=0, slave=mock_slave_3)},
         ]
         assert len(ret) == len(expected) and utils.sort_dicts(ret) == utils.sort_dicts(expected)
@@ -726,43 +717,48 @@ def _ids(list_of_mocks):
 
 @mark.asyncio
 async def test_get_tasks_from_app_id():
-    with asynctest.patch(
-        'paasta_tools.mesos_tools.get_running_tasks_from_frameworks', autospec=True,
-    ) as mock_get_running_tasks_from_frameworks:
-        mock_task_1 = mock.Mock(slave=asynctest.CoroutineMock(return_value={'hostname': 'host1'}))
-        mock_task_2 = mock.Mock(slave=asynctest.CoroutineMock(return_value={'hostname': 'host2'}))
-        mock_task_3 = mock.Mock(slave=asynctest.CoroutineMock(return_value={'hostname': 'host2.domain'}))
-        mock_get_running_tasks_from_frameworks.return_value = [mock_task_1, mock_task_2, mock_task_3]
-
-        ret = await mesos_tools.get_tasks_from_app_id('app_id')
-        mock_get_running_tasks_from_frameworks.assert_called_with('app_id')
-        expected = [mock_task_1, mock_task_2, mock_task_3]
-        assert len(expected) == len(ret) and _ids(ret) == _ids(expected)
+    task_1 = {'id': 'app.id.1', 'state': 'TASK_RUNNING', 'slave_id': 's1', 'framework_id': 'fw'}
+    task_2 = {'id': 'app.id.2', 'state': 'TASK_RUNNING', 'slave_id': 's2', 'framework_id': 'fw'}
+    task_3 = {'id': 'app.id.3', 'state': 'TASK_RUNNING', 'slave_id': 's3', 'framework_id': 'fw'}
+    task_4 = {'id': 'app.id.4', 'state': 'TASK_KILLED', 'slave_id': 's2', 'framework_id': 'fw'}
+    task_5 = {'id': 'app.idx.5', 'state': 'TASK_RUNNING', 'slave_id': 's2', 'framework_id': 'fw'}
+    mock_master = _mock_master_with_state_index(
+        {'frameworks': [{'id': 'fw', 'tasks': [task_1, task_2, task_3, task_4, task_5]}]},
+        slaves=[
+            {'id': 's1', 'hostname': 'host1'},
+            {'id': 's2', 'hostname': 'host2'},
+            {'id': 's3', 'hostname': 'host2.domain'},
+        ],
+    )
+    with asynctest.patch('paasta_tools.mesos_tools.get_mesos_master', autospec=True, return_value=mock_master):
+        ret = await mesos_tools.get_tasks_from_app_id('app.id')
+        assert [task['id'] for task in ret] == ['app.id.1', 'app.id.2', 'app.id.3']
 
-        ret = await mesos_tools.get_tasks_from_app_id('app_id', slave_hostname='host2')
-        mock_get_running_tasks_from_frameworks.assert_called_with('app_id')
-        expected = [mock_task_2, mock_task_3]
-        assert len(expected) == len(ret) and _ids(ret) == _ids(expected)
+        ret = await mesos_tools.get_tasks_from_app_id('/app.id', slave_hostname='host2')
+        assert [task['id'] for task in ret] == ['app.id.2', 'app.id.3']
 
 
 @mark.asyncio
 async def test_get_task():
-    with asynctest.patch(
-        'paasta_tools.mesos_tools.get_running_tasks_from_frameworks', autospec=True,
-    ) as mock_get_running_tasks_from_frameworks:
-        mock_task_1 = {'id': '123'}
-        mock_task_2 = {'id': '789'}
-        mock_task_3 = {'id': '789'}
-        mock_get_running_tasks_from_frameworks.return_value = [mock_task_1, mock_task_2, mock_task_3]
-        ret = await mesos_tools.get_task('123', app_id='app_id')
-        mock_get_running_tasks_from_frameworks.assert_called_with('app_id')
-        assert ret == mock_task_1
+    task_1 = {'id': 'app_id.123', 'state': 'TASK_RUNNING', 'slave_id': 's1', 'framework_id': 'fw'}
+    task_2 = {'id': 'app_id.789', 'state': 'TASK_RUNNING', 'slave_id': 's1', 'framework_id': 'fw'}
+    task_3 = {'id': 'app_id.789', 'state': 'TASK_RUNNING', 'slave_id': 's1', 'framework_id': 'fw'}
+    task_4 = {'id': 'app_id.456', 'state': 'TASK_FAILED', 'slave_id': 's1', 'framework_id': 'fw'}
+    mock_master = _mock_master_with_state_index(
+        {'frameworks': [{'id': 'fw', 'tasks': [task_1, task_2, task_3, task_4]}]},
+    )
+    with asynctest.patch('paasta_tools.mesos_tools.get_mesos_master', autospec=True, return_value=mock_master):
+        ret = await mesos_tools.get_task('app_id.123', app_id='app_id')
+        assert ret['id'] == 'app_id.123'
+
+        with raises(mesos_tools.TaskNotFound):
+            await mesos_tools.get_task('app_id.123', app_id='other_app')
 
         with raises(mesos_tools.TaskNotFound):
-            await mesos_tools.get_task('111', app_id='app_id')
+            await mesos_tools.get_task('app_id.456', app_id='app_id')
 
         with raises(mesos_tools.TooManyTasks):
-            await mesos_tools.get_task('789', app_id='app_id')
+            await mesos_tools.get_task('app_id.789', app_id='app_id')
 
 
 @mark.asyncio
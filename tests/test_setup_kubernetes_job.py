@@ -1,4 +1,6 @@
+from typing import Dict
 from typing import Sequence
+from typing import Tuple
 
 import mock
 from kubernetes.client import V1DeleteOptions
@@ -50,6 +52,7 @@ def test_main():
             kube_client=mock_kube_client.return_value,
             service_instances=mock_parse_args.return_value.service_instance_list,
             soa_dir=mock_parse_args.return_value.soa_dir,
+            max_workers=mock_parse_args.return_value.max_workers,
         )
 
         mock_setup_kube_deployments.return_value = False
@@ -63,7 +66,9 @@ def test_setup_kube_deployment():
         'paasta_tools.setup_kubernetes_job.reconcile_kubernetes_deployment', autospec=True,
     ) as mock_reconcile_kubernetes_deployment, mock.patch(
         'paasta_tools.setup_kubernetes_job.list_all_deployments', autospec=True,
-    ) as mock_list_all_deployments:
+    ) as mock_list_all_deployments, mock.patch(
+        'paasta_tools.setup_kubernetes_job.list_all_pod_disruption_budgets', autospec=True,
+    ) as mock_list_all_pod_disruption_budgets:
         mock_client = mock.Mock()
         mock_service_instances: Sequence[str] = []
         assert setup_kube_deployments(
@@ -71,7 +76,12 @@ def test_setup_kube_deployment():
             service_instances=mock_service_instances,
             soa_dir='/nail/blah',
         ) is True
+        assert not mock_list_all_deployments.called
 
+        fake_deployment = KubeDeployment(
+            service='kurupt', instance='fm', git_sha='a12345', config_sha='b12345', replicas=3,
+        )
+        mock_list_all_deployments.return_value = [fake_deployment]
         mock_reconcile_kubernetes_deployment.return_value = (0, 0)
         mock_service_instances = ['kurupt.fm', 'kurupt.garage']
         assert setup_kube_deployments(
@@ -84,17 +94,21 @@ def test_setup_kube_deployment():
                 kube_client=mock_client,
                 service='kurupt',
                 instance='fm',
-                kube_deployments=mock_list_all_deployments.return_value,
+                kube_deployments={('kurupt', 'fm'): fake_deployment},
                 soa_dir='/nail/blah',
+                pod_disruption_budgets=mock_list_all_pod_disruption_budgets.return_value,
             ),
             mock.call(
                 kube_client=mock_client,
                 service='kurupt',
                 instance='garage',
-                kube_deployments=mock_list_all_deployments.return_value,
+                kube_deployments={('kurupt', 'fm'): fake_deployment},
                 soa_dir='/nail/blah',
+                pod_disruption_budgets=mock_list_all_pod_disruption_budgets.return_value,
             ),
-        ])
+        ], any_order=True)
+        assert mock_list_all_deployments.call_count == 1
+        assert mock_list_all_pod_disruption_budgets.call_count == 1
 
         mock_reconcile_kubernetes_deployment.return_value = (1, 0)
         assert setup_kube_deployments(
@@ -103,6 +117,13 @@ def test_setup_kube_deployment():
             soa_dir='/nail/blah',
         ) is False
 
+        mock_reconcile_kubernetes_deployment.return_value = (0, 0)
+        assert setup_kube_deployments(
+            kube_client=mock_client,
+            service_instances=['kurupt.fm', 'not_a_service_instance'],
+            soa_dir='/nail/blah',
+        ) is False
+
 
 def test_ensure_pod_disruption_budget_create():
     with mock.patch(
@@ -167,6 +188,42 @@ def test_ensure_pod_disruption_budget_replaces_outdated():
         )
 
 
+def test_ensure_pod_disruption_budget_uses_listed_budgets():
+    with mock.patch(
+        'paasta_tools.setup_kubernetes_job.pod_disruption_budget_for_service_instance', autospec=True,
+    ) as mock_pdr_for_service_instance, mock.patch(
+        'paasta_tools.setup_kubernetes_job.create_pod_disruption_budget', autospec=True,
+    ) as mock_create_pdr:
+        mock_pdr_for_service_instance.return_value.spec.min_available = 10
+        mock_client = mock.Mock()
+        mock_existing_pdr = mock.Mock()
+        mock_existing_pdr.spec.min_available = 10
+
+        ensure_pod_disruption_budget(
+            mock_client,
+            'fake_service',
+            'fake_instance',
+            min_instances=10,
+            existing_pod_disruption_budgets={('fake_service', 'fake_instance'): mock_existing_pdr},
+        )
+        assert not mock_client.policy.read_namespaced_pod_disruption_budget.called
+        assert not mock_client.policy.delete_namespaced_pod_disruption_budget.called
+        assert not mock_create_pdr.called
+
+        ensure_pod_disruption_budget(
+            mock_client,
+            'fake_service',
+            'fake_instance',
+            min_instances=10,
+            existing_pod_disruption_budgets={},
+        )
+        assert not mock_client.policy.read_namespaced_pod_disruption_budget.called
+        mock_create_pdr.assert_called_once_with(
+            kube_client=mock_client,
+            pod_disruption_budget=mock_pdr_for_service_instance.return_value,
+        )
+
+
 def test_reconcile_kubernetes_deployment():
     with mock.patch(
         'paasta_tools.setup_kubernetes_job.load_kubernetes_service_config_no_cache', autospec=True,
@@ -178,7 +235,7 @@ def test_reconcile_kubernetes_deployment():
         'paasta_tools.setup_kubernetes_job.update_kubernetes_application', autospec=True,
     ) as mock_update_kubernetes_application:
         mock_kube_client = mock.Mock()
-        mock_deployments: Sequence[KubeDeployment] = []
+        mock_deployments: Dict[Tuple[str, str], KubeDeployment] = {}
 
         service_config = mock.MagicMock()
         service_config.get_desired_instances.return_value = 5
@@ -200,13 +257,13 @@ def test_reconcile_kubernetes_deployment():
         )
 
         # different instance so should create
-        mock_deployments = [KubeDeployment(
+        mock_deployments = {('kurupt', 'garage'): KubeDeployment(
             service='kurupt',
             instance='garage',
             git_sha='a12345',
             config_sha='b12345',
             replicas=3,
-        )]
+        )}
         ret = reconcile_kubernetes_deployment(
             kube_client=mock_kube_client,
             service='kurupt',
@@ -241,13 +298,13 @@ def test_reconcile_kubernetes_deployment():
                 ),
             ),
         )
-        mock_deployments = [KubeDeployment(
+        mock_deployments = {('kurupt', 'fm'): KubeDeployment(
             service='kurupt',
             instance='fm',
             git_sha='a12345',
             config_sha='b12345',
             replicas=3,
-        )]
+        )}
         ret = reconcile_kubernetes_deployment(
             kube_client=mock_kube_client,
             service='kurupt',
@@ -280,13 +337,13 @@ def test_reconcile_kubernetes_deployment():
                 ),
             ),
         )
-        mock_deployments = [KubeDeployment(
+        mock_deployments = {('kurupt', 'fm'): KubeDeployment(
             service='kurupt',
             instance='fm',
             git_sha='a12345',
             config_sha='b12345',
             replicas=3,
-        )]
+        )}
         ret = reconcile_kubernetes_deployment(
             kube_client=mock_kube_client,
             service='kurupt',
@@ -324,13 +381,13 @@ def test_reconcile_kubernetes_deployment():
                 ),
             ),
         )
-        mock_deployments = [KubeDeployment(
+        mock_deployments = {('kurupt', 'fm'): KubeDeployment(
             service='kurupt',
             instance='fm',
             git_sha='a12345',
             config_sha='b12345',
             replicas=3,
-        )]
+        )}
         ret = reconcile_kubernetes_deployment(
             kube_client=mock_kube_client,
             service='kurupt',
@@ -368,13 +425,13 @@ def test_reconcile_kubernetes_deployment():
                 ),
             ),
         )
-        mock_deployments = [KubeDeployment(
+        mock_deployments = {('kurupt', 'fm'): KubeDeployment(
             service='kurupt',
             instance='fm',
             git_sha='a12345',
             config_sha='b12345',
             replicas=3,
-        )]
+        )}
         ret = reconcile_kubernetes_deployment(
             kube_client=mock_kube_client,
             service='kurupt',
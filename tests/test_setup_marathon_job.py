@@ -106,7 +106,7 @@ class TestSetupMarathonJob:
         ), mock.patch(
             'sys.exit', autospec=True,
         ) as sys_exit_patch, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ), mock.patch(
             'paasta_tools.marathon_tools.get_all_marathon_apps', autospec=True,
         ) as get_all_marathon_apps_patch, mock.patch(
@@ -902,7 +902,7 @@ class TestSetupMarathonJob:
         ) as mock_get_happy_tasks, mock.patch(
             'paasta_tools.setup_marathon_job.drain_lib.get_drain_method', autospec=True,
         ) as mock_get_drain_method, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ), mock.patch(
             'paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True,
         ):
@@ -969,7 +969,7 @@ class TestSetupMarathonJob:
         ) as mock_get_happy_tasks, mock.patch(
             'paasta_tools.setup_marathon_job.drain_lib.get_drain_method', autospec=True,
         ) as mock_get_drain_method, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ) as mock_get_draining_hosts, mock.patch(
             'paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True,
         ) as mock_mt_get_draining_hosts:
@@ -1044,7 +1044,7 @@ class TestSetupMarathonJob:
         ), mock.patch(
             'paasta_tools.setup_marathon_job.do_bounce', autospec=True,
         ) as mock_do_bounce, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ), mock.patch(
             'paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True,
         ):
@@ -1115,7 +1115,7 @@ class TestSetupMarathonJob:
         ), mock.patch(
             'paasta_tools.setup_marathon_job.do_bounce', autospec=True,
         ) as mock_do_bounce, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ), mock.patch(
             'paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True,
         ):
@@ -1189,7 +1189,7 @@ class TestSetupMarathonJob:
         ), mock.patch(
             'paasta_tools.setup_marathon_job.do_bounce', autospec=True,
         ) as mock_do_bounce, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ), mock.patch(
             'paasta_tools.mesos_maintenance.get_draining_hosts', autospec=True,
         ):
@@ -1263,7 +1263,7 @@ class TestSetupMarathonJob:
             'paasta_tools.setup_marathon_job.deploy_service',
             autospec=True,
         ) as deploy_service_patch, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts',
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot',
             autospec=True,
         ):
             setup_marathon_job.setup_service(
@@ -1337,7 +1337,7 @@ class TestSetupMarathonJob:
             return_value=fake_bounce_margin_factor,
             autospec=True,
         ) as get_bounce_margin_factor_patch, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts',
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot',
             autospec=True,
         ):
             mock_marathon_apps_with_clients = mock.Mock()
@@ -1470,7 +1470,7 @@ class TestSetupMarathonJob:
             'paasta_tools.drain_lib._drain_methods', autospec=None,
             new={'exists1': mock.Mock(), 'exists2': mock.Mock()},
         ), mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             mock_load_system_paasta_config.return_value.get_cluster = mock.Mock(return_value='fake_cluster')
             actual = setup_marathon_job.deploy_service(
@@ -1517,7 +1517,7 @@ class TestSetupMarathonJob:
         ) as mock_log, mock.patch(
             'paasta_tools.setup_marathon_job.load_system_paasta_config', autospec=True,
         ) as mock_load_system_paasta_config, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             mock_load_system_paasta_config.return_value.get_cluster = mock.Mock(return_value='fake_cluster')
             actual = setup_marathon_job.deploy_service(
@@ -1606,7 +1606,7 @@ class TestSetupMarathonJob:
         ) as mock_load_system_paasta_config, mock.patch(
             'paasta_tools.drain_lib.get_drain_method', return_value=fake_drain_method, autospec=True,
         ), mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             mock_load_system_paasta_config.return_value.get_cluster = mock.Mock(return_value='fake_cluster')
             result = setup_marathon_job.deploy_service(
@@ -1689,7 +1689,7 @@ class TestSetupMarathonJob:
         ), mock.patch(
             'paasta_tools.setup_marathon_job.load_system_paasta_config', autospec=True,
         ) as mock_load_system_paasta_config, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             mock_load_system_paasta_config.return_value.get_cluster = mock.Mock(return_value='fake_cluster')
             ret = setup_marathon_job.deploy_service(
@@ -1739,7 +1739,7 @@ class TestSetupMarathonJob:
         ), mock.patch(
             'paasta_tools.setup_marathon_job.load_system_paasta_config', autospec=True,
         ) as mock_load_system_paasta_config, mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             mock_load_system_paasta_config.return_value.get_cluster = mock.Mock(return_value='fake_cluster')
             with raises(OSError):
@@ -1886,7 +1886,7 @@ class TestGetOldHappyUnhappyDrainingTasks:
         with mock.patch(
             'paasta_tools.bounce_lib.get_happy_tasks', side_effect=self.fake_get_happy_tasks, autospec=True,
         ), mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             actual = setup_marathon_job.get_tasks_by_state(
                 other_apps_with_clients=fake_apps_with_clients,
@@ -1954,7 +1954,7 @@ class TestGetOldHappyUnhappyDrainingTasks:
         with mock.patch(
             'paasta_tools.bounce_lib.get_happy_tasks', side_effect=self.fake_get_happy_tasks, autospec=True,
         ), mock.patch(
-            'paasta_tools.setup_marathon_job.get_draining_hosts', autospec=True,
+            'paasta_tools.setup_marathon_job.get_draining_hosts_snapshot', autospec=True,
         ):
             actual = setup_marathon_job.get_tasks_by_state(
                 other_apps_with_clients=fake_apps_with_clients,
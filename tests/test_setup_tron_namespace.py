@@ -0,0 +1,46 @@
+import mock
+import pytest
+
+from paasta_tools import setup_tron_namespace
+from paasta_tools.tron.client import config_hash
+
+
+@mock.patch('paasta_tools.setup_tron_namespace.tron_tools.create_complete_config', autospec=True)
+def test_sync_namespace_skips_unchanged_without_contacting_tron(mock_create_complete_config):
+    mock_create_complete_config.return_value = 'jobs: []'
+    mock_client = mock.Mock()
+    manifest = {'foo': config_hash('jobs: []')}
+
+    status, _, push_time = setup_tron_namespace.sync_namespace(
+        mock_client, 'foo', 'fake_cluster', '/nail/blah', manifest=manifest,
+    )
+    assert status == setup_tron_namespace.SKIPPED
+    assert push_time == 0.0
+    assert not mock_client.update_namespace.called
+
+
+@mock.patch('paasta_tools.setup_tron_namespace.tron_tools.create_complete_config', autospec=True)
+def test_sync_namespace_pushes_changed_and_records_digest(mock_create_complete_config):
+    mock_create_complete_config.return_value = 'jobs: [a]'
+    mock_client = mock.Mock()
+    manifest = {'foo': config_hash('jobs: []')}
+
+    status, _, _ = setup_tron_namespace.sync_namespace(
+        mock_client, 'foo', 'fake_cluster', '/nail/blah', manifest=manifest,
+    )
+    assert status == setup_tron_namespace.UPDATED
+    mock_client.update_namespace.assert_called_once_with('foo', 'jobs: [a]')
+    assert manifest == {'foo': config_hash('jobs: [a]')}
+
+    mock_client.update_namespace.side_effect = Exception('tron is down')
+    mock_create_complete_config.return_value = 'jobs: [b]'
+    with pytest.raises(Exception):
+        setup_tron_namespace.sync_namespace(mock_client, 'foo', 'fake_cluster', '/nail/blah', manifest=manifest)
+    assert manifest == {'foo': config_hash('jobs: [a]')}
+
+
+def test_manifest_round_trip(tmpdir):
+    path = str(tmpdir.join('manifest.json'))
+    assert setup_tron_namespace.load_manifest(path) == {}
+    setup_tron_namespace.write_manifest(path, {'foo': 'abc'})
+    assert setup_tron_namespace.load_manifest(path) == {'foo': 'abc'}
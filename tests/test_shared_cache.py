@@ -0,0 +1,160 @@
+import fcntl
+import os
+import time
+
+import mock
+import pytest
+
+from paasta_tools import shared_cache
+from paasta_tools.shared_cache import SharedCache
+
+
+@pytest.fixture
+def cache(tmpdir):
+    return SharedCache(str(tmpdir.join('cache')))
+
+
+def test_get_fetches_once_until_stale(cache):
+    fetch = mock.Mock(return_value={'apps': []})
+    assert cache.get('marathon_apps', 'key', fetch, ttl=60) == {'apps': []}
+    assert cache.get('marathon_apps', 'key', fetch, ttl=60) == {'apps': []}
+    assert fetch.call_count == 1
+
+    with mock.patch('paasta_tools.shared_cache.time.time', autospec=True, return_value=time.time() + 61):
+        cache.get('marathon_apps', 'key', fetch, ttl=60)
+    assert fetch.call_count == 2
+    assert cache.stats['marathon_apps'] == {'miss': 2, 'hit': 1}
+
+
+def test_get_is_shared_between_instances(cache):
+    cache.get('metastatus', ('-v',), lambda: ('output', 0), ttl=60)
+    other_process = SharedCache(cache.path)
+    fetch = mock.Mock()
+    assert other_process.get('metastatus', ('-v',), fetch, ttl=60) == ('output', 0)
+    assert not fetch.called
+    assert other_process.get('metastatus', (), lambda: ('other', 1), ttl=60) == ('other', 1)
+
+
+def test_get_holds_lock_while_fetching(cache):
+    path = cache.entry_path('mesos_state', 'key')
+
+    def fetch():
+        # flock locks belong to the open file, so this conflicts like another process would
+        with open(path + '.lock', 'a') as other_process_lock:
+            with pytest.raises(BlockingIOError):
+                fcntl.flock(other_process_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+        return 'state'
+
+    assert cache.get('mesos_state', 'key', fetch, ttl=60) == 'state'
+    with open(path + '.lock', 'a') as other_process_lock:
+        fcntl.flock(other_process_lock, fcntl.LOCK_EX | fcntl.LOCK_NB)
+
+
+def test_get_uses_entry_refreshed_while_waiting(cache):
+    # Another process refreshed the entry between our first read and us getting the lock
+    fetch = mock.Mock()
+    with mock.patch.object(cache, '_read', autospec=True, side_effect=[shared_cache._MISSING, 'refreshed']):
+        assert cache.get('mesos_state', 'key', fetch, ttl=60) == 'refreshed'
+    assert not fetch.called
+    assert cache.stats['mesos_state'] == {'coalesced': 1}
+
+
+def test_get_does_not_cache_failures(cache):
+    with pytest.raises(ValueError):
+        cache.get('metastatus', 'key', mock.Mock(side_effect=ValueError), ttl=60)
+    assert cache.get('metastatus', 'key', lambda: 'ok', ttl=60) == 'ok'
+
+
+def test_get_ignores_corrupt_entries(cache):
+    with open(cache.entry_path('metastatus', 'key'), 'w') as f:
+        f.write('garbage')
+    assert cache.get('metastatus', 'key', lambda: 'ok', ttl=60) == 'ok'
+
+
+@pytest.mark.asyncio
+async def test_get_async(cache):
+    fetch = mock.Mock(return_value='state')
+
+    async def fetch_async():
+        return fetch()
+
+    assert [await cache.get_async('mesos_state', 'key', fetch_async, ttl=60) for _ in range(2)] == ['state', 'state']
+    assert fetch.call_count == 1
+    assert cache.stats['mesos_state'] == {'miss': 1, 'hit': 1}
+
+
+def test_metrics(tmpdir):
+    metrics = mock.Mock()
+    cache = SharedCache(str(tmpdir.join('cache')), metrics=metrics)
+    for _ in range(3):
+        cache.get('marathon_apps', 'key', lambda: [], ttl=60)
+    assert metrics.create_counter.call_args_list == [mock.call('marathon_apps.miss'), mock.call('marathon_apps.hit')]
+    assert metrics.create_counter.return_value.count.call_count == 3
+
+
+def test_configure(tmpdir):
+    with mock.patch.object(shared_cache, '_shared_cache', None):
+        configured = shared_cache.configure(str(tmpdir.join('cache')))
+        assert shared_cache.get_shared_cache() is configured
+        assert os.path.isdir(str(tmpdir.join('cache')))
+
+        shared_cache.configure(None)
+        assert shared_cache.get_shared_cache() is None
+
+
+def test_refuses_directory_others_can_access(tmpdir):
+    path = tmpdir.join('cache')
+    path.mkdir()
+    path.chmod(0o777)
+    with pytest.raises(PermissionError):
+        SharedCache(str(path))
+
+    target = tmpdir.join('target')
+    target.mkdir()
+    target.chmod(0o700)
+    tmpdir.join('link').mksymlinkto(target)
+    with pytest.raises(PermissionError):
+        SharedCache(str(tmpdir.join('link')))
+
+    with mock.patch.object(shared_cache, '_shared_cache', None):
+        assert shared_cache.configure(str(path)) is None
+
+
+def test_refuses_directory_of_other_user(cache):
+    with mock.patch('paasta_tools.shared_cache.os.geteuid', autospec=True, return_value=os.geteuid() + 1):
+        with pytest.raises(PermissionError):
+            SharedCache(cache.path)
+
+
+def test_write_removes_temporary_file_on_error(cache):
+    # lambdas can't be pickled; the value is still returned, just not shared
+    assert cache.get('metastatus', 'key', lambda: lambda: None, ttl=60) is not None
+    assert os.listdir(cache.path) == [os.path.basename(cache.entry_path('metastatus', 'key')) + '.lock']
+
+
+def test_sweep(cache):
+    for endpoint in ('old', 'held', 'new'):
+        cache.get(endpoint, 'key', lambda: 'value', ttl=60)
+    old_time = time.time() - cache.max_age - 1
+    for endpoint in ('old', 'held'):
+        for path in (cache.entry_path(endpoint, 'key'), cache.entry_path(endpoint, 'key') + '.lock'):
+            os.utime(path, (old_time, old_time))
+
+    with open(cache.entry_path('held', 'key') + '.lock', 'a') as held_lock:
+        fcntl.flock(held_lock, fcntl.LOCK_EX)
+        cache.sweep()
+
+    assert sorted(os.listdir(cache.path)) == sorted([
+        os.path.basename(cache.entry_path('held', 'key')) + '.lock',
+        os.path.basename(cache.entry_path('new', 'key')),
+        os.path.basename(cache.entry_path('new', 'key')) + '.lock',
+    ])
+
+
+def test_write_sweeps_periodically(cache):
+    with mock.patch.object(cache, 'sweep', autospec=True) as mock_sweep:
+        cache.get('metastatus', 'a', lambda: 'value', ttl=60)
+        assert mock_sweep.call_count == 0
+        cache._last_sweep -= shared_cache.SWEEP_INTERVAL
+        cache.get('metastatus', 'b', lambda: 'value', ttl=60)
+        assert mock_sweep.call_count == 1
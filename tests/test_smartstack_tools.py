@@ -277,6 +277,31 @@ def test_get_replication_for_instance(
     )
 
 
+def test_prefetch_replication_for_location(system_paasta_config):
+    checker = smartstack_tools.SmartstackReplicationChecker(
+        mesos_slaves=[],
+        system_paasta_config=system_paasta_config,
+    )
+    stats_client = smartstack_tools.HaproxyStatsClient()
+    with mock.patch.object(
+        smartstack_tools, '_haproxy_stats_client', stats_client,
+    ), mock.patch.object(
+        stats_client, 'fetch_csv', autospec=True, return_value='\n'.join(FAKE_HAPROXY_CSV),
+    ) as mock_fetch_csv:
+        checker.prefetch_replication_for_location('fake_region1', 'host1')
+        # locations served by the same host share its haproxy stats
+        checker.prefetch_replication_for_location('fake_habitat1', 'host1')
+        checker.prefetch_replication_for_location('fake_region1', 'host2')
+        mock_fetch_csv.assert_called_once_with(
+            system_paasta_config.get_synapse_haproxy_url_format().format(
+                host='host1', port=system_paasta_config.get_synapse_port(),
+            ),
+        )
+        instance_config = mock.Mock(service='service1', instance='main')
+        assert checker._get_replication_info('fake_habitat1', 'host3', instance_config) == {'service1.main': 2}
+        assert mock_fetch_csv.call_count == 1
+
+
 def test_are_services_up_on_port():
     with mock.patch(
         'paasta_tools.smartstack_tools.get_multiple_backends', autospec=True,
@@ -391,3 +416,116 @@ def test_are_services_up_on_port():
             host_ip='10.1.1.1',
             host_port=8888,
         )
+
+
+FAKE_HAPROXY_CSV = [
+    '# pxname,svname,status,',
+    'service1.main,FRONTEND,OPEN,',
+    'service1.main,10.0.0.1:31000_box1,UP,',
+    'service2.main,10.0.0.2:31000_box2,DOWN,',
+    'service1.main,10.0.0.3:31000_box3,UP,',
+    'service1.main,BACKEND,UP,',
+]
+
+
+def test_haproxy_stats_get_backends():
+    stats = smartstack_tools.HaproxyStats.from_csv(FAKE_HAPROXY_CSV)
+    assert stats.get_backends(['service1.main']) == [
+        {'pxname': 'service1.main', 'svname': '10.0.0.1:31000_box1', 'status': 'UP'},
+        {'pxname': 'service1.main', 'svname': '10.0.0.3:31000_box3', 'status': 'UP'},
+    ]
+    assert [b['svname'] for b in stats.get_backends()] == [
+        '10.0.0.1:31000_box1', '10.0.0.2:31000_box2', '10.0.0.3:31000_box3',
+    ]
+    assert [b['svname'] for b in stats.get_backends({'service2.main', 'service1.main'})] == [
+        '10.0.0.1:31000_box1', '10.0.0.2:31000_box2', '10.0.0.3:31000_box3',
+    ]
+    assert stats.get_backends(['service3.main']) == []
+    # callers get their own dicts
+    stats.get_backends(['service2.main'])[0]['status'] = 'UP'
+    assert stats.get_backends(['service2.main'])[0]['status'] == 'DOWN'
+
+
+def test_haproxy_stats_client_caches_per_host():
+    client = smartstack_tools.HaproxyStatsClient(ttl=2)
+    with mock.patch.object(
+        client, 'fetch_csv', autospec=True, return_value='\n'.join(FAKE_HAPROXY_CSV),
+    ) as mock_fetch_csv, mock.patch(
+        'paasta_tools.smartstack_tools.time.time', autospec=True,
+    ) as mock_time:
+        mock_time.return_value = 100
+        first = client.get_stats('host1', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT)
+        assert client.get_stats('host1', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT) is first
+        client.get_stats('host2', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT)
+        assert mock_fetch_csv.call_count == 2
+
+        mock_time.return_value = 103
+        assert client.get_stats('host1', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT) is not first
+        assert mock_fetch_csv.call_count == 3
+        mock_fetch_csv.assert_called_with(DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT.format(host='host1', port=3212))
+
+
+def test_haproxy_stats_client_reuses_session():
+    client = smartstack_tools.HaproxyStatsClient()
+    with mock.patch('paasta_tools.smartstack_tools.requests.Session', autospec=True) as mock_session:
+        mock_session.return_value.headers = {}
+        mock_session.return_value.get.return_value.text = 'csv'
+        assert client.fetch_csv('http://host1:3212/;csv') == 'csv'
+        assert client.fetch_csv('http://host2:3212/;csv') == 'csv'
+        assert mock_session.call_count == 1
+        mock_session.return_value.get.assert_called_with('http://host2:3212/;csv', timeout=1)
+
+
+def test_smartstack_registration_service():
+    registration_service = smartstack_tools.SmartstackRegistrationService()
+    stats_client = smartstack_tools.HaproxyStatsClient(ttl=10)
+    task1 = mock.Mock(host='box1', ports=[31000])
+    task2 = mock.Mock(host='box2', ports=[31000])
+    task3 = mock.Mock(host='box3', ports=[31001, 31000])
+    hostnames = {'box1': '10.0.0.1', 'box2': '10.0.0.2', 'box3': '10.0.0.3'}
+    with mock.patch.object(
+        smartstack_tools, '_haproxy_stats_client', stats_client,
+    ), mock.patch.object(
+        stats_client, 'fetch_csv', autospec=True, return_value='\n'.join(FAKE_HAPROXY_CSV),
+    ) as mock_fetch_csv, mock.patch(
+        'paasta_tools.smartstack_tools.time.time', autospec=True, return_value=100,
+    ) as mock_time, mock.patch(
+        'paasta_tools.smartstack_tools.socket.gethostbyname', autospec=True, side_effect=lambda x: hostnames[x],
+    ):
+        assert registration_service.get_registered_tasks(
+            'host1', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT,
+            {'service1.main': [task1, task2, task3], 'service2.main': [task2]},
+        ) == {'service1.main': [task1, task3], 'service2.main': []}
+
+        mock_time.return_value = 105
+        assert registration_service.get_registered_tasks(
+            'host1', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT, {'service1.main': [task2]},
+        ) == {'service1.main': []}
+        assert mock_fetch_csv.call_count == 1
+        assert registration_service.get_metrics() == {'hits': 1, 'misses': 1, 'hit_rate': 0.5, 'staleness': 5}
+
+        mock_time.return_value = 110
+        registration_service.get_registered_tasks('host1', 3212, DEFAULT_SYNAPSE_HAPROXY_URL_FORMAT, {})
+        assert mock_fetch_csv.call_count == 2
+        assert registration_service.get_metrics()['staleness'] == 0
+
+
+def test_haproxy_stats_get_up_ip_ports():
+    stats = smartstack_tools.HaproxyStats.from_csv(FAKE_HAPROXY_CSV)
+    assert stats.get_up_ip_ports('service1.main') == {('10.0.0.1', 31000), ('10.0.0.3', 31000)}
+    assert stats.get_up_ip_ports('service2.main') == set()
+    assert stats.get_up_ip_ports('service1.main') is stats.get_up_ip_ports('service1.main')
+
+
+def test_get_multiple_backends():
+    with mock.patch.object(
+        smartstack_tools.get_haproxy_stats_client(), 'get_stats', autospec=True,
+        return_value=smartstack_tools.HaproxyStats.from_csv(FAKE_HAPROXY_CSV),
+    ) as mock_get_stats:
+        backends = smartstack_tools.get_multiple_backends(
+            ['service2.main'], synapse_host='host1', synapse_port=3212, synapse_haproxy_url_format='fmt',
+        )
+        assert backends == [{'pxname': 'service2.main', 'svname': '10.0.0.2:31000_box2', 'status': 'DOWN'}]
+        mock_get_stats.assert_called_once_with(
+            synapse_host='host1', synapse_port=3212, synapse_haproxy_url_format='fmt',
+        )
@@ -0,0 +1,95 @@
+import os
+
+import mock
+
+from paasta_tools import soa_config_cache
+from paasta_tools.soa_config_cache import SoaConfigCache
+
+
+def _write(path, contents):
+    with open(path, 'w') as f:
+        f.write(contents)
+
+
+def test_load_only_reloads_changed_files(tmpdir):
+    path = str(tmpdir.join('marathon-foo.yaml'))
+    _write(path, 'a')
+    cache = SoaConfigCache()
+    loader = mock.Mock(return_value={'main': {}})
+
+    assert cache.load('key', [path], loader) == {'main': {}}
+    assert cache.load('key', [path], loader) == {'main': {}}
+    assert loader.call_count == 1
+    assert cache.hits == 1
+
+    _write(path, 'ab')
+    cache.load('key', [path], loader)
+    assert loader.call_count == 2
+
+
+def test_load_returns_the_cached_value(tmpdir):
+    path = str(tmpdir.join('marathon-foo.yaml'))
+    _write(path, 'a')
+    cache = SoaConfigCache()
+    value = cache.load('key', [path], lambda: {'main': {'cpus': 1}})
+    assert cache.load('key', [path], mock.Mock()) is value
+
+
+def test_load_does_not_cache_missing_files(tmpdir):
+    cache = SoaConfigCache()
+    loader = mock.Mock(return_value={})
+    cache.load('key', [str(tmpdir.join('nope.yaml'))], loader)
+    cache.load('key', [str(tmpdir.join('nope.yaml'))], loader)
+    assert loader.call_count == 2
+    assert len(cache) == 0
+
+
+def test_load_evicts_least_recently_used(tmpdir):
+    path = str(tmpdir.join('marathon-foo.yaml'))
+    _write(path, 'a')
+    cache = SoaConfigCache(max_entries=2)
+    cache.load('a', [path], lambda: 'a')
+    cache.load('b', [path], lambda: 'b')
+    cache.load('a', [path], mock.Mock())
+    cache.load('c', [path], lambda: 'c')
+    assert list(cache.entries.keys()) == ['a', 'c']
+
+
+def test_invalidate(tmpdir):
+    service_dir = tmpdir.mkdir('universe')
+    path_1 = str(service_dir.join('marathon-foo.yaml'))
+    path_2 = str(tmpdir.mkdir('universe2').join('marathon-foo.yaml'))
+    _write(path_1, 'a')
+    _write(path_2, 'a')
+    cache = SoaConfigCache()
+    cache.load('1', [path_1], lambda: 1)
+    cache.load('2', [path_2], lambda: 2)
+
+    cache.invalidate(str(service_dir))
+    assert list(cache.entries.keys()) == ['2']
+    cache.invalidate(path_2)
+    assert len(cache) == 0
+
+
+def test_read_extra_service_information(tmpdir):
+    service_dir = tmpdir.mkdir('universe')
+    _write(str(service_dir.join('marathon-foo.yaml')), 'main:\n  cpus: 1\n')
+    with mock.patch.object(soa_config_cache, 'soa_config_cache', SoaConfigCache()), mock.patch(
+        'paasta_tools.soa_config_cache.service_configuration_lib.read_extra_service_information',
+        autospec=True, return_value={'main': {'cpus': 1}},
+    ) as mock_read_extra_service_information:
+        for _ in range(2):
+            assert soa_config_cache.read_extra_service_information(
+                'universe', 'marathon-foo', soa_dir=str(tmpdir),
+            ) == {'main': {'cpus': 1}}
+        mock_read_extra_service_information.assert_called_once_with('universe', 'marathon-foo', soa_dir=str(tmpdir))
+
+
+def test_read_json_file(tmpdir):
+    path = os.path.join(str(tmpdir), 'deployments.json')
+    _write(path, '{"v2": {}}')
+    with mock.patch.object(soa_config_cache, 'soa_config_cache', SoaConfigCache()):
+        assert soa_config_cache.read_json_file(path) == {'v2': {}}
+        assert soa_config_cache.soa_config_cache.misses == 1
+        assert soa_config_cache.read_json_file(path) == {'v2': {}}
+        assert soa_config_cache.soa_config_cache.hits == 1
@@ -12,6 +12,7 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 import datetime
+import io
 import json
 import os
 import stat
@@ -89,6 +90,13 @@ def test_deploy_whitelist_to_constraints():
     assert constraints == expected_constraints
 
 
+def test_format_log_line_strips_ansi_escape_sequences():
+    line = utils.format_log_line(
+        'debug', 'cluster', 'service', 'instance', 'build', '\x1b[32mfoo\x1b[0m', timestamp='now',
+    )
+    assert json.loads(line)['message'] == 'foo'
+
+
 def test_format_log_line_with_timestamp():
     input_line = 'foo'
     fake_cluster = 'fake_cluster'
@@ -1960,6 +1968,106 @@ class TestFileLogWriter:
         }
 
 
+class TestBufferedFileLogWriter:
+    @pytest.fixture
+    def writer(self, tmpdir):
+        with mock.patch.object(utils.BufferedFileLogWriter, '_start_flusher', autospec=True):
+            yield utils.BufferedFileLogWriter(str(tmpdir.join('{service}.log')))
+
+    def test_log_batches_lines(self, writer, tmpdir):
+        with mock.patch("paasta_tools.utils.format_log_line", side_effect=lambda *args: args[-1], autospec=True):
+            writer.log('service1', 'line1', 'build')
+            writer.log('service2', 'line2', 'build')
+            writer.log('service1', 'line3', 'build')
+            assert not tmpdir.join('service1.log').exists()
+
+            with mock.patch("paasta_tools.utils.io.FileIO", autospec=None, wraps=io.FileIO) as mock_FileIO:
+                writer.flush()
+                assert tmpdir.join('service1.log').read() == 'line1\nline3\n'
+                assert tmpdir.join('service2.log').read() == 'line2\n'
+
+                writer.log('service1', 'line4', 'build')
+                writer.flush()
+                assert tmpdir.join('service1.log').read() == 'line1\nline3\nline4\n'
+            # files stay open between flushes
+            assert mock_FileIO.call_count == 2
+
+    def test_log_writes_each_batch_at_once(self, writer):
+        fake_file = mock.Mock()
+        with mock.patch.object(writer, '_open', autospec=True, return_value=fake_file), mock.patch(
+            "paasta_tools.utils.format_log_line", side_effect=lambda *args: args[-1], autospec=True,
+        ):
+            writer.log('service', 'line1', 'build')
+            writer.log('service', 'line2', 'build')
+            writer.flush()
+        fake_file.write.assert_called_once_with(b'line1\nline2\n')
+
+    def test_log_wakes_flusher_when_buffer_is_full(self, writer):
+        writer.max_buffer_bytes = 1000
+        writer.log('service', 'line', 'build')
+        assert not writer._wakeup.is_set()
+        writer.log('service', 'x' * 1000, 'build')
+        assert writer._wakeup.is_set()
+
+    def test_log_starts_flusher_once_per_process(self, writer):
+        writer._flusher_pid = os.getpid()
+        writer.log('service', 'line', 'build')
+        assert writer._start_flusher.call_count == 0
+
+        writer._flusher_pid = None
+        writer.log('service', 'line', 'build')
+        assert writer._start_flusher.call_count == 1
+
+    def test_start_flusher_after_fork(self, tmpdir):
+        writer = utils.BufferedFileLogWriter(str(tmpdir.join('{service}.log')))
+        writer._flusher_pid = -1
+        writer._buffers = {'parent.log': [b'line\n']}
+        with mock.patch("paasta_tools.utils.threading.Thread", autospec=True) as mock_Thread:
+            writer._start_flusher()
+        assert writer._buffers == {}
+        assert writer._flusher_pid == os.getpid()
+        mock_Thread.return_value.start.assert_called_once_with()
+
+    def test_flush_in_forked_child_leaves_parent_buffer(self, writer, tmpdir):
+        writer.log('service', 'line', 'build')
+        writer._flusher_pid = -1
+        # held by the parent's flusher thread at the time of the fork
+        writer._write_lock.acquire()
+        writer.flush()
+        assert not tmpdir.join('service.log').exists()
+
+    def test_reopens_rotated_files(self, writer, tmpdir):
+        writer.log('service', 'line1', 'build')
+        writer.flush()
+        tmpdir.join('service.log').rename(tmpdir.join('service.log.1'))
+        writer.log('service', 'line2', 'build')
+        writer.flush()
+        assert 'line1' in tmpdir.join('service.log.1').read()
+        assert 'line1' not in tmpdir.join('service.log').read()
+        assert 'line2' in tmpdir.join('service.log').read()
+
+    def test_closes_least_recently_written_files(self, writer):
+        writer.max_open_files = 2
+        for service in ('service1', 'service2', 'service1', 'service3'):
+            writer.log(service, 'line', 'build')
+            writer.flush()
+        assert list(writer._files) == [writer.format_path('service1', 'build', 'event', 'N/A', 'N/A'),
+                                       writer.format_path('service3', 'build', 'event', 'N/A', 'N/A')]
+
+    def test_write_raises_IOError(self, writer):
+        with mock.patch.object(
+            writer, '_open', autospec=True, side_effect=IOError("hurp durp"),
+        ), mock.patch(
+            "paasta_tools.utils.paasta_print", autospec=True,
+        ) as mock_print, mock.patch(
+            "paasta_tools.utils.format_log_line", return_value="line", autospec=True,
+        ):
+            writer.log('service', 'line', 'build')
+            writer.flush()
+        path = writer.format_path('service', 'build', 'event', 'N/A', 'N/A')
+        assert mock_print.call_args[0][0] == f"Could not log to {path}: OSError: hurp durp -- would have logged: line\n"
+
+
 def test_deep_merge_dictionaries():
     overrides = {
         'common_key': 'value',